@@ -5,7 +5,7 @@ from slsim.Deflectors.MassLightConnection.velocity_dispersion import (
     vel_disp_abundance_matching,
 )
 from slsim.Deflectors.DeflectorPopulation.elliptical_lens_galaxies import (
-    elliptical_projected_eccentricity,
+    materialize_deflectors,
 )
 from slsim.Deflectors.DeflectorPopulation.deflectors_base import DeflectorsBase
 from astropy.table import vstack
@@ -26,6 +26,8 @@ class AllLensGalaxies(DeflectorsBase):
         sky_area,
         gamma_pl=None,
         catalog_type="skypy",
+        analytic_vel_disp=False,
+        einstein_radius_table=False,
     ):
         """
         :param red_galaxy_list: list of dictionary with elliptical galaxy
@@ -52,6 +54,13 @@ class AllLensGalaxies(DeflectorsBase):
          default, this class considers deflector catalog is generated using skypy
          pipeline.
         :type catalog_type: str. "skypy" or None.
+        :param analytic_vel_disp: If True, the velocity dispersions are
+         abundance matched analytically, see `vel_disp_abundance_matching`.
+        :type analytic_vel_disp: bool
+        :param einstein_radius_table: If True, the velocity dispersions of power-law
+         deflectors are measured ones (sis_convention=False) and their Einstein radii
+         are computed with `EPLEinsteinRadiusTable`, see `materialize_deflectors`.
+        :type einstein_radius_table: bool
         """
         red_galaxy_list = catalog_with_angular_size_in_arcsec(
             galaxy_catalog=red_galaxy_list, input_catalog_type=catalog_type
@@ -92,7 +101,11 @@ class AllLensGalaxies(DeflectorsBase):
 
         galaxy_list = fill_table(galaxy_list)
         self._f_vel_disp = vel_disp_abundance_matching(
-            galaxy_list, z_max=0.5, sky_area=sky_area, cosmo=cosmo
+            galaxy_list,
+            z_max=0.5,
+            sky_area=sky_area,
+            cosmo=cosmo,
+            analytic=analytic_vel_disp,
         )
 
         self._galaxy_select = object_cut(galaxy_list, **kwargs_cut)
@@ -100,6 +113,9 @@ class AllLensGalaxies(DeflectorsBase):
         self._galaxy_select["vel_disp"] = self._f_vel_disp(
             np.log10(self._galaxy_select["stellar_mass"])
         )
+        self._columns = materialize_deflectors(
+            self._galaxy_select, einstein_radius_table=einstein_radius_table
+        )
         # TODO: random reshuffle of matched list
 
     def deflector_number(self):
@@ -117,19 +133,25 @@ class AllLensGalaxies(DeflectorsBase):
         """
 
         index = random.randint(0, self._num_select - 1)
-        deflector = self._galaxy_select[index]
-        if deflector["e1_light"] == -1 or deflector["e2_light"] == -1:
-            e1_light, e2_light, e1_mass, e2_mass = elliptical_projected_eccentricity(
-                **deflector
-            )
-            deflector["e1_light"] = e1_light
-            deflector["e2_light"] = e2_light
-            deflector["e1_mass"] = e1_mass
-            deflector["e2_mass"] = e2_mass
-        if deflector["n_sersic"] == -1:
-            deflector["n_sersic"] = 4  # TODO make a better estimate with scatter
-        deflector_class = Deflector(deflector_type=self.deflector_profile, **deflector)
-        return deflector_class
+        return self._deflector_from_columns(index)
+
+    def draw_deflectors(self, n):
+        """Draws n deflectors at once.
+
+        :param n: number of deflectors
+        :type n: int
+        :return: list of Deflector instances
+        """
+        indices = random.randint(0, self._num_select - 1, size=n)
+        return Deflector.from_arrays(self.deflector_profile, self._columns, indices)
+
+    def _deflector_from_columns(self, index):
+        """Deflector of a row of the materialized columns.
+
+        :param index: row index of the selected deflectors
+        :return: Deflector instance
+        """
+        return Deflector.from_arrays(self.deflector_profile, self._columns, [index])[0]
 
 
 def fill_table(galaxy_list):
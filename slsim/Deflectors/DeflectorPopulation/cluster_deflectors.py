@@ -9,7 +9,7 @@ from slsim.Deflectors.MassLightConnection.velocity_dispersion import (
     vel_disp_abundance_matching,
 )
 from slsim.Deflectors.DeflectorPopulation.elliptical_lens_galaxies import (
-    elliptical_projected_eccentricity,
+    materialize_deflectors,
 )
 from slsim.Deflectors.MassLightConnection.velocity_dispersion import vel_disp_nfw
 from slsim.Deflectors.DeflectorPopulation.deflectors_base import DeflectorsBase
@@ -17,7 +17,7 @@ from slsim.Deflectors.deflector import Deflector
 from lenstronomy.Util.param_util import phi_q2_ellipticity
 from astropy import units as u
 from astropy.table import hstack
-from scipy.spatial.distance import cdist
+from scipy.spatial import cKDTree
 
 
 class ClusterDeflectors(DeflectorsBase):
@@ -101,6 +101,7 @@ class ClusterDeflectors(DeflectorsBase):
         )
 
         self._kwargs_mass2light = kwargs_mass2light
+        self._prepare_members()
 
         self._num_select = len(self._cluster_select)
 
@@ -155,6 +156,27 @@ class ClusterDeflectors(DeflectorsBase):
             cluster["e2_mass"] = e2
         return dict(cluster)
 
+    def _prepare_members(self):
+        """Groups the selected members by cluster, sorted by cluster_id with
+        the offsets of each cluster, and fills their missing velocity
+        dispersions in one vectorized pass.
+
+        The missing ellipticities are random and drawn anew by each call of
+        `draw_members`.
+        """
+        members = self._members_select
+        members = members[np.argsort(members["cluster_id"], kind="stable")]
+        members["vel_disp"] = np.where(
+            members["vel_disp"] == -1,
+            param_util.vel_disp_from_m_star(members["stellar_mass"]),
+            members["vel_disp"],
+        )
+        self._members_select = members
+        self._member_cluster_ids, first = np.unique(
+            np.asarray(members["cluster_id"]), return_index=True
+        )
+        self._member_offsets = np.append(first, len(members))
+
     def draw_members(self, cluster_id, center_scatter=0.2, max_dist=80, bcg_band="r"):
         """
         :param cluster_id: identifier of the cluster
@@ -167,28 +189,16 @@ class ClusterDeflectors(DeflectorsBase):
         :type bcg_band: str
         :return: astropy table with EPL+Sersic parameters of each member
         """
-        members = self._members_select[cluster_id == self._members_select["cluster_id"]]
-
-        members["vel_disp"] = np.where(
-            members["vel_disp"] == -1,
-            param_util.vel_disp_from_m_star(members["stellar_mass"]),
-            members["vel_disp"],
-        )
-
-        for i in range(len(members)):
-            if members[i]["e1_light"] == -1 or members[i]["e2_light"] == -1:
-                e1_light, e2_light, e1_mass, e2_mass = (
-                    elliptical_projected_eccentricity(
-                        **members[i], **self._kwargs_mass2light
-                    )
-                )
-                members[i]["e1_light"] = e1_light
-                members[i]["e2_light"] = e2_light
-                members[i]["e1_mass"] = e1_mass
-                members[i]["e2_mass"] = e2_mass
-        members["n_sersic"] = np.where(
-            members["n_sersic"] == -1, 4, members["n_sersic"]
-        )
+        i = np.searchsorted(self._member_cluster_ids, cluster_id)
+        if i < len(self._member_cluster_ids) and (
+            self._member_cluster_ids[i] == cluster_id
+        ):
+            start, stop = self._member_offsets[i], self._member_offsets[i + 1]
+        else:
+            start, stop = 0, 0
+        members = self._members_select[start:stop].copy()
+        # draws the missing ellipticities of the members of this cluster
+        materialize_deflectors(members, kwargs_mass2light=self._kwargs_mass2light)
         bcg_id = np.argmin(members[f"mag_{bcg_band}"])
         bcg_ra, bcg_dec = members["ra"][bcg_id], members["dec"][bcg_id]
         center_ra, center_dec = (
@@ -216,7 +226,9 @@ class ClusterDeflectors(DeflectorsBase):
         max_gals=10000,
     ):
         """Assigns a similar galaxy to each member of a group/cluster member
-        catalog by comparing their magnitudes and redshifts.
+        catalog by comparing their magnitudes and redshifts. The nearest galaxy
+        in (magnitudes, distance modulus) is found with a KD-tree, with a
+        memory footprint linear in the number of members and galaxies.
 
         :param members_list: astropy table with columns 'mag_{band}',
             'z'
@@ -227,11 +239,12 @@ class ClusterDeflectors(DeflectorsBase):
         :type cosmo: astropy.cosmology
         :param bands: list of bands to compare
         :type bands: list
-        :param max_gals: maximum number of galaxies to compare to
-        :type max_gals: int
+        :param max_gals: maximum number of galaxies to compare to. If
+            None, all galaxies are compared to.
+        :type max_gals: int or None
         """
         # shuffle galaxy list and select a subset
-        if len(galaxy_list) > max_gals:
+        if max_gals is not None and len(galaxy_list) > max_gals:
             indices = np.random.choice(len(galaxy_list), max_gals, replace=False)
             galaxy_list = galaxy_list[indices]
 
@@ -246,12 +259,12 @@ class ClusterDeflectors(DeflectorsBase):
         dist_mod_galaxies = -5 * np.log10(
             cosmo.luminosity_distance(galaxy_list["z"]) / (10 * u.pc)
         )
-        distance = cdist(
-            np.stack([*mag_members, dist_mod_members], axis=1),
-            np.stack([*mag_galaxies, dist_mod_galaxies], axis=1),
-            metric="euclidean",
+        tree = cKDTree(
+            np.stack([*mag_galaxies, dist_mod_galaxies], axis=1).astype(float)
+        )
+        _, nearest_neighbors_indices = tree.query(
+            np.stack([*mag_members, dist_mod_members], axis=1).astype(float)
         )
-        nearest_neighbors_indices = distance.argmin(axis=1)
         similar_galaxies = galaxy_list[nearest_neighbors_indices]
         include_cols_members = [
             col for col in members_list.columns if col not in mag_cols  # + ["z"]
@@ -293,13 +306,21 @@ class ClusterDeflectors(DeflectorsBase):
         n_members = len(members_list)
         column_names = members_list.columns
         if "z" not in column_names:
-            members_list["z"] = -np.ones(n_members)
             # assign the redshift of the cluster to its members
-            for i in range(n_clusters):
-                z = cluster_list["z"][i]
-                members_list["z"][
-                    members_list["cluster_id"] == cluster_list["cluster_id"][i]
-                ] = z
+            cluster_ids = np.asarray(cluster_list["cluster_id"])
+            order = np.argsort(cluster_ids)
+            member_ids = np.asarray(members_list["cluster_id"])
+            index = np.clip(
+                np.searchsorted(cluster_ids, member_ids, sorter=order),
+                0,
+                n_clusters - 1,
+            )
+            index = order[index]
+            members_list["z"] = np.where(
+                cluster_ids[index] == member_ids,
+                np.asarray(cluster_list["z"])[index],
+                -1.0,
+            )
         # use center_x and center_y if available, otherwise use ra and dec
         if "center_x" not in column_names or "center_y" not in column_names:
             members_list["center_x"] = -np.ones(n_members)
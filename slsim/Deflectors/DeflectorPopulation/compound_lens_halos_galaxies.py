@@ -94,3 +94,15 @@ class CompoundLensHalosGalaxies(DeflectorsBase):
             deflector["e2_mass"] = e2_mass
         deflector_class = Deflector(deflector_type=self.deflector_profile, **deflector)
         return deflector_class
+
+    def draw_deflectors(self, n):
+        """Draws n deflectors at once, with their Einstein radii for a source
+        at infinity solved together (see `Deflector.theta_e_infinity_batch`).
+
+        :param n: number of deflectors
+        :type n: int
+        :return: list of Deflector instances
+        """
+        deflectors = [self.draw_deflector() for _ in range(n)]
+        Deflector.theta_e_infinity_batch(deflectors, cosmo=self._cosmo)
+        return deflectors
@@ -3,6 +3,9 @@ import numpy.random as random
 from slsim.Lenses.selection import object_cut
 from slsim.Util import param_util
 from slsim.Deflectors.DeflectorPopulation.deflectors_base import DeflectorsBase
+from slsim.Deflectors.MassLightConnection.einstein_radius_table import (
+    EPLEinsteinRadiusTable,
+)
 from slsim.Deflectors.MassLightConnection.velocity_dispersion import (
     vel_disp_abundance_matching,
 )
@@ -21,6 +24,8 @@ class EllipticalLensGalaxies(DeflectorsBase):
         sky_area,
         gamma_pl=None,
         catalog_type="skypy",
+        analytic_vel_disp=False,
+        einstein_radius_table=False,
     ):
         """
 
@@ -44,6 +49,13 @@ class EllipticalLensGalaxies(DeflectorsBase):
          gamma for uniform distribution. eg: gamma_pl=2.1, gamma_pl={"mean": a, "std_dev": b},
          gamma_pl={"gamma_min": c, "gamma_max": d}
         :type catalog_type: str. "skypy" or None.
+        :param analytic_vel_disp: If True, the velocity dispersions are
+         abundance matched analytically, see `vel_disp_abundance_matching`.
+        :type analytic_vel_disp: bool
+        :param einstein_radius_table: If True, the velocity dispersions of power-law
+         deflectors are measured ones (sis_convention=False) and their Einstein radii
+         are computed with `EPLEinsteinRadiusTable`, see `materialize_deflectors`.
+        :type einstein_radius_table: bool
         """
         galaxy_list = param_util.catalog_with_angular_size_in_arcsec(
             galaxy_catalog=galaxy_list, input_catalog_type=catalog_type
@@ -70,7 +82,11 @@ class EllipticalLensGalaxies(DeflectorsBase):
             galaxy_list["n_sersic"] = -np.ones(n)
 
         self._f_vel_disp = vel_disp_abundance_matching(
-            galaxy_list, z_max=0.5, sky_area=sky_area, cosmo=cosmo
+            galaxy_list,
+            z_max=0.5,
+            sky_area=sky_area,
+            cosmo=cosmo,
+            analytic=analytic_vel_disp,
         )
 
         self._galaxy_select = object_cut(galaxy_list, **kwargs_cut)
@@ -78,6 +94,9 @@ class EllipticalLensGalaxies(DeflectorsBase):
         self._galaxy_select["vel_disp"] = self._f_vel_disp(
             np.log10(self._galaxy_select["stellar_mass"])
         )
+        self._columns = materialize_deflectors(
+            self._galaxy_select, einstein_radius_table=einstein_radius_table
+        )
 
         self._kwargs_mass2light = kwargs_mass2light
 
@@ -98,19 +117,91 @@ class EllipticalLensGalaxies(DeflectorsBase):
         """
 
         index = random.randint(0, self._num_select - 1)
-        deflector = self._galaxy_select[index]
-        if deflector["e1_light"] == -1 or deflector["e2_light"] == -1:
-            e1_light, e2_light, e1_mass, e2_mass = elliptical_projected_eccentricity(
-                **deflector
-            )
-            deflector["e1_light"] = e1_light
-            deflector["e2_light"] = e2_light
-            deflector["e1_mass"] = e1_mass
-            deflector["e2_mass"] = e2_mass
-        if deflector["n_sersic"] == -1:
-            deflector["n_sersic"] = 4  # TODO make a better estimate with scatter
-        deflector_class = Deflector(deflector_type=self.deflector_profile, **deflector)
-        return deflector_class
+        return self._deflector_from_columns(index)
+
+    def draw_deflectors(self, n):
+        """Draws n deflectors at once.
+
+        :param n: number of deflectors
+        :type n: int
+        :return: list of Deflector instances
+        """
+        indices = random.randint(0, self._num_select - 1, size=n)
+        return Deflector.from_arrays(self.deflector_profile, self._columns, indices)
+
+    def _deflector_from_columns(self, index):
+        """Deflector of a row of the materialized columns.
+
+        :param index: row index of the selected deflectors
+        :return: Deflector instance
+        """
+        return Deflector.from_arrays(self.deflector_profile, self._columns, [index])[0]
+
+
+def materialize_deflectors(
+    galaxy_list, kwargs_mass2light=None, einstein_radius_table=False
+):
+    """Fills the missing ellipticities (-1) and Sersic indices (-1) of all
+    galaxies of a table in one vectorized pass, and returns its columns as
+    contiguous arrays from which deflectors are drawn by index. The filled
+    values are also written to the table.
+
+    With `einstein_radius_table`, the velocity dispersions of power-law
+    deflectors are taken as measured within their half light radius
+    (sis_convention=False) instead of SIS equivalent ones. The Einstein radii
+    depend on the source redshift, so the source independent velocity
+    dispersion ratios of all rows are interpolated from
+    `EPLEinsteinRadiusTable` into the column `vel_disp_ratio`, from which
+    the `EPL` deflectors compute their Einstein radii analytically instead of
+    solving the Jeans equation of each deflector. The light profiles are
+    taken to be spherical.
+
+    :param galaxy_list: table of deflectors with the columns of
+        `fill_table`
+    :type galaxy_list: ~astropy.Table instance
+    :param kwargs_mass2light: light-to-mass eccentricity parameters of
+        `elliptical_projected_eccentricity`, superseded by the columns of
+        the same name
+    :type kwargs_mass2light: dict
+    :param einstein_radius_table: If True, adds the columns
+        `sis_convention` and `vel_disp_ratio` of power-law deflectors
+    :type einstein_radius_table: bool
+    :return: arrays by column name
+    :rtype: dict
+    """
+    columns = {name: np.array(galaxy_list[name]) for name in galaxy_list.colnames}
+    missing = (columns["e1_light"] == -1) | (columns["e2_light"] == -1)
+    if np.any(missing):
+        kwargs = dict(kwargs_mass2light or {})
+        kwargs.update(
+            {
+                name: columns[name][missing]
+                for name in (
+                    "light2mass_e_scaling",
+                    "light2mass_e_scatter",
+                    "light2mass_angle_scatter",
+                )
+                if name in columns
+            }
+        )
+        eccentricities = elliptical_projected_eccentricity(
+            columns["ellipticity"][missing], **kwargs
+        )
+        for name, values in zip(
+            ["e1_light", "e2_light", "e1_mass", "e2_mass"], eccentricities
+        ):
+            columns[name] = columns[name].astype(float)
+            columns[name][missing] = values
+            galaxy_list[name] = columns[name]
+    # TODO make a better estimate with scatter
+    columns["n_sersic"] = np.where(columns["n_sersic"] == -1, 4, columns["n_sersic"])
+    galaxy_list["n_sersic"] = columns["n_sersic"]
+    if einstein_radius_table and "gamma_pl" in columns:
+        columns["vel_disp_ratio"] = EPLEinsteinRadiusTable.cached().vel_disp_ratio(
+            columns["gamma_pl"], columns["n_sersic"], columns["angular_size"]
+        )
+        columns["sis_convention"] = np.zeros(len(columns["gamma_pl"]), dtype=bool)
+    return columns
 
 
 def elliptical_projected_eccentricity(
@@ -124,7 +215,7 @@ def elliptical_projected_eccentricity(
     deflector parameters.
 
     :param ellipticity: eccentricity amplitude (1-q^2)/(1+q^2)
-    :type ellipticity: float [0,1)
+    :type ellipticity: float [0,1) or numpy array of them
     :param light2mass_e_scaling: scaling factor of mass eccentricity /
         light eccentricity
     :param light2mass_e_scatter: scatter in light and mass
@@ -135,14 +226,17 @@ def elliptical_projected_eccentricity(
     :type kwargs: dict
     :return: e1_light, e2_light,e1_mass, e2_mass eccentricity components
     """
+    size = np.shape(ellipticity) if np.ndim(ellipticity) > 0 else None
     e_light = param_util.epsilon2e(ellipticity)
-    phi_light = np.random.uniform(0, np.pi)
+    phi_light = np.random.uniform(0, np.pi, size=size)
     e1_light = e_light * np.cos(2 * phi_light)
     e2_light = e_light * np.sin(2 * phi_light)
     e_mass = light2mass_e_scaling * e_light + np.random.normal(
-        loc=0, scale=light2mass_e_scatter
+        loc=0, scale=light2mass_e_scatter, size=size
+    )
+    phi_mass = phi_light + np.random.normal(
+        loc=0, scale=light2mass_angle_scatter, size=size
     )
-    phi_mass = phi_light + np.random.normal(loc=0, scale=light2mass_angle_scatter)
     e1_mass = e_mass * np.cos(2 * phi_mass)
     e2_mass = e_mass * np.sin(2 * phi_mass)
     return e1_light, e2_light, e1_mass, e2_mass
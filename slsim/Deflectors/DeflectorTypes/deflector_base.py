@@ -2,6 +2,7 @@ from abc import ABC, abstractmethod
 
 import numpy as np
 from slsim.Util import param_util
+from slsim.Util.column_view import ColumnView
 
 _SUPPORTED_DEFLECTORS = ["EPL", "NFW_HERNQUIST"]
 
@@ -10,6 +11,17 @@ class DeflectorBase(ABC):
     """Class of a single deflector with quantities only related to the
     deflector (independent of the source)"""
 
+    # arguments of __init__ which are not kept in the parameter dictionary
+    _init_keys = (
+        "z",
+        "vel_disp",
+        "stellar_mass",
+        "angular_size",
+        "center_x",
+        "center_y",
+        "deflector_area",
+    )
+
     def __init__(
         self,
         z,
@@ -48,6 +60,42 @@ class DeflectorBase(ABC):
             )
         self._center_lens = np.array([center_x, center_y])
 
+    @classmethod
+    def from_columns(cls, columns, index, names=None):
+        """Deflector of one row of shared column arrays. Only the arguments of
+        __init__ are read from the row, the parameter dictionary of the
+        deflector is a `ColumnView` of the row instead of a copy.
+
+        :param columns: arrays by parameter name
+        :type columns: dict
+        :param index: row index
+        :type index: int
+        :param names: names of the parameter dictionary, see
+            `dictionary_names`. Pass them to share them among the
+            deflectors of the same columns.
+        :type names: tuple or None
+        :return: deflector instance
+        """
+        if names is None:
+            names = cls.dictionary_names(columns)
+        deflector = cls(
+            **{name: columns[name][index] for name in cls._init_keys if name in columns}
+        )
+        deflector._deflector_dict = ColumnView(columns, index, names)
+        return deflector
+
+    @classmethod
+    def dictionary_names(cls, columns):
+        """Names of the columns kept in the parameter dictionary, i.e. the
+        columns which are not arguments of __init__.
+
+        :param columns: arrays by parameter name
+        :type columns: dict
+        :return: names
+        :rtype: tuple
+        """
+        return tuple(name for name in columns if name not in cls._init_keys)
+
     def update_center(self, deflector_area):
         """Overwrites the deflector center position.
 
@@ -20,7 +20,21 @@ class EPL(DeflectorBase):
 
     # TODO: add center_x center_y to documentation
 
-    def __init__(self, sis_convention=True, theta_E=None, gamma_pl=2, **deflector_dict):
+    _init_keys = DeflectorBase._init_keys + (
+        "sis_convention",
+        "theta_E",
+        "gamma_pl",
+        "vel_disp_ratio",
+    )
+
+    def __init__(
+        self,
+        sis_convention=True,
+        theta_E=None,
+        gamma_pl=2,
+        vel_disp_ratio=None,
+        **deflector_dict
+    ):
         """
 
         :param deflector_dict: dictionary of deflector quantities
@@ -28,11 +42,15 @@ class EPL(DeflectorBase):
          if =None then the Einstein radius is being computed from the velocity dispersion argument
         :param gamma_pl: logarithmic slope of the mass density profile (2 is isothermal)
         :param sis_convention: if using the SIS convention to normalize the Einstein radius or not
+        :param vel_disp_ratio: tabulated velocity dispersion ratio of
+         `EPLEinsteinRadiusTable.vel_disp_ratio`. If given and sis_convention is False, the
+         Einstein radius is computed from it instead of the kinematics of the light profile.
         """
         super().__init__(**deflector_dict)
         self._sis_convention = sis_convention
         self._theta_E = theta_E
         self._gamma_pl = gamma_pl
+        self._vel_disp_ratio = vel_disp_ratio
 
     def velocity_dispersion(self, cosmo=None):
         """Velocity dispersion of deflector. If velocity dispersion is not
@@ -55,6 +73,17 @@ class EPL(DeflectorBase):
         :type lens_cosmo: ~lenstronomy.Cosmo.LensCosmo instance
         :return: Einstein radius of the deflector
         """
+        if (
+            self._theta_E is None
+            and self._vel_disp_ratio is not None
+            and not self._sis_convention
+            and self._gamma_pl != 2
+        ):
+            # see EPLEinsteinRadiusTable.theta_E
+            theta_E_sis = lens_cosmo.sis_sigma_v2theta_E(
+                float(self.velocity_dispersion())
+            )
+            return (theta_E_sis / self._vel_disp_ratio) ** (1 / (self._gamma_pl - 1))
         if self._theta_E is None:
             lens_light_model_list, kwargs_lens_light = self.light_model_lenstronomy()
             theta_E = theta_E_from_vel_disp_epl(
@@ -2,8 +2,12 @@ from slsim.Deflectors.DeflectorTypes.deflector_base import DeflectorBase
 from slsim.Deflectors.MassLightConnection.velocity_dispersion import (
     vel_disp_composite_model,
 )
+from slsim.Halos.halos_multi_plane import _nfw_F_g
 from slsim.Util.param_util import ellipticity_slsim_to_lenstronomy
+from lenstronomy.Cosmo.lens_cosmo import LensCosmo
+from lenstronomy.LensModel.Profiles.hernquist import Hernquist
 from lenstronomy.Util import constants
+import numpy as np
 
 
 class NFWHernquist(DeflectorBase):
@@ -148,3 +152,76 @@ class NFWHernquist(DeflectorBase):
         :return: halo mass M200 [physical M_sol], concentration r200/rs
         """
         return self._deflector_dict["halo_mass"], self._deflector_dict["concentration"]
+
+
+def einstein_radius_nfw_hernquist(
+    halo_mass,
+    concentration,
+    stellar_mass,
+    angular_size,
+    z_lens,
+    cosmo,
+    z_source=100,
+    r_min=1e-3,
+    r_max=5e1,
+    num_iterations=50,
+):
+    """Einstein radii of spherical NFW+Hernquist deflectors, vectorized over
+    arrays of deflectors.
+
+    The mean convergence within a radius R of the axisymmetric profiles is
+    alpha(R) / R with the closed-form deflection angles of the NFW and
+    HERNQUIST profiles, so that the radii with a mean convergence of
+    1 are found by a bisection in log R for all deflectors at once. This
+    replaces `LensProfileAnalysis.effective_einstein_radius` of the spherical
+    models of `NFWHernquist.mass_model_lenstronomy`.
+
+    :param halo_mass: halo masses M200 [physical M_sol]
+    :param concentration: halo concentrations r200/rs
+    :param stellar_mass: stellar masses [physical M_sol]
+    :param angular_size: half-light radii of the Hernquist profiles
+        [arcsec]
+    :param z_lens: deflector redshifts
+    :param cosmo: astropy.cosmology instance
+    :param z_source: source redshift
+    :param r_min: minimum Einstein radius [arcsec]; deflectors with a
+        mean convergence below 1 within r_min get 0
+    :param r_max: maximum Einstein radius [arcsec]
+    :param num_iterations: number of bisection steps
+    :return: Einstein radii [arcsec]
+    :rtype: numpy.ndarray
+    """
+    halo_mass, concentration, stellar_mass, angular_size, z_lens = np.broadcast_arrays(
+        *[
+            np.atleast_1d(np.asarray(value, dtype=float))
+            for value in (
+                halo_mass,
+                concentration,
+                stellar_mass,
+                angular_size,
+                z_lens,
+            )
+        ]
+    )
+    lens_cosmo = LensCosmo(z_lens=z_lens, z_source=z_source, cosmo=cosmo)
+    rs_halo, alpha_rs = lens_cosmo.nfw_physical2angle(M=halo_mass, c=concentration)
+    rs_phys = lens_cosmo.dd * (angular_size * constants.arcsec)
+    sigma0, rs_light = lens_cosmo.hernquist_phys2angular(mass=stellar_mass, rs=rs_phys)
+    hernquist = Hernquist()
+
+    def _mean_kappa_minus_one(r):
+        _, g = _nfw_F_g(r / rs_halo)
+        alpha_nfw = alpha_rs * rs_halo * g / ((1 + np.log(0.5)) * r)
+        alpha_hernquist, _ = hernquist.derivatives(r, 0, sigma0, rs_light)
+        return (alpha_nfw + alpha_hernquist) / r - 1
+
+    log_low = np.full(halo_mass.shape, np.log(r_min))
+    log_high = np.full(halo_mass.shape, np.log(r_max))
+    for _ in range(num_iterations):
+        log_mid = (log_low + log_high) / 2
+        inside = _mean_kappa_minus_one(np.exp(log_mid)) > 0
+        log_low = np.where(inside, log_mid, log_low)
+        log_high = np.where(inside, log_high, log_mid)
+    theta_E = np.exp((log_low + log_high) / 2)
+    theta_E[_mean_kappa_minus_one(np.full(halo_mass.shape, r_min)) <= 0] = 0
+    return theta_E
@@ -0,0 +1,213 @@
+import hashlib
+import os
+
+import numpy as np
+from astropy.cosmology import FlatLambdaCDM
+from lenstronomy.Cosmo.lens_cosmo import LensCosmo
+from scipy.interpolate import RegularGridInterpolator
+
+from slsim.Deflectors.MassLightConnection.velocity_dispersion import (
+    vel_disp_power_law,
+)
+
+_DATA_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))),
+    "data",
+    "EinsteinRadius",
+)
+
+
+def vel_disp_ratio_power_law(gamma, n_sersic, r_half=1.0):
+    """Squared ratio of the luminosity-weighted velocity dispersion within
+    r_half of a spherical power-law mass profile with Einstein radius 1 arcsec
+    and a spherical Sersic light profile with R_sersic = r_half, to the
+    velocity dispersion of the SIS with the same Einstein radius.
+
+    The ratio does not depend on the cosmology or the redshifts, since
+    both velocity dispersions scale with D_s / D_ds.
+
+    :param gamma: power-law slope
+    :param n_sersic: Sersic index of the light profile
+    :param r_half: half light radius in arcsec
+    :return: (sigma_v(theta_E=1) / sigma_v,SIS(theta_E=1))^2
+    :rtype: float
+    """
+    lens_cosmo = LensCosmo(
+        z_lens=0.5, z_source=2.0, cosmo=FlatLambdaCDM(H0=70, Om0=0.3)
+    )
+    kwargs_light = [
+        {
+            "magnitude": 20,
+            "R_sersic": r_half,
+            "n_sersic": n_sersic,
+            "e1": 0,
+            "e2": 0,
+            "center_x": 0,
+            "center_y": 0,
+        }
+    ]
+    vel_disp = vel_disp_power_law(
+        1.0, gamma, r_half, kwargs_light, ["SERSIC_ELLIPSE"], lens_cosmo
+    )
+    return float((vel_disp / lens_cosmo.sis_theta_E2sigma_v(1.0)) ** 2)
+
+
+class EPLEinsteinRadiusTable(object):
+    """Einstein radii of power-law deflectors from their velocity dispersions
+    without the SIS convention, i.e. the conversion of
+    `theta_E_from_vel_disp_epl` with `sis_convention=False`, interpolated from
+    a precomputed table and vectorized over arrays of deflectors.
+
+    For a power-law mass profile with a Sersic light profile of size
+    r_half, the velocity dispersion scales as sigma_v^2 = sigma_SIS^2(1) h(gamma,
+    n) theta_E^(gamma - 1) r_half^(2 - gamma), where sigma_SIS(1) is the SIS
+    velocity dispersion of theta_E = 1 arcsec. Only h(gamma, n) needs the
+    kinematics and is tabulated once on a (gamma, n_sersic) grid, so that
+    theta_E / theta_E,SIS is an analytic function of r_half / theta_E,SIS
+    between the grid points. The table of the default grid ships with the
+    package data, other tables are computed once per process (see `cached`)
+    and optionally on disk. The light profiles are taken to be spherical.
+    """
+
+    _tables = {}  # in-memory cache of `cached`
+
+    def __init__(self, gamma_grid=None, n_sersic_grid=None, cache_dir=None):
+        """
+        :param gamma_grid: power-law slopes of the table, defaults to 1.5
+            to 2.5 in steps of 0.05
+        :type gamma_grid: numpy.ndarray, optional
+        :param n_sersic_grid: Sersic indices of the table, defaults to 0.5
+            to 8
+        :type n_sersic_grid: numpy.ndarray, optional
+        :param cache_dir: If given, the table is read from or written to
+            a .npz file in this directory. The table of the default grid
+            is read from the package data if it is not found there.
+        :type cache_dir: str, optional
+        """
+        self.key = self.cache_key(gamma_grid, n_sersic_grid)
+        self._gamma = np.array(self.key[0])
+        self._n_sersic = np.array(self.key[1])
+        file_name = "epl_vel_disp_ratio_%s.npz" % (
+            hashlib.sha1(repr(self.key).encode()).hexdigest()
+        )
+
+        ratio = None
+        for directory in [cache_dir, _DATA_DIR]:
+            if directory is not None and os.path.exists(
+                os.path.join(directory, file_name)
+            ):
+                ratio = np.load(os.path.join(directory, file_name))["ratio"]
+                break
+        if ratio is None:
+            ratio = np.array(
+                [
+                    [vel_disp_ratio_power_law(gamma, n) for n in self._n_sersic]
+                    for gamma in self._gamma
+                ]
+            )
+            if cache_dir is not None:
+                os.makedirs(cache_dir, exist_ok=True)
+                np.savez(os.path.join(cache_dir, file_name), ratio=ratio)
+        self._ratio = ratio  # h(gamma, n), shape (len(gamma), len(n))
+        self._interpolation = RegularGridInterpolator(
+            (self._gamma, self._n_sersic), np.log(ratio)
+        )
+
+    @staticmethod
+    def cache_key(gamma_grid=None, n_sersic_grid=None):
+        """Key identifying a table by its grid, with the same arguments as the
+        class.
+
+        :return: hashable key
+        :rtype: tuple
+        """
+        if gamma_grid is None:
+            gamma_grid = np.round(np.arange(1.5, 2.5001, 0.05), 2)
+        if n_sersic_grid is None:
+            n_sersic_grid = [0.5, 1, 1.5, 2, 2.5, 3, 4, 5, 6, 8]
+        return (
+            tuple(float(gamma) for gamma in gamma_grid),
+            tuple(float(n) for n in n_sersic_grid),
+        )
+
+    @classmethod
+    def cached(cls, **kwargs):
+        """Returns the table with the given grid, computing it only once per
+        process.
+
+        :param kwargs: keyword arguments of EPLEinsteinRadiusTable.
+        :return: EPLEinsteinRadiusTable instance
+        """
+        key = cls.cache_key(kwargs.get("gamma_grid"), kwargs.get("n_sersic_grid"))
+        if key not in cls._tables:
+            cls._tables[key] = cls(**kwargs)
+        return cls._tables[key]
+
+    def vel_disp_ratio(self, gamma, n_sersic, r_half=1.0):
+        """Interpolated squared velocity dispersion ratio, see
+        `vel_disp_ratio_power_law`. Slopes and Sersic indices outside of the
+        grid are clipped to its bounds.
+
+        :param gamma: power-law slopes
+        :param n_sersic: Sersic indices
+        :param r_half: half light radii in arcsec
+        :return: (sigma_v(theta_E=1) / sigma_v,SIS(theta_E=1))^2
+        :rtype: numpy.ndarray
+        """
+        gamma, n_sersic, r_half = np.broadcast_arrays(
+            np.asarray(gamma, dtype=float),
+            np.asarray(n_sersic, dtype=float),
+            np.asarray(r_half, dtype=float),
+        )
+        points = np.stack(
+            [
+                np.clip(gamma, self._gamma[0], self._gamma[-1]),
+                np.clip(n_sersic, self._n_sersic[0], self._n_sersic[-1]),
+            ],
+            axis=-1,
+        )
+        return np.exp(self._interpolation(points)) * r_half ** (2 - gamma)
+
+    def theta_E(
+        self,
+        vel_disp,
+        gamma,
+        r_half,
+        n_sersic,
+        lens_cosmo=None,
+        theta_E_sis=None,
+        kappa_ext=0,
+    ):
+        """Einstein radii matching the velocity dispersions, vectorized over
+        arrays of deflectors. Deflectors with gamma = 2 get the SIS Einstein
+        radius, as in `theta_E_from_vel_disp_epl`.
+
+        :param vel_disp: velocity dispersions within r_half [km/s]
+        :param gamma: power-law slopes
+        :param r_half: half light radii [arcsec]
+        :param n_sersic: Sersic indices of the light profiles
+        :param lens_cosmo: LensCosmo instance of deflectors at a common
+            deflector and source redshift
+        :type lens_cosmo: ~lenstronomy.Cosmo.LensCosmo instance,
+            optional
+        :param theta_E_sis: SIS Einstein radii of the velocity
+            dispersions [arcsec], e.g. for deflectors at different
+            redshifts, instead of lens_cosmo
+        :param kappa_ext: external convergence
+        :return: Einstein radii [arcsec]
+        :rtype: numpy.ndarray
+        """
+        if theta_E_sis is None:
+            theta_E_sis = lens_cosmo.sis_sigma_v2theta_E(np.asarray(vel_disp))
+        theta_E_sis, gamma, r_half, n_sersic, kappa_ext = np.broadcast_arrays(
+            np.asarray(theta_E_sis, dtype=float),
+            np.asarray(gamma, dtype=float),
+            np.asarray(r_half, dtype=float),
+            np.asarray(n_sersic, dtype=float),
+            np.asarray(kappa_ext, dtype=float),
+        )
+        ratio = self.vel_disp_ratio(gamma, n_sersic, r_half)
+        sis = gamma == 2
+        exponent = 1 / np.where(sis, 1, gamma - 1)
+        theta_E = np.where(sis, theta_E_sis, (theta_E_sis / ratio) ** exponent)
+        return theta_E / (1 - kappa_ext) ** exponent
@@ -1,6 +1,8 @@
+import hashlib
+
 import numpy as np
 import scipy
-from scipy import interpolate
+from scipy import integrate, interpolate
 import copy
 
 from lenstronomy.Cosmo.lens_cosmo import LensCosmo
@@ -376,12 +378,7 @@ def vel_disp_sdss(sky_area, redshift, vd_min, vd_max, cosmology, noise=True):
     .. [1] Bernardi et al. 2010,
      https://ui.adsabs.harvard.edu/abs/2010MNRAS.404.2087B/abstract
     """
-    # SDSS velocity dispersion function for galaxies brighter than Mr >= -16.8
-    # These numbers are from the Bernardi et al. 2010.
-    phi_star = 2.099e-2 * (cosmology.h / 0.7) ** 3
-    vd_star = 113.78
-    alpha = 0.94
-    beta = 1.85
+    phi_star, alpha, beta, vd_star = _sdss_vdf_parameters(cosmology)
     return schechter_vel_disp(
         redshift,
         phi_star,
@@ -396,6 +393,46 @@ def vel_disp_sdss(sky_area, redshift, vd_min, vd_max, cosmology, noise=True):
     )
 
 
+def _sdss_vdf_parameters(cosmology):
+    """Parameters phi_star, alpha, beta and vd_star of the SDSS velocity
+    dispersion function of `vel_disp_sdss`."""
+    # SDSS velocity dispersion function for galaxies brighter than Mr >= -16.8
+    # These numbers are from the Bernardi et al. 2010.
+    phi_star = 2.099e-2 * (cosmology.h / 0.7) ** 3
+    vd_star = 113.78
+    alpha = 0.94
+    beta = 1.85
+    return phi_star, alpha, beta, vd_star
+
+
+def vel_disp_sdss_cumulative_density(cosmology, vd_min=50, vd_max=500, resolution=1000):
+    """Cumulative comoving number density n(>sigma) of the SDSS velocity
+    dispersion function of `vel_disp_sdss`, integrated on a grid between
+    `vd_min` and `vd_max`.
+
+    :param cosmology: astropy.cosmology instance
+    :param vd_min: lower bound of the velocity dispersion function in km/s
+    :param vd_max: upper bound of the velocity dispersion function in km/s
+    :param resolution: number of grid points
+    :return: velocity dispersions at the effective radius in km/s
+        (ascending), as returned by `vel_disp_sdss`, and n(>sigma) in
+        Mpc^-3
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    """
+    phi_star, alpha, beta, vd_star = _sdss_vdf_parameters(cosmology)
+    v = np.linspace(vd_min, vd_max, resolution)
+    pdf = (
+        phi_star
+        * ((v / vd_star) ** alpha)
+        * np.exp(-((v / vd_star) ** beta))
+        * beta
+        / (v * scipy.special.gamma(alpha / beta))
+    )
+    cumulative = integrate.cumulative_trapezoid(pdf, v, initial=0)
+    # correction to the effective radius as in `schechter_vel_disp`
+    return v * (8 ** (-0.066)), cumulative[-1] - cumulative
+
+
 def schechter_vel_disp(
     redshift,
     phi_star,
@@ -718,12 +755,25 @@ def schechter_velocity_dispersion_function(
     return v_sample
 
 
-def vel_disp_abundance_matching(galaxy_list, z_max, sky_area, cosmo):
+# in-memory cache of the analytic `vel_disp_abundance_matching` per
+# (cosmology, catalog)
+_vel_disp_matching_cache = {}
+
+
+def vel_disp_abundance_matching(galaxy_list, z_max, sky_area, cosmo, analytic=False):
     """Calculates the velocity dispersion from the steller mass. The routine
     uses abundance matching between stellar mass and velocity dispersion taking
     the sample drawn from z=0 to z_max (which can be still at low redshift
     where there is data on the velocity dispersion function)
 
+    By default, a Monte Carlo sample of the SDSS velocity dispersion function
+    is drawn for the sky area (`vel_disp_sdss`) and matched by rank. With
+    `analytic=True`, the cumulative number densities n(>M*) of the galaxies
+    and n(>sigma) of the integrated velocity dispersion function
+    (`vel_disp_sdss_cumulative_density`) are matched instead, which takes a
+    time independent of the sky area and is deterministic. The analytic
+    result is cached per cosmology and catalog.
+
     :param galaxy_list: list of galaxies with stellar masses given
     :type galaxy_list: ~astropy.Table object
     :param z_max: maximum redshift to which the abundance matching with the SDSS
@@ -732,8 +782,15 @@ def vel_disp_abundance_matching(galaxy_list, z_max, sky_area, cosmo):
     :type sky_area: `~astropy.units.Quantity`
     :param sky_area: Sky area over which galaxies are sampled. Must be in units of solid
         angle.
+    :param analytic: If True, matches the cumulative number densities
+        instead of a Monte Carlo sample.
+    :type analytic: bool
     :return: interpolation function f; f(stellar_mass) -> vel_disp
     """
+    if analytic:
+        return _vel_disp_abundance_matching_analytic(
+            galaxy_list, z_max, sky_area, cosmo
+        )
 
     # selects galaxies with redshift below maximum redshift (z_max)
     bool_cut = galaxy_list["z"] < z_max
@@ -764,12 +821,66 @@ def vel_disp_abundance_matching(galaxy_list, z_max, sky_area, cosmo):
     # interpolate relationship between stellar mass and velocity dispersion
     stellar_mass = np.asarray(galaxy_list_zmax["stellar_mass"])
     vel_disp = np.asarray(galaxy_list_zmax["vel_disp"])
+    return _vel_disp_interpolation(
+        stellar_mass, vel_disp, max(galaxy_list["stellar_mass"])
+    )
+
+
+def _vel_disp_abundance_matching_analytic(galaxy_list, z_max, sky_area, cosmo):
+    """Analytic mode of `vel_disp_abundance_matching`.
 
+    The galaxy of rank k in stellar mass below z_max gets the velocity
+    dispersion with n(>sigma) = (k - 1/2) / V, where V is the comoving
+    volume of the sky area up to z_max. Galaxies beyond the number of the
+    velocity dispersion function are not matched, as in the Monte Carlo
+    mode.
+    """
+    stellar_mass_all = np.asarray(galaxy_list["stellar_mass"], dtype=float)
+    redshift_all = np.asarray(galaxy_list["z"], dtype=float)
+    digest = hashlib.sha1(stellar_mass_all.tobytes())
+    digest.update(redshift_all.tobytes())
+    key = (
+        repr(cosmo),
+        float(z_max),
+        float(sky_area.to_value("sr")),
+        digest.hexdigest(),
+    )
+    if key in _vel_disp_matching_cache:
+        return _vel_disp_matching_cache[key]
+
+    stellar_mass = np.sort(stellar_mass_all[redshift_all < z_max])[::-1]
+    redshift = np.linspace(0, z_max, 100)
+    volume = integrate.trapezoid(
+        (cosmo.differential_comoving_volume(redshift) * sky_area).to_value("Mpc3"),
+        redshift,
+    )
+    vel_disp_grid, density_grid = vel_disp_sdss_cumulative_density(cosmo)
+    density = (np.arange(len(stellar_mass)) + 0.5) / volume
+    matched = density <= density_grid[0]
+    vel_disp = np.interp(density[matched], density_grid[::-1], vel_disp_grid[::-1])
+    f = _vel_disp_interpolation(
+        stellar_mass[matched], vel_disp, np.max(stellar_mass_all)
+    )
+    _vel_disp_matching_cache[key] = f
+    return f
+
+
+def _vel_disp_interpolation(stellar_mass, vel_disp, max_stellar_mass):
+    """Interpolation function of the velocity dispersion in log10 of the
+    stellar mass, from abundance matched values sorted by decreasing stellar
+    mass, extended to low stellar masses and to the largest stellar mass of the
+    catalog.
+
+    :param stellar_mass: matched stellar masses
+    :param vel_disp: matched velocity dispersions
+    :param max_stellar_mass: largest stellar mass of the catalog
+    :return: interpolation function f; f(log10(stellar_mass)) ->
+        vel_disp
+    """
     # here we make sure we interpolate to low stellar masses
     stellar_mass = np.append(stellar_mass, 10**5)
     vel_disp = np.append(vel_disp, 10)
     # here we make sure we interpolate to high stellar mass
-    max_stellar_mass = max(galaxy_list["stellar_mass"])
     max_vel_disp = vel_disp_from_m_star(max_stellar_mass)
     stellar_mass = np.append(max_stellar_mass, stellar_mass)
     vel_disp = np.append(max_vel_disp, vel_disp)
@@ -1,6 +1,9 @@
 from slsim.Deflectors.DeflectorTypes.epl_sersic import EPLSersic
 from slsim.Deflectors.DeflectorTypes.epl import EPL
-from slsim.Deflectors.DeflectorTypes.nfw_hernquist import NFWHernquist
+from slsim.Deflectors.DeflectorTypes.nfw_hernquist import (
+    NFWHernquist,
+    einstein_radius_nfw_hernquist,
+)
 from slsim.Deflectors.DeflectorTypes.nfw_cluster import NFWCluster
 from lenstronomy.LightModel.light_model import LightModel
 from lenstronomy.Util import data_util
@@ -12,6 +15,12 @@ from lenstronomy.Analysis.lens_profile import LensProfileAnalysis
 from lenstronomy.LensModel.lens_model import LensModel
 
 _SUPPORTED_DEFLECTORS = ["EPL", "EPL_SERSIC", "NFW_HERNQUIST", "NFW_CLUSTER"]
+# deflector types which can be created from column arrays (see from_arrays)
+_COLUMN_DEFLECTORS = {
+    "EPL": EPL,
+    "EPL_SERSIC": EPLSersic,
+    "NFW_HERNQUIST": NFWHernquist,
+}
 JAX_PROFILES = [
     "EPL",
     "NFW",
@@ -51,6 +60,41 @@ class Deflector(object):
             )
         self.deflector_type = deflector_type
 
+    @classmethod
+    def from_arrays(cls, deflector_type, columns, indices=None):
+        """Deflectors of rows of shared column arrays, e.g. of a deflector
+        population. The parameters of each deflector are a `ColumnView` of its
+        row, so that no parameter dictionary is copied and no table row is
+        materialized.
+
+        :param deflector_type: type of deflector, i.e. "EPL",
+            "EPL_SERSIC" or "NFW_HERNQUIST"
+        :type deflector_type: str
+        :param columns: arrays by parameter name
+        :type columns: dict
+        :param indices: row indices of the deflectors, by default all
+            rows
+        :type indices: iterable of int or None
+        :return: list of Deflector instances
+        """
+        if deflector_type not in _COLUMN_DEFLECTORS:
+            raise ValueError(
+                "Deflector type %s not supported from arrays. Chose among %s."
+                % (deflector_type, list(_COLUMN_DEFLECTORS.keys()))
+            )
+        deflector_class = _COLUMN_DEFLECTORS[deflector_type]
+        names = deflector_class.dictionary_names(columns)
+        if indices is None:
+            indices = range(len(next(iter(columns.values()))))
+        deflectors = []
+        for index in indices:
+            deflector = cls.__new__(cls)
+            deflector._name = "GAL"
+            deflector.deflector_type = deflector_type
+            deflector._deflector = deflector_class.from_columns(columns, index, names)
+            deflectors.append(deflector)
+        return deflectors
+
     @property
     def name(self):
         """Meaningful name string of the deflector.
@@ -216,6 +260,10 @@ class Deflector(object):
             theta_E_infinity = (
                 4 * np.pi * (v_sigma * 1000.0 / constants.c) ** 2 / constants.arcsec
             )
+        elif self.deflector_type in ["NFW_HERNQUIST"]:
+            theta_E_infinity = float(
+                self._nfw_hernquist_theta_e_infinity([self], cosmo=cosmo)[0]
+            )
         else:
             _z_source_infty = 100
             lens_cosmo = LensCosmo(
@@ -254,3 +302,58 @@ class Deflector(object):
             theta_E_infinity = np.nan_to_num(theta_E_infinity, nan=0)
         self._theta_e_infinity = theta_E_infinity
         return theta_E_infinity
+
+    @staticmethod
+    def theta_e_infinity_batch(deflectors, cosmo):
+        """Einstein radii for a source at infinity of many deflectors. The
+        Einstein radii of the NFW_HERNQUIST deflectors are solved for all at
+        once, the others with `theta_e_infinity`. The results are cached on
+        each deflector.
+
+        :param deflectors: Deflector instances
+        :type deflectors: list
+        :param cosmo: astropy.cosmology instance
+        :return: Einstein radii [arcsec]
+        :rtype: numpy.ndarray
+        """
+        batch = [
+            deflector
+            for deflector in deflectors
+            if deflector.deflector_type in ["NFW_HERNQUIST"]
+            and not hasattr(deflector, "_theta_e_infinity")
+        ]
+        if len(batch) > 0:
+            theta_E = Deflector._nfw_hernquist_theta_e_infinity(batch, cosmo=cosmo)
+            for deflector, theta_E_infinity in zip(batch, theta_E):
+                deflector._theta_e_infinity = float(theta_E_infinity)
+        return np.array(
+            [
+                np.asarray(deflector.theta_e_infinity(cosmo=cosmo)).item()
+                for deflector in deflectors
+            ]
+        )
+
+    @staticmethod
+    def _nfw_hernquist_theta_e_infinity(deflectors, cosmo):
+        """Closed-form spherical Einstein radii for a source at infinity of
+        NFW_HERNQUIST deflectors, see `einstein_radius_nfw_hernquist`.
+
+        :param deflectors: NFW_HERNQUIST Deflector instances
+        :param cosmo: astropy.cosmology instance
+        :return: Einstein radii [arcsec]
+        :rtype: numpy.ndarray
+        """
+        halo_properties = np.array(
+            [deflector.halo_properties for deflector in deflectors]
+        )
+        return einstein_radius_nfw_hernquist(
+            halo_mass=halo_properties[:, 0],
+            concentration=halo_properties[:, 1],
+            stellar_mass=[deflector.stellar_mass for deflector in deflectors],
+            angular_size=[deflector.angular_size_light for deflector in deflectors],
+            z_lens=[deflector.redshift for deflector in deflectors],
+            cosmo=cosmo,
+            z_source=100,
+            r_min=1e-3,
+            r_max=5e1,
+        )
@@ -0,0 +1,212 @@
+# Benchmarks of the halo pipeline and of the weak-lensing statistics of halos
+# at small, medium and large sky areas. Run e.g. with
+#   python -m slsim.Halos.benchmark --sky-areas 0.0001 0.001 --output bench.json
+
+import argparse
+
+import numpy as np
+from astropy.cosmology import default_cosmology
+
+from slsim.Halos.halos import (
+    HaloMassFunctionTable,
+    colossus_halo_mass_sampler,
+    number_density_at_redshift,
+)
+from slsim.Halos.halos_statistics import HalosStatistics
+from slsim.Pipelines.halos_pipeline import HalosSkyPyPipeline
+from slsim.Util.benchmark_util import measure, write_benchmark_json
+
+# small, medium and large sky areas in deg2
+SKY_AREAS = (0.0001, 0.001, 0.01)
+
+
+def run_halos_benchmarks(
+    sky_areas=SKY_AREAS,
+    samples_number=100,
+    processes=4,
+    use_skypy=True,
+    repeat=1,
+    output_file=None,
+    random_seed=42,
+):
+    """Times the halo pipeline (`HalosSkyPyPipeline`), the convergence and
+    shear of one set of halo positions (`HalosRayTracing.get_convergence_shear`
+    through `HalosLensBase.halos_get_convergence_shear`), the distributions of
+    `HalosStatistics.get_kappa_gamma_distib` with one and several processes,
+    and the mass function functions `number_density_at_redshift` and
+    `colossus_halo_mass_sampler` for halo numbers of the sky areas.
+
+    The mass function tables of `HaloMassFunctionTable.cached` are cleared
+    before each sky area and the on-disk cache is disabled during the
+    benchmarks, so that the timings of all sky areas include the same table
+    computations. `number_density_at_redshift` is reported once with a cold
+    cache, including the computation of its table ("cache": "cold"), and
+    once with the cached table ("cache": "warm").
+
+    :param sky_areas: sky areas in deg2
+    :param samples_number: number of halo positions of the kappa-gamma
+        distributions
+    :param processes: number of worker processes of the multi-process
+        distribution
+    :param use_skypy: If True, the halos are generated with SkyPy,
+        otherwise with the cached mass function table.
+    :param repeat: number of repetitions of each benchmark, the best
+        wall time is reported
+    :param output_file: path of the JSON file with the results. If None,
+        nothing is written.
+    :param random_seed: seed of the halo positions
+    :return: report with metadata and one entry per benchmark with the
+        wall time in seconds, peak memory in MB, the sky area and the
+        number of halos.
+    :rtype: dict
+    """
+    cosmo = default_cosmology.get()
+    results = []
+
+    def _record(name, measurement, sky_area, n_halos, **fields):
+        measurement.update(
+            {"name": name, "sky_area": sky_area, "n_halos": n_halos, **fields}
+        )
+        results.append(measurement)
+        return measurement
+
+    default_cache_dir = HaloMassFunctionTable.default_cache_dir
+    HaloMassFunctionTable.default_cache_dir = None
+    try:
+        for sky_area in sky_areas:
+            HaloMassFunctionTable._tables.clear()
+            pipeline_benchmark = _record(
+                "halos_pipeline",
+                measure(
+                    HalosSkyPyPipeline,
+                    sky_area=sky_area,
+                    cosmo=cosmo,
+                    use_skypy=use_skypy,
+                    random_seed=random_seed,
+                    repeat=repeat,
+                ),
+                sky_area,
+                None,
+                use_skypy=use_skypy,
+            )
+            pipeline = pipeline_benchmark["result"]
+            halos_lens = HalosStatistics(
+                halos_list=pipeline.halos,
+                mass_correction_list=pipeline.mass_sheet_correction,
+                sky_area=sky_area,
+                cosmo=cosmo,
+                samples_number=samples_number,
+                random_seed=random_seed,
+            )
+            n_halos = halos_lens.n_halos
+            pipeline_benchmark["n_halos"] = n_halos
+
+            _record(
+                "get_convergence_shear",
+                measure(halos_lens.halos_get_convergence_shear, repeat=repeat),
+                sky_area,
+                n_halos,
+            )
+            _record(
+                "get_kappa_gamma_distib_single_process",
+                measure(
+                    halos_lens.get_kappa_gamma_distib_without_multiprocessing,
+                    gamma_tot=True,
+                    repeat=repeat,
+                ),
+                sky_area,
+                n_halos,
+                samples_number=samples_number,
+            )
+            _record(
+                "get_kappa_gamma_distib_multi_process",
+                measure(
+                    halos_lens.get_kappa_gamma_distib,
+                    gamma_tot=True,
+                    processes=processes,
+                    repeat=repeat,
+                ),
+                sky_area,
+                n_halos,
+                samples_number=samples_number,
+                processes=processes,
+            )
+            _record(
+                "get_kappa_gamma_distib_vectorized",
+                measure(
+                    halos_lens.get_kappa_gamma_distib_vectorized,
+                    gamma_tot=True,
+                    repeat=repeat,
+                ),
+                sky_area,
+                n_halos,
+                samples_number=samples_number,
+            )
+
+            z = np.linspace(0, 5, int(5 / 0.001) + 1)
+            HaloMassFunctionTable._tables.clear()
+            _record(
+                "number_density_at_redshift",
+                measure(
+                    number_density_at_redshift, z, cosmology=cosmo, trace_memory=False
+                ),
+                sky_area,
+                n_halos,
+                cache="cold",
+            )
+            _record(
+                "number_density_at_redshift",
+                measure(number_density_at_redshift, z, cosmology=cosmo, repeat=repeat),
+                sky_area,
+                n_halos,
+                cache="warm",
+            )
+            _record(
+                "colossus_halo_mass_sampler",
+                measure(
+                    colossus_halo_mass_sampler,
+                    m_min=1.0e12,
+                    m_max=1.0e16,
+                    resolution=100,
+                    z=1.0,
+                    cosmology=cosmo,
+                    size=max(n_halos, 1),
+                    repeat=repeat,
+                ),
+                sky_area,
+                n_halos,
+            )
+    finally:
+        HaloMassFunctionTable.default_cache_dir = default_cache_dir
+
+    return write_benchmark_json(results, output_file)
+
+
+def main(args=None):
+    """Command line entry point of the Halos benchmarks."""
+    parser = argparse.ArgumentParser(description="Benchmark the slsim Halos module.")
+    parser.add_argument(
+        "--sky-areas",
+        type=float,
+        nargs="+",
+        default=list(SKY_AREAS),
+        help="sky areas in deg2",
+    )
+    parser.add_argument("--samples-number", type=int, default=100)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--no-skypy", action="store_true")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", default="halos_benchmark.json")
+    parsed = parser.parse_args(args)
+    run_halos_benchmarks(
+        sky_areas=parsed.sky_areas,
+        samples_number=parsed.samples_number,
+        processes=parsed.processes,
+        use_skypy=not parsed.no_skypy,
+        repeat=parsed.repeat,
+        output_file=parsed.output,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
 import numpy as np
 import scipy.stats as st
-from colossus.halo import concentration
-from colossus.lss import mass_function
+from colossus.halo import concentration, mass_defs
+from colossus.lss import mass_function, peaks
+from scipy.interpolate import RegularGridInterpolator
 
 
 def gene_e_ang_halo(Mh):
@@ -101,6 +102,38 @@ def dNhalodzdlnM_lens(M, z, cosmo_col):
     return dvoldzdO * mfunc_so
 
 
+def dNhalodzdlnM_lens_grid(M, z, cosmo_col):
+    """Differential number density of halos with respect to redshift and log
+    halo mass per unit of solid angle [deg^2], as `dNhalodzdlnM_lens`, on the
+    full grid of masses and redshifts at once.
+
+    The variance of the linear density field factorizes into sigma(R, 0)
+    D(z), so that the variance and its logarithmic slope are evaluated
+    once per mass and the growth factor and volume once per redshift.
+
+    :param M: The masses of the dark matter halos [M_sol/h].
+    :type  M: ndarray
+    :param z: The redshifts.
+    :type  z: ndarray
+    :param cosmo_col: An instance of an colossus cosmology model
+    :type cosmo_col: colossus.cosmology instance
+    :return: dNhalodzdlnM of shape (len(z), len(M)) in units of
+        #/deg^2/dlnM[M_sol/h].
+    """
+    M = np.asarray(M, dtype=float)
+    z = np.asarray(z, dtype=float)
+    R = peaks.lagrangianR(M)
+    sigma = cosmo_col.sigma(R, 0.0)[None, :] * cosmo_col.growthFactor(z)[:, None]
+    f = mass_function.massFunction(
+        sigma, z[:, None], q_in="sigma", q_out="f", mdef="fof", model="sheth99"
+    )
+    d_ln_sigma_d_ln_R = cosmo_col.sigma(R, 0.0, derivative=True)
+    rho_m = cosmo_col.rho_m(0.0) * 1e9
+    hhh = (cosmo_col.H0 / 100.0) ** 3
+    mfunc_so = -(1.0 / 3.0) * f * rho_m / M * d_ln_sigma_d_ln_R * hhh
+    return calc_vol(z, cosmo_col)[:, None] * mfunc_so
+
+
 def concent_m_w_scatter(m, z, sig):
     """Concentration parameter of halos in B. Diemer and A. V. Kravtsov, 2015
     with updated parameters of  Diemer & Joyce 2019 arXiv:1407.4730 [astro-
@@ -119,3 +152,47 @@ def concent_m_w_scatter(m, z, sig):
     con = con_mean * sca
     con[con < 1.0] = 1.0  # TODO check
     return con
+
+
+def concent_m_w_scatter_vectorized(m, z, sig, dz=0.05, dlog10m=0.05):
+    """Concentration parameter of halos as `concent_m_w_scatter`, for halos at
+    different redshifts at once.
+
+    The mean virial concentrations of the model of Diemer & Joyce 2019
+    are tabulated on a (z, log10 m) grid covering the halos and
+    interpolated. At each redshift of the grid, the concentrations are
+    evaluated in the native 200c mass definition of the model and
+    converted to the virial definition for all masses at once, instead
+    of solving for the 200c mass of every halo.
+
+    :param m: halo mass [M_sol/h]
+    :type  m: nd.array
+    :param z: redshifts of the halos
+    :type  z: nd.array
+    :param sig: intrinsic scatter of logarithmic concentration parameter
+    :type  sig: float
+    :param dz: redshift step of the table
+    :type  dz: float
+    :param dlog10m: log10 mass step of the table
+    :type  dlog10m: float
+    :return: con_halo: ndarray, concentration parameter of halos
+    """
+    m = np.atleast_1d(np.asarray(m, dtype=float))
+    z = np.broadcast_to(np.asarray(z, dtype=float), m.shape)
+    log10m = np.log10(m)
+    z_min, z_max = z.min(), max(z.max(), z.min() + dz)
+    z_grid = np.linspace(z_min, z_max, int(np.ceil((z_max - z_min) / dz)) + 1)
+    # the 200c masses are smaller than the virial masses
+    log10m_grid = np.arange(log10m.min() - 0.5, log10m.max() + 0.5, dlog10m)
+    log10c_grid = np.empty((len(z_grid), len(log10m_grid)))
+    for i, z_i in enumerate(z_grid):
+        m200c = 10**log10m_grid
+        c200c = concentration.concentration(m200c, "200c", z_i, model="diemer19")
+        mvir, _, cvir = mass_defs.changeMassDefinition(m200c, c200c, z_i, "200c", "vir")
+        log10c_grid[i] = np.interp(log10m_grid, np.log10(mvir), np.log10(cvir))
+    interpolation = RegularGridInterpolator((z_grid, log10m_grid), log10c_grid)
+    con_mean = 10 ** interpolation(np.stack([z, log10m], axis=-1))
+    sca = np.random.lognormal(0.0, sig, len(m))
+    con = con_mean * sca
+    con[con < 1.0] = 1.0  # TODO check
+    return con
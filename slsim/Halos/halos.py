@@ -1,8 +1,12 @@
+import hashlib
+import os
+import tempfile
 from scipy import integrate
 from colossus.lss import mass_function
 from colossus.cosmology import cosmology as colossus_cosmo
 import numpy as np
 import warnings
+from astropy.table import Table
 from lenstronomy.Cosmo.lens_cosmo import LensCosmo
 from slsim.Util.param_util import deg2_to_cone_angle
 from slsim.Util.astro_util import (
@@ -12,7 +16,9 @@ from slsim.Util.astro_util import (
 from scipy.optimize import bisect
 
 
-def colossus_halo_mass_function(m_200, cosmo, z, sigma8=0.81, ns=0.96, omega_m=None):
+def colossus_halo_mass_function(
+    m_200, cosmo, z, sigma8=0.81, ns=0.96, omega_m=None, model="bhattacharya11"
+):
     """Calculate the differential halo mass function per logarithmic mass
     interval at a given redshift.
 
@@ -37,9 +43,11 @@ def colossus_halo_mass_function(m_200, cosmo, z, sigma8=0.81, ns=0.96, omega_m=N
     :param omega_m: Omega_m in Cosmology, defaults to none which will lead to the same
         in Cosmology setting.
     :type omega_m: float, optional
+    :param model: Colossus mass function model, defaults to `bhattacharya11`.
+    :type model: str, optional
     :return: The differential halo mass function dn/dlnM, in units of Mpc^-3.
     :rtype: ndarray
-    :note: The `bhattacharya11` model within the Colossus framework is used for the mass function.
+    :note: The `bhattacharya11` model within the Colossus framework is used for the mass function by default.
     """
     if omega_m is None:
         omega_m = cosmo.Om0
@@ -63,7 +71,7 @@ def colossus_halo_mass_function(m_200, cosmo, z, sigma8=0.81, ns=0.96, omega_m=N
     colossus_cosmo.setCosmology(cosmo_name="halo_cosmo", **params)
     h3 = np.power(cosmo.h, 3)
     mfunc_h3_dmpc3 = mass_function.massFunction(
-        m_200, z, mdef="fof", model="bhattacharya11", q_out="dndlnM"
+        m_200, z, mdef="fof", model=model, q_out="dndlnM"
     )
     # in h^3*Mpc-3
     massf = mfunc_h3_dmpc3 * h3  # in Mpc-3
@@ -233,7 +241,8 @@ def number_density_at_redshift(
         list (for scalar z) or ndarray (for array z).
     :rtype: list or ndarray :note: A warning is issued for NaN values in
         input redshifts, with a fallback to a default redshift of
-        0.0001.
+        0.0001. The mass function is interpolated from a cached
+        HaloMassFunctionTable.
     """
     (
         m_min,
@@ -246,20 +255,21 @@ def number_density_at_redshift(
         resolution,
         cosmology,
     )
-    m_200 = np.geomspace(m_min * cosmology.h, m_max * cosmology.h, resolution)
     if np.all(np.isnan(z)):
         warnings.warn("Redshift data lost, instead uses 0.0001")
         return [0.0001] * len(z)
-    if isinstance(z, float):
-        z = np.array([z])
-    cdfs = []
-    for zi in z:
-        massf = colossus_halo_mass_function(
-            m_200, cosmology, zi, sigma8=sigma8, ns=ns, omega_m=omega_m
-        )
-        total_number_density = number_density_for_massf(massf, m_200, dndlnM=True)
-        cdfs.append(total_number_density)
-    return cdfs
+    z = np.atleast_1d(np.asarray(z, dtype=float))
+    table = HaloMassFunctionTable.cached(
+        cosmology,
+        m_min=m_min,
+        m_max=m_max,
+        resolution=resolution,
+        z_max=_table_z_max(z),
+        sigma8=sigma8,
+        ns=ns,
+        omega_m=omega_m,
+    )
+    return list(table.number_density(z))
 
 
 def number_density_for_massf(massf, m, dndlnM=False):
@@ -529,6 +539,7 @@ def halo_mass_at_z(
     sigma8=0.81,
     ns=0.96,
     omega_m=None,
+    random_seed=None,
 ):
     """Sample halo masses at given redshift(s) using specified or default
     cosmological parameters and mass range.
@@ -556,9 +567,13 @@ def halo_mass_at_z(
     :param omega_m: Matter density parameter Omega_m. If not specified, the value from
         the cosmology instance is used.
     :type omega_m: float, optional
+    :param random_seed: Seed or numpy.random.Generator of the masses. If
+        None, the global numpy random state is used.
+    :type random_seed: int or numpy.random.Generator, optional
     :return: List of sampled halo masses for each provided redshift. Each element
         corresponds to the mass sampled at the respective redshift in the input.
     :rtype: list
+    :note: All masses are drawn at once from a cached HaloMassFunctionTable.
     """
 
     (
@@ -577,24 +592,21 @@ def halo_mass_at_z(
     except TypeError:
         z = [z]
 
-    mass = []
     if np.all(np.isnan(z)):
         return [0] * len(z)
-    for z_val in z:
-        mass.append(
-            colossus_halo_mass_sampler(
-                m_min=m_min,
-                m_max=m_max,
-                resolution=resolution,
-                z=z_val,
-                cosmology=cosmology,
-                size=1,
-                sigma8=sigma8,
-                ns=ns,
-                omega_m=omega_m,
-            )
-        )
-    return mass
+    z = np.asarray(z, dtype=float)
+    table = HaloMassFunctionTable.cached(
+        cosmology,
+        m_min=m_min,
+        m_max=m_max,
+        resolution=resolution,
+        z_max=_table_z_max(z),
+        sigma8=sigma8,
+        ns=ns,
+        omega_m=omega_m,
+    )
+    mass = table.sample_masses(z, random_seed=random_seed)
+    return list(mass[:, None])
 
 
 def redshift_mass_sheet_correction_array_from_comoving_density(redshift_list):
@@ -715,6 +727,16 @@ def expected_mass_at_redshift(
     ) = set_defaults_halos(m_min, m_max, resolution, cosmology)
     m2_list = []
     delta_z = np.diff(z)[0]
+    table = HaloMassFunctionTable.cached(
+        cosmology,
+        m_min=m_min,
+        m_max=m_max,
+        resolution=resolution,
+        z_max=_table_z_max(np.asarray(z) + delta_z),
+        sigma8=sigma8,
+        ns=ns,
+        omega_m=omega_m,
+    )
     for zi in z:
         N = colossus_halo_expected_number_certain_bin(
             z_c=zi,
@@ -728,16 +750,7 @@ def expected_mass_at_redshift(
             ns=ns,
             omega_m=omega_m,
         )
-        expectation_m = colossus_halo_expected_mass_sampler(
-            m_min=m_min,
-            m_max=m_max,
-            resolution=resolution,
-            z=zi,
-            cosmology=cosmology,
-            sigma8=sigma8,
-            ns=ns,
-            omega_m=omega_m,
-        )
+        expectation_m = table.expected_mass(zi)
         m2 = expectation_m * N
         m2_list.append(m2)
     return m2_list
@@ -990,3 +1003,431 @@ def optimize_min_mass_based_on_number(
         return result_m_min
     except Exception:
         return 1e9
+
+
+# directory of the opt-in on-disk cache of HaloMassFunctionTable.cached, the
+# tables are then computed once per machine instead of once per process
+_CACHE_DIR = os.environ.get("SLSIM_CACHE_DIR")
+
+
+def _table_z_max(z):
+    """Upper redshift of the HaloMassFunctionTable used for the redshifts `z`,
+    so that one cached table covers all calls of a light cone up to z = 5."""
+    return max(5.0, float(np.ceil(np.nanmax(z))))
+
+
+def _random_state(random_seed):
+    """Generator of a seed, or the global numpy random state if the seed is
+    None, so that np.random.seed keeps controlling unseeded draws."""
+    if random_seed is None:
+        return np.random
+    return np.random.default_rng(random_seed)
+
+
+def _save_table(file_name, **arrays):
+    """Writes arrays to a .npz file through a temporary file, so that processes
+    reading the cache never see a partial file.
+
+    A cache directory which cannot be written is ignored.
+    """
+    directory = os.path.dirname(file_name)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as tmp_file:
+            np.savez(tmp_file, **arrays)
+        os.replace(tmp_file.name, file_name)
+    except OSError:
+        pass
+
+
+class HaloMassFunctionTable(object):
+    """Halo mass function dn/dlnM tabulated once on a (z, M) grid.
+
+    The mass function is computed with Colossus, see
+    `colossus_halo_mass_function`, for all redshifts of the grid at once and
+    is linearly interpolated in redshift. Number densities, expected masses,
+    cumulative mass distributions and inverse-CDF mass samples are then
+    vectorized over arrays of redshifts. Tables are cached in memory per
+    (cosmology, sigma8, ns, omega_m, model, grid), see `cached`, and on
+    disk.
+
+    Computing a table takes one Colossus call per grid redshift (501 calls
+    up to z = 5, a few seconds). If `default_cache_dir` is set, by default
+    from the environment variable SLSIM_CACHE_DIR, `cached` therefore also
+    stores the tables there, so that other processes, e.g. spawned workers,
+    load them instead of computing them again. The directory is not
+    cleaned up. Without it, the tables are only cached in memory.
+    """
+
+    _tables = {}  # in-memory cache of `cached`
+    default_cache_dir = _CACHE_DIR  # on-disk cache of `cached`, None to disable
+
+    def __init__(
+        self,
+        cosmology=None,
+        m_min=None,
+        m_max=None,
+        resolution=None,
+        z_max=5.0,
+        z_resolution=None,
+        sigma8=0.81,
+        ns=0.96,
+        omega_m=None,
+        model="bhattacharya11",
+        cache_dir=None,
+    ):
+        """
+        :param cosmology: astropy.cosmology instance. Defaults to the
+            astropy default cosmology.
+        :type cosmology: astropy.Cosmology instance, optional
+        :param m_min: Minimum halo mass in M_sol.
+        :type m_min: float, optional
+        :param m_max: Maximum halo mass in M_sol.
+        :type m_max: float, optional
+        :param resolution: Number of mass grid points.
+        :type resolution: int, optional
+        :param z_max: Maximum redshift of the grid, the minimum is 0.
+        :type z_max: float
+        :param z_resolution: Number of redshift grid points, defaults to
+            a spacing of 0.01.
+        :type z_resolution: int, optional
+        :param sigma8: Sigma8 parameter for the power spectrum
+            normalization.
+        :type sigma8: float
+        :param ns: Spectral index for the power spectrum.
+        :type ns: float
+        :param omega_m: Matter density parameter Omega_m. If None, the
+            value of the cosmology instance is used.
+        :type omega_m: float, optional
+        :param model: Colossus mass function model.
+        :type model: str
+        :param cache_dir: If given, the table is read from or written to
+            a .npz file in this directory.
+        :type cache_dir: str, optional
+        """
+        m_min, m_max, resolution, cosmology = set_defaults_halos(
+            m_min, m_max, resolution, cosmology
+        )
+        h = get_value_if_quantity(cosmology.h)
+        if z_resolution is None:
+            z_resolution = int(round(100 * z_max)) + 1
+        self._m_h = np.geomspace(
+            get_value_if_quantity(m_min) * h,
+            get_value_if_quantity(m_max) * h,
+            get_value_if_quantity(resolution),
+        )
+        self._h = h
+        self._cosmology = cosmology
+        self._ln_m = np.log(self._m_h)
+        self._z = np.linspace(0, z_max, z_resolution)
+        self.key = self.cache_key(
+            cosmology,
+            m_min,
+            m_max,
+            resolution,
+            z_max,
+            z_resolution,
+            sigma8,
+            ns,
+            omega_m,
+            model,
+        )
+
+        dndlnm = None
+        if cache_dir is not None:
+            digest = hashlib.sha1(repr(self.key).encode()).hexdigest()
+            file_name = os.path.join(cache_dir, "halo_mass_function_%s.npz" % digest)
+            if os.path.exists(file_name):
+                dndlnm = np.load(file_name)["dndlnm"]
+        if dndlnm is None:
+            dndlnm = np.array(
+                [
+                    colossus_halo_mass_function(
+                        self._m_h, cosmology, zi, sigma8, ns, omega_m, model=model
+                    )
+                    for zi in self._z
+                ]
+            )
+            if cache_dir is not None:
+                _save_table(file_name, dndlnm=dndlnm)
+        self._dndlnm = dndlnm  # in Mpc^-3, shape (len(z), len(m))
+
+        cumulative = integrate.cumulative_trapezoid(
+            dndlnm, self._ln_m, initial=0, axis=1
+        )
+        self._number_density = cumulative[:, -1]
+        self._mass_density = (
+            integrate.trapezoid(dndlnm * self._m_h, self._ln_m, axis=1) / h
+        )
+        empty = self._number_density <= 0
+        # rows without halos fall back to a uniform distribution in ln M
+        cumulative[empty] = np.linspace(0, 1, len(self._m_h))
+        self._cdf = cumulative / cumulative[:, -1:]
+        # rows offset by their index are monotonic when flattened, which allows
+        # one searchsorted call for halos at different redshifts
+        self._cdf_flat = (self._cdf + np.arange(len(self._z))[:, None]).ravel()
+
+    @staticmethod
+    def cache_key(
+        cosmology,
+        m_min=None,
+        m_max=None,
+        resolution=None,
+        z_max=5.0,
+        z_resolution=None,
+        sigma8=0.81,
+        ns=0.96,
+        omega_m=None,
+        model="bhattacharya11",
+    ):
+        """Key identifying a table by the cosmological parameters used by
+        Colossus and the grid, with the same arguments as the class.
+
+        :return: hashable key
+        :rtype: tuple
+        """
+        m_min, m_max, resolution, cosmology = set_defaults_halos(
+            m_min, m_max, resolution, cosmology
+        )
+        if z_resolution is None:
+            z_resolution = int(round(100 * z_max)) + 1
+        return (
+            cosmology.Ok0 == 0.0,
+            get_value_if_quantity(cosmology.H0),
+            cosmology.Om0,
+            cosmology.Ode0,
+            cosmology.Ob0,
+            get_value_if_quantity(cosmology.Tcmb0),
+            cosmology.Neff,
+            sigma8,
+            ns,
+            omega_m,
+            model,
+            float(get_value_if_quantity(m_min)),
+            float(get_value_if_quantity(m_max)),
+            int(get_value_if_quantity(resolution)),
+            float(z_max),
+            z_resolution,
+        )
+
+    @classmethod
+    def cached(cls, cosmology=None, **kwargs):
+        """Returns the table with the given parameters, computing it only once
+        per process. Unless cache_dir is given, the table is read from or
+        written to `default_cache_dir`.
+
+        :param cosmology: astropy.cosmology instance.
+        :param kwargs: keyword arguments of HaloMassFunctionTable.
+        :return: HaloMassFunctionTable instance
+        """
+        kwargs.setdefault("cache_dir", cls.default_cache_dir)
+        key_kwargs = {k: v for k, v in kwargs.items() if k != "cache_dir"}
+        key = cls.cache_key(cosmology, **key_kwargs)
+        if key not in cls._tables:
+            cls._tables[key] = cls(cosmology, **kwargs)
+        return cls._tables[key]
+
+    @property
+    def redshifts(self):
+        """Redshift grid of the table."""
+        return self._z
+
+    @property
+    def masses(self):
+        """Mass grid of the table in M_sol."""
+        return self._m_h / self._h
+
+    def _interpolation_weights(self, z):
+        """Index of the grid redshift below `z` and the linear weight of the
+        one above."""
+        z = np.asarray(z, dtype=float)
+        index = np.clip(
+            np.searchsorted(self._z, z, side="right") - 1, 0, len(self._z) - 2
+        )
+        weight = np.clip(
+            (z - self._z[index]) / (self._z[index + 1] - self._z[index]), 0, 1
+        )
+        return index, weight
+
+    def dndlnm(self, z):
+        """Mass function dn/dlnM on the mass grid `masses`.
+
+        :param z: redshift(s)
+        :type z: float or ndarray
+        :return: dn/dlnM in Mpc^-3, shape z.shape + (len(masses),)
+        :rtype: ndarray
+        """
+        index, weight = self._interpolation_weights(z)
+        weight = weight[..., None]
+        return (1 - weight) * self._dndlnm[index] + weight * self._dndlnm[index + 1]
+
+    def number_density(self, z):
+        """Number density of halos between the minimum and maximum mass.
+
+        :param z: redshift(s)
+        :type z: float or ndarray
+        :return: number density in Mpc^-3
+        :rtype: float or ndarray
+        """
+        return np.interp(z, self._z, self._number_density)
+
+    def expected_mass(self, z):
+        """Average mass of a halo between the minimum and maximum mass.
+
+        :param z: redshift(s)
+        :type z: float or ndarray
+        :return: average mass in M_sol
+        :rtype: float or ndarray
+        """
+        return np.interp(z, self._z, self._mass_density) / self.number_density(z)
+
+    def cdf(self, z):
+        """Cumulative distribution of the halo masses on the mass grid
+        `masses`.
+
+        :param z: redshift(s)
+        :type z: float or ndarray
+        :return: CDF, shape z.shape + (len(masses),)
+        :rtype: ndarray
+        """
+        cumulative = integrate.cumulative_trapezoid(
+            self.dndlnm(z), self._ln_m, initial=0, axis=-1
+        )
+        total = cumulative[..., -1:]
+        return np.divide(
+            cumulative,
+            total,
+            out=np.broadcast_to(
+                np.linspace(0, 1, len(self._ln_m)), cumulative.shape
+            ).copy(),
+            where=total > 0,
+        )
+
+    def sample_masses(self, z, random_seed=None):
+        """Draws one halo mass for each redshift by inverting the CDF of the
+        mass function interpolated to that redshift. The interpolated mass
+        function is a mixture of the two neighbouring grid rows, so a row is
+        drawn first and its tabulated CDF is inverted, for all halos at once.
+
+        :param z: redshifts of the halos
+        :type z: float or ndarray
+        :param random_seed: seed or numpy.random.Generator. If None, the
+            global numpy random state is used.
+        :return: halo masses in M_sol, same shape as z
+        :rtype: ndarray
+        """
+        rng = _random_state(random_seed)
+        z = np.asarray(z, dtype=float)
+        index, weight = self._interpolation_weights(z)
+        lower = (1 - weight) * self._number_density[index]
+        upper = weight * self._number_density[index + 1]
+        total = lower + upper
+        p_upper = np.divide(upper, total, out=weight.copy(), where=total > 0)
+        row = index + (rng.random(z.shape) < p_upper)
+
+        n_m = len(self._ln_m)
+        u = rng.random(z.shape)
+        flat_index = np.searchsorted(self._cdf_flat, row + u, side="right") - 1
+        j = np.clip(flat_index - row * n_m, 0, n_m - 2)
+        cdf_low = self._cdf[row, j]
+        cdf_high = self._cdf[row, j + 1]
+        delta = cdf_high - cdf_low
+        fraction = np.divide(u - cdf_low, delta, out=np.zeros_like(u), where=delta > 0)
+        ln_m = self._ln_m[j] + np.clip(fraction, 0, 1) * (
+            self._ln_m[j + 1] - self._ln_m[j]
+        )
+        return np.exp(ln_m) / self._h
+
+    def sample_halos(self, sky_area, z_max=None, random_seed=None):
+        """Draws all halos of a light cone in one pass from the joint (z, M)
+        distribution of the table: the number of halos from a Poisson
+        distribution, their redshifts from the cumulative dN/dz and their
+        masses with `sample_masses`.
+
+        :param sky_area: sky area of the light cone.
+        :type sky_area: `~astropy.units.Quantity`
+        :param z_max: maximum redshift of the halos, defaults to the
+            maximum of the table.
+        :type z_max: float, optional
+        :param random_seed: seed or numpy.random.Generator. If None, the
+            global numpy random state is used.
+        :return: redshifts and masses in M_sol of the halos
+        :rtype: (ndarray, ndarray)
+        """
+        rng = _random_state(random_seed)
+        if z_max is None:
+            z_max = self._z[-1]
+        redshift_list = np.append(self._z[self._z < z_max], z_max)
+        dN_dz = v_per_redshift(
+            redshift_list, self._cosmology, sky_area
+        ) * self.number_density(redshift_list)
+        cdf = integrate.cumulative_trapezoid(dN_dz, redshift_list, initial=0)
+        n_halos = rng.poisson(cdf[-1])
+        if n_halos == 0:
+            return np.array([]), np.array([])
+        z = np.interp(rng.random(n_halos), cdf / cdf[-1], redshift_list)
+        return z, self.sample_masses(z, random_seed=rng)
+
+
+def halos_from_mass_function_table(
+    sky_area,
+    cosmology=None,
+    m_min=None,
+    m_max=None,
+    z_max=5.0,
+    resolution=None,
+    sigma8=0.81,
+    ns=0.96,
+    omega_m=None,
+    random_seed=None,
+):
+    """Draws a halo light cone with a cached HaloMassFunctionTable, see
+    `HaloMassFunctionTable.sample_halos`. This replaces the per-halo path of
+    `redshift_halos_array_from_comoving_density` and `halo_mass_at_z`.
+
+    :param sky_area: Sky area of the light cone.
+    :type sky_area: `~astropy.units.Quantity`
+    :param cosmology: astropy.cosmology instance.
+    :type cosmology: astropy.Cosmology instance, optional
+    :param m_min: Minimum halo mass in M_sol.
+    :type m_min: float, optional
+    :param m_max: Maximum halo mass in M_sol.
+    :type m_max: float, optional
+    :param z_max: Maximum redshift of the halos.
+    :type z_max: float
+    :param resolution: Number of mass grid points.
+    :type resolution: int, optional
+    :param sigma8: Sigma8 parameter for the power spectrum normalization.
+    :type sigma8: float
+    :param ns: Spectral index for the power spectrum.
+    :type ns: float
+    :param omega_m: Matter density parameter Omega_m, defaults to the
+        value of the cosmology.
+    :type omega_m: float, optional
+    :param random_seed: seed or numpy.random.Generator
+    :return: Table with the columns "z" and "mass" (in M_sol) of the
+        halos. If no halos are drawn, a single row with z = nan and mass
+        = 0 is returned, as in the SkyPy pipeline.
+    :rtype: astropy.table.Table
+    """
+    (
+        m_min,
+        m_max,
+        resolution,
+        cosmology,
+    ) = set_defaults_halos(m_min, m_max, resolution, cosmology)
+    table = HaloMassFunctionTable.cached(
+        cosmology,
+        m_min=m_min,
+        m_max=m_max,
+        resolution=resolution,
+        z_max=_table_z_max(z_max),
+        sigma8=sigma8,
+        ns=ns,
+        omega_m=omega_m,
+    )
+    z, mass = table.sample_halos(sky_area, z_max=z_max, random_seed=random_seed)
+    if len(z) == 0:
+        warnings.warn("No Halos found in the given redshift range")
+        z, mass = np.array([np.nan]), np.array([0.0])
+    return Table([z, mass], names=("z", "mass"))
@@ -4,6 +4,8 @@ from lenstronomy.Cosmo.lens_cosmo import LensCosmo
 import warnings
 from collections.abc import Iterable
 from slsim.Halos.halos_ray_tracing import HalosRayTracing
+from slsim.Halos.halos_multi_plane import HalosMultiPlane
+from slsim.Util.param_util import deg2_to_cone_angle
 
 
 def concentration_from_mass(z, mass, A=75.4, d=-0.422, m=-0.089):
@@ -64,18 +66,24 @@ class HalosLensBase(object):
          mass_list (numpy.ndarray): Masses of the halos in solar masses.
          cosmo (astropy.Cosmology): Cosmology used for computations.
          param_lens_model (lenstronomy.LensModel.LensModel): LensModel with an NFW profile for each halo.
+         param_halos_multi_plane (HalosMultiPlane): vectorized multi-plane evaluator of the same halos and mass sheets.
 
     Methods:
          enhance_halos_table_random_pos(): Enhances the halos table with random positions.
          get_lens_model(): Creates a lens model using provided halos and optional mass sheet correction.
          random_position(): Generates and returns random positions in the sky using a uniform distribution.
+         random_positions_block(): Generates random positions of all halos for many repositionings at once.
          get_nfw_kwargs(): Returns the angle at scale radius and observed bending angle at the scale radius for NFW profile.
          get_halos_lens_kwargs(): Constructs and returns the list of keyword arguments for each halo in the lens model.
          filter_halos_by_redshift(): Filters halos and mass corrections by redshift conditions and constructs lens data.
          get_lens_data_by_redshift(): Retrieves lens data filtered by the specified redshift range.
          halos_get_convergence_shear(): Computes the convergence and shear at the origin due to all Halos.
+         get_halos_multi_plane(): Creates the vectorized multi-plane evaluator of the halos and mass sheets.
+         halos_get_convergence_shear_vectorized(): Computes the convergence and shear at the origin for many halo positions at once.
          compute_halos_nonlinear_correction_kappa_gamma_values(): Compute the various convergence and shear values from the non-linear correction numbers.
          halos_get_kext_gext_values(): Compute the non-linear external convergence and shear values from the Halos.
+         get_halos_multi_plane_by_redshift(): Creates the vectorized multi-plane evaluators of the `od`, `os` and `ds` lens data once per redshift pair.
+         halos_get_kext_gext_values_vectorized(): Compute the external convergence and shear for many halo positions at once.
          halos_compute_kappa(): Computes the convergence across the lensed sky area.
          plot_halos_convergence(): Compares and plots the convergence for different configurations of the mass sheet.
          enhance_halos_pos_to0(): Sets the positions of all halos to 0.
@@ -90,6 +98,7 @@ class HalosLensBase(object):
         sky_area=0.004 * np.pi,
         mass_sheet=True,
         z_source=5,
+        random_seed=None,
     ):
         """Initialize the HalosLens class.
 
@@ -103,6 +112,8 @@ class HalosLensBase(object):
         :type sky_area: float, optional
         :param mass_sheet: Flag to decide whether to use the mass_sheet correction. If set to False, the mass_correction_list is ignored. Defaults to True.
         :type mass_sheet: bool, optional
+        :param random_seed: Seed or numpy.random.Generator for the random positions of the halos. If None, the global numpy random state is used.
+        :type random_seed: int or numpy.random.Generator, optional
         """
 
         if mass_correction_list is None:
@@ -150,6 +161,13 @@ class HalosLensBase(object):
 
         self._lens_cosmo = None  # place-holder for lazy load
         self._lens_model = None  # same as above
+        self._halos_multi_plane = None  # same as above
+        self._halos_nfw_kwargs = None  # same as above
+        self._halos_multi_plane_by_redshift = {}
+        # the global random state unless a seed or generator is given
+        self._rng = (
+            np.random if random_seed is None else np.random.default_rng(random_seed)
+        )
         c_200 = [
             concentration_from_mass(z=zi, mass=mi)
             for zi, mi in zip(self.halos_redshift_list, self.mass_list)
@@ -198,6 +216,18 @@ class HalosLensBase(object):
             self._lens_model = self.get_lens_model()
         return self._lens_model
 
+    @property
+    def param_halos_multi_plane(self):
+        """Lazy-load param_halos_multi_plane.
+
+        The redshifts and NFW parameters of the halos do not change when
+        the halos are repositioned, so the evaluator is created only
+        once.
+        """
+        if self._halos_multi_plane is None:
+            self._halos_multi_plane = self.get_halos_multi_plane()
+        return self._halos_multi_plane
+
     def enhance_halos_table_random_pos(self):
         """Put halos in random positions in the sky."""
         n_halos = self.n_halos
@@ -205,7 +235,7 @@ class HalosLensBase(object):
             self.halos_list["px"] = 0.0
             self.halos_list["py"] = 0.0
         else:
-            px, py = np.array([self.random_position() for _ in range(n_halos)]).T
+            px, py = self.random_position(size=n_halos)
             # Adding the computed attributes to the halos table
             self.halos_list["px"] = px
             self.halos_list["py"] = py
@@ -251,22 +281,64 @@ class HalosLensBase(object):
         )
         return lens_model
 
-    def random_position(self):
+    def get_halos_multi_plane(self):
+        """Create the vectorized multi-plane evaluator of the halos and (if
+        specified) the mass sheet correction, equivalent to the lens model of
+        `get_lens_model` with the kwargs of `get_halos_lens_kwargs`.
+
+        :return: evaluator of the convergence and shear for arbitrary
+            halo positions
+        :rtype: HalosMultiPlane
+        """
+        Rs_angle, alpha_Rs = self.get_nfw_kwargs()
+        return HalosMultiPlane(
+            halo_redshifts=self.halos_redshift_list[: self.n_halos],
+            Rs=Rs_angle,
+            alpha_Rs=alpha_Rs,
+            cosmo=self.cosmo,
+            z_source=self.z_source,
+            sheet_redshifts=self.mass_sheet_correction_redshift,
+            sheet_kappa=self.mass_sheet_kappa,
+            z_source_convention=self._z_source_convention,
+        )
+
+    def random_position(self, size=None):
         """Generates and returns random positions in the sky using a uniform
         distribution.
 
+        :param size: number of positions to draw. If None, a single
+            position is drawn.
+        :type size: int or tuple of int, optional
         :returns: The generated random x and y coordinates inside the
-            skyarea in arcsec.
-        :rtype: (float, float)
+            skyarea in arcsec, floats or arrays of shape `size`.
+        :rtype: (float, float) or (numpy.ndarray, numpy.ndarray)
         """
-
-        phi = 2 * np.pi * np.random.random()
+        phi = 2 * np.pi * self._rng.random(size)
         upper_bound = np.sqrt(self.sky_area / np.pi)
-        random_radius = 3600 * np.sqrt(np.random.random()) * upper_bound
-        px = random_radius * np.cos(2 * phi)
-        py = random_radius * np.sin(2 * phi)
+        random_radius = 3600 * np.sqrt(self._rng.random(size)) * upper_bound
+        px = random_radius * np.cos(phi)
+        py = random_radius * np.sin(phi)
+        if size is None:
+            return float(px), float(py)
         return px, py
 
+    def random_positions_block(self, n_samples, n_halos=None):
+        """Generates random positions of all halos for `n_samples`
+        repositionings at once.
+
+        :param n_samples: number of repositionings.
+        :type n_samples: int
+        :param n_halos: number of halos. If None, uses `n_halos` of the
+            class.
+        :type n_halos: int, optional
+        :returns: x and y coordinates in arcsec along the last axis.
+        :rtype: numpy.ndarray of shape (n_samples, n_halos, 2)
+        """
+        if n_halos is None:
+            n_halos = self.n_halos
+        px, py = self.random_position(size=(n_samples, n_halos))
+        return np.stack((px, py), axis=-1)
+
     def get_nfw_kwargs(self, z=None, mass=None, n_halos=None, lens_cosmo=None, c=None):
         """Returns the angle at scale radius, observed bending angle at the
         scale radius, and positions of the Halos in the lens plane from
@@ -315,8 +387,12 @@ class HalosLensBase(object):
             dictionaries containing the keyword arguments for each halo.
         """
 
+        # Rs and alpha_Rs only depend on redshift, mass and concentration and
+        # are reused when the halos are repositioned
+        if self._halos_nfw_kwargs is None:
+            self._halos_nfw_kwargs = self.get_nfw_kwargs()
+        Rs_angle, alpha_Rs = self._halos_nfw_kwargs
         if self.mass_sheet and self.n_correction > 0:
-            Rs_angle, alpha_Rs = self.get_nfw_kwargs()
             #    first_moment = self.mass_first_moment
             #    kappa = self.kappa_ext_for_mass_sheet(self.mass_sheet_correction_redshift,
             #                                          self.param_lens_cosmo[-self.n_correction:], first_moment)
@@ -336,7 +412,6 @@ class HalosLensBase(object):
                 for h in range(self.n_correction)
             ]
         else:
-            Rs_angle, alpha_Rs = self.get_nfw_kwargs()
             kwargs_lens = [
                 {
                     "Rs": Rs_angle[h],
@@ -816,6 +891,119 @@ class HalosLensBase(object):
             same_from_class=same_from_class,
         )
 
+    def get_halos_multi_plane_by_redshift(self, zd, zs):
+        """Vectorized multi-plane evaluators of the `od`, `os` and `ds` lens
+        data of `get_lens_data_by_redshift`. They are created once per (zd, zs)
+        and reused for all halo positions.
+
+        :param zd: The deflector redshift.
+        :type zd: float
+        :param zs: The source redshift.
+        :type zs: float
+        :return: A dictionary with the keys `od`, `os` and `ds`, each mapping to a tuple of the HalosMultiPlane instance, the boolean mask of the halos it contains and the observer redshift (z_start) of its Hessian.
+        :rtype: dict
+        :raises ValueError: If the source redshift (zs) is less than the deflector redshift (zd).
+        """
+        if zs < zd:
+            raise ValueError(
+                f"Source redshift {zs} cannot be less than deflector redshift {zd}."
+            )
+        if (zd, zs) not in self._halos_multi_plane_by_redshift:
+            z_halos = np.asarray(self.halos_list["z"])
+            z_sheets = np.asarray(self.mass_sheet_correction_redshift, dtype=float)
+            conditions = {
+                "od": (0, zd, 0),
+                "os": (0, zs, 0),
+                "ds": (zd, zs, zd),
+            }
+            engines = {}
+            for name, (z1, z2, z_start) in conditions.items():
+                halo_mask = (z_halos >= z1) & (z_halos < z2)
+                sheet_mask = (z_sheets >= z1) & (z_sheets < z2)
+                engines[name] = (
+                    self._build_halos_multi_plane(halo_mask, sheet_mask, z2),
+                    halo_mask,
+                    z_start,
+                )
+            self._halos_multi_plane_by_redshift[(zd, zs)] = engines
+        return self._halos_multi_plane_by_redshift[(zd, zs)]
+
+    def _build_halos_multi_plane(self, halo_mask, sheet_mask, z_source):
+        """Creates the HalosMultiPlane of a subset of the halos and mass
+        sheets, with the NFW parameters defined for the source redshift as in
+        `_build_lens_data`.
+
+        :param halo_mask: boolean mask of the halos
+        :type halo_mask: numpy.ndarray
+        :param sheet_mask: boolean mask of the mass sheets
+        :type sheet_mask: numpy.ndarray
+        :param z_source: The redshift of the source.
+        :type z_source: float
+        :rtype: HalosMultiPlane
+        """
+        z_halo = np.asarray(self.halos_list["z"])[halo_mask]
+        n_halos = len(z_halo)
+        lens_cosmo_list = [
+            LensCosmo(z_lens=z, z_source=z_source, cosmo=self.cosmo) for z in z_halo
+        ]
+        Rs_angle, alpha_Rs = self.get_nfw_kwargs(
+            z=z_halo,
+            mass=np.asarray(self.halos_list["mass"])[halo_mask],
+            n_halos=n_halos,
+            lens_cosmo=lens_cosmo_list,
+            c=np.asarray(self.halos_list["c_200"])[halo_mask],
+        )
+        if self.mass_sheet and len(sheet_mask) > 0:
+            sheet_redshifts = np.asarray(self.mass_sheet_correction_redshift)[
+                sheet_mask
+            ]
+            sheet_kappa = np.asarray(self.mass_sheet_kappa)[sheet_mask]
+        else:
+            sheet_redshifts, sheet_kappa = None, None
+        return HalosMultiPlane(
+            halo_redshifts=z_halo,
+            Rs=Rs_angle,
+            alpha_Rs=alpha_Rs,
+            cosmo=self.cosmo,
+            z_source=z_source,
+            sheet_redshifts=sheet_redshifts,
+            sheet_kappa=sheet_kappa,
+            z_source_convention=self._z_source_convention,
+        )
+
+    def halos_get_convergence_shear_vectorized(
+        self, px=None, py=None, gamma12=False, born=False
+    ):
+        """Computes the convergence and shear at the origin due to all Halos
+        for one or many sets of halo positions at once, with the analytic
+        multi-plane Hessian instead of finite differences. return all 0 if no
+        halos.
+
+        :param px: x-positions of the halos in arcsec, shape (n_halos,) or
+            (n_samples, n_halos). If None, uses the positions in the halos
+            table.
+        :type px: numpy.ndarray, optional
+        :param py: y-positions of the halos in arcsec, same shape as px.
+        :type py: numpy.ndarray, optional
+        :param gamma12: If True, returns gamma1 and gamma2 in addition to kappa. If False, returns total shear gamma along with kappa.
+        :type gamma12: bool, optional
+        :param born: If True, uses the Born approximation, which is faster but neglects the coupling between lens planes.
+        :type born: bool, optional
+        :returns: Depending on `gamma12`, either (kappa, gamma) or (kappa, gamma1, gamma2), floats or arrays of shape (n_samples,).
+        :rtype: tuple
+        """
+        if px is None:
+            px = np.asarray(self.halos_list["px"])[: self.n_halos]
+        if py is None:
+            py = np.asarray(self.halos_list["py"])[: self.n_halos]
+        if self.n_halos == 0:
+            shape = np.shape(px)[:-1]
+            zeros = np.zeros(shape) if shape else 0.0
+            return (zeros,) * (3 if gamma12 else 2)
+        return self.param_halos_multi_plane.convergence_shear(
+            px, py, gamma12=gamma12, born=born
+        )
+
     def compute_halos_nonlinear_correction_kappa_gamma_values(self, zd, zs):
         """Compute various kappa and gamma values for the given lens data.
         This function retrieves the lens data based on the input redshifts and computes
@@ -866,6 +1054,68 @@ class HalosLensBase(object):
         HRT = HalosRayTracing(lens_kwargs=None, lens_model=None)
         return HRT.get_kext_gext_values(lens_data=lens_data, zd=zd, zs=zs)
 
+    def halos_get_kext_gext_values_vectorized(
+        self, zd, zs, px=None, py=None, born=False
+    ):
+        r"""Compute the kext and gext values for one or many sets of halo
+        positions at once. The lens models of the `od`, `os` and `ds` lens data
+        are built only once for the given redshifts, see
+        `get_halos_multi_plane_by_redshift`.
+
+        The convergence and shear are those of the analytic Hessian at the
+        origin, not the finite differences over 1 arcsec of
+        `halos_get_kext_gext_values`, from which they differ by a few percent
+        if a halo is close to the line of sight.
+
+        :param zd: Deflector redshift.
+        :type zd: float
+        :param zs: Source redshift.
+        :type zs: float
+        :param px: x-positions of all halos in arcsec, shape (n_halos,) or
+            (n_samples, n_halos). If None, uses the positions in the halos
+            table.
+        :type px: numpy.ndarray, optional
+        :param py: y-positions of the halos in arcsec, same shape as px.
+        :type py: numpy.ndarray, optional
+        :param born: If True, uses the Born approximation.
+        :type born: bool, optional
+        :returns: A tuple containing the computed external convergence
+            value (kext) and the computed external shear magnitude
+            (gext), floats or arrays of shape (n_samples,).
+        :rtype: (float, float) or (numpy.ndarray, numpy.ndarray)
+
+        .. note::
+            See `HalosRayTracing.get_kext_gext_values` for the formulae.
+        """
+        if px is None:
+            px = np.asarray(self.halos_list["px"])
+        if py is None:
+            py = np.asarray(self.halos_list["py"])
+        px = np.asarray(px, dtype=float)
+        py = np.asarray(py, dtype=float)
+        values = {}
+        for name, (
+            engine,
+            halo_mask,
+            z_start,
+        ) in self.get_halos_multi_plane_by_redshift(zd, zs).items():
+            values[name] = engine.convergence_shear(
+                px[..., halo_mask],
+                py[..., halo_mask],
+                gamma12=True,
+                z_start=z_start,
+                born=born,
+            )
+        kappa_od, gamma_od1, gamma_od2 = values["od"]
+        kappa_os, gamma_os1, gamma_os2 = values["os"]
+        kappa_ds, gamma_ds1, gamma_ds2 = values["ds"]
+        kext = 1 - (1 - kappa_od) * (1 - kappa_os) / (1 - kappa_ds)
+        gext = np.sqrt(
+            (gamma_od1 + gamma_os1 - gamma_ds1) ** 2
+            + (gamma_od2 + gamma_os2 - gamma_ds2) ** 2
+        )
+        return kext, gext
+
     def halos_compute_kappa(
         self,
         diff=0.0000001,
@@ -873,6 +1123,7 @@ class HalosLensBase(object):
         diff_method="square",
         mass_sheet_bool=None,
         enhance_pos=False,
+        fft=False,
     ):
         """Computes the convergence (kappa) values over a grid and returns both
         the 2D kappa image and the 1D array of kappa values.
@@ -892,12 +1143,30 @@ class HalosLensBase(object):
         :param enhance_pos: A boolean value indicating whether to
             reshuffle the halo positions. Defaults to False.
         :type enhance_pos: bool, optional
+        :param fft: If True, the convergence is computed in the Born
+            approximation with `halos_born_maps` instead of the full
+            multi-plane lens model; `diff` and `diff_method` are then
+            ignored. Defaults to False.
+        :type fft: bool, optional
         :return: A tuple containing the 2D kappa image and the 1D array
             of kappa values.
         :rtype: tuple(numpy.ndarray, numpy.ndarray)
         """
 
         sky_area = self.sky_area
+        if fft:
+            radius_arcsec = deg2_to_cone_angle(sky_area) * 206264.806
+            kappa_image, _, _ = self.halos_born_maps(
+                num_points=num_points, map_size=2 * radius_arcsec
+            )
+            x = (np.arange(num_points) - (num_points - 1) / 2) * (
+                2 * radius_arcsec / num_points
+            )
+            mask_2D = x[None, :] ** 2 + x[:, None] ** 2 <= radius_arcsec**2
+            kappa_image = np.where(mask_2D, kappa_image, np.nan)
+            if enhance_pos:
+                self.enhance_halos_table_random_pos()
+            return kappa_image, kappa_image[mask_2D]
         kwargs = self.get_halos_lens_kwargs()
         lens_model = self.param_lens_model
         if mass_sheet_bool is not None:
@@ -916,6 +1185,72 @@ class HalosLensBase(object):
             self.enhance_halos_table_random_pos()
         return kappa_image, kappa_values
 
+    def halos_born_maps(
+        self,
+        num_points=500,
+        map_size=None,
+        px=None,
+        py=None,
+        truncate=True,
+        n_kernels=16,
+        n_truncation_kernels=4,
+    ):
+        """Convergence and shear maps of all halos (and mass sheets) to
+        `z_source` in the Born approximation, on a grid centered on the
+        lightcone axis.
+
+        Instead of evaluating the lens model of every halo on every pixel,
+        the projected halo masses, weighted with the lensing efficiency of
+        their planes, are deposited onto grids and convolved via FFT with
+        tabulated NFW kernels truncated at r_200, see
+        `slsim.Halos.halos_maps.nfw_born_maps`. This scales to degree-scale
+        maps from which many sightlines can be read at once.
+
+        :param num_points: The number of pixels along each axis.
+            Defaults to 500.
+        :type num_points: int, optional
+        :param map_size: side length of the map in arcsec. Defaults to
+            the diameter of the lightcone of `sky_area`.
+        :type map_size: float, optional
+        :param px: x-positions of the halos in arcsec. If None, uses the
+            positions in the halos table.
+        :type px: numpy.ndarray, optional
+        :param py: y-positions of the halos in arcsec.
+        :type py: numpy.ndarray, optional
+        :param truncate: If True, the NFW profiles are truncated at
+            c_200 * Rs.
+        :type truncate: bool, optional
+        :param n_kernels: number of bins of the angular scale radius of
+            the halos.
+        :type n_kernels: int, optional
+        :param n_truncation_kernels: number of bins of the truncation
+            radius of the halos. Each occupied pair of bins costs one FFT
+            convolution.
+        :type n_truncation_kernels: int, optional
+        :return: kappa, gamma1, gamma2 maps of shape (num_points,
+            num_points), pixel centers as in
+            `lenstronomy.Util.util.make_grid`
+        :rtype: tuple(numpy.ndarray, numpy.ndarray, numpy.ndarray)
+        """
+        if map_size is None:
+            map_size = 2 * deg2_to_cone_angle(self.sky_area) * 206264.806
+        if px is None:
+            px = np.asarray(self.halos_list["px"])[: self.n_halos]
+        if py is None:
+            py = np.asarray(self.halos_list["py"])[: self.n_halos]
+        truncation = None
+        if truncate and self.n_halos > 0:
+            truncation = np.asarray(self.halos_list["c_200"])[: self.n_halos]
+        return self.param_halos_multi_plane.born_maps(
+            px[: self.n_halos],
+            py[: self.n_halos],
+            num_pixels=num_points,
+            pixel_scale=map_size / num_points,
+            truncation=truncation,
+            n_kernels=n_kernels,
+            n_truncation_kernels=n_truncation_kernels,
+        )
+
     def plot_halos_convergence(
         self,
         diff=0.0000001,
@@ -0,0 +1,259 @@
+import numpy as np
+from scipy import fft
+
+from slsim.Halos.halos_multi_plane import _nfw_F_g
+
+
+def truncated_nfw_kernels(
+    Rs, truncation, pixel_scale, shape, supersampling=8, central_pixels=2
+):
+    """Convergence and shear kernels of an NFW profile truncated in projection
+    at `truncation` * Rs, for a unit amplitude kappa_s * Rs^2 = 1 arcsec^2, on
+    a periodic grid with the center at pixel (0, 0) as needed for FFT
+    convolutions.
+
+    Outside the truncation radius the shear is that of a point mass of the
+    truncated mass. The pixels close to the center are averaged over
+    `supersampling` x `supersampling` sub-pixels, and profiles which are
+    truncated within these pixels keep their total mass.
+
+    :param Rs: scale radius in arcsec
+    :type Rs: float
+    :param truncation: truncation radius in units of Rs, np.inf for no
+        truncation
+    :type truncation: float
+    :param pixel_scale: pixel size in arcsec
+    :type pixel_scale: float
+    :param shape: shape (ny, nx) of the grid
+    :type shape: tuple
+    :param supersampling: sub-pixels per axis of the central pixels
+    :type supersampling: int
+    :param central_pixels: half-width in pixels of the supersampled
+        central region
+    :type central_pixels: int
+    :return: kappa, gamma1, gamma2 kernels of the given shape
+    :rtype: (numpy.ndarray, numpy.ndarray, numpy.ndarray)
+    """
+    y = np.fft.fftfreq(shape[0], 1 / shape[0])[:, None] * pixel_scale
+    x = np.fft.fftfreq(shape[1], 1 / shape[1])[None, :] * pixel_scale
+    kernels = _truncated_nfw_lensing(x, y, Rs, truncation)
+
+    m = central_pixels
+    offsets = (np.arange(supersampling) + 0.5) / supersampling - 0.5
+    sub = offsets * pixel_scale
+    pixels = np.arange(-m, m + 1) * pixel_scale
+    # (2m+1, s) coordinates of the sub-pixels of the central pixels
+    sub_y = (pixels[:, None] + sub[None, :])[:, :, None, None]
+    sub_x = (pixels[:, None] + sub[None, :])[None, None, :, :]
+    central = _truncated_nfw_lensing(sub_x, sub_y, Rs, truncation)
+    rows = np.arange(-m, m + 1)[:, None] % shape[0]
+    columns = np.arange(-m, m + 1)[None, :] % shape[1]
+    for kernel, values in zip(kernels, central):
+        kernel[rows, columns] = values.mean(axis=(1, 3))
+    if truncation * Rs < (m + 0.5) * pixel_scale:
+        # profiles unresolved by the sub-pixels; the central pixel keeps the
+        # remaining mass 4 pi g(truncation) of the truncated profile
+        _, g_truncation = _nfw_F_g(np.array([truncation]))
+        mass = 4 * np.pi * g_truncation[0]
+        kernels[0][0, 0] += mass / pixel_scale**2 - np.sum(kernels[0])
+    return kernels
+
+
+def _truncated_nfw_lensing(x, y, Rs, truncation):
+    """Convergence and shear of a projected-truncated NFW profile of unit
+    amplitude kappa_s * Rs^2, in the sign convention of `nfw_hessian`.
+
+    :return: kappa, gamma1, gamma2
+    """
+    x, y = np.broadcast_arrays(x, y)
+    R2 = np.maximum(x**2 + y**2, 0.000001**2)
+    X = np.sqrt(R2) / Rs
+    F, g = _nfw_F_g(X)
+    inside = X < truncation
+    kappa = np.where(inside, 2 * F / Rs**2, 0.0)
+    if np.isfinite(truncation):
+        _, g_truncation = _nfw_F_g(np.array([truncation]))
+        g = np.where(inside, g, g_truncation[0])
+    mean_kappa = 4 * g / R2
+    a = mean_kappa - kappa
+    gamma1 = a * (y**2 - x**2) / R2
+    gamma2 = -a * 2 * x * y / R2
+    return kappa, gamma1, gamma2
+
+
+def cloud_in_cell(x, y, amplitudes, pixel_scale, shape, origin):
+    """Deposits point amplitudes onto a grid with bilinear (cloud-in-cell)
+    weights. Points outside the grid are dropped.
+
+    :param x: x-positions in arcsec
+    :type x: numpy.ndarray
+    :param y: y-positions in arcsec
+    :type y: numpy.ndarray
+    :param amplitudes: amplitude of each point
+    :type amplitudes: numpy.ndarray
+    :param pixel_scale: pixel size in arcsec
+    :type pixel_scale: float
+    :param shape: shape (ny, nx) of the grid
+    :type shape: tuple
+    :param origin: (row, column) pixel coordinates of the position (0, 0)
+    :type origin: tuple
+    :return: grid of shape `shape`
+    :rtype: numpy.ndarray
+    """
+    u = np.asarray(x, dtype=float) / pixel_scale + origin[1]
+    v = np.asarray(y, dtype=float) / pixel_scale + origin[0]
+    i0 = np.floor(v).astype(int)
+    j0 = np.floor(u).astype(int)
+    fv = v - i0
+    fu = u - j0
+    grid = np.zeros(shape[0] * shape[1])
+    for di, wi in ((0, 1 - fv), (1, fv)):
+        for dj, wj in ((0, 1 - fu), (1, fu)):
+            i, j = i0 + di, j0 + dj
+            inside = (i >= 0) & (i < shape[0]) & (j >= 0) & (j < shape[1])
+            grid += np.bincount(
+                i[inside] * shape[1] + j[inside],
+                weights=(amplitudes * wi * wj)[inside],
+                minlength=grid.size,
+            )
+    return grid.reshape(shape)
+
+
+def _log_bins(values, n_bins):
+    """Index of the equal logarithmic bin between the minimum and maximum of
+    the values, for each value."""
+    log_values = np.log(values)
+    edges = np.linspace(log_values.min(), log_values.max(), n_bins + 1)
+    return np.clip(np.digitize(log_values, edges[1:-1]), 0, n_bins - 1)
+
+
+def nfw_born_maps(
+    center_x,
+    center_y,
+    Rs,
+    kappa_s,
+    weights,
+    num_pixels,
+    pixel_scale,
+    truncation=None,
+    sheet_kappa=0.0,
+    n_kernels=16,
+    padding=0.25,
+    n_truncation_kernels=4,
+):
+    """Convergence and shear maps of many NFW halos in the Born approximation,
+    by FFT convolutions instead of evaluating every halo on every pixel.
+
+    The halos are grouped into `n_kernels` logarithmic bins of their angular
+    scale radius times `n_truncation_kernels` logarithmic bins of their
+    truncation radius (untruncated halos form one more bin). The weighted
+    amplitudes kappa_s * Rs^2 of each group, i.e. the projected halo masses
+    times the lensing efficiency of their planes, are deposited onto one grid
+    and convolved with the tabulated truncated-NFW kernels of the median
+    scale radius and truncation of the group. The maps are the sum of all
+    groups. The grids are zero-padded, so that the convolutions are not
+    periodic and halos up to `padding` times the map size outside the map
+    contribute.
+
+    Away from the halo centers, where the cloud-in-cell deposit smooths the
+    profiles on the pixel scale, the maps differ from the sum of the exact
+    profiles of all halos mostly by the spread of the profiles within the
+    bins. For scale radii spread over a factor of 10 and truncations between
+    3 and 12 scale radii (e.g. c_200), the rms errors of the default bins are
+    about 3% of the rms convergence and 10% of the rms shear, compared to 1%
+    and 3% with one kernel per halo. More kernels reduce these errors at the
+    cost of one FFT convolution per occupied bin.
+
+    :param center_x: x-centers of the halos in arcsec
+    :type center_x: numpy.ndarray
+    :param center_y: y-centers of the halos in arcsec
+    :type center_y: numpy.ndarray
+    :param Rs: scale radii in arcsec
+    :type Rs: numpy.ndarray
+    :param kappa_s: convergence at the scale radius, i.e. alpha_Rs / (4
+        Rs (1 + log(1/2)))
+    :type kappa_s: numpy.ndarray
+    :param weights: lensing efficiency weights of the halo planes
+    :type weights: numpy.ndarray
+    :param num_pixels: number of pixels along each axis of the maps
+    :type num_pixels: int
+    :param pixel_scale: pixel size in arcsec
+    :type pixel_scale: float
+    :param truncation: truncation radii in units of Rs, e.g. the
+        concentrations c_200. If None, the profiles are not truncated.
+    :type truncation: numpy.ndarray, optional
+    :param sheet_kappa: weighted convergence of the mass sheets, added
+        to the convergence map
+    :type sheet_kappa: float
+    :param n_kernels: maximum number of kernels
+    :type n_kernels: int
+    :param padding: margin of the deposit grids in units of the map size
+    :type padding: float
+    :param n_truncation_kernels: number of bins of the finite truncation
+        radii
+    :type n_truncation_kernels: int
+    :return: kappa, gamma1, gamma2 maps of shape (num_pixels,
+        num_pixels), with the pixel centers of
+        `lenstronomy.Util.util.make_grid` and x along the second axis
+    :rtype: (numpy.ndarray, numpy.ndarray, numpy.ndarray)
+    """
+    center_x = np.atleast_1d(np.asarray(center_x, dtype=float))
+    center_y = np.atleast_1d(np.asarray(center_y, dtype=float))
+    Rs = np.atleast_1d(np.asarray(Rs, dtype=float))
+    if truncation is None:
+        truncation = np.full(len(Rs), np.inf)
+    truncation = np.atleast_1d(np.asarray(truncation, dtype=float))
+    amplitudes = np.asarray(weights) * np.asarray(kappa_s) * Rs**2
+
+    margin = int(np.ceil(padding * num_pixels))
+    # circular convolutions of the deposits of size num_pixels + 2 * margin
+    # equal linear convolutions on the map if the grid holds both extents
+    size = fft.next_fast_len(2 * (num_pixels + margin), real=True)
+    shape = (size, size)
+    origin = ((num_pixels - 1) / 2 + margin,) * 2
+    deposit_shape = (num_pixels + 2 * margin,) * 2
+
+    maps_fourier = [0, 0, 0]
+    if len(Rs) > 0:
+        group = _log_bins(np.maximum(Rs, 0.0000001), n_kernels) * (
+            n_truncation_kernels + 1
+        )
+        finite = np.isfinite(truncation)
+        # untruncated profiles share the last truncation bin
+        truncation_group = np.full(len(Rs), n_truncation_kernels)
+        if np.any(finite):
+            truncation_group[finite] = _log_bins(
+                np.maximum(truncation[finite], 0.0000001), n_truncation_kernels
+            )
+        group += truncation_group
+        for g in np.unique(group):
+            members = group == g
+            deposit = np.zeros(shape)
+            deposit[: deposit_shape[0], : deposit_shape[1]] = cloud_in_cell(
+                center_x[members],
+                center_y[members],
+                amplitudes[members],
+                pixel_scale,
+                deposit_shape,
+                origin,
+            )
+            deposit_fourier = fft.rfft2(deposit)
+            kernels = truncated_nfw_kernels(
+                np.median(Rs[members]),
+                np.median(truncation[members]),
+                pixel_scale,
+                shape,
+            )
+            for i, kernel in enumerate(kernels):
+                maps_fourier[i] = maps_fourier[i] + deposit_fourier * fft.rfft2(kernel)
+    maps = []
+    for map_fourier in maps_fourier:
+        if np.isscalar(map_fourier):
+            maps.append(np.zeros((num_pixels, num_pixels)))
+        else:
+            full = fft.irfft2(map_fourier, s=shape)
+            maps.append(
+                full[margin : margin + num_pixels, margin : margin + num_pixels]
+            )
+    kappa, gamma1, gamma2 = maps
+    return kappa + sheet_kappa, gamma1, gamma2
@@ -0,0 +1,476 @@
+import numpy as np
+
+
+def nfw_derivatives(x, y, Rs, alpha_Rs):
+    """Reduced deflection angles of NFW profiles, in the parameterization of
+    the lenstronomy NFW profile and vectorized over both positions and
+    profiles.
+
+    :param x: x-position relative to the halo center (arcsec)
+    :type x: numpy.ndarray
+    :param y: y-position relative to the halo center (arcsec)
+    :type y: numpy.ndarray
+    :param Rs: scale radius (arcsec), broadcastable with x
+    :type Rs: numpy.ndarray
+    :param alpha_Rs: deflection at the scale radius (arcsec),
+        broadcastable with x
+    :type alpha_Rs: numpy.ndarray
+    :return: deflection angles alpha_x, alpha_y
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    """
+    return _nfw_lensing(x, y, Rs, alpha_Rs)[:2]
+
+
+def nfw_hessian(x, y, Rs, alpha_Rs):
+    """Hessian of the lensing potential of NFW profiles, in the
+    parameterization of the lenstronomy NFW profile and vectorized over both
+    positions and profiles.
+
+    :param x: x-position relative to the halo center (arcsec)
+    :type x: numpy.ndarray
+    :param y: y-position relative to the halo center (arcsec)
+    :type y: numpy.ndarray
+    :param Rs: scale radius (arcsec), broadcastable with x
+    :type Rs: numpy.ndarray
+    :param alpha_Rs: deflection at the scale radius (arcsec),
+        broadcastable with x
+    :type alpha_Rs: numpy.ndarray
+    :return: f_xx, f_xy, f_yy
+    :rtype: (numpy.ndarray, numpy.ndarray, numpy.ndarray)
+    """
+    return _nfw_lensing(x, y, Rs, alpha_Rs, deflection=False)[2:]
+
+
+def _nfw_lensing(x, y, Rs, alpha_Rs, deflection=True):
+    """Deflection and Hessian of NFW profiles sharing the evaluation of the
+    radial functions.
+
+    :return: alpha_x, alpha_y (None if deflection is False), f_xx, f_xy,
+        f_yy
+    """
+    Rs = np.maximum(Rs, 0.0000001)
+    kappa_s = alpha_Rs / (4.0 * Rs * (1.0 + np.log(1.0 / 2.0)))
+    R2 = np.maximum(x**2 + y**2, 0.000001**2)
+    X = np.sqrt(R2) / Rs
+    F, g = _nfw_F_g(X)
+    mean_kappa = 4 * kappa_s * g / X**2
+    if deflection:
+        alpha_x, alpha_y = mean_kappa * x, mean_kappa * y
+    else:
+        alpha_x, alpha_y = None, None
+    kappa = 2 * kappa_s * F
+    a = mean_kappa - kappa
+    gamma1 = a * (y**2 - x**2) / R2
+    gamma2 = -a * 2 * x * y / R2
+    return alpha_x, alpha_y, kappa + gamma1, gamma2, kappa - gamma1
+
+
+def _nfw_h(X):
+    """Arccosh(1/X)/sqrt(1-X^2) for X<1 and arccos(1/X)/sqrt(X^2-1) for X>1,
+    continued with its limit 1 at X=1.
+
+    :param X: R/Rs, larger than 0
+    :type X: numpy.ndarray
+    """
+    X = np.asarray(X, dtype=float)
+    h = np.ones_like(X)
+    inner = X < 1
+    outer = X > 1
+    X_inner = X[inner]
+    h[inner] = np.arccosh(1 / X_inner) / np.sqrt(1 - X_inner**2)
+    X_outer = X[outer]
+    h[outer] = np.arccos(1 / X_outer) / np.sqrt(X_outer**2 - 1)
+    return h
+
+
+def _nfw_F_g(X):
+    """Projected density (1 - h(X))/(X^2 - 1) and enclosed projected mass
+    log(X/2) + h(X) of the NFW profile in units of R/Rs.
+
+    :param X: R/Rs
+    :type X: numpy.ndarray
+    :return: F(X), g(X)
+    """
+    X = np.maximum(X, 0.000001)
+    h = _nfw_h(X)
+    # first order expansion around X=1, where (1 - h)/(X^2 - 1) cancels
+    close = np.abs(X - 1) < 0.0001
+    denominator = np.where(close, 1, X**2 - 1)
+    F = np.where(close, 1.0 / 3 - 0.4 * (X - 1), (1 - h) / denominator)
+    return F, np.log(X / 2.0) + h
+
+
+class HalosMultiPlane(object):
+    """Vectorized multi-plane convergence and shear of many NFW halos and mass
+    sheets.
+
+    It follows the recursive multi-plane formalism of lenstronomy's
+    `MultiPlane` (same distance conventions and reduced deflection angles with
+    respect to `z_source_convention`), but propagates the Jacobian of the ray
+    analytically instead of by finite differences and evaluates many halo
+    configurations (e.g. random repositionings of the same halos) at once. The
+    lens redshifts, scale radii and deflections are fixed at initialization;
+    only the halo centers are passed at evaluation.
+
+    With `born=True` the Born approximation is used: all planes are evaluated
+    on the undeflected ray and their Hessians are summed with the lensing
+    efficiency weights, which is fully vectorized over halos and samples.
+    """
+
+    def __init__(
+        self,
+        halo_redshifts,
+        Rs,
+        alpha_Rs,
+        cosmo,
+        z_source,
+        sheet_redshifts=None,
+        sheet_kappa=None,
+        z_source_convention=5,
+    ):
+        """
+
+        :param halo_redshifts: redshifts of the halos
+        :type halo_redshifts: array_like
+        :param Rs: NFW scale radii in arcsec, as returned by
+            `LensCosmo.nfw_physical2angle`
+        :type Rs: array_like
+        :param alpha_Rs: NFW deflections at the scale radius in arcsec
+        :type alpha_Rs: array_like
+        :param cosmo: astropy.cosmology instance
+        :param z_source: redshift up to which the rays are traced
+        :type z_source: float
+        :param sheet_redshifts: redshifts of the mass sheets (lenstronomy
+            `CONVERGENCE` profiles), optional
+        :type sheet_redshifts: array_like
+        :param sheet_kappa: convergences of the mass sheets
+        :type sheet_kappa: array_like
+        :param z_source_convention: source redshift of the reduced
+            deflection angles
+        :type z_source_convention: float
+        """
+        halo_redshifts = np.atleast_1d(np.asarray(halo_redshifts, dtype=float))
+        if sheet_redshifts is None:
+            sheet_redshifts, sheet_kappa = [], []
+        sheet_redshifts = np.atleast_1d(np.asarray(sheet_redshifts, dtype=float))
+        redshifts = np.concatenate((halo_redshifts, sheet_redshifts))
+        if len(redshifts) > 0 and np.max(redshifts) >= z_source_convention:
+            raise ValueError(
+                "deflector redshifts higher or equal the source redshift convention "
+                "(%s >= %s) not allowed." % (np.max(redshifts), z_source_convention)
+            )
+        self.n_halos = len(halo_redshifts)
+        self.z_source = z_source
+        self._z_source_convention = z_source_convention
+        self._Rs = np.atleast_1d(np.asarray(Rs, dtype=float))
+        self._alpha_Rs = np.atleast_1d(np.asarray(alpha_Rs, dtype=float))
+        self._sheet_kappa = np.atleast_1d(np.asarray(sheet_kappa, dtype=float))
+        self.cosmo = cosmo
+
+        # planes sorted by redshift; indices < n_halos are halos, the rest sheets
+        self._sorted_index = np.argsort(redshifts, kind="stable")
+        self._redshifts = redshifts[self._sorted_index]
+        self._T_z = self._T_xy(0, self._redshifts)
+        self._reduced2physical_factor = self._d_xy(0, z_source_convention) / self._d_xy(
+            self._redshifts, z_source_convention
+        )
+
+    def hessian(
+        self,
+        center_x,
+        center_y,
+        theta_x=0.0,
+        theta_y=0.0,
+        z_start=0,
+        born=False,
+        chunk_size=100000,
+    ):
+        """Hessian of the multi-plane lensing potential of a ray, for one or
+        many configurations of the halo centers.
+
+        With `z_start=0` this corresponds to `LensModel.hessian` of the
+        equivalent lenstronomy multi-plane model, otherwise to
+        `LensModel.hessian_z1z2(z_start, z_source, ...)`, in the limit of a
+        vanishing finite difference.
+
+        :param center_x: x-centers of the halos in arcsec, shape (n_halos,)
+            or (n_samples, n_halos)
+        :type center_x: numpy.ndarray
+        :param center_y: y-centers of the halos in arcsec, same shape as
+            center_x
+        :type center_y: numpy.ndarray
+        :param theta_x: x-position of the ray in arcsec
+        :type theta_x: float
+        :param theta_y: y-position of the ray in arcsec
+        :type theta_y: float
+        :param z_start: redshift of the observer; only planes with z_start <
+            z <= z_source are included
+        :type z_start: float
+        :param born: if True, uses the Born approximation
+        :type born: bool
+        :param chunk_size: number of halo evaluations per block in the Born
+            approximation, to limit the memory
+        :type chunk_size: int
+        :return: f_xx, f_xy, f_yx, f_yy, each a float or an array of shape
+            (n_samples,)
+        """
+        center_x = np.asarray(center_x, dtype=float)
+        center_y = np.asarray(center_y, dtype=float)
+        single = center_x.ndim < 2
+        center_x = np.atleast_2d(center_x)
+        center_y = np.atleast_2d(center_y)
+        if born:
+            hessian = self._hessian_born(
+                center_x, center_y, theta_x, theta_y, z_start, chunk_size
+            )
+        else:
+            hessian = self._hessian_multi_plane(
+                center_x, center_y, theta_x, theta_y, z_start
+            )
+        if single:
+            return tuple(float(f[0]) for f in hessian)
+        return hessian
+
+    def convergence_shear(
+        self,
+        center_x,
+        center_y,
+        gamma12=False,
+        z_start=0,
+        born=False,
+    ):
+        """Convergence and shear at the origin, for one or many configurations
+        of the halo centers.
+
+        :param center_x: x-centers of the halos in arcsec, shape (n_halos,)
+            or (n_samples, n_halos)
+        :type center_x: numpy.ndarray
+        :param center_y: y-centers of the halos in arcsec, same shape as
+            center_x
+        :type center_y: numpy.ndarray
+        :param gamma12: If True, returns gamma1 and gamma2 in addition to kappa. If False, returns total shear gamma along with kappa.
+        :type gamma12: bool
+        :param z_start: redshift of the observer, see `hessian`
+        :type z_start: float
+        :param born: if True, uses the Born approximation
+        :type born: bool
+        :returns: Depending on `gamma12`, either (kappa, gamma) or (kappa, gamma1, gamma2).
+        :rtype: tuple
+        """
+        f_xx, f_xy, _, f_yy = self.hessian(
+            center_x, center_y, z_start=z_start, born=born
+        )
+        kappa = 0.5 * (f_xx + f_yy)
+        if gamma12:
+            gamma1 = 1.0 / 2 * (f_xx - f_yy)
+            gamma2 = f_xy
+            return kappa, gamma1, gamma2
+        gamma = np.sqrt(f_xy**2 + 0.25 * (f_xx - f_yy) ** 2)
+        return kappa, gamma
+
+    def _planes(self, z_start):
+        """Sorted plane indices with z_start < z <= z_source."""
+        return np.where(
+            (self._redshifts > z_start) & (self._redshifts <= self.z_source)
+        )[0]
+
+    def _d_xy(self, z_observer, z_source):
+        """Angular diameter distance in Mpc, as `Background.d_xy` of
+        lenstronomy."""
+        z_observer, z_source = np.broadcast_arrays(z_observer, z_source)
+        if z_source.size == 0:
+            # astropy cannot vectorize the distance integral over no planes
+            return np.zeros(z_source.shape)
+        return np.asarray(
+            self.cosmo.angular_diameter_distance_z1z2(z_observer, z_source).value
+        )
+
+    def _T_xy(self, z_observer, z_source):
+        """Transverse comoving distance in Mpc, as `Background.T_xy` of
+        lenstronomy."""
+        return self._d_xy(z_observer, z_source) * (1 + np.asarray(z_source))
+
+    def _hessian_multi_plane(self, center_x, center_y, theta_x, theta_y, z_start):
+        """Recursive multi-plane ray tracing of the ray and its Jacobian,
+        vectorized over the halo configurations.
+
+        :return: f_xx, f_xy, f_yx, f_yy
+        """
+        n_samples = len(center_x)
+        # one contiguous row of centers per halo
+        center_x = np.ascontiguousarray(center_x.T)
+        center_y = np.ascontiguousarray(center_y.T)
+        T_start = self._T_xy(0, z_start)
+        x = np.full(n_samples, theta_x * T_start)
+        y = np.full(n_samples, theta_y * T_start)
+        alpha_x = np.full(n_samples, float(theta_x))
+        alpha_y = np.full(n_samples, float(theta_y))
+        # derivatives of the co-moving positions and the angles of the ray with
+        # respect to (theta_x, theta_y)
+        x_x, x_y, y_x, y_y = (np.zeros(n_samples) for _ in range(4))
+        a_xx, a_yy = np.ones(n_samples), np.ones(n_samples)
+        a_xy, a_yx = np.zeros(n_samples), np.zeros(n_samples)
+
+        planes = self._planes(z_start)
+        z_planes = self._redshifts[planes]
+        delta_T_list = self._T_xy(np.append(z_start, z_planes[:-1]), z_planes)
+        for i, delta_T in zip(planes, delta_T_list):
+            x = x + alpha_x * delta_T
+            y = y + alpha_y * delta_T
+            x_x, x_y = x_x + a_xx * delta_T, x_y + a_xy * delta_T
+            y_x, y_y = y_x + a_yx * delta_T, y_y + a_yy * delta_T
+            T_z = self._T_z[i]
+            factor = self._reduced2physical_factor[i]
+            index = self._sorted_index[i]
+            if index < self.n_halos:
+                dx = x / T_z - center_x[index]
+                dy = y / T_z - center_y[index]
+                d_x, d_y, f_xx, f_xy, f_yy = _nfw_lensing(
+                    dx, dy, self._Rs[index], self._alpha_Rs[index]
+                )
+            else:
+                kappa = self._sheet_kappa[index - self.n_halos]
+                d_x, d_y = kappa * x / T_z, kappa * y / T_z
+                f_xx, f_xy, f_yy = kappa, 0.0, kappa
+            alpha_x = alpha_x - factor * d_x
+            alpha_y = alpha_y - factor * d_y
+            f_xx, f_xy, f_yy = (factor / T_z * f for f in (f_xx, f_xy, f_yy))
+            a_xx, a_xy, a_yx, a_yy = (
+                a_xx - (f_xx * x_x + f_xy * y_x),
+                a_xy - (f_xx * x_y + f_xy * y_y),
+                a_yx - (f_xy * x_x + f_yy * y_x),
+                a_yy - (f_xy * x_y + f_yy * y_y),
+            )
+        z_before = z_planes[-1] if len(planes) > 0 else z_start
+        delta_T = self._T_xy(z_before, self.z_source)
+        x_x, x_y = x_x + a_xx * delta_T, x_y + a_xy * delta_T
+        y_x, y_y = y_x + a_yx * delta_T, y_y + a_yy * delta_T
+        T_end = self._T_xy(z_start, self.z_source)
+        return (
+            1 - x_x / T_end,
+            -x_y / T_end,
+            -y_x / T_end,
+            1 - y_y / T_end,
+        )
+
+    def born_weights(self, z_start=0):
+        """Lensing efficiency weights of the planes between z_start and the
+        source redshift, with which the Born approximation sums the plane
+        Hessians.
+
+        :param z_start: redshift of the observer, see `hessian`
+        :type z_start: float
+        :return: indices of the included halos, their weights, the scale
+            of the undeflected ray position on their planes (1 for
+            z_start=0), and the weighted convergence of the included mass
+            sheets
+        :rtype: (numpy.ndarray, numpy.ndarray, numpy.ndarray, float)
+        """
+        planes = self._planes(z_start)
+        T_start = self._T_xy(0, z_start)
+        T_end = self._T_xy(z_start, self.z_source)
+        T_start_z = self._T_xy(z_start, self._redshifts[planes])
+        T_z_end = self._T_xy(self._redshifts[planes], self.z_source)
+        T_z = self._T_z[planes]
+        # position of the undeflected ray on each plane and its derivative
+        theta_scale = (T_start + T_start_z) / T_z
+        weights = (
+            self._reduced2physical_factor[planes] * T_start_z / T_z * T_z_end / T_end
+        )
+        index = self._sorted_index[planes]
+        is_halo = index < self.n_halos
+        sheet_index = index[~is_halo] - self.n_halos
+        sheet = np.sum(weights[~is_halo] * self._sheet_kappa[sheet_index])
+        return index[is_halo], weights[is_halo], theta_scale[is_halo], sheet
+
+    def born_maps(
+        self,
+        center_x,
+        center_y,
+        num_pixels,
+        pixel_scale,
+        truncation=None,
+        n_kernels=16,
+        padding=0.25,
+        n_truncation_kernels=4,
+    ):
+        """Convergence and shear maps of one configuration of the halo centers
+        in the Born approximation, computed by FFT convolutions of the weighted
+        halo amplitudes with tabulated NFW kernels, see
+        `slsim.Halos.halos_maps.nfw_born_maps`. The maps are centered on the
+        origin.
+
+        :param center_x: x-centers of the halos in arcsec, shape
+            (n_halos,)
+        :type center_x: numpy.ndarray
+        :param center_y: y-centers of the halos in arcsec, shape
+            (n_halos,)
+        :type center_y: numpy.ndarray
+        :param num_pixels: number of pixels along each axis
+        :type num_pixels: int
+        :param pixel_scale: pixel size in arcsec
+        :type pixel_scale: float
+        :param truncation: truncation radii of the halos in units of Rs,
+            e.g. c_200. If None, the profiles are not truncated.
+        :type truncation: numpy.ndarray, optional
+        :param n_kernels: number of bins of the angular scale radius
+        :type n_kernels: int
+        :param padding: margin in units of the map size within which
+            halos outside the map contribute
+        :type padding: float
+        :param n_truncation_kernels: number of bins of the truncation
+            radius
+        :type n_truncation_kernels: int
+        :return: kappa, gamma1, gamma2 maps of shape (num_pixels,
+            num_pixels)
+        """
+        from slsim.Halos.halos_maps import nfw_born_maps
+
+        halo_index, weights, _, sheet = self.born_weights(z_start=0)
+        Rs = np.maximum(self._Rs[halo_index], 0.0000001)
+        kappa_s = self._alpha_Rs[halo_index] / (4.0 * Rs * (1.0 + np.log(1.0 / 2.0)))
+        if truncation is not None:
+            truncation = np.atleast_1d(np.asarray(truncation, dtype=float))[halo_index]
+        return nfw_born_maps(
+            np.asarray(center_x, dtype=float)[halo_index],
+            np.asarray(center_y, dtype=float)[halo_index],
+            Rs,
+            kappa_s,
+            weights,
+            num_pixels,
+            pixel_scale,
+            truncation=truncation,
+            sheet_kappa=sheet,
+            n_kernels=n_kernels,
+            padding=padding,
+            n_truncation_kernels=n_truncation_kernels,
+        )
+
+    def _hessian_born(self, center_x, center_y, theta_x, theta_y, z_start, chunk_size):
+        """Born approximation: sum of the plane Hessians along the undeflected
+        ray, weighted with the lensing efficiency of each plane.
+
+        :return: f_xx, f_xy, f_yx, f_yy
+        """
+        n_samples = len(center_x)
+        halo_index, weights_halo, scale, sheet = self.born_weights(z_start)
+
+        f_xx = np.zeros(n_samples)
+        f_xy = np.zeros(n_samples)
+        f_yy = np.zeros(n_samples)
+        f_xx += sheet
+        f_yy += sheet
+
+        if len(halo_index) > 0:
+            Rs = self._Rs[halo_index]
+            alpha_Rs = self._alpha_Rs[halo_index]
+            step = max(1, chunk_size // len(halo_index))
+            for start in range(0, n_samples, step):
+                block = slice(start, start + step)
+                dx = theta_x * scale - center_x[block][:, halo_index]
+                dy = theta_y * scale - center_y[block][:, halo_index]
+                h_xx, h_xy, h_yy = nfw_hessian(dx, dy, Rs, alpha_Rs)
+                f_xx[block] += h_xx @ weights_halo
+                f_xy[block] += h_xy @ weights_halo
+                f_yy[block] += h_yy @ weights_halo
+        return f_xx, f_xy, f_xy.copy(), f_yy
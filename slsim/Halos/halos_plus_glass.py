@@ -6,8 +6,12 @@ from astropy.cosmology import FlatLambdaCDM
 import time
 from scipy import stats
 import warnings
-from multiprocessing import get_context
-from slsim.Halos.halos_util import convergence_mean_0
+from slsim.Halos.halos_util import (
+    ConditionalQuantileSampler,
+    convergence_mean_0,
+    log_timing,
+    starmap_in_chunks,
+)
 
 
 def read_glass_data(file_name="kgdata.npy"):
@@ -37,10 +41,49 @@ def read_glass_data(file_name="kgdata.npy"):
     return kappa_values, gamma_values, nside
 
 
-def generate_samples_from_glass(kappa_values, gamma_values, n=10000):
-    """This function fits a Gaussian Kernel Density Estimation (KDE) to the
-    joint distribution of kappa and gamma values, and then generates a random
-    sample from this distribution.
+def resample_kappa_gamma(
+    kappa_values, gamma_values, n, sampler="kde", random_seed=None
+):
+    """Draws `n` random (kappa, gamma) pairs from the joint distribution of the
+    given samples.
+
+    :param kappa_values: The kappa values.
+    :type kappa_values: numpy.ndarray
+    :param gamma_values: The gamma values.
+    :type gamma_values: numpy.ndarray
+    :param n: The number of random numbers to generate.
+    :type n: int
+    :param sampler: "kde" for resampling a Gaussian Kernel Density
+        Estimation, or "quantile" for inverse-CDF lookups in a conditional
+        quantile table (`ConditionalQuantileSampler`), whose resolution is
+        chosen from the number of samples. The quantile sampler is faster
+        for many samples, but cannot draw values beyond the range of the
+        given samples, i.e. it cuts off the tails of the distribution.
+    :type sampler: str, optional
+    :param random_seed: seed or numpy Generator of the resampling. If
+        None, the global numpy random state is used.
+    :returns: A tuple containing two numpy arrays for the randomly
+        resampled kappa and gamma values.
+    :rtype: tuple
+    """
+    if sampler == "quantile":
+        return ConditionalQuantileSampler(kappa_values, gamma_values).sample(
+            n, random_seed=random_seed
+        )
+    if sampler == "kde":
+        kernel = stats.gaussian_kde(np.vstack([kappa_values, gamma_values]))
+        kappa_random, gamma_random = kernel.resample(n, seed=random_seed)
+        return kappa_random, gamma_random
+    raise ValueError(f"sampler must be 'quantile' or 'kde', got {sampler}.")
+
+
+def generate_samples_from_glass(
+    kappa_values, gamma_values, n=10000, sampler="kde", random_seed=None
+):
+    """This function generates a random sample from the joint distribution of
+    kappa and gamma values, either by inverse-CDF lookups in a conditional
+    quantile table or by fitting a Gaussian Kernel Density Estimation (KDE),
+    see `resample_kappa_gamma`.
 
     :param kappa_values: The kappa values.
     :type kappa_values: numpy.ndarray
@@ -49,15 +92,16 @@ def generate_samples_from_glass(kappa_values, gamma_values, n=10000):
     :param n: The number of random numbers to generate. Defaults to
         10000.
     :type n: int, optional
+    :param sampler: "kde" or "quantile". Defaults to "kde".
+    :type sampler: str, optional
+    :param random_seed: seed or numpy Generator of the resampling.
     :returns: A tuple containing two numpy arrays for the randomly
         resampled kappa and gamma values.
     :rtype: tuple
     """
-
-    kernel = stats.gaussian_kde(np.vstack([kappa_values, gamma_values]))
-    kappa_random_glass, gamma_random_glass = kernel.resample(n)
-    return kappa_random_glass, gamma_random_glass
-    # TODO: make n more reasonable (maybe write some function relate n with bandwidth of kde)
+    return resample_kappa_gamma(
+        kappa_values, gamma_values, n, sampler=sampler, random_seed=random_seed
+    )
 
 
 def skyarea_form_n(nside, deg2=True):
@@ -96,11 +140,13 @@ def generate_maps_kmean_zero_using_halos(
     z_max=None,
     samples_number_for_one_halos=1000,
     renders_numbers=500,
+    sampler="kde",
+    random_seed=None,
 ):
     """Given the specified parameters, this function repeatedly renders the
     same halo list (same z & m) for different positions
     (`samples_number_for_one_halos`) times and then ensures that the mean of
-    the kappa values is zero. It then gets the kde of the weak- lensing
+    the kappa values is zero. It then builds a sampler of the weak- lensing
     distribution for this halo list and resamples `renders_numbers` sets of the
     corresponding convergence (`kappa`) and shear (`gamma`) values for this
     halo list.
@@ -125,6 +171,10 @@ def generate_maps_kmean_zero_using_halos(
     :param renders_numbers: The number of random numbers to generate.
         Default is 500.
     :type renders_numbers: int, optional
+    :param sampler: "kde" or "quantile", see `resample_kappa_gamma`.
+        Default is "kde".
+    :type sampler: str, optional
+    :param random_seed: seed or numpy Generator of the resampling.
     :returns: A tuple containing the randomly resampled kappa values and
         gamma values.
     :rtype: (numpy.ndarray, numpy.ndarray)
@@ -169,12 +219,13 @@ def generate_maps_kmean_zero_using_halos(
         # Return arrays of zeros with the same shape
         return np.array([0] * renders_numbers), np.array([0] * renders_numbers)
 
-    kernel = stats.gaussian_kde(np.vstack([modified_kappa_halos, gamma_values_halos]))
-    (kappa_random_halos, gamma_random_halos) = kernel.resample(renders_numbers)
-    return kappa_random_halos, gamma_random_halos
-
-    # TODO: make samples_number_for_one_halos & renders_numbers more reasonable (maybe write some function relate them
-    #  with bandwidth of kde)
+    return resample_kappa_gamma(
+        modified_kappa_halos,
+        gamma_values_halos,
+        renders_numbers,
+        sampler=sampler,
+        random_seed=random_seed,
+    )
 
 
 def generate_meanzero_halos_multiple_times(
@@ -187,11 +238,13 @@ def generate_meanzero_halos_multiple_times(
     z_max=None,
     samples_number_for_one_halos=1000,
     renders_numbers=500,
+    sampler="kde",
+    random_seed=None,
 ):
     """Given the specified parameters, this function repeatedly renders the
     same halo list (same z & m) for different positions
     (`samples_number_for_one_halos`) times and then ensures that the mean of
-    the kappa values is zero. It then gets the kde of the weak- lensing
+    the kappa values is zero. It then builds a sampler of the weak- lensing
     distribution for this halo list and resamples `renders_numbers` sets of the
     corresponding convergence (`kappa`) and shear (`gamma`) values for this
     halo list. This process is repeated `n_times` to accumulate the results.
@@ -219,6 +272,10 @@ def generate_meanzero_halos_multiple_times(
     :param renders_numbers: The number of random numbers to generate.
         Default is 500.
     :type renders_numbers: int, optional
+    :param sampler: "kde" or "quantile", see `resample_kappa_gamma`.
+        Default is "kde".
+    :type sampler: str, optional
+    :param random_seed: seed or numpy Generator of the resampling.
     :returns: A tuple containing the accumulated randomly resampled
         kappa values and gamma values.
     :rtype: (numpy.ndarray, numpy.ndarray)
@@ -227,7 +284,8 @@ def generate_meanzero_halos_multiple_times(
     accumulated_kappa_random_halos = []
     accumulated_gamma_random_halos = []
     n_times_range = range(n_times)
-    start_time = time.time()
+    rng = None if random_seed is None else np.random.default_rng(random_seed)
+    start_time = time.perf_counter()
     for _ in n_times_range:
         kappa_random_halos, gamma_random_halos = generate_maps_kmean_zero_using_halos(
             skypy_config=skypy_config,
@@ -238,12 +296,13 @@ def generate_meanzero_halos_multiple_times(
             m_min=m_min,
             m_max=m_max,
             z_max=z_max,
+            sampler=sampler,
+            random_seed=rng,
         )
         accumulated_kappa_random_halos.extend(kappa_random_halos)
         accumulated_gamma_random_halos.extend(gamma_random_halos)
 
-    end_time = time.time()  # Note the end time
-    print(f"Elapsed time: {end_time - start_time} seconds")
+    log_timing("generate_meanzero_halos_multiple_times", start_time, n_times=n_times)
 
     return np.array(accumulated_kappa_random_halos), np.array(
         accumulated_gamma_random_halos
@@ -360,7 +419,7 @@ def run_halos_without_kde(
     # Show progress only when n_iterations > 30
     iter_range = range(n_iterations)
 
-    start_time = time.time()  # Note the start time
+    start_time = time.perf_counter()  # Note the start time
     for _ in iter_range:
         npipeline = HalosSkyPyPipeline(
             sky_area=sky_area, m_min=m_min, m_max=m_max, z_max=z_max
@@ -413,10 +472,7 @@ def run_halos_without_kde(
             kappa_values_total.extend(nkappa_values_halos)
             gamma_values_total.extend(ngamma_values_halos)
 
-    end_time = time.time()  # Note the end time
-    print(
-        f"The {n_iterations} halo-lists took {(end_time - start_time)} seconds to run"
-    )
+    log_timing("run_halos_without_kde", start_time, n_iterations=n_iterations)
 
     return kappa_values_total, gamma_values_total
 
@@ -538,7 +594,7 @@ def run_halos_without_kde_by_multiprocessing(
     kappa_values_total = []
     gamma_values_total = []
 
-    start_time = time.time()  # Note the start time
+    start_time = time.perf_counter()  # Note the start time
 
     args = [
         (
@@ -558,16 +614,16 @@ def run_halos_without_kde_by_multiprocessing(
     ]
 
     # Use multiprocessing
-    with get_context("spawn").Pool() as pool:
-        results = pool.starmap(worker_run_halos_without_kde, args)
+    results = starmap_in_chunks(worker_run_halos_without_kde, args, context="spawn")
 
     for nkappa, ngamma in results:
         kappa_values_total.extend(nkappa)
         gamma_values_total.extend(ngamma)
 
-    end_time = time.time()  # Note the end time
-    print(
-        f"The {n_iterations} halo-lists took {(end_time - start_time)} seconds to run"
+    log_timing(
+        "run_halos_without_kde_by_multiprocessing",
+        start_time,
+        n_iterations=n_iterations,
     )
     return kappa_values_total, gamma_values_total
 
@@ -614,7 +670,7 @@ def run_kappaext_gammaext_kde_by_multiprocessing(
 
     .. note::
         The function employs multiprocessing to run simulations in parallel, improving computational efficiency.
-        The elapsed runtime for the simulations is printed to the console.
+        The elapsed runtime is logged with `log_timing`.
     """
 
     # TODO: BUG
@@ -626,7 +682,7 @@ def run_kappaext_gammaext_kde_by_multiprocessing(
 
     kappaext_gammaext_values_total = []
 
-    start_time = time.time()  # Note the start time
+    start_time = time.perf_counter()  # Note the start time
 
     args = [
         (
@@ -645,15 +701,15 @@ def run_kappaext_gammaext_kde_by_multiprocessing(
     ]
 
     # Use multiprocessing
-    with get_context("spawn").Pool() as pool:
-        results = pool.starmap(worker_kappaext_gammaext_kde, args)
+    results = starmap_in_chunks(worker_kappaext_gammaext_kde, args, context="spawn")
 
     for generate_distributions_0to5 in results:
         kappaext_gammaext_values_total.extend(generate_distributions_0to5)
 
-    end_time = time.time()  # Note the end time
-    print(
-        f"The {n_iterations} halo-lists took {(end_time - start_time)} seconds to run"
+    log_timing(
+        "run_kappaext_gammaext_kde_by_multiprocessing",
+        start_time,
+        n_iterations=n_iterations,
     )
     return kappaext_gammaext_values_total
 
@@ -794,7 +850,7 @@ def run_certain_redshift_lensext_kde_by_multiprocessing(
 
     kappaext_gammaext_values = []
 
-    start_time = time.time()  # Note the start time
+    start_time = time.perf_counter()  # Note the start time
 
     args = [
         (
@@ -816,15 +872,17 @@ def run_certain_redshift_lensext_kde_by_multiprocessing(
     ]
 
     # Use multiprocessing
-    with get_context("spawn").Pool() as pool:
-        results = pool.starmap(worker_certain_redshift_lensext_kde, args)
+    results = starmap_in_chunks(
+        worker_certain_redshift_lensext_kde, args, context="spawn"
+    )
 
     for distributions in results:
         kappaext_gammaext_values.extend(distributions)
 
-    end_time = time.time()  # Note the end time
-    print(
-        f"The {n_iterations} halo-lists took {(end_time - start_time)} seconds to run"
+    log_timing(
+        "run_certain_redshift_lensext_kde_by_multiprocessing",
+        start_time,
+        n_iterations=n_iterations,
     )
     return kappaext_gammaext_values
 
@@ -969,7 +1027,7 @@ def run_certain_redshift_many_by_multiprocessing(
     kappaext_gammaext_values = []
     lensinstance_values = []
 
-    start_time = time.time()  # Note the start time
+    start_time = time.perf_counter()  # Note the start time
 
     args = [
         (
@@ -988,16 +1046,16 @@ def run_certain_redshift_many_by_multiprocessing(
     ]
 
     # Use multiprocessing
-    with get_context("spawn").Pool() as pool:
-        results = pool.starmap(worker_certain_redshift_many, args)
+    results = starmap_in_chunks(worker_certain_redshift_many, args, context="spawn")
 
     for distributions, lensinstance in results:
         kappaext_gammaext_values.extend(distributions)
         lensinstance_values.extend(lensinstance)
 
-    end_time = time.time()  # Note the end time
-    print(
-        f"The {n_iterations} halo-lists took {(end_time - start_time)} seconds to run"
+    log_timing(
+        "run_certain_redshift_many_by_multiprocessing",
+        start_time,
+        n_iterations=n_iterations,
     )
     return kappaext_gammaext_values, lensinstance_values
 
@@ -1107,7 +1165,7 @@ def run_total_mass_by_multiprocessing(
 
     total_mass = []
 
-    start_time = time.time()  # Note the start time
+    start_time = time.perf_counter()  # Note the start time
 
     args = [
         (
@@ -1122,13 +1180,13 @@ def run_total_mass_by_multiprocessing(
     ]
 
     # Use multiprocessing
-    with get_context("spawn").Pool() as pool:
-        results = pool.starmap(worker_run_total_mass_by_multiprocessing, args)
-        total_mass.extend(results)
+    results = starmap_in_chunks(
+        worker_run_total_mass_by_multiprocessing, args, context="spawn"
+    )
+    total_mass.extend(results)
 
-    end_time = time.time()  # Note the end time
-    print(
-        f"The {n_iterations} halo-lists took {(end_time - start_time)} seconds to run"
+    log_timing(
+        "run_total_mass_by_multiprocessing", start_time, n_iterations=n_iterations
     )
     return total_mass
 
@@ -1225,7 +1283,7 @@ def run_total_kappa_by_multiprocessing(
 
     average_kappa_list = []
 
-    start_time = time.time()  # Note the start time
+    start_time = time.perf_counter()  # Note the start time
 
     args = [
         (
@@ -1243,13 +1301,13 @@ def run_total_kappa_by_multiprocessing(
     ]
 
     # Use multiprocessing
-    with get_context("spawn").Pool() as pool:
-        results = pool.starmap(worker_run_total_kappa_by_multiprocessing, args)
-        average_kappa_list.append(results)
+    results = starmap_in_chunks(
+        worker_run_total_kappa_by_multiprocessing, args, context="spawn"
+    )
+    average_kappa_list.append(results)
 
-    end_time = time.time()  # Note the end time
-    print(
-        f"The {n_iterations} halo-lists took {(end_time - start_time)} seconds to run"
+    log_timing(
+        "run_total_kappa_by_multiprocessing", start_time, n_iterations=n_iterations
     )
     return average_kappa_list
 
@@ -1346,22 +1404,20 @@ def run_average_mass_by_multiprocessing(
     z_bins = np.arange(0, z_max + 0.05, 0.05)
     total_mass_sums = np.zeros(len(z_bins) - 1)
 
-    start_time = time.time()
+    start_time = time.perf_counter()
 
     args = [(i, sky_area, m_min, m_max, z_max) for i in range(n_iterations)]
 
-    with get_context("spawn").Pool() as pool:
-        results = pool.starmap(worker_run_average_mass_by_multiprocessing, args)
-        for result in results:
-            total_mass_sums += (
-                result  # Sum up the mass for each bin across all iterations
-            )
+    results = starmap_in_chunks(
+        worker_run_average_mass_by_multiprocessing, args, context="spawn"
+    )
+    for result in results:
+        total_mass_sums += result  # Sum up the mass for each bin across all iterations
 
     average_masses = total_mass_sums / n_iterations
 
-    end_time = time.time()
-    print(
-        f"The {n_iterations} iterations took {(end_time - start_time):.2f} seconds to run"
+    log_timing(
+        "run_average_mass_by_multiprocessing", start_time, n_iterations=n_iterations
     )
     return average_masses
 
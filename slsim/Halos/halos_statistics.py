@@ -3,11 +3,60 @@ from lenstronomy.Util.util import make_grid
 import numpy as np
 import astropy.units as u
 import math
+import os
+import tempfile
 import time
-import multiprocessing
+from astropy.table import Table
 from slsim.Util.astro_util import cone_radius_angle_to_physical_area
 from slsim.Util.param_util import deg2_to_cone_angle
-from slsim.Halos.halos_util import convergence_mean_0
+from slsim.Halos.halos_util import (
+    convergence_mean_0,
+    log_timing,
+    save_arrays_for_workers,
+    load_arrays_for_workers,
+    starmap_in_chunks,
+)
+
+# HalosStatistics instance and halo positions of a worker process of
+# `HalosStatistics.get_kappa_gamma_distib`, set by `_init_kappa_gamma_worker`
+_worker_halos = None
+_worker_positions = None
+
+
+def _init_kappa_gamma_worker(paths, kwargs_halos):
+    """Builds the HalosStatistics instance of a worker process once from the
+    memory-mapped halo catalog written by `get_kappa_gamma_distib`.
+
+    :param paths: paths of the memory-mapped arrays "z", "mass" and
+        "positions".
+    :type paths: dict
+    :param kwargs_halos: remaining keyword arguments of HalosStatistics.
+    :type kwargs_halos: dict
+    """
+    global _worker_halos, _worker_positions
+    arrays = load_arrays_for_workers(paths)
+    halos = Table([arrays["z"], arrays["mass"]], names=("z", "mass"), copy=False)
+    _worker_halos = HalosStatistics(halos_list=halos, **kwargs_halos)
+    _worker_positions = arrays["positions"]
+
+
+def _compute_kappa_gamma_chunk(start, stop, gamma_tot, diff, diff_method):
+    """Computes the convergence and shear of the samples `start` to `stop` in a
+    worker process, at the halo positions pre-drawn by the parent process.
+
+    :return: array of shape (stop - start, 2 or 3)
+    :rtype: numpy.ndarray
+    """
+    halos = _worker_halos
+    results = np.empty((stop - start, 2 if gamma_tot else 3))
+    for i in range(start, stop):
+        if halos.n_halos > 0:
+            halos.halos_list["px"] = _worker_positions[i, :, 0]
+            halos.halos_list["py"] = _worker_positions[i, :, 1]
+        results[i - start] = halos.halos_get_convergence_shear(
+            gamma12=not gamma_tot, diff=diff, diff_method=diff_method
+        )
+    return results
 
 
 class HalosStatistics(HalosLensBase):
@@ -24,6 +73,7 @@ class HalosStatistics(HalosLensBase):
         cosmo (astropy.Cosmology): Cosmology used for lensing computations.
         sky_area (float): Total sky area (in steradians) over which Halos are distributed. Defaults to full sky (4pi steradians). Optional.
         mass_sheet (bool): Flag to decide whether to use the mass_sheet correction.
+        random_seed (int or numpy.random.Generator, optional): Seed of the random halo positions. If None, the global numpy random state is used.
 
     Methods:
         get_kappaext_gammaext_distib_zdzs: Computes the distribution of external convergence and shear for given deflector and source redshifts.
@@ -38,6 +88,8 @@ class HalosStatistics(HalosLensBase):
         compute_kappa_gamma: Compute the convergence and shear values for a given index, designed for use with multiprocessing.
         get_kappa_gamma_distib: Computes and returns the distribution of convergence and shear values using multiprocessing.
         get_kappa_gamma_distib_without_multiprocessing: Computes and returns the distribution of convergence and shear values without using multiprocessing.
+        sample_halos_positions: Draws random positions of the halos for all samples.
+        get_kappa_gamma_distib_vectorized: Computes and returns the distribution of convergence and shear values with one batched evaluation of all samples.
     """
 
     def __init__(
@@ -49,6 +101,7 @@ class HalosStatistics(HalosLensBase):
         samples_number=1000,
         mass_sheet=True,
         z_source=5,
+        random_seed=None,
     ):
         super().__init__(
             halos_list,
@@ -57,10 +110,13 @@ class HalosStatistics(HalosLensBase):
             sky_area,
             mass_sheet,
             z_source,
+            random_seed=random_seed,
         )
         self.samples_number = samples_number
 
-    def get_kappaext_gammaext_distib_zdzs(self, zd, zs, listmean=False):
+    def get_kappaext_gammaext_distib_zdzs(
+        self, zd, zs, listmean=False, vectorized=False, born=False
+    ):
         """Computes the distribution of external convergence (kappa_ext) and
         external shear (gamma_ext) for given deflector and source redshifts.
 
@@ -70,29 +126,43 @@ class HalosStatistics(HalosLensBase):
         :type zs: float
         :param listmean: the boolean if average convergence (kappa) to 0
         :type listmean: bool
+        :param vectorized: If True, the lens models are built once and all samples are evaluated in one batched call of the analytic multi-plane Hessian, see `halos_get_kext_gext_values_vectorized`. If False, the lens models are rebuilt for every sample.
+        :type vectorized: bool
+        :param born: If True and vectorized, uses the Born approximation.
+        :type born: bool
         :return: An array of shape (samples_number, 2) containing the computed kappa_ext and gamma_ext values for the given deflector and source redshifts. Each row corresponds to a sample, with the first column being kappa_ext and the second column being gamma_ext.
         :rtype: numpy.ndarray
 
         .. note::
-            The total elapsed time for computing weak-lensing maps is printed at the end.
+            The elapsed time is logged with `slsim.Halos.halos_util.log_timing`.
         """
 
         kappa_gamma_distribution = np.empty((self.samples_number, 2))
 
         loop = range(self.samples_number)
 
-        start_time = time.time()
+        start_time = time.perf_counter()
+
+        if vectorized:
+            px, py = self.sample_halos_positions()
+            kext, gext = self.halos_get_kext_gext_values_vectorized(
+                zd=zd, zs=zs, px=px, py=py, born=born
+            )
+            kappa_gamma_distribution[:, 0] = kext
+            kappa_gamma_distribution[:, 1] = gext
+            loop = []
 
         for i in loop:
             self.enhance_halos_table_random_pos()
             kappa, gamma = self.halos_get_kext_gext_values(zd=zd, zs=zs)
             kappa_gamma_distribution[i] = [kappa, gamma]
 
-        if self.samples_number > 999:
-            elapsed_time = time.time() - start_time
-            print(
-                f"For this halos lists, zd,zs, elapsed time for computing weak-lensing maps: {elapsed_time} seconds"
-            )
+        log_timing(
+            "HalosStatistics.get_kappaext_gammaext_distib_zdzs",
+            start_time,
+            samples_number=self.samples_number,
+            n_halos=self.n_halos,
+        )
         if listmean:
             kappa_gamma_distribution[:, 0] = convergence_mean_0(
                 kappa_gamma_distribution[:, 0]
@@ -257,7 +327,7 @@ class HalosStatistics(HalosLensBase):
         :rtype: numpy.ndarray
 
         .. note::
-            The total elapsed time for computing weak-lensing maps is printed at the end.
+            The elapsed time is logged with `slsim.Halos.halos_util.log_timing`.
         """
 
         kappa_gamma_distribution = np.empty((self.samples_number, 14))
@@ -265,7 +335,7 @@ class HalosStatistics(HalosLensBase):
 
         loop = range(self.samples_number)
 
-        start_time = time.time()
+        start_time = time.perf_counter()
 
         for i in loop:
             self.enhance_halos_table_random_pos()
@@ -304,11 +374,12 @@ class HalosStatistics(HalosLensBase):
                 gext,
             ]
             lens_instance[i] = [kwargs_lens_os, lens_model_os]
-        if self.samples_number > 999:
-            elapsed_time = time.time() - start_time
-            print(
-                f"For this halos lists, zd,zs, elapsed time for computing weak-lensing maps: {elapsed_time} seconds"
-            )
+        log_timing(
+            "HalosStatistics.get_all_pars_distib",
+            start_time,
+            samples_number=self.samples_number,
+            n_halos=self.n_halos,
+        )
 
         return kappa_gamma_distribution, lens_instance
 
@@ -536,12 +607,19 @@ class HalosStatistics(HalosLensBase):
             return [kappa, gamma1, gamma2]
 
     def get_kappa_gamma_distib(
-        self, gamma_tot=False, diff=1.0, diff_method="square", listmean=False
+        self,
+        gamma_tot=False,
+        diff=1.0,
+        diff_method="square",
+        listmean=False,
+        processes=None,
+        chunk_size=None,
     ):
         """Computes and returns the distribution of convergence and shear
         values.
 
         This method uses multiprocessing to compute the convergence and shear values for multiple samples in parallel.
+        The halo redshifts, masses and the positions of all samples are written once to memory-mapped files which the workers attach to, and each worker builds its lens model once and computes a contiguous chunk of samples per task.
 
         :param listmean: The boolean if average convergence (kappa) to 0.
         :type listmean: bool
@@ -552,33 +630,66 @@ class HalosStatistics(HalosLensBase):
         :type diff: float, optional
         :param diff_method: Method used to compute differential. Default is `square`.
         :type diff_method: str, optional
+        :param processes: Maximum number of worker processes. Defaults to the number of CPUs.
+        :type processes: int, optional
+        :param chunk_size: Number of samples per task. Defaults to about four tasks per worker.
+        :type chunk_size: int, optional
         :returns: A 2D array containing kappa and either gamma or gamma1 and gamma2 for each sample, based on the value of `gamma_tot`.
         :rtype: numpy.ndarray
 
         .. note::
-            The method uses the `compute_kappa_gamma` static method to compute the values for each sample.
-            If the number of samples exceeds 2000, a print statement will indicate the elapsed time for computation.
+            The positions of all samples are drawn in the parent process with `random_positions_block`, so that the result does not depend on the number of workers.
+            The elapsed time is logged with `slsim.Halos.halos_util.log_timing`.
         """
-
-        kappa_gamma_distribution = np.empty(
-            (self.samples_number, 2 if gamma_tot else 3)
-        )
-        start_time = time.time()
-
-        with multiprocessing.Pool() as pool:
-            results = pool.starmap(
-                self.compute_kappa_gamma,
-                [(i, gamma_tot, diff, diff_method) for i in range(self.samples_number)],
+        start_time = time.perf_counter()
+
+        if processes is None:
+            processes = os.cpu_count() or 1
+        if chunk_size is None:
+            chunk_size = max(1, math.ceil(self.samples_number / (4 * processes)))
+        chunks = [
+            (
+                start,
+                min(start + chunk_size, self.samples_number),
+                gamma_tot,
+                diff,
+                diff_method,
             )
-
-        for i, result in enumerate(results):
-            kappa_gamma_distribution[i] = result
-
-        if self.samples_number > 2000:
-            elapsed_time = time.time() - start_time
-            print(
-                f"For this Halos list, elapsed time for computing weak-lensing maps: {elapsed_time} seconds"
+            for start in range(0, self.samples_number, chunk_size)
+        ]
+        kwargs_halos = {
+            "mass_correction_list": self.mass_correction_list,
+            "cosmo": self.cosmo,
+            "sky_area": self.sky_area,
+            "samples_number": self.samples_number,
+            "mass_sheet": self.mass_sheet,
+            "z_source": self.z_source,
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            paths = save_arrays_for_workers(
+                directory,
+                z=np.asarray(self.halos_list["z"], dtype=float),
+                mass=np.asarray(self.halos_list["mass"], dtype=float),
+                positions=self.random_positions_block(self.samples_number),
             )
+            results = starmap_in_chunks(
+                _compute_kappa_gamma_chunk,
+                chunks,
+                processes=processes,
+                chunk_size=1,
+                initializer=_init_kappa_gamma_worker,
+                initargs=(paths, kwargs_halos),
+            )
+        kappa_gamma_distribution = np.concatenate(results).reshape(
+            self.samples_number, 2 if gamma_tot else 3
+        )
+
+        log_timing(
+            "HalosStatistics.get_kappa_gamma_distib",
+            start_time,
+            samples_number=self.samples_number,
+            n_halos=self.n_halos,
+        )
         if listmean:
             kappa_gamma_distribution[:, 0] = convergence_mean_0(
                 kappa_gamma_distribution[:, 0]
@@ -610,7 +721,7 @@ class HalosStatistics(HalosLensBase):
 
         loop = range(self.samples_number)
 
-        start_time = time.time()
+        start_time = time.perf_counter()
 
         if gamma_tot:
             for i in loop:
@@ -633,10 +744,65 @@ class HalosStatistics(HalosLensBase):
                 kappa_mean = np.mean(kappa_gamma_distribution[:, 0])
                 kappa_gamma_distribution[:, 0] -= kappa_mean
 
-        if self.samples_number > 999:
-            elapsed_time = time.time() - start_time
-            print(
-                f"For this Halos list, elapsed time for computing weak-lensing maps: {elapsed_time} seconds"
-            )
+        log_timing(
+            "HalosStatistics.get_kappa_gamma_distib_without_multiprocessing",
+            start_time,
+            samples_number=self.samples_number,
+            n_halos=self.n_halos,
+        )
+
+        return kappa_gamma_distribution
+
+    def sample_halos_positions(self):
+        """Draws `samples_number` random positions of all halos at once, see
+        `random_positions_block`. The halos table holds the positions of the
+        last sample afterwards, as after `enhance_halos_table_random_pos`.
+
+        :return: x and y positions in arcsec, each of shape
+            (samples_number, len(halos_list))
+        :rtype: (numpy.ndarray, numpy.ndarray)
+        """
+        if self.n_halos == 0:
+            self.enhance_halos_table_random_pos()
+            px = np.zeros((self.samples_number, len(self.halos_list)))
+            return px, px.copy()
+        positions = self.random_positions_block(self.samples_number)
+        px = positions[..., 0]
+        py = positions[..., 1]
+        self.halos_list["px"] = px[-1]
+        self.halos_list["py"] = py[-1]
+        return px, py
+
+    def get_kappa_gamma_distib_vectorized(
+        self, gamma_tot=False, listmean=False, born=False
+    ):
+        """Computes and returns the distribution of convergence and shear
+        values.
 
+        The multi-plane lens model and the NFW parameters of the halos are
+        built only once; the random positions of all samples are drawn first
+        and evaluated in one batched call of the analytic multi-plane Hessian,
+        see `halos_get_convergence_shear_vectorized`.
+
+        :param gamma_tot: If True, the function will return total shear gamma values. If False, it will return gamma1 and gamma2 values.
+        :type gamma_tot: bool, optional
+        :param listmean: The boolean if average convergence (kappa) to 0.
+        :type listmean: bool
+        :param born: If True, uses the Born approximation.
+        :type born: bool, optional
+        :returns: A 2D array containing kappa and either gamma or gamma1 and gamma2 for each sample, based on the value of `gamma_tot`.
+        :rtype: numpy.ndarray
+        """
+        px, py = self.sample_halos_positions()
+        results = self.halos_get_convergence_shear_vectorized(
+            px[:, : self.n_halos],
+            py[:, : self.n_halos],
+            gamma12=not gamma_tot,
+            born=born,
+        )
+        kappa_gamma_distribution = np.column_stack(results)
+        if listmean:
+            kappa_gamma_distribution[:, 0] = convergence_mean_0(
+                kappa_gamma_distribution[:, 0]
+            )
         return kappa_gamma_distribution
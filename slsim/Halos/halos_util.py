@@ -1,5 +1,15 @@
+import logging
+import math
+import os
+import time
+from multiprocessing import get_context
+
 import numpy as np
 
+# timings of the long-running Halos functions, silent unless configured, e.g.
+# with logging.basicConfig(level=logging.INFO)
+timing_logger = logging.getLogger("slsim.Halos.timing")
+
 
 def convergence_mean_0(kappa_data):
     """Adjusts the input kappa data by subtracting the mean of non-zero
@@ -24,3 +34,185 @@ def convergence_mean_0(kappa_data):
         return adjusted_kappa_array.tolist()
     else:
         return adjusted_kappa_array
+
+
+def log_timing(name, start_time, **fields):
+    """Logs the wall time of a computation on the `slsim.Halos.timing` logger
+    at INFO level. The record carries the timing as a dictionary in its
+    `timing` attribute, so that handlers can store it in structured form.
+
+    :param name: name of the computation
+    :type name: str
+    :param start_time: start of the computation, from
+        time.perf_counter()
+    :type start_time: float
+    :param fields: further information, e.g. the number of samples
+    :return: name, wall time in seconds and the fields
+    :rtype: dict
+    """
+    timing = {"name": name, "wall_time": time.perf_counter() - start_time}
+    timing.update(fields)
+    timing_logger.info(
+        "%s took %.3f seconds", name, timing["wall_time"], extra={"timing": timing}
+    )
+    return timing
+
+
+def save_arrays_for_workers(directory, **arrays):
+    """Writes arrays as .npy files, so that worker processes can open them
+    memory-mapped with `load_arrays_for_workers` instead of receiving pickled
+    copies. The pages are shared between all processes through the page cache.
+
+    :param directory: directory in which the files are written, e.g. a
+        tempfile.TemporaryDirectory owned by the parent process.
+    :type directory: str
+    :param arrays: arrays to write, by name.
+    :return: paths of the files, by name.
+    :rtype: dict
+    """
+    paths = {}
+    for name, array in arrays.items():
+        paths[name] = os.path.join(directory, name + ".npy")
+        np.save(paths[name], np.ascontiguousarray(array))
+    return paths
+
+
+def load_arrays_for_workers(paths):
+    """Opens the arrays written by `save_arrays_for_workers` read-only and
+    memory-mapped.
+
+    :param paths: paths of the files, by name.
+    :type paths: dict
+    :return: memory-mapped arrays, by name.
+    :rtype: dict
+    """
+    return {name: np.load(path, mmap_mode="r") for name, path in paths.items()}
+
+
+def starmap_in_chunks(
+    function,
+    args,
+    processes=None,
+    chunk_size=None,
+    context=None,
+    initializer=None,
+    initargs=(),
+):
+    """Runs `function` on all argument tuples with a process pool. The pool is
+    never larger than the number of tasks, and the tasks are sent to the
+    workers in chunks, so that each message carries several tasks.
+
+    :param function: picklable function run in the workers.
+    :param args: iterable of argument tuples.
+    :param processes: maximum number of worker processes. Defaults to
+        the number of CPUs.
+    :type processes: int, optional
+    :param chunk_size: number of tasks per message. Defaults to about
+        four chunks per worker.
+    :type chunk_size: int, optional
+    :param context: multiprocessing start method, e.g. "spawn". Defaults
+        to the platform default.
+    :type context: str, optional
+    :param initializer: function called once in each worker, with
+        `initargs`.
+    :param initargs: arguments of `initializer`.
+    :type initargs: tuple
+    :return: results of all tasks in the order of `args`.
+    :rtype: list
+    """
+    args = list(args)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = max(1, min(processes, len(args)))
+    if chunk_size is None:
+        chunk_size = max(1, math.ceil(len(args) / (4 * processes)))
+    with get_context(context).Pool(processes, initializer, initargs) as pool:
+        return pool.starmap(function, args, chunksize=chunk_size)
+
+
+class ConditionalQuantileSampler(object):
+    """Samples pairs (x, y), e.g. (kappa, gamma), from the empirical joint
+    distribution of a set of samples by inverse-CDF lookups in two tables
+    which are computed once: the quantiles of x and, in equal-count bins of x,
+    the conditional quantiles of y. Drawing a sample costs two interpolations
+    independently of the number of input samples, unlike the resampling of a
+    `scipy.stats.gaussian_kde`.
+
+    The resolution is chosen from the number of samples n: about n^(1/3)
+    bins of x with about n^(2/3) samples each, so that both the bins and
+    the conditional distributions within them become finer as n grows.
+    """
+
+    def __init__(self, x, y, n_bins=None, n_quantiles=None, max_quantiles=1025):
+        """
+        :param x: samples of the first variable, e.g. kappa
+        :type x: numpy.ndarray
+        :param y: samples of the second variable, e.g. gamma
+        :type y: numpy.ndarray
+        :param n_bins: number of equal-count bins of x. Defaults to
+            about n^(1/3).
+        :type n_bins: int, optional
+        :param n_quantiles: number of conditional quantiles of y per bin.
+            Defaults to the number of samples per bin, at most
+            `max_quantiles`.
+        :type n_quantiles: int, optional
+        :param max_quantiles: upper limit of the default resolution of the
+            quantile tables.
+        :type max_quantiles: int
+        """
+        x = np.asarray(x, dtype=float).ravel()
+        y = np.asarray(y, dtype=float).ravel()
+        if len(x) != len(y) or len(x) == 0:
+            raise ValueError(
+                "x and y must be non-empty and of the same length, "
+                f"got {len(x)} and {len(y)}."
+            )
+        n = len(x)
+        if n_bins is None:
+            n_bins = int(round(n ** (1 / 3)))
+        n_bins = max(1, min(n_bins, n))
+        order = np.argsort(x, kind="stable")
+        x_sorted = x[order]
+        bins = np.array_split(y[order], n_bins)
+        if n_quantiles is None:
+            n_quantiles = min(min(len(values) for values in bins), max_quantiles)
+        n_quantiles = max(2, n_quantiles)
+
+        self._n_bins = n_bins
+        self._x_quantiles = np.quantile(
+            x_sorted, np.linspace(0, 1, min(max(n, 2), max_quantiles))
+        )
+        levels = np.linspace(0, 1, n_quantiles)
+        self._y_quantiles = np.stack([np.quantile(values, levels) for values in bins])
+
+    @property
+    def resolution(self):
+        """Number of bins of x and number of conditional quantiles of y per
+        bin.
+
+        :return: (n_bins, n_quantiles)
+        """
+        return self._y_quantiles.shape
+
+    def sample(self, size, random_seed=None):
+        """Draws samples of (x, y).
+
+        :param size: number of samples
+        :type size: int
+        :param random_seed: seed or numpy Generator. If None, the global
+            numpy random state is used.
+        :return: x and y, each of shape (size,)
+        :rtype: tuple(numpy.ndarray, numpy.ndarray)
+        """
+        rng = np.random if random_seed is None else np.random.default_rng(random_seed)
+        u_x, u_y = rng.random((2, size))
+        x = np.interp(u_x, np.linspace(0, 1, len(self._x_quantiles)), self._x_quantiles)
+        # the equal-count bins of x are equal intervals of its CDF
+        bin_index = np.minimum((u_x * self._n_bins).astype(int), self._n_bins - 1)
+        n_quantiles = self._y_quantiles.shape[1]
+        position = u_y * (n_quantiles - 1)
+        index = np.minimum(position.astype(int), n_quantiles - 2)
+        lower = self._y_quantiles[bin_index, index]
+        upper = self._y_quantiles[bin_index, index + 1]
+        y = lower + (position - index) * (upper - lower)
+        return x, y
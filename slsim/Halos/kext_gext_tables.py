@@ -0,0 +1,289 @@
+import h5py
+import numpy as np
+from astropy.cosmology import default_cosmology
+
+from slsim.Halos.halos_statistics import HalosStatistics
+from slsim.Halos.halos_util import starmap_in_chunks
+from slsim.Pipelines.halos_pipeline import HalosSkyPyPipeline
+
+
+def kext_gext_dataset_name(zs, zd=None):
+    """Name of a dataset in the HDF5 layout of `data/glass/*.h5`, as read by
+    `LineOfSightDistribution`.
+
+    :param zs: source redshift, rounded to 0.1
+    :param zd: deflector redshift, rounded to 0.1. If None, the name of
+        a distribution without non-linear correction is returned.
+    :return: name of the form `zs_{zs}` or `zs_{zs}_zd_{zd}`
+    :rtype: str
+    """
+    if zd is None:
+        return f"zs_{round(float(zs), 1)}"
+    return f"zs_{round(float(zs), 1)}_zd_{round(float(zd), 1)}"
+
+
+def default_redshift_pairs(nonlinear=True, zs_list=None, zd_list=None):
+    """Redshift pairs of a table.
+
+    By default, these are the pairs read by `LineOfSightDistribution`: zs
+    from 0.1 to 4.9 and, with the non-linear correction, zd from 0 to
+    zs - 0.1 in steps of 0.1.
+
+    :param nonlinear: If True, pairs (zs, zd) are returned; otherwise
+        pairs (zs, None).
+    :param zs_list: source redshifts
+    :param zd_list: deflector redshifts, only those below zs are used
+    :return: list of (zs, zd) tuples
+    """
+    if zs_list is None:
+        zs_list = np.round(np.arange(0.1, 4.95, 0.1), 1)
+    if not nonlinear:
+        return [(float(zs), None) for zs in zs_list]
+    if zd_list is None:
+        zd_list = np.round(np.arange(0, 4.85, 0.1), 1)
+    return [
+        (float(zs), float(zd))
+        for zs in zs_list
+        for zd in zd_list
+        if round(zd, 1) < round(zs, 1)
+    ]
+
+
+def kext_gext_samples_from_halos(halos_lens, redshift_pairs, born=False):
+    """Samples the external convergence and shear of one halo list for many
+    redshift pairs. The random positions of all samples are drawn once and
+    shared by all pairs, and each pair is evaluated with one batched call of
+    the analytic multi-plane Hessian.
+
+    :param halos_lens: halo list with the number of samples
+    :type halos_lens: HalosStatistics
+    :param redshift_pairs: list of (zs, zd) tuples. If zd is None, the
+        convergence and shear to zs without non-linear correction (the
+        `os` lens data) are sampled.
+    :param born: If True, uses the Born approximation.
+    :type born: bool
+    :return: arrays of shape (samples_number, 2) with kappa and gamma, by
+        dataset name
+    :rtype: dict
+    """
+    px, py = halos_lens.sample_halos_positions()
+    samples = {}
+    for zs, zd in redshift_pairs:
+        if zd is None:
+            engine, halo_mask, z_start = halos_lens.get_halos_multi_plane_by_redshift(
+                zs, zs
+            )["os"]
+            kappa, gamma = engine.convergence_shear(
+                px[..., halo_mask], py[..., halo_mask], z_start=z_start, born=born
+            )
+        else:
+            kappa, gamma = halos_lens.halos_get_kext_gext_values_vectorized(
+                zd=zd, zs=zs, px=px, py=py, born=born
+            )
+        samples[kext_gext_dataset_name(zs, zd)] = np.column_stack(
+            np.broadcast_arrays(kappa, gamma)
+        )
+    return samples
+
+
+def worker_kext_gext_table(
+    seed,
+    redshift_pairs,
+    sky_area,
+    m_min,
+    m_max,
+    z_max,
+    cosmo,
+    samples_number,
+    mass_sheet_correction,
+    sigma_8,
+    omega_m,
+    use_skypy,
+    born,
+):
+    """Generates one halo list and samples its external convergence and shear,
+    see `build_kext_gext_table` for the parameters.
+
+    :param seed: seed of the halo list and of the halo positions
+    :type seed: numpy.random.SeedSequence
+    :return: arrays of shape (samples_number, 2), by dataset name
+    :rtype: dict
+    """
+    rng = np.random.default_rng(seed)
+    pipeline = HalosSkyPyPipeline(
+        sky_area=sky_area,
+        m_min=m_min,
+        m_max=m_max,
+        z_max=z_max,
+        cosmo=cosmo,
+        sigma_8=sigma_8,
+        omega_m=omega_m,
+        use_skypy=use_skypy,
+        random_seed=rng,
+    )
+    halos_lens = HalosStatistics(
+        halos_list=pipeline.halos,
+        mass_correction_list=(
+            pipeline.mass_sheet_correction if mass_sheet_correction else None
+        ),
+        sky_area=sky_area,
+        cosmo=cosmo,
+        samples_number=samples_number,
+        mass_sheet=mass_sheet_correction,
+        z_source=z_max,
+        random_seed=rng,
+    )
+    return kext_gext_samples_from_halos(halos_lens, redshift_pairs, born=born)
+
+
+def write_kext_gext_table(file_name, samples, attributes=None):
+    """Writes samples of external convergence and shear in the HDF5 layout of
+    `data/glass/*.h5`, one (n, 2) dataset of kappa and gamma per redshift pair.
+    Samples of datasets which already exist are appended.
+
+    :param file_name: path of the HDF5 file, created if it does not exist
+    :type file_name: str
+    :param samples: arrays of shape (n, 2), by dataset name
+    :type samples: dict
+    :param attributes: metadata of the table, e.g. the halo settings of
+        `build_kext_gext_table`
+    :type attributes: dict, optional
+    :raises ValueError: if the metadata differs from the metadata stored
+        in the file
+    """
+    with h5py.File(file_name, "a") as h5_file:
+        for key, value in (attributes or {}).items():
+            if key in h5_file.attrs and h5_file.attrs[key] != value:
+                raise ValueError(
+                    f"Cannot append to {file_name}: {key} is {h5_file.attrs[key]} "
+                    f"in the file and {value} for the new samples."
+                )
+        for key, value in (attributes or {}).items():
+            h5_file.attrs[key] = value
+        for name, data in samples.items():
+            data = np.asarray(data, dtype=float)
+            if name not in h5_file:
+                h5_file.create_dataset(name, data=data, maxshape=(None, 2), chunks=True)
+            elif h5_file[name].maxshape[0] is None:
+                dataset = h5_file[name]
+                n_old = dataset.shape[0]
+                dataset.resize(n_old + len(data), axis=0)
+                dataset[n_old:] = data
+            else:
+                # datasets of fixed size, e.g. in the shipped tables
+                data = np.concatenate([h5_file[name][()], data])
+                del h5_file[name]
+                h5_file.create_dataset(name, data=data, maxshape=(None, 2), chunks=True)
+
+
+def build_kext_gext_table(
+    file_name,
+    n_iterations=1,
+    nonlinear=True,
+    zs_list=None,
+    zd_list=None,
+    sky_area=0.0001,
+    samples_number=1000,
+    cosmo=None,
+    m_min=None,
+    m_max=None,
+    z_max=5.0,
+    mass_sheet_correction=True,
+    sigma_8=0.81,
+    omega_m=None,
+    use_skypy=False,
+    born=False,
+    processes=None,
+    random_seed=None,
+):
+    """Builds, or extends, a table of external convergence and shear samples
+    which `LineOfSightDistribution` reads through its
+    `nonlinear_correction_path` (nonlinear=True) or `no_correction_path`
+    (nonlinear=False) arguments.
+
+    Each of the `n_iterations` halo lists is generated and sampled
+    `samples_number` times for all redshift pairs in one worker process, the
+    halo lists are distributed over the processes. The samples are appended
+    to the datasets of an existing file, provided the halo settings stored in
+    its attributes agree, so that a table can be refined incrementally.
+
+    :param file_name: path of the HDF5 file
+    :type file_name: str
+    :param n_iterations: number of halo lists
+    :type n_iterations: int
+    :param nonlinear: If True, samples kappa_ext and gamma_ext with the
+        non-linear correction for (zs, zd) pairs; otherwise kappa and
+        gamma to zs.
+    :type nonlinear: bool
+    :param zs_list: source redshifts, see `default_redshift_pairs`
+    :param zd_list: deflector redshifts, see `default_redshift_pairs`
+    :param sky_area: sky area of a halo list in deg2
+    :type sky_area: float
+    :param samples_number: number of random halo positions per halo list
+    :type samples_number: int
+    :param cosmo: cosmology of the halo mass function and of the lensing,
+        defaults to the astropy default cosmology
+    :type cosmo: astropy.cosmology instance, optional
+    :param m_min: minimum halo mass, see `HalosSkyPyPipeline`
+    :param m_max: maximum halo mass, see `HalosSkyPyPipeline`
+    :param z_max: maximum halo redshift
+    :type z_max: float
+    :param mass_sheet_correction: If True, applies the mass sheet
+        correction.
+    :type mass_sheet_correction: bool
+    :param sigma_8: sigma_8 of the halo mass function
+    :param omega_m: Omega_m of the halo mass function
+    :param use_skypy: If True, generates the halo lists with the SkyPy
+        pipeline, otherwise with the cached mass function table.
+    :type use_skypy: bool
+    :param born: If True, uses the Born approximation.
+    :type born: bool
+    :param processes: maximum number of worker processes
+    :type processes: int, optional
+    :param random_seed: seed of all halo lists and positions
+    :type random_seed: int, optional
+    :return: number of samples per dataset written by this call
+    :rtype: int
+    """
+    if cosmo is None:
+        cosmo = default_cosmology.get()
+    redshift_pairs = default_redshift_pairs(nonlinear, zs_list, zd_list)
+    seeds = np.random.SeedSequence(random_seed).spawn(n_iterations)
+    args = [
+        (
+            seed,
+            redshift_pairs,
+            sky_area,
+            m_min,
+            m_max,
+            z_max,
+            cosmo,
+            samples_number,
+            mass_sheet_correction,
+            sigma_8,
+            omega_m,
+            use_skypy,
+            born,
+        )
+        for seed in seeds
+    ]
+    results = starmap_in_chunks(
+        worker_kext_gext_table, args, processes=processes, context="spawn"
+    )
+    samples = {
+        name: np.concatenate([result[name] for result in results])
+        for name in results[0]
+    }
+    attributes = {
+        "nonlinear": nonlinear,
+        "sky_area": sky_area,
+        "m_min": "None" if m_min is None else m_min,
+        "m_max": "None" if m_max is None else m_max,
+        "z_max": z_max,
+        "sigma_8": sigma_8,
+        "omega_m": "None" if omega_m is None else omega_m,
+        "cosmology": repr(cosmo),
+        "mass_sheet_correction": mass_sheet_correction,
+    }
+    write_kext_gext_table(file_name, samples, attributes)
+    return n_iterations * samples_number
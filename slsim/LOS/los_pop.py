@@ -74,6 +74,18 @@ class LOSPop(object):
         self.nonlinear_correction_path = nonlinear_correction_path
         self.no_correction_path = no_correction_path
 
+    def _line_of_sight_distribution(self):
+        """LineOfSightDistribution of the correction paths. The tables are
+        shared by all instances and only loaded again if another LOSPop loaded
+        other files in the meantime, so the paths are checked on every call.
+
+        :return: LineOfSightDistribution instance
+        """
+        return LineOfSightDistribution(
+            nonlinear_correction_path=self.nonlinear_correction_path,
+            no_correction_path=self.no_correction_path,
+        )
+
     def draw_los(self, source_redshift, deflector_redshift):
         """Calculate line-of-sight distortions in shear and convergence for an
         individual realisation.
@@ -107,10 +119,7 @@ class LOSPop(object):
         else:
             z_source = float(source_redshift)
             z_lens = float(deflector_redshift)
-            LOS = LineOfSightDistribution(
-                nonlinear_correction_path=self.nonlinear_correction_path,
-                no_correction_path=self.no_correction_path,
-            )
+            LOS = self._line_of_sight_distribution()
             gamma_abs, kappa = LOS.get_kappa_gamma(
                 z_source, z_lens, self.nonlinear_los_bool
             )
@@ -120,3 +129,69 @@ class LOSPop(object):
             gamma = [gamma1, gamma2]
 
         return LOSIndividual(kappa=kappa, gamma=gamma)
+
+    def draw_los_batch(
+        self, source_redshift, deflector_redshift, random_seed=None, as_list=False
+    ):
+        """Calculate line-of-sight distortions in shear and convergence for
+        many realisations at once, e.g. for all lens candidates of a
+        population. The kappa and gamma tables are loaded once and sampled
+        jointly for all redshift pairs, see
+        `LineOfSightDistribution.draw_kappa_gamma`.
+
+        :param source_redshift: redshifts of the source galaxy objects.
+        :type source_redshift: numpy.ndarray
+        :param deflector_redshift: redshifts of the deflector galaxy
+            objects, broadcastable with source_redshift.
+        :type deflector_redshift: numpy.ndarray
+        :param random_seed: seed or numpy Generator.
+        :param as_list: If True, returns a list of LOSIndividual
+            instances instead of arrays.
+        :type as_list: bool
+        :return: kappa, gamma1 and gamma2 arrays, or a list of
+            LOSIndividual class instances
+        """
+        source_redshift, deflector_redshift = np.broadcast_arrays(
+            np.atleast_1d(np.asarray(source_redshift, dtype=float)),
+            np.atleast_1d(np.asarray(deflector_redshift, dtype=float)),
+        )
+        size = len(source_redshift)
+        rng = np.random.default_rng(random_seed)
+        if not self.los_bool:
+            kappa, gamma_abs = np.zeros(size), np.zeros(size)
+        elif self.mixgauss_gamma and not self.nonlinear_los_bool:
+            mixture = GaussianMixtureModel(
+                means=self.mixgauss_means,
+                stds=self.mixgauss_stds,
+                weights=self.mixgauss_weights,
+            )
+            components = rng.choice(len(mixture.means), size=size, p=mixture.weights)
+            gamma_abs = np.abs(
+                rng.normal(
+                    np.asarray(mixture.means)[components],
+                    np.asarray(mixture.stds)[components],
+                )
+            )
+            kappa = rng.normal(loc=0, scale=0.05, size=size)
+        elif self.mixgauss_gamma and self.nonlinear_los_bool:
+            raise ValueError(
+                "Can only choose one method for external shear and convergence"
+            )
+        else:
+            kappa, gamma_abs = self._line_of_sight_distribution().draw_kappa_gamma(
+                source_redshift,
+                deflector_redshift,
+                use_nonlinear_correction=self.nonlinear_los_bool,
+                random_seed=rng,
+            )
+        phi = 2 * np.pi * rng.random(size)
+        gamma1 = gamma_abs * np.cos(2 * phi)
+        gamma2 = gamma_abs * np.sin(2 * phi)
+        if not self.los_bool:
+            gamma1, gamma2 = np.zeros(size), np.zeros(size)
+        if as_list:
+            return [
+                LOSIndividual(kappa=k, gamma=[g1, g2])
+                for k, g1, g2 in zip(kappa.tolist(), gamma1.tolist(), gamma2.tolist())
+            ]
+        return kappa, gamma1, gamma2
@@ -0,0 +1,325 @@
+# Throughput benchmarks of the microlensing pipeline on synthetic
+# magnification maps, so that they run without the GPU IPM code.
+# Run e.g. with
+#   python -m slsim.Microlensing.benchmark --resolutions 500 1000 --output bench.json
+
+import argparse
+
+import numpy as np
+from astropy.cosmology import FlatLambdaCDM
+from scipy.ndimage import gaussian_filter
+
+from slsim.Microlensing.lightcurve import MicrolensingLightCurve
+from slsim.Microlensing.lightcurvelensmodel import (
+    MicrolensingLightCurveFromLensModel,
+)
+from slsim.Microlensing.magmap import MagnificationMap
+from slsim.Util.astro_util import (
+    extract_light_curve,
+    extract_light_curve_batch,
+    theta_star_physical,
+)
+from slsim.Util.benchmark_util import measure, write_benchmark_json
+
+# a typical lensed quasar, same as in the microlensing tests
+DEFLECTOR_REDSHIFT = 1.19
+SOURCE_REDSHIFT = 3.41
+MICROLENSING_PARAMS = {
+    "kappa_star": np.array([0.12007537, 0.13209889, 0.15942816, 0.21984733]),
+    "kappa_tot": np.array([0.47128266, 0.49348656, 0.53113534, 0.61013069]),
+    "shear": np.array([0.42394672, 0.46016948, 0.51043085, 0.58869696]),
+    "shear_phi": np.array([2.01471637, -1.81166767, -0.71529481, 0.03913024]),
+}
+
+
+def synthetic_magnification_map(
+    num_pixels,
+    kappa_tot,
+    shear,
+    kappa_star,
+    theta_star,
+    half_length=10,
+    random_seed=None,
+):
+    """Creates a MagnificationMap from a smoothed log-normal random field with
+    the mean of the macro magnification. It has the size and the statistics of
+    an IPM map closely enough for timing purposes, but is not physical.
+
+    :param num_pixels: number of pixels along each axis
+    :param kappa_tot: total convergence
+    :param shear: shear
+    :param kappa_star: convergence in stars
+    :param theta_star: Einstein radius of a unit mass point lens in
+        arcsec
+    :param half_length: half-length of the map in units of theta_star
+    :param random_seed: seed for the random field
+    :return: MagnificationMap instance
+    """
+    rng = np.random.default_rng(random_seed)
+    field = gaussian_filter(rng.normal(size=(num_pixels, num_pixels)), sigma=2)
+    magnifications = np.exp(field / np.std(field))
+    mu_ave = np.abs(1 / ((1 - kappa_tot) ** 2 - shear**2))
+    magnifications *= mu_ave / np.mean(magnifications)
+    return MagnificationMap(
+        magnifications_array=magnifications,
+        kappa_tot=kappa_tot,
+        shear=shear,
+        kappa_star=kappa_star,
+        theta_star=theta_star,
+        center_x=0,
+        center_y=0,
+        half_length_x=half_length * theta_star,
+        half_length_y=half_length * theta_star,
+        num_pixels_x=num_pixels,
+        num_pixels_y=num_pixels,
+    )
+
+
+def _extract_light_curves_one_by_one(
+    convolved_map,
+    pixel_size,
+    effective_velocity,
+    time_years,
+    num_light_curves,
+    random_seed=None,
+):
+    """Extracts light curves with one `extract_light_curve` call each, as the
+    reference of `extract_light_curve_batch`."""
+    return [
+        extract_light_curve(
+            convolved_map,
+            pixel_size,
+            effective_velocity,
+            time_years,
+            random_seed=random_seed,
+        )
+        for _ in range(num_light_curves)
+    ]
+
+
+class _SyntheticMapLensModel(MicrolensingLightCurveFromLensModel):
+    """MicrolensingLightCurveFromLensModel which uses synthetic maps instead of
+    running the IPM code."""
+
+    def __init__(self, num_pixels, random_seed=None):
+        self._num_pixels = num_pixels
+        self._random_seed = random_seed
+
+    def generate_magnification_maps_from_microlensing_params(
+        self,
+        kappa_star_images,
+        kappa_tot_images,
+        shear_images,
+        kwargs_MagnificationMap=None,
+    ):
+        if kwargs_MagnificationMap is None:
+            kwargs_MagnificationMap = {}
+        self._magmaps_images = [
+            synthetic_magnification_map(
+                self._num_pixels,
+                kappa_tot_images[i],
+                shear_images[i],
+                kappa_star_images[i],
+                kwargs_MagnificationMap["theta_star"],
+                random_seed=self._random_seed,
+            )
+            for i in range(len(kappa_star_images))
+        ]
+        return self._magmaps_images
+
+
+def kwargs_source_morphology(point_source_morphology, cosmo, theta_star):
+    """Source morphology settings used in the benchmarks.
+
+    :param point_source_morphology: "gaussian" or "agn"
+    :param cosmo: astropy.cosmology instance
+    :param theta_star: Einstein radius of a unit mass point lens in
+        arcsec
+    :return: keyword arguments of the source morphology class
+    """
+    if point_source_morphology == "gaussian":
+        return {
+            "source_redshift": SOURCE_REDSHIFT,
+            "cosmo": cosmo,
+            "source_size": 0.05 * theta_star,
+        }
+    if point_source_morphology == "agn":
+        return {
+            "source_redshift": SOURCE_REDSHIFT,
+            "cosmo": cosmo,
+            "r_out": 1000,
+            "r_resolution": 100,
+            "smbh_mass_exp": 8,
+            "inclination_angle": 30,
+            "black_hole_spin": 0,
+            "observer_frame_wavelength_in_nm": 600,
+            "eddington_ratio": 0.1,
+        }
+    raise ValueError(
+        "Invalid source morphology type. Choose 'gaussian' or 'agn' for benchmarks."
+    )
+
+
+def run_microlensing_benchmarks(
+    resolutions=(500, 1000, 2000),
+    point_source_morphologies=("gaussian", "agn"),
+    num_lightcurves=100,
+    time_duration=3650,
+    repeat=1,
+    output_file=None,
+    random_seed=42,
+):
+    """Times the stages of the microlensing pipeline: the convolution of the
+    magnification map with the source, the extraction of tracks one at a time
+    (extract_light_curve) and batched (extract_light_curve_batch), and the
+    end-to-end lightcurve generation for all images of one lens.
+
+    :param resolutions: number of pixels along each axis of the
+        synthetic maps
+    :param point_source_morphologies: source morphologies to benchmark
+    :param num_lightcurves: number of lightcurves per map in the
+        extraction and end-to-end benchmarks
+    :param time_duration: duration of the lightcurves in days
+    :param repeat: number of repetitions of each benchmark, the best
+        wall time is reported
+    :param output_file: path of the JSON file with the results. If None,
+        nothing is written.
+    :param random_seed: seed for the synthetic maps and tracks
+    :return: report with metadata and one entry per benchmark with the
+        wall time in seconds, peak memory in MB and lightcurves per
+        second where applicable.
+    :rtype: dict
+    """
+    cosmo = FlatLambdaCDM(H0=70, Om0=0.3)
+    theta_star = theta_star_physical(DEFLECTOR_REDSHIFT, SOURCE_REDSHIFT, cosmo)[
+        0
+    ].value
+    time_array = np.linspace(0, time_duration, 500)
+    effective_velocity = 1000  # km/s
+    results = []
+
+    def _record(name, measurement, num_pixels, morphology, num_curves=None):
+        measurement.update(
+            {"name": name, "num_pixels": num_pixels, "morphology": morphology}
+        )
+        if num_curves is not None:
+            measurement["num_lightcurves"] = num_curves
+            measurement["lightcurves_per_second"] = (
+                num_curves / measurement["wall_time"]
+            )
+        results.append(measurement)
+        return measurement
+
+    for num_pixels in resolutions:
+        magmap = synthetic_magnification_map(
+            num_pixels,
+            MICROLENSING_PARAMS["kappa_tot"][0],
+            MICROLENSING_PARAMS["shear"][0],
+            MICROLENSING_PARAMS["kappa_star"][0],
+            theta_star,
+            random_seed=random_seed,
+        )
+        pixel_size = magmap.get_pixel_size_meters(SOURCE_REDSHIFT, cosmo)
+        time_years = time_duration / (1 + SOURCE_REDSHIFT) / 365.25
+
+        for morphology in point_source_morphologies:
+            kwargs_morphology = kwargs_source_morphology(morphology, cosmo, theta_star)
+            ml_lc = MicrolensingLightCurve(
+                magnification_map=magmap,
+                time_duration=time_duration,
+                point_source_morphology=morphology,
+                kwargs_source_morphology=kwargs_morphology,
+            )
+            convolved_map = _record(
+                "convolution",
+                measure(ml_lc.get_convolved_map, repeat=repeat),
+                num_pixels,
+                morphology,
+            )["result"]
+
+            rng = np.random.default_rng(random_seed)
+            _record(
+                "track_extraction_single",
+                measure(
+                    _extract_light_curves_one_by_one,
+                    convolved_map,
+                    pixel_size,
+                    effective_velocity,
+                    time_years,
+                    num_lightcurves,
+                    random_seed=rng,
+                    repeat=repeat,
+                ),
+                num_pixels,
+                morphology,
+                num_lightcurves,
+            )
+            _record(
+                "track_extraction_batch",
+                measure(
+                    extract_light_curve_batch,
+                    convolved_map,
+                    pixel_size,
+                    effective_velocity,
+                    time_years,
+                    num_light_curves=num_lightcurves,
+                    random_seed=rng,
+                    repeat=repeat,
+                ),
+                num_pixels,
+                morphology,
+                num_lightcurves,
+            )
+
+            lens_model = _SyntheticMapLensModel(num_pixels, random_seed=random_seed)
+            _record(
+                "lens_end_to_end",
+                measure(
+                    lens_model.generate_point_source_lightcurves,
+                    time_array,
+                    SOURCE_REDSHIFT,
+                    DEFLECTOR_REDSHIFT,
+                    MICROLENSING_PARAMS["kappa_star"],
+                    MICROLENSING_PARAMS["kappa_tot"],
+                    MICROLENSING_PARAMS["shear"],
+                    MICROLENSING_PARAMS["shear_phi"],
+                    10.0,
+                    -10.0,
+                    250.0,
+                    cosmo,
+                    kwargs_MagnificationMap={"theta_star": theta_star},
+                    point_source_morphology=morphology,
+                    kwargs_source_morphology=kwargs_morphology,
+                    num_lightcurves=num_lightcurves,
+                    repeat=repeat,
+                ),
+                num_pixels,
+                morphology,
+                num_lightcurves * len(MICROLENSING_PARAMS["kappa_star"]),
+            )
+
+    return write_benchmark_json(results, output_file)
+
+
+def main(args=None):
+    """Command line entry point of the microlensing benchmarks."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the slsim microlensing pipeline."
+    )
+    parser.add_argument("--resolutions", type=int, nargs="+", default=[500, 1000, 2000])
+    parser.add_argument("--morphologies", nargs="+", default=["gaussian", "agn"])
+    parser.add_argument("--num-lightcurves", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", default="microlensing_benchmark.json")
+    parsed = parser.parse_args(args)
+    run_microlensing_benchmarks(
+        resolutions=parsed.resolutions,
+        point_source_morphologies=parsed.morphologies,
+        num_lightcurves=parsed.num_lightcurves,
+        repeat=parsed.repeat,
+        output_file=parsed.output,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,7 @@ from skimage.transform import rescale
 from slsim.Microlensing.magmap import MagnificationMap
 
 from slsim.Util.astro_util import (
-    extract_light_curve,
+    extract_light_curve_batch,
 )
 
 from slsim.Microlensing.source_morphology.agn import AGNSourceMorphology
@@ -163,11 +163,12 @@ class MicrolensingLightCurve(object):
             source plane (in km/s). Default is 1000 km/s (typical effective velocity of the source with respect to microlenses/stars).
         :param num_lightcurves: Number of lightcurves to generate.
             Default is 1.
-        :param x_start_position: Starting x position of the lightcurve on the magnification map in arcsec. A value of 0 indicates the center of the magnification map. Default is None. If None, a random position is chosen.
-        :param y_start_position: Starting y position of the lightcurve on the magnification map in arcsec. A value of 0 indicates the center of the magnification map. Default is None. If None, a random position is chosen.
+        :param x_start_position: Starting x position of the lightcurve on the magnification map in arcsec. A value of 0 indicates the center of the magnification map. Default is None. If None, a random position is chosen. An array with one entry per lightcurve is also accepted.
+        :param y_start_position: Starting y position of the lightcurve on the magnification map in arcsec. A value of 0 indicates the center of the magnification map. Default is None. If None, a random position is chosen. An array with one entry per lightcurve is also accepted.
         :param phi_travel_direction: Angle of the travel direction in
             degrees. Default is None. If None, a random angle is chosen. A value of 0
-            implies the positive x-axis of the magnification map.
+            implies the positive x-axis of the magnification map. An array with one
+            entry per lightcurve is also accepted.
         :return: A tuple of lightcurves, tracks, and time arrays.
 
             lightcurves: list of lightcurves
@@ -194,9 +195,9 @@ class MicrolensingLightCurve(object):
                 * self._magnification_map.num_pixels_x
                 / 2
             )
-            x_start_position = int(
+            x_start_position = np.asarray(
                 x_start_position + self._magnification_map.num_pixels_x // 2
-            )
+            ).astype(int)
 
         if y_start_position is not None:
             y_start_position = (
@@ -204,9 +205,9 @@ class MicrolensingLightCurve(object):
                 * self._magnification_map.num_pixels_y
                 / 2
             )
-            y_start_position = int(
+            y_start_position = np.asarray(
                 y_start_position + self._magnification_map.num_pixels_y // 2
-            )
+            ).astype(int)
 
         return self._generate_lightcurves(
             source_redshift=source_redshift,
@@ -264,10 +265,6 @@ class MicrolensingLightCurve(object):
             requested.
         """
 
-        LCs = []
-        tracks = []
-        time_arrays = []
-
         # time duration in source frame
         self._time_duration_source_frame = self._time_duration_observer_frame / (
             1 + source_redshift
@@ -277,36 +274,38 @@ class MicrolensingLightCurve(object):
             self._time_duration_source_frame / 365.25
         )  # converting time_duration from days to years
 
-        for _ in range(num_lightcurves):
-            light_curve, x_positions, y_positions = extract_light_curve(
-                convolution_array=convolved_map,
-                pixel_size=pixel_size_magnification_map,  # Make sure that the units for theta_star and pixel_size are in arcsec
-                effective_transverse_velocity=effective_transverse_velocity,
-                light_curve_time_in_years=time_duration_years,
-                pixel_shift=0,
-                x_start_position=x_start_position,
-                y_start_position=y_start_position,
-                phi_travel_direction=phi_travel_direction,
-                return_track_coords=True,
-                random_seed=None,
-            )
+        # all tracks are sampled from the convolved map in one vectorized call
+        light_curves, x_positions, y_positions = extract_light_curve_batch(
+            convolution_array=convolved_map,
+            pixel_size=pixel_size_magnification_map,  # Make sure that the units for theta_star and pixel_size are in arcsec
+            effective_transverse_velocity=effective_transverse_velocity,
+            light_curve_time_in_years=time_duration_years,
+            num_light_curves=num_lightcurves,
+            pixel_shift=0,
+            x_start_positions=x_start_position,
+            y_start_positions=y_start_position,
+            phi_travel_directions=phi_travel_direction,
+            return_track_coords=True,
+            random_seed=None,
+        )
 
-            if lightcurve_type == "magnitude":
-                # print("Extracting magnitude for light curve...")
-                light_curve = -2.5 * np.log10(
-                    light_curve / np.abs(self._magnification_map.mu_ave)
-                )
-            elif lightcurve_type == "magnification":
-                # print("Extracting magnification for light curve...")
-                light_curve = light_curve
-            else:
-                raise ValueError(
-                    "Lightcurve type not recognized. Please use 'magnitude' or 'magnification'."
-                )
-            LCs.append(light_curve)
-            tracks.append(np.array([x_positions, y_positions]))
-            time_arrays.append(
-                np.linspace(0, self._time_duration_observer_frame, len(light_curve))
+        if lightcurve_type == "magnitude":
+            light_curves = -2.5 * np.log10(
+                light_curves / np.abs(self._magnification_map.mu_ave)
             )
+        elif lightcurve_type != "magnification":
+            raise ValueError(
+                "Lightcurve type not recognized. Please use 'magnitude' or 'magnification'."
+            )
+
+        LCs = list(light_curves)
+        tracks = [
+            np.array([x_positions[i], y_positions[i]])
+            for i in range(light_curves.shape[0])
+        ]
+        time_arrays = [
+            np.linspace(0, self._time_duration_observer_frame, light_curves.shape[1])
+            for _ in range(light_curves.shape[0])
+        ]
 
         return LCs, tracks, time_arrays
@@ -0,0 +1,369 @@
+# here we generate microlensing lightcurves for a whole population of lensed
+# point sources. Images with (nearly) the same microlensing parameters share a
+# magnification map, the groups are processed in a pool of worker processes
+# and the lightcurves are streamed to an HDF5 file in chunks.
+
+from multiprocessing import get_context
+
+import h5py
+import numpy as np
+
+from slsim.Microlensing.lightcurve import MicrolensingLightCurve
+from slsim.Microlensing.magmap import MagnificationMap
+from slsim.Util.astro_util import extract_light_curve_batch
+
+
+def default_magnification_map(kappa_tot, shear, kappa_star, **kwargs_MagnificationMap):
+    """Generates a magnification map with the IPM code for one group of images.
+    Any picklable function with the same signature that returns a
+    MagnificationMap can be used instead (e.g. to load precomputed maps).
+
+    :param kappa_tot: total convergence
+    :param shear: shear
+    :param kappa_star: convergence in point mass lenses/stars
+    :param kwargs_MagnificationMap: keyword arguments for the
+        MagnificationMap class
+    :return: MagnificationMap instance
+    """
+    return MagnificationMap(
+        kappa_tot=kappa_tot,
+        shear=shear,
+        kappa_star=kappa_star,
+        **kwargs_MagnificationMap,
+    )
+
+
+class MicrolensingLightCurvePopulation(object):
+    """Class to generate microlensing lightcurves for all images of a
+    population of lensed point sources.
+
+    The microlensing parameters are given in columnar form with one row
+    per image. Images whose (kappa_star, kappa_tot, shear) agree within
+    `map_tolerance` are grouped and share one magnification map, so the
+    number of (expensive) maps scales with the number of distinct
+    parameter cells rather than with the number of images.
+    """
+
+    def __init__(
+        self,
+        microlensing_params,
+        cosmology,
+        kwargs_MagnificationMap: dict,
+        point_source_morphology: str,
+        kwargs_source_morphology: dict,
+        map_tolerance=0.01,
+        magnification_map_function=default_magnification_map,
+    ):
+        """
+        :param microlensing_params: astropy Table, dictionary or any other
+            columnar container with one row per image and the columns
+            "kappa_star", "kappa_tot", "shear", "shear_phi" (angle of the
+            shear vector w.r.t. the x-axis of the image plane in degrees),
+            "source_redshift", "effective_velocity" (effective transverse
+            velocity in the source plane in km/s) and
+            "effective_velocity_angle" (direction of the effective velocity
+            w.r.t. the x-axis of the image plane in degrees). An optional
+            integer "lens_id" column identifies the lens each image belongs
+            to.
+        :param cosmology: astropy.cosmology instance.
+        :param kwargs_MagnificationMap: Keyword arguments for the
+            MagnificationMap class (except kappa_tot, shear and kappa_star),
+            shared by all maps.
+        :param point_source_morphology: Morphology of the point source.
+            Options are "gaussian" or "agn" (Accretion Disk).
+        :param kwargs_source_morphology: Dictionary of keyword arguments for
+            the source morphology class. The "source_redshift" and "cosmo"
+            entries are set per image from microlensing_params and
+            cosmology.
+        :param map_tolerance: width of the (kappa_star, kappa_tot, shear)
+            cells within which images share a magnification map. Set to 0
+            to only group images with identical parameters.
+        :param magnification_map_function: picklable function with the
+            signature of default_magnification_map returning the
+            MagnificationMap for a group of images.
+        """
+        self._kappa_star = np.asarray(microlensing_params["kappa_star"], dtype=float)
+        self._kappa_tot = np.asarray(microlensing_params["kappa_tot"], dtype=float)
+        self._shear = np.asarray(microlensing_params["shear"], dtype=float)
+        self._shear_phi = np.asarray(microlensing_params["shear_phi"], dtype=float)
+        self._source_redshift = np.asarray(
+            microlensing_params["source_redshift"], dtype=float
+        )
+        self._effective_velocity = np.asarray(
+            microlensing_params["effective_velocity"], dtype=float
+        )
+        self._effective_velocity_angle = np.asarray(
+            microlensing_params["effective_velocity_angle"], dtype=float
+        )
+        self.num_images = len(self._kappa_star)
+        if "lens_id" in _column_names(microlensing_params):
+            self._lens_id = np.asarray(microlensing_params["lens_id"])
+        else:
+            self._lens_id = np.arange(self.num_images)
+
+        self._cosmo = cosmology
+        self._kwargs_MagnificationMap = kwargs_MagnificationMap
+        self._point_source_morphology = point_source_morphology
+        self._kwargs_source_morphology = kwargs_source_morphology
+        self._map_tolerance = map_tolerance
+        self._magnification_map_function = magnification_map_function
+
+        self._group_ids = None
+
+    @property
+    def group_ids(self):
+        """Returns the index of the magnification map group of each image.
+
+        Images with kappa_star, kappa_tot and shear in the same cell of
+        width map_tolerance share a group.
+        """
+        if self._group_ids is None:
+            params = np.column_stack([self._kappa_star, self._kappa_tot, self._shear])
+            if self._map_tolerance > 0:
+                params = np.floor(params / self._map_tolerance)
+            _, self._group_ids = np.unique(params, axis=0, return_inverse=True)
+            self._group_ids = self._group_ids.ravel()
+        return self._group_ids
+
+    @property
+    def num_groups(self):
+        """Returns the number of magnification maps needed for the
+        population."""
+        return int(np.max(self.group_ids)) + 1 if self.num_images > 0 else 0
+
+    def _group_tasks(self, time, lightcurve_type, random_seed):
+        """Yields the arguments of _group_light_curves for each group of
+        images, sorted by source redshift within the group so that convolved
+        maps can be reused.
+
+        :param time: time array of the lightcurves in days.
+        :param lightcurve_type: 'magnitude' or 'magnification'.
+        :param random_seed: seed for the random start positions.
+        """
+        order = np.argsort(self.group_ids, kind="stable")
+        boundaries = np.flatnonzero(np.diff(self.group_ids[order])) + 1
+        seeds = np.random.SeedSequence(random_seed).spawn(self.num_groups)
+        for group_id, indices in enumerate(np.split(order, boundaries)):
+            indices = indices[np.argsort(self._source_redshift[indices], kind="stable")]
+            yield (
+                group_id,
+                indices,
+                # the map is generated for the mean parameters of the group
+                np.mean(self._kappa_tot[indices]),
+                np.mean(self._shear[indices]),
+                np.mean(self._kappa_star[indices]),
+                self._source_redshift[indices],
+                self._effective_velocity[indices],
+                # direction of travel in the reference frame of the map
+                self._effective_velocity_angle[indices] - self._shear_phi[indices],
+                time,
+                self._cosmo,
+                self._kwargs_MagnificationMap,
+                self._point_source_morphology,
+                self._kwargs_source_morphology,
+                self._magnification_map_function,
+                lightcurve_type,
+                seeds[group_id],
+            )
+
+    def generate_lightcurves(
+        self,
+        time,
+        filename,
+        lightcurve_type="magnitude",
+        chunk_size=1000,
+        processes=None,
+        random_seed=None,
+    ):
+        """Generates one microlensing lightcurve per image and streams them to
+        an HDF5 file.
+
+        The file contains the datasets "lightcurves" with shape
+        (num_images, len(time)), "image_index" (row of each lightcurve
+        in microlensing_params), "lens_id", "group_id" and "time". Rows
+        are written in the order in which the groups finish, use
+        read_lightcurves to get them in the order of
+        microlensing_params.
+
+        :param time: time array (in days, observer frame) at which the
+            lightcurves are evaluated.
+        :param filename: path of the HDF5 file to write.
+        :param lightcurve_type: Type of lightcurve to generate, either
+            'magnitude' or 'magnification'. If 'magnitude', the
+            lightcurve is returned in magnitudes normalized to the macro
+            magnification of the map.
+        :param chunk_size: number of lightcurves buffered in memory
+            before they are appended to the file.
+        :param processes: number of worker processes. If 1, the groups
+            are processed in the calling process. If None, all available
+            cores are used.
+        :param random_seed: seed for the random start positions of the
+            tracks on the magnification maps.
+        :return: filename
+        """
+        if lightcurve_type not in ["magnitude", "magnification"]:
+            raise ValueError(
+                "Lightcurve type not recognized. Please use 'magnitude' or 'magnification'."
+            )
+        time = np.atleast_1d(np.asarray(time, dtype=float))
+        tasks = self._group_tasks(time, lightcurve_type, random_seed)
+
+        with h5py.File(filename, "w") as f:
+            f.create_dataset("time", data=time)
+            f.attrs["lightcurve_type"] = lightcurve_type
+            f.attrs["map_tolerance"] = self._map_tolerance
+            lightcurves_dataset = f.create_dataset(
+                "lightcurves",
+                shape=(0, len(time)),
+                maxshape=(None, len(time)),
+                chunks=(max(1, min(chunk_size, self.num_images)), len(time)),
+                dtype=float,
+            )
+            index_datasets = {
+                name: f.create_dataset(
+                    name, shape=(0,), maxshape=(None,), dtype=np.int64
+                )
+                for name in ["image_index", "group_id"]
+            }
+            index_datasets["lens_id"] = f.create_dataset(
+                "lens_id", shape=(0,), maxshape=(None,), dtype=self._lens_id.dtype
+            )
+
+            buffer = []
+
+            def _flush():
+                if len(buffer) == 0:
+                    return
+                indices = np.concatenate([b[1] for b in buffer])
+                columns = {
+                    "image_index": indices,
+                    "group_id": np.concatenate(
+                        [np.full(len(b[1]), b[0]) for b in buffer]
+                    ),
+                    "lens_id": self._lens_id[indices],
+                }
+                lightcurves = np.concatenate([b[2] for b in buffer])
+                n_old = lightcurves_dataset.shape[0]
+                n_new = n_old + len(indices)
+                lightcurves_dataset.resize(n_new, axis=0)
+                lightcurves_dataset[n_old:n_new] = lightcurves
+                for name, dataset in index_datasets.items():
+                    dataset.resize(n_new, axis=0)
+                    dataset[n_old:n_new] = columns[name]
+                buffer.clear()
+
+            def _collect(results):
+                num_buffered = 0
+                for result in results:
+                    buffer.append(result)
+                    num_buffered += len(result[1])
+                    if num_buffered >= chunk_size:
+                        _flush()
+                        num_buffered = 0
+                _flush()
+
+            if processes == 1:
+                _collect(_group_light_curves(task) for task in tasks)
+            else:
+                with get_context("spawn").Pool(processes) as pool:
+                    _collect(pool.imap_unordered(_group_light_curves, tasks))
+
+        return filename
+
+    @staticmethod
+    def read_lightcurves(filename):
+        """Reads the lightcurves written by generate_lightcurves, sorted in the
+        order of the input microlensing parameters.
+
+        :param filename: path of the HDF5 file.
+        :return: image_index, lens_id and lightcurves with shape
+            (num_images, len(time)) and the time array.
+        :rtype: tuple
+        """
+        with h5py.File(filename, "r") as f:
+            image_index = f["image_index"][:]
+            order = np.argsort(image_index)
+            return (
+                image_index[order],
+                f["lens_id"][:][order],
+                f["lightcurves"][:][order],
+                f["time"][:],
+            )
+
+
+def _column_names(microlensing_params):
+    """Returns the column names of a Table or the keys of a dictionary."""
+    if hasattr(microlensing_params, "colnames"):
+        return microlensing_params.colnames
+    return list(microlensing_params.keys())
+
+
+def _group_light_curves(args):
+    """Generates the lightcurves of all images that share one magnification
+    map. This is a module level function so that it can be sent to the worker
+    processes.
+
+    :param args: tuple as yielded by
+        MicrolensingLightCurvePopulation._group_tasks
+    :return: group id, image indices and lightcurves of the group with
+        shape (num_images_in_group, len(time))
+    """
+    (
+        group_id,
+        indices,
+        kappa_tot,
+        shear,
+        kappa_star,
+        source_redshifts,
+        effective_velocities,
+        velocity_angles,
+        time,
+        cosmo,
+        kwargs_MagnificationMap,
+        point_source_morphology,
+        kwargs_source_morphology,
+        magnification_map_function,
+        lightcurve_type,
+        seed,
+    ) = args
+    rng = np.random.default_rng(seed)
+
+    magmap = magnification_map_function(
+        kappa_tot, shear, kappa_star, **kwargs_MagnificationMap
+    )
+    time_duration = time[-1] - time[0]
+
+    lightcurves = np.empty((len(indices), len(time)))
+    # images are sorted by source redshift, so all images at the same
+    # redshift share one convolved map and are extracted in one call
+    redshifts, starts = np.unique(source_redshifts, return_index=True)
+    ends = np.append(starts[1:], len(indices))
+    for source_redshift, start, end in zip(redshifts, starts, ends):
+        kwargs_morphology = dict(kwargs_source_morphology)
+        kwargs_morphology["source_redshift"] = source_redshift
+        kwargs_morphology["cosmo"] = cosmo
+        convolved_map = MicrolensingLightCurve(
+            magnification_map=magmap,
+            time_duration=time_duration,
+            point_source_morphology=point_source_morphology,
+            kwargs_source_morphology=kwargs_morphology,
+        ).get_convolved_map()
+        pixel_size = magmap.get_pixel_size_meters(
+            source_redshift=source_redshift, cosmo=cosmo
+        )
+
+        light_curves = extract_light_curve_batch(
+            convolution_array=convolved_map,
+            pixel_size=pixel_size,
+            effective_transverse_velocity=effective_velocities[start:end],
+            light_curve_time_in_years=time_duration / (1 + source_redshift) / 365.25,
+            phi_travel_directions=velocity_angles[start:end],
+            random_seed=rng,
+        )
+        if lightcurve_type == "magnitude":
+            light_curves = -2.5 * np.log10(light_curves / np.abs(magmap.mu_ave))
+        samples = np.linspace(0, time_duration, light_curves.shape[1])
+        for i, light_curve in enumerate(light_curves, start=start):
+            lightcurves[i] = np.interp(time - time[0], samples, light_curve)
+
+    return group_id, indices, lightcurves
@@ -14,6 +14,195 @@ from slsim.Microlensing.magmap import MagnificationMap
 from slsim.Microlensing.lightcurve import MicrolensingLightCurve
 
 
+# CMB dipole from Planck (2018)
+_V_DIPOLE = 369.8  # km/s
+_DIPOLE_APEX_RA, _DIPOLE_APEX_DEC = 167.942, -6.944  # degrees
+
+# Kochanek04, sigma0 = 235 km/s
+_SIGMA0_PECULIAR = 235  # km/s
+
+# interpolation grids of distances and growth rates, one per cosmology
+_COSMOLOGY_GRIDS = {}
+
+
+def growth_rate(z, cosmo):
+    """Approximate linear growth rate of structure.
+
+    Lightman & Schechter 1990, Hamilton 2001: f = Omega_m**(4./7.) +
+    Omega_v*(1.+Omega_m/2.)/70.
+
+    :param z: redshift(s)
+    :param cosmo: astropy.cosmology instance
+    :return: growth rate f(z)
+    """
+    Omega_m = cosmo.Om(z)
+    Omega_v = cosmo.Ode(z)
+    return Omega_m ** (4.0 / 7.0) + Omega_v * (1.0 + Omega_m / 2.0) / 70.0
+
+
+def _unit_vectors(ra, dec):
+    """Cartesian unit vectors for arrays of sky positions.
+
+    :param ra: right ascension in degrees
+    :param dec: declination in degrees
+    :return: array of shape (len(ra), 3)
+    """
+    ra, dec = np.radians(ra), np.radians(dec)
+    return np.column_stack(
+        [np.cos(dec) * np.cos(ra), np.cos(dec) * np.sin(ra), np.sin(dec)]
+    )
+
+
+def cosmology_interpolation_grid(cosmo, z_max=10, num_z=2000):
+    """Comoving distances and peculiar velocity growth factors tabulated on a
+    redshift grid. The grid is computed once per cosmology and cached.
+
+    :param cosmo: astropy.cosmology instance
+    :param z_max: maximum redshift of the grid
+    :param num_z: number of grid points
+    :return: redshift grid, line-of-sight comoving distance in Mpc and
+        growth rate normalized to z = 0, f(z) / f(0)
+    :rtype: tuple
+    """
+    key = (repr(cosmo), z_max, num_z)
+    if key not in _COSMOLOGY_GRIDS:
+        z_grid = np.linspace(0, z_max, num_z)
+        comoving_distance = cosmo.comoving_distance(z_grid).to(u.Mpc).value
+        growth = growth_rate(z_grid, cosmo) / growth_rate(0, cosmo)
+        _COSMOLOGY_GRIDS[key] = (z_grid, comoving_distance, growth)
+    return _COSMOLOGY_GRIDS[key]
+
+
+def _transverse_comoving_distance(comoving_distance, cosmo):
+    """Transverse comoving distance from the line-of-sight comoving distance,
+    including spatial curvature.
+
+    :param comoving_distance: line-of-sight comoving distance in Mpc
+    :param cosmo: astropy.cosmology instance
+    :return: transverse comoving distance in Mpc
+    """
+    Ok0 = cosmo.Ok0
+    if Ok0 == 0:
+        return comoving_distance
+    hubble_distance = cosmo.hubble_distance.to(u.Mpc).value
+    sqrt_Ok0 = np.sqrt(np.abs(Ok0))
+    if Ok0 > 0:
+        return (
+            hubble_distance
+            / sqrt_Ok0
+            * np.sinh(sqrt_Ok0 * comoving_distance / hubble_distance)
+        )
+    return (
+        hubble_distance
+        / sqrt_Ok0
+        * np.sin(sqrt_Ok0 * comoving_distance / hubble_distance)
+    )
+
+
+def effective_transverse_velocities(
+    source_redshifts,
+    deflector_redshifts,
+    ra_lens,
+    dec_lens,
+    deflector_velocity_dispersions,
+    shear_phi_angle_images,
+    lens_indices,
+    cosmo,
+    random_seed=None,
+    magmap_reference_frame=True,
+    z_max=10,
+):
+    """Vectorized version of
+    MicrolensingLightCurveFromLensModel.effective_transverse_velocity_images
+    for all images of many lenses at once. Distances and growth rates are
+    interpolated from a grid computed once per cosmology.
+
+    :param source_redshifts: source redshift of each lens
+    :param deflector_redshifts: deflector redshift of each lens
+    :param ra_lens: Right Ascension of each lens in degrees
+    :param dec_lens: Declination of each lens in degrees
+    :param deflector_velocity_dispersions: velocity dispersion of each
+        deflector in km/s
+    :param shear_phi_angle_images: angle of the shear vector, w.r.t. the
+        x-axis of the image plane, in degrees for each image of all
+        lenses (flat array).
+    :param lens_indices: index of the lens each entry of
+        shear_phi_angle_images belongs to.
+    :param cosmo: astropy.cosmology instance
+    :param random_seed: seed or numpy Generator for the random peculiar
+        velocities.
+    :param magmap_reference_frame: whether to return the angles in the
+        reference frame of the magnification maps.
+    :param z_max: maximum redshift of the interpolation grid.
+    :return: effective transverse velocity in km/s and its angle in
+        degrees for each image.
+    :rtype: tuple
+    """
+    rng = np.random.default_rng(random_seed)
+    z_s = np.atleast_1d(np.asarray(source_redshifts, dtype=float))
+    z_l = np.atleast_1d(np.asarray(deflector_redshifts, dtype=float))
+    sig_star = np.atleast_1d(np.asarray(deflector_velocity_dispersions, dtype=float))
+    shear_phi = np.atleast_1d(np.asarray(shear_phi_angle_images, dtype=float))
+    lens_indices = np.atleast_1d(np.asarray(lens_indices, dtype=int))
+    num_lenses = len(z_s)
+
+    z_grid, comoving_distance_grid, growth_grid = cosmology_interpolation_grid(
+        cosmo, z_max=z_max
+    )
+    D_C_l = np.interp(z_l, z_grid, comoving_distance_grid)
+    D_C_s = np.interp(z_s, z_grid, comoving_distance_grid)
+    # angular-diameter distances
+    D_l = _transverse_comoving_distance(D_C_l, cosmo) / (1 + z_l)
+    D_s = _transverse_comoving_distance(D_C_s, cosmo) / (1 + z_s)
+    D_ls = _transverse_comoving_distance(D_C_s - D_C_l, cosmo) / (1 + z_s)
+
+    sig_l_pec = (
+        _SIGMA0_PECULIAR / (1 + z_l) ** 0.5 * np.interp(z_l, z_grid, growth_grid)
+    )
+    sig_s_pec = (
+        _SIGMA0_PECULIAR / (1 + z_s) ** 0.5 * np.interp(z_s, z_grid, growth_grid)
+    )
+    # effective combined pec.-velocity dispersion sigma_g (Eq.5)
+    sigma_g = np.sqrt(
+        (sig_l_pec / (1 + z_l) * D_s / D_l) ** 2 + (sig_s_pec / (1 + z_s)) ** 2
+    )
+
+    # line-of-sight unit vectors and orthonormal sky-plane bases e1, e2
+    u_los = _unit_vectors(ra_lens, dec_lens) * np.ones((num_lenses, 1))
+    e1 = np.cross(u_los, [0, 0, 1.0])
+    at_pole = np.all(np.isclose(e1, 0), axis=1)
+    e1[at_pole] = np.cross(u_los[at_pole], [0, 1.0, 0])
+    e1 /= np.linalg.norm(e1, axis=1)[:, np.newaxis]
+    e2 = np.cross(u_los, e1)
+    e2 /= np.linalg.norm(e2, axis=1)[:, np.newaxis]
+
+    # 1) observer's transverse velocity (Eq.6), in the (e1, e2) basis
+    v_cmb_vec = _V_DIPOLE * _unit_vectors(_DIPOLE_APEX_RA, _DIPOLE_APEX_DEC)[0]
+    v_o_scale = (D_ls / D_l) / (1 + z_l)
+    v_x = (e1 @ v_cmb_vec) * v_o_scale
+    v_y = (e2 @ v_cmb_vec) * v_o_scale
+
+    # 3) combined random "Gaussian" component v_g
+    phi = rng.uniform(0, 2 * np.pi, size=num_lenses)
+    v_g_mag = rng.normal(0, sigma_g)
+    v_x = v_x + np.cos(phi) * v_g_mag
+    v_y = v_y + np.sin(phi) * v_g_mag
+
+    # 5) lens-galaxy peculiar velocity v_* (Eq.3, 4), per image
+    theta = rng.uniform(0, 2 * np.pi, size=len(lens_indices))
+    v_star_scaled = (np.sqrt(2) * sig_star * (D_s / D_l) / (1 + z_l))[lens_indices]
+    v_e_x = v_x[lens_indices] - np.cos(theta) * v_star_scaled
+    v_e_y = v_y[lens_indices] - np.sin(theta) * v_star_scaled
+
+    # 7) magnitude and angle of the effective velocity in the source plane
+    effective_velocities = np.hypot(v_e_x, v_e_y)
+    effective_velocities_angles_deg = np.degrees(np.arctan2(v_e_y, v_e_x))
+    if magmap_reference_frame:
+        effective_velocities_angles_deg = effective_velocities_angles_deg - shear_phi
+
+    return effective_velocities, effective_velocities_angles_deg
+
+
 class MicrolensingLightCurveFromLensModel(object):
     """Class to generate microlensing lightcurves based on the microlensing
     parameters for each image of a source."""
@@ -453,27 +642,16 @@ class MicrolensingLightCurveFromLensModel(object):
 
         np.random.seed(random_seed)  # Set the random seed for reproducibility
 
-        #############################################
-        # Lightman & Schechter 1990, Hamilton 2001
-        # f = Omega_m**(4./7.) + Omega_v*(1.+Omega_m/2.)/70.
-        #############################################
-        def f_GrowthRate(z):
-            Omega_m = cosmo.Om(z)
-            Omega_v = cosmo.Ode(z)
-            return Omega_m ** (4.0 / 7.0) + Omega_v * (1.0 + Omega_m / 2.0) / 70.0
-
-        #############################################
-
         #############################################
         # Kochanek04
         # sigma0 = 235 km/s
         #############################################
         sigma0 = 235 * (u.km / u.s)
         sig_l_pec = (
-            sigma0 / (1 + z_l) ** 0.5 * f_GrowthRate(z_l) / f_GrowthRate(0)
+            sigma0 / (1 + z_l) ** 0.5 * growth_rate(z_l, cosmo) / growth_rate(0, cosmo)
         )  # σₗ,pec
         sig_s_pec = (
-            sigma0 / (1 + z_s) ** 0.5 * f_GrowthRate(z_s) / f_GrowthRate(0)
+            sigma0 / (1 + z_s) ** 0.5 * growth_rate(z_s, cosmo) / growth_rate(0, cosmo)
         )  # σₛ,pec
         #############################################
 
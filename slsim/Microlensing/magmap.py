@@ -1,5 +1,8 @@
 __author__ = "Paras Sharma"
 
+import json
+import os
+
 import numpy as np
 from astropy import units as u
 
@@ -26,11 +29,13 @@ class MagnificationMap(object):
         num_pixels_x: int = None,
         num_pixels_y: int = None,
         kwargs_IPM: dict = {},
+        dtype=None,
     ):
         """
         :param magnifications_array: array of magnifications to use. If None, a new
             magnification map will be generated based on the parameters
-            provided.
+            provided. Read-only and memory-mapped arrays (see from_file) are used
+            without copying.
         :param kappa_tot: total convergence
         :param shear: shear
         :param kappa_star: convergence in point mass lenses/stars.
@@ -46,9 +51,13 @@ class MagnificationMap(object):
         :param num_pixels_x: number of pixels for the x axis
         :param num_pixels_y: number of pixels for the y axis
         :param kwargs_IPM: additional keyword arguments to pass to the IPM class.
+        :param dtype: data type in which the magnifications are stored, e.g. np.float32
+            to halve the memory footprint. Default is None, which keeps the data type
+            of the magnifications.
         """
 
         # Private attributes
+        self._dtype = dtype
         self._kappa_tot = kappa_tot
         self._shear = shear
         self._kappa_star = kappa_star
@@ -76,7 +85,7 @@ class MagnificationMap(object):
             self._m_upper = 100
 
         if magnifications_array is not None:
-            self.magnifications = magnifications_array  # TODO: make it so that the magnification map is not generated again, is stored in cache!
+            self.magnifications = magnifications_array
         else:
             try:
                 # Credits: Luke's Microlensing code - https://github.com/weisluke/microlensing
@@ -115,6 +124,19 @@ class MagnificationMap(object):
                 self._microlensing_IPM.magnifications
             )  # based on updated IPM class
 
+    @property
+    def magnifications(self):
+        """Returns the 2D array of magnifications."""
+        return self._magnifications
+
+    @magnifications.setter
+    def magnifications(self, magnifications_array):
+        """Sets the magnifications, casting them to the requested data type
+        (without a copy if they already have it), and resets the cached
+        magnitudes."""
+        self._magnifications = np.asanyarray(magnifications_array, dtype=self._dtype)
+        self._magnitudes = None
+
     @property
     def mu_ave(self):
         """Returns the average (macro) magnification of the magnification
@@ -160,8 +182,82 @@ class MagnificationMap(object):
     @property
     def magnitudes(self):
         """Returns the magnitudes of the magnification map normalized by the
-        average magnification."""
-        return -2.5 * np.log10(self.magnifications / np.abs(self.mu_ave))
+        average magnification.
+
+        They are computed on first access, in the data type of the
+        magnifications, and cached.
+        """
+        if self._magnitudes is None:
+            self._magnitudes = -2.5 * np.log10(
+                self.magnifications / np.abs(self.mu_ave)
+            )
+        return self._magnitudes
+
+    def to_file(self, filename, dtype=None):
+        """Saves the magnifications to a .npy file and the map parameters to a
+        .json file next to it, so that the map can be loaded (memory-mapped)
+        with from_file.
+
+        :param filename: path of the .npy file.
+        :param dtype: data type in which to store the magnifications.
+            Default is None, which keeps the data type of the
+            magnifications.
+        :return: path of the .npy file.
+        """
+        filename = _npy_filename(filename)
+        np.save(filename, np.asarray(self.magnifications, dtype=dtype))
+        with open(_json_filename(filename), "w") as f:
+            # numpy scalars are stored as plain python numbers
+            json.dump(self._parameters(), f, default=lambda value: value.item())
+        return filename
+
+    @classmethod
+    def from_file(cls, filename, mmap_mode="r", dtype=None, **kwargs):
+        """Loads a magnification map saved with to_file. By default, the
+        magnifications are memory-mapped read-only, so that they are only read
+        from disk on access and the pages are shared between processes.
+
+        :param filename: path of the .npy file.
+        :param mmap_mode: memory-map mode passed to numpy.load. Use None
+            to read the magnifications into memory.
+        :param dtype: data type of the magnifications. Default is None,
+            which keeps the stored data type. A different data type
+            requires a copy in memory.
+        :param kwargs: parameters of the MagnificationMap that override
+            the ones stored next to the magnifications.
+        :return: MagnificationMap instance
+        """
+        filename = _npy_filename(filename)
+        parameters = {}
+        if os.path.exists(_json_filename(filename)):
+            with open(_json_filename(filename)) as f:
+                parameters = json.load(f)
+        parameters.update(kwargs)
+        magnifications = np.load(filename, mmap_mode=mmap_mode)
+        return cls(magnifications_array=magnifications, dtype=dtype, **parameters)
+
+    def _parameters(self):
+        """Returns the parameters needed to reconstruct the map from its
+        magnifications.
+
+        :return: dictionary of MagnificationMap keyword arguments
+        """
+        return {
+            "kappa_tot": self._kappa_tot,
+            "shear": self._shear,
+            "kappa_star": self._kappa_star,
+            "theta_star": self.theta_star,
+            "mass_function": self._mass_function,
+            "m_solar": self._m_solar,
+            "m_lower": self._m_lower,
+            "m_upper": self._m_upper,
+            "center_x": self.center_x,
+            "center_y": self.center_y,
+            "half_length_x": self.half_length_x,
+            "half_length_y": self.half_length_y,
+            "num_pixels_x": self.num_pixels_x,
+            "num_pixels_y": self.num_pixels_y,
+        }
 
     def get_pixel_size_meters(self, source_redshift, cosmo):
         """Returns the pixel size in meters.
@@ -178,3 +274,16 @@ class MagnificationMap(object):
         )
 
         return pixel_size_meters.value
+
+
+def _npy_filename(filename):
+    """Appends the .npy extension if needed, as numpy.save does."""
+    filename = str(filename)
+    if not filename.endswith(".npy"):
+        filename += ".npy"
+    return filename
+
+
+def _json_filename(npy_filename):
+    """Returns the path of the parameter file of a saved map."""
+    return npy_filename[: -len(".npy")] + ".json"
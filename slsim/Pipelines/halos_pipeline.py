@@ -1,8 +1,17 @@
 import os
+import numpy as np
+from astropy import units
+from astropy.table import Table
 from skypy.pipeline import Pipeline
 import slsim
 import tempfile
 import slsim.Util.param_util as util
+from slsim.Halos.halos import (
+    halos_from_mass_function_table,
+    redshift_mass_sheet_correction_array_from_comoving_density,
+    expected_mass_at_redshift,
+    kappa_ext_for_each_sheet,
+)
 
 
 class HalosSkyPyPipeline:
@@ -19,6 +28,8 @@ class HalosSkyPyPipeline:
         sigma_8=0.81,
         n_s=0.96,
         omega_m=None,
+        use_skypy=True,
+        random_seed=None,
     ):
         """Initialize the class with the given parameters.
 
@@ -40,7 +51,42 @@ class HalosSkyPyPipeline:
         :param n_s: Spectral index, defaults to 0.96 if not specified.
         :param omega_m: Omega_m in Cosnmology, defaults to none which will lead to the same
             in Cosmology setting.
+        :param use_skypy: If False, the SkyPy pipeline is bypassed and all halos are drawn
+            in one pass from a cached halo mass function table, see
+            `slsim.Halos.halos.halos_from_mass_function_table`. The mass sheet correction
+            is computed with the same functions and settings as in the default
+            configuration file, which can then not be replaced.
+        :type use_skypy: bool, optional
+        :param random_seed: Seed or numpy.random.Generator for the halos. With
+            `use_skypy`, SkyPy draws from the global numpy random state, which is then
+            seeded with this integer seed before the pipeline is executed.
+        :type random_seed: int or numpy.random.Generator, optional
         """
+        if not use_skypy:
+            if skypy_config is not None:
+                raise ValueError(
+                    "A SkyPy configuration file can only be used with use_skypy=True."
+                )
+            self._sample_without_skypy(
+                sky_area=0.0001 if sky_area is None else sky_area,
+                m_min=1.0e12 if m_min is None else m_min,
+                m_max=1.0e16 if m_max is None else m_max,
+                z_max=5.0 if z_max is None else z_max,
+                cosmo=cosmo,
+                sigma_8=sigma_8,
+                n_s=n_s,
+                omega_m=omega_m,
+                random_seed=random_seed,
+            )
+            return
+
+        if random_seed is not None:
+            if isinstance(random_seed, np.random.Generator):
+                raise ValueError(
+                    "The SkyPy pipeline draws from the global numpy random state, "
+                    "use an integer random_seed or use_skypy=False."
+                )
+            np.random.seed(random_seed)
 
         path = os.path.dirname(slsim.__file__)
         module_path, _ = os.path.split(path)
@@ -109,6 +155,57 @@ class HalosSkyPyPipeline:
             # Remove the temporary file after the pipeline has been executed
             os.remove(tmp_file.name)
 
+    def _sample_without_skypy(
+        self, sky_area, m_min, m_max, z_max, cosmo, sigma_8, n_s, omega_m, random_seed
+    ):
+        """Computes the halos and mass sheet correction tables of the default
+        configuration file without SkyPy.
+
+        The parameters are those of the class, with defaults applied.
+        """
+        if cosmo is None:
+            from astropy.cosmology import default_cosmology
+
+            cosmo = default_cosmology.get()
+        sky_area = sky_area * units.deg**2
+        halos = halos_from_mass_function_table(
+            sky_area=sky_area,
+            cosmology=cosmo,
+            m_min=m_min,
+            m_max=m_max,
+            z_max=z_max,
+            resolution=500,
+            sigma8=sigma_8,
+            ns=n_s,
+            omega_m=omega_m,
+            random_seed=random_seed,
+        )
+        z_sheets = redshift_mass_sheet_correction_array_from_comoving_density(
+            np.linspace(0, z_max, 100)
+        )
+        first_moment = expected_mass_at_redshift(
+            z=z_sheets,
+            sky_area=sky_area,
+            cosmology=cosmo,
+            m_min=m_min,
+            m_max=m_max,
+            resolution=200,
+            sigma8=sigma_8,
+            ns=n_s,
+            omega_m=omega_m,
+        )
+        kappa = kappa_ext_for_each_sheet(
+            redshift_list=z_sheets,
+            first_moment=first_moment,
+            sky_area=sky_area,
+            cosmology=cosmo,
+            z_sigma_crit_source=z_max,
+        )
+        self._pipeline = {
+            "halos": halos,
+            "mass_sheet_correction": Table([z_sheets, kappa], names=("z", "kappa")),
+        }
+
     @property
     def halos(self):
         """SkyPy pipeline for Halos.
@@ -1,8 +1,88 @@
+import hashlib
 import os
+import numpy as np
+import skypy
+from astropy.table import Table, vstack
 from skypy.pipeline import Pipeline
 import slsim
 import tempfile
 import slsim.Util.param_util as util
+from slsim.Halos.halos_util import starmap_in_chunks
+
+# galaxy tables of the SkyPy configurations which are kept by SkyPyPipeline
+_GALAXY_TABLES = ("blue", "red")
+
+
+def skypy_galaxy_tables(content, random_seed=None):
+    """Runs a SkyPy pipeline and returns its blue and red galaxy tables.
+
+    :param content: content of a SkyPy configuration yaml file
+    :type content: str
+    :param random_seed: seed of the numpy random state of SkyPy. If None,
+        the random state is not reset.
+    :type random_seed: int or None
+    :return: blue and red galaxy tables
+    :rtype: dict of `~astropy.table.Table`
+    """
+    if random_seed is not None:
+        np.random.seed(random_seed)
+    with tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".yml") as tmp_file:
+        tmp_file.write(content)
+    try:
+        pipeline = Pipeline.read(tmp_file.name)
+        pipeline.execute()
+    finally:
+        # Remove the temporary file after the pipeline has been executed
+        os.remove(tmp_file.name)
+    return {name: pipeline[name] for name in _GALAXY_TABLES}
+
+
+def skypy_galaxy_tables_in_tiles(
+    content, sky_area, num_tiles, processes=None, random_seed=None
+):
+    """Runs a SkyPy pipeline in independent tiles of equal area and stacks
+    their blue and red galaxy tables. The galaxy numbers of the tiles are
+    independent Poisson draws, so that the stacked catalog has the statistics
+    of a single run over the whole sky area. Each run has a fixed cost of
+    several seconds for the magnitude grids of SkyPy, so the tiles should be
+    large compared to the area simulated in that time.
+
+    :param content: content of a SkyPy configuration yaml file with
+        "fsky: 0.1 deg2"
+    :type content: str
+    :param sky_area: total sky area. Must be in units of solid angle.
+    :type sky_area: `~astropy.units.Quantity`
+    :param num_tiles: number of tiles
+    :type num_tiles: int
+    :param processes: number of worker processes. If 1, the tiles are run
+        in this process. Defaults to the number of CPUs.
+    :type processes: int or None
+    :param random_seed: seed of the tiles. Each tile is run with its own
+        seed spawned from it.
+    :type random_seed: int or None
+    :return: blue and red galaxy tables
+    :rtype: dict of `~astropy.table.Table`
+    """
+    if "fsky: 0.1 deg2" not in content:
+        raise ValueError(
+            "The SkyPy configuration needs 'fsky: 0.1 deg2' to be split into tiles."
+        )
+    tile_area = sky_area / num_tiles
+    content = content.replace(
+        "fsky: 0.1 deg2", f"fsky: {tile_area.value} {tile_area.unit}"
+    )
+    seeds = np.random.SeedSequence(random_seed).spawn(num_tiles)
+    args = [(content, int(seed.generate_state(1)[0])) for seed in seeds]
+    if processes == 1 or num_tiles == 1:
+        tiles = [skypy_galaxy_tables(*arg) for arg in args]
+    else:
+        tiles = starmap_in_chunks(
+            skypy_galaxy_tables, args, processes=processes, chunk_size=1
+        )
+    return {
+        name: vstack([tile[name] for tile in tiles], metadata_conflicts="silent")
+        for name in _GALAXY_TABLES
+    }
 
 
 class SkyPyPipeline:
@@ -16,6 +96,10 @@ class SkyPyPipeline:
         cosmo=None,
         z_min=None,
         z_max=None,
+        tile_area=None,
+        processes=None,
+        random_seed=None,
+        cache_dir=None,
     ):
         """
         :param skypy_config: path to SkyPy configuration yaml file.
@@ -35,7 +119,29 @@ class SkyPyPipeline:
          If one passes u-band filter, z_max should be <= 4.09 to avoid
          issues with skypy SED templates.
         :type z_max: float or None
+        :param tile_area: If given together with sky_area, the sky area is
+         split into tiles of at most this area which are simulated
+         independently in a process pool, see `skypy_galaxy_tables_in_tiles`.
+        :type tile_area: `~astropy.units.Quantity` or None
+        :param processes: number of worker processes of the tiles.
+         Defaults to the number of CPUs.
+        :type processes: int or None
+        :param random_seed: seed of the galaxy catalog. If None, the catalog
+         is drawn from the current numpy random state, or from fresh
+         entropy if it is split into tiles.
+        :type random_seed: int or None
+        :param cache_dir: If given, the blue and red galaxy tables are read
+         from or written to FITS files in this directory, keyed by a hash of
+         the configuration (including cosmology, filters, redshift range and
+         sky area), the tiling and the seed. Repeated runs with the same
+         parameters then return the same catalog. Requires random_seed, as
+         a catalog without a seed is a new random draw on every run.
+        :type cache_dir: str or None
         """
+        if cache_dir is not None and random_seed is None:
+            raise ValueError(
+                "A random_seed is required to cache the galaxy catalog in cache_dir."
+            )
         path = os.path.dirname(slsim.__file__)
         module_path, _ = os.path.split(path)
         if skypy_config is None:
@@ -47,50 +153,65 @@ class SkyPyPipeline:
         else:
             skypy_config = skypy_config
 
-        if sky_area is None and filters is None and cosmo is None and z_min is None:
-            self._pipeline = Pipeline.read(skypy_config)
-            self._pipeline.execute()
+        with open(skypy_config, "r") as file:
+            content = file.read()
+
+        if z_min is not None and z_max is not None:
+            old_zrange = "!numpy.arange [0.0, 5.01, 0.01]"
+            new_zrange = f"!numpy.arange [{z_min}, {z_max}, {0.01}]"
+            content = content.replace(old_zrange, new_zrange)
+
+        if filters is not None:
+            filters_mag = [f"mag_{f}" for f in filters]
+            old_filter_name = "mag_g, mag_r, mag_i, mag_z, mag_y"
+            new_filters_name = f"{filters_mag}".strip("[]").replace("'", "")
+            old_filters = "filters: ['lsst2016-g', 'lsst2016-r', 'lsst2016-i', 'lsst2016-z', 'lsst2016-y']"
+
+            new_filters = [f.replace("mag_", "lsst2016-") for f in filters_mag]
+            new_filters = f"filters: {new_filters}"
+
+            content = content.replace(old_filters, new_filters)
+            content = content.replace(old_filter_name, new_filters_name)
+
+        content = util.update_cosmology_in_yaml_file(cosmo=cosmo, yml_file=content)
+
+        num_tiles = 1
+        if sky_area is not None and tile_area is not None:
+            num_tiles = max(1, int(np.ceil((sky_area / tile_area).decompose().value)))
+
+        cache_files = None
+        if cache_dir is not None:
+            key = repr((content, str(sky_area), num_tiles, random_seed))
+            key = hashlib.sha1((key + skypy.__version__).encode()).hexdigest()
+            cache_files = {
+                name: os.path.join(cache_dir, f"skypy_{key}_{name}.fits")
+                for name in _GALAXY_TABLES
+            }
+            if all(os.path.exists(file) for file in cache_files.values()):
+                self._pipeline = {
+                    name: Table.read(file) for name, file in cache_files.items()
+                }
+                return
+
+        if num_tiles > 1:
+            self._pipeline = skypy_galaxy_tables_in_tiles(
+                content,
+                sky_area=sky_area,
+                num_tiles=num_tiles,
+                processes=processes,
+                random_seed=random_seed,
+            )
         else:
-            with open(skypy_config, "r") as file:
-                content = file.read()
-
             if sky_area is not None:
                 old_fsky = "fsky: 0.1 deg2"
                 new_fsky = f"fsky: {sky_area.value} {sky_area.unit}"
                 content = content.replace(old_fsky, new_fsky)
-            if z_min is not None and z_max is not None:
-                old_zrange = "!numpy.arange [0.0, 5.01, 0.01]"
-                new_zrange = f"!numpy.arange [{z_min}, {z_max}, {0.01}]"
-                content = content.replace(old_zrange, new_zrange)
-
-            if filters is not None:
-                filters_mag = [f"mag_{f}" for f in filters]
-                old_filter_name = "mag_g, mag_r, mag_i, mag_z, mag_y"
-                new_filters_name = f"{filters_mag}".strip("[]").replace("'", "")
-                old_filters = "filters: ['lsst2016-g', 'lsst2016-r', 'lsst2016-i', 'lsst2016-z', 'lsst2016-y']"
-
-                new_filters = [f.replace("mag_", "lsst2016-") for f in filters_mag]
-                new_filters = f"filters: {new_filters}"
-
-                content = content.replace(old_filters, new_filters)
-                content = content.replace(old_filter_name, new_filters_name)
-
-            content = util.update_cosmology_in_yaml_file(cosmo=cosmo, yml_file=content)
-
-            with tempfile.NamedTemporaryFile(
-                mode="w", delete=False, suffix=".yml"
-            ) as tmp_file:
-                tmp_file.write(content)
-
-            self._pipeline = Pipeline.read(tmp_file.name)
-            self._pipeline.execute()
-
-            # Remove the temporary file after the pipeline has been executed
-            os.remove(tmp_file.name)
-        # TODO: note that the f_sky can not be set to large. Need to figure out
-        #  how to do this properly
+            self._pipeline = skypy_galaxy_tables(content, random_seed=random_seed)
 
-        # TODO: make filters work
+        if cache_files is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            for name, file in cache_files.items():
+                self._pipeline[name].write(file, overwrite=True)
 
     @property
     def blue_galaxies(self):
@@ -10,6 +10,9 @@ import slsim.Util.param_util as util
 import tempfile
 from skypy.pipeline import Pipeline
 
+# number of (z, M) grid points of the halo mass function evaluated at once
+_GRID_BLOCK_SIZE = 2000000
+
 
 class SLHammocksPipeline:
     """SLHammocksPipeline is a class that generate galaxy populations using a
@@ -200,16 +203,21 @@ def table_translator_for_slsim(table, cosmo):
         angular_size_in_arcsec = table["tb"] / 0.551
         table.add_column(angular_size_in_arcsec, name="angular_size")
 
-    M200_array, r200_array, c200_array = zip(
-        *[
-            mass_defs.changeMassDefinition(Mvir, cvir, z, "vir", "200c")
-            for Mvir, cvir, z in zip(
-                table["halo_mass"], table["concentration"], table["z"]
-            )
-        ]
-    )
-    M200_array = np.array(M200_array)
-    c200_array = np.array(c200_array)
+    # the mass definition is changed for all halos at the same redshift at once
+    halo_mass = np.asarray(table["halo_mass"], dtype=float)
+    concentration = np.asarray(table["concentration"], dtype=float)
+    order = np.argsort(np.asarray(table["z"]), kind="stable")
+    z_unique, first = np.unique(np.asarray(table["z"])[order], return_index=True)
+    offsets = np.append(first, len(table))
+    M200_array = np.empty(len(table))
+    c200_array = np.empty(len(table))
+    for i, z in enumerate(z_unique):
+        select = order[offsets[i] : offsets[i + 1]]
+        M200, _, c200 = mass_defs.changeMassDefinition(
+            halo_mass[select], concentration[select], z, "vir", "200c"
+        )
+        M200_array[select] = M200
+        c200_array[select] = c200
 
     hubble = cosmo_col.H0 / 100.0
     table["halo_mass"] = (
@@ -311,8 +319,6 @@ def halo_galaxy_population(
     dlnMh = np.log(10**dlogMh)
     # cosmological parameters
     area = sky_area.value
-    halo_gal_pop_array = np.array([])
-    halo_gal_pop_array = np.empty((0, 10), float)
     zz = np.arange(z_min, z_max + dz, dz)
     Mh_min = 10**log10host_halo_mass_min
     Mh_max = 10**log10host_halo_mass_max
@@ -322,57 +328,70 @@ def halo_galaxy_population(
     sig_mcen = sigma_central_galaxy_mass
     cosmo_col = cosmology.fromAstropy(cosmo, sigma8, ns, cosmo_name="my_cosmo")
     cosmo_col.Tcmb0 = 2.725
+    hubble = cosmo_col.H0 / 100.0
 
-    for z in zz:
-        zz2 = np.full(len(MMh), z)
-        NNh = area * halo_population.dNhalodzdlnM_lens(MMh, zz2, cosmo_col) * dlnMh * dz
-        Nh = np.random.poisson(NNh)
-        indices = np.nonzero(Nh)[0]
-        if len(indices) == 0:
-            continue
-
-        zl_tab = np.repeat(zz2[indices], Nh[indices])
-        Mhosthl_tab = np.repeat(MMh[indices], Nh[indices])
-        conhl_tab = halo_population.concent_m_w_scatter(Mhosthl_tab, z, sig_c)
-        # in physical [Mpc/h]
-        eliphl_tab, polarhl_tab = halo_population.gene_e_ang_halo(Mhosthl_tab)
-
-        # mshsat_tot = 0
-        Mhosthl_tab_re = Mhosthl_tab
-        hubble = cosmo_col.H0 / 100.0
-
-        Mcenl_ave = galaxy_population.stellarmass_halomass(
-            Mhosthl_tab_re / (hubble), zl_tab, paramc, frac_SM_IMF
-        ) * (hubble)
-        Mcenl_scat = np.random.lognormal(0.0, sig_mcen, size=Mhosthl_tab_re.shape)
-        Mcenl_tab = Mcenl_ave * Mcenl_scat
-
-        elipcenl, polarcenl = galaxy_population.set_gals_param(polarhl_tab)
-        tb_cen = galaxy_population.galaxy_size(
-            Mhosthl_tab_re,
-            Mcenl_tab / frac_SM_IMF,
-            zl_tab,
-            cosmo_col,
-            model=TYPE_GAL_SIZE,
-            scatter=True,
-            sig_tb=sig_tb,
+    # Poisson numbers of halos on the (z, M) grid, in blocks of redshifts to
+    # bound the memory of the grid
+    z_step = max(1, _GRID_BLOCK_SIZE // len(MMh))
+    z_indices, m_indices, numbers = [], [], []
+    for i in range(0, len(zz), z_step):
+        NNh = (
+            area
+            * halo_population.dNhalodzdlnM_lens_grid(MMh, zz[i : i + z_step], cosmo_col)
+            * dlnMh
+            * dz
         )
-        halogal_par_mat = np.hstack(
-            (
-                zl_tab.reshape(-1, 1),
-                Mhosthl_tab_re.reshape(-1, 1),
-                np.zeros_like(Mhosthl_tab).reshape(-1, 1),
-                eliphl_tab.reshape(-1, 1),
-                polarhl_tab.reshape(-1, 1),
-                conhl_tab.reshape(-1, 1),
-                Mcenl_tab.reshape(-1, 1),
-                elipcenl.reshape(-1, 1),
-                polarcenl.reshape(-1, 1),
-                tb_cen.reshape(-1, 1),
-            )
+        Nh = np.random.poisson(NNh)
+        z_index, m_index = np.nonzero(Nh)
+        z_indices.append(z_index + i)
+        m_indices.append(m_index)
+        numbers.append(Nh[z_index, m_index])
+    z_indices = np.concatenate(z_indices)
+    m_indices = np.concatenate(m_indices)
+    numbers = np.concatenate(numbers)
+
+    zl_tab = np.repeat(zz[z_indices], numbers)
+    Mhosthl_tab = np.repeat(MMh[m_indices], numbers)
+    if len(Mhosthl_tab) == 0:
+        conhl_tab = np.empty(0)
+    else:
+        conhl_tab = halo_population.concent_m_w_scatter_vectorized(
+            Mhosthl_tab, zl_tab, sig_c
         )
-
-        halo_gal_pop_array = np.append(halo_gal_pop_array, halogal_par_mat, axis=0)
+    # in physical [Mpc/h]
+    eliphl_tab, polarhl_tab = halo_population.gene_e_ang_halo(Mhosthl_tab)
+
+    Mcenl_ave = galaxy_population.stellarmass_halomass(
+        Mhosthl_tab / (hubble), zl_tab, paramc, frac_SM_IMF
+    ) * (hubble)
+    Mcenl_scat = np.random.lognormal(0.0, sig_mcen, size=Mhosthl_tab.shape)
+    Mcenl_tab = Mcenl_ave * Mcenl_scat
+
+    elipcenl, polarcenl = galaxy_population.set_gals_param(polarhl_tab)
+    tb_cen = galaxy_population.galaxy_size(
+        Mhosthl_tab,
+        Mcenl_tab / frac_SM_IMF,
+        zl_tab,
+        cosmo_col,
+        model=TYPE_GAL_SIZE,
+        scatter=True,
+        sig_tb=sig_tb,
+    )
+    halo_gal_pop_array = np.stack(
+        (
+            zl_tab,
+            Mhosthl_tab,
+            np.zeros_like(Mhosthl_tab),
+            eliphl_tab,
+            polarhl_tab,
+            conhl_tab,
+            Mcenl_tab,
+            elipcenl,
+            polarcenl,
+            tb_cen,
+        ),
+        axis=1,
+    )
 
     columns_pop = [
         "z",
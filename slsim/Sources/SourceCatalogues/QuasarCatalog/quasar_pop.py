@@ -41,6 +41,7 @@ class QuasarRate(object):
         noise: bool = True,
         redshifts: np.ndarray = None,
         host_galaxy_candidate: Table = None,
+        analytic_vel_disp: bool = False,
     ):
         """Initializes the QuasarRate class with given parameters.
 
@@ -76,6 +77,10 @@ class QuasarRate(object):
          is used to match with the supernova population. If None, the galaxy catalog is
          generated within this class.
         :type host_galaxy_candidate: `~astropy.table.Table`
+        :param analytic_vel_disp: If True, the velocity dispersions of the host
+         galaxies are abundance matched analytically, see
+         `vel_disp_abundance_matching`.
+        :type analytic_vel_disp: bool
         """
         self.zeta = zeta
         self.xi = xi
@@ -93,6 +98,7 @@ class QuasarRate(object):
             np.array(redshifts) if redshifts is not None else np.linspace(0.1, 5.0, 100)
         )
         self.host_galaxy_candidate = host_galaxy_candidate
+        self.analytic_vel_disp = analytic_vel_disp
 
         # Construct the dynamic path to the data file
         base_path = Path(os.path.dirname(__file__))
@@ -405,6 +411,7 @@ class QuasarRate(object):
                     z_max=0.5,
                     sky_area=self.sky_area,
                     cosmo=self.cosmo,
+                    analytic=self.analytic_vel_disp,
                 )
                 host_galaxy_catalog["vel_disp"] = self._f_vel_disp(
                     np.log10(host_galaxy_catalog["stellar_mass"])
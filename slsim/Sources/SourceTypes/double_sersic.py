@@ -7,6 +7,19 @@ from slsim.Util.param_util import surface_brightness_reff
 class DoubleSersic(SourceBase):
     """Class to manage source with double sersic light profile."""
 
+    _init_keys = SourceBase._init_keys + (
+        "angular_size_0",
+        "angular_size_1",
+        "n_sersic_0",
+        "n_sersic_1",
+        "w0",
+        "w1",
+        "e1_1",
+        "e2_1",
+        "e1_2",
+        "e2_2",
+    )
+
     def __init__(
         self,
         angular_size_0,
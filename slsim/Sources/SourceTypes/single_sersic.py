@@ -6,6 +6,8 @@ from slsim.Util.param_util import surface_brightness_reff
 class SingleSersic(SourceBase):
     """Class to manage source with single sersic light profile."""
 
+    _init_keys = SourceBase._init_keys + ("n_sersic",)
+
     def __init__(self, angular_size, n_sersic, e1=0, e2=0, **source_dict):
         """
 
@@ -2,12 +2,28 @@ from abc import ABC
 import numpy as np
 from slsim.Util import param_util
 from slsim.Sources.SourceVariability.variability import Variability
+from slsim.Util.column_view import ColumnView
 
 
 class SourceBase(ABC):
     """Class of a single source with quantities only related to the source
     (independent of the deflector)"""
 
+    _init_keys = (
+        "z",
+        "lensed",
+        "center_x",
+        "center_y",
+        "ra_off",
+        "dec_off",
+        "angular_size",
+        "e1",
+        "e2",
+        "cosmo",
+        "variability_model",
+        "kwargs_variability_model",
+    )
+
     def __init__(
         self,
         z,
@@ -89,6 +105,49 @@ class SourceBase(ABC):
         self._e1, self._e2 = e1, e2
         self._cosmo = cosmo
 
+    @classmethod
+    def from_columns(cls, columns, index, names=None, **kwargs):
+        """Source of one row of shared column arrays. Only the arguments of
+        __init__ are read from the row, the source dictionary is a `ColumnView`
+        of the row instead of a copy.
+
+        :param columns: arrays by parameter name
+        :type columns: dict
+        :param index: row index
+        :type index: int
+        :param names: names of the source dictionary, see
+            `dictionary_names`. Pass them to share them among the sources
+            of the same columns.
+        :type names: tuple or None
+        :param kwargs: additional source properties shared by all rows,
+            e.g. the cosmology
+        :return: source instance
+        """
+        if names is None:
+            names = cls.dictionary_names(columns)
+        init_kwargs = {
+            name: columns[name][index] for name in cls._init_keys if name in columns
+        }
+        init_kwargs.update(kwargs)
+        source = cls(**init_kwargs)
+        source_dict = ColumnView(columns, index, names)
+        for name, value in source.source_dict.items():
+            source_dict[name] = value
+        source.source_dict = source_dict
+        return source
+
+    @classmethod
+    def dictionary_names(cls, columns):
+        """Names of the columns kept in the source dictionary, i.e. the columns
+        which are not arguments of __init__.
+
+        :param columns: arrays by parameter name
+        :type columns: dict
+        :return: names
+        :rtype: tuple
+        """
+        return tuple(name for name in columns if name not in cls._init_keys)
+
     @property
     def redshift(self):
         """Returns source redshift."""
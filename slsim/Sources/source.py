@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from slsim.Sources.SourceTypes.point_plus_extended_source import PointPlusExtendedSource
 
 _SUPPORTED_POINT_SOURCES = ["supernova", "quasar", "general_lightcurve"]
@@ -7,6 +9,53 @@ _SUPPORTED_EXTENDED_SOURCES = [
     "catalog_source",
     "interpolated",
 ]
+_COLUMN_SOURCES = ["single_sersic", "double_sersic"]
+
+
+@lru_cache(maxsize=None)
+def _source_class(source_type):
+    """Class of a point or extended source type. The source type modules are
+    imported on first use.
+
+    :param source_type: point or extended source type
+    :type source_type: str
+    :return: source class
+    """
+    # point sources
+    if source_type == "supernova":
+        from slsim.Sources.SourceTypes.supernova_event import SupernovaEvent
+
+        return SupernovaEvent
+    elif source_type == "quasar":
+        from slsim.Sources.SourceTypes.quasar import Quasar
+
+        return Quasar
+    elif source_type == "general_lightcurve":
+        from slsim.Sources.SourceTypes.general_lightcurve import GeneralLightCurve
+
+        return GeneralLightCurve
+
+    # extended sources
+    elif source_type == "single_sersic":
+        from slsim.Sources.SourceTypes.single_sersic import SingleSersic
+
+        return SingleSersic
+    elif source_type == "double_sersic":
+        from slsim.Sources.SourceTypes.double_sersic import DoubleSersic
+
+        return DoubleSersic
+    elif source_type == "catalog_source":
+        from slsim.Sources.SourceTypes.catalog_source import CatalogSource
+
+        return CatalogSource
+    elif source_type == "interpolated":
+        from slsim.Sources.SourceTypes.interpolated_image import Interpolated
+
+        return Interpolated
+    raise ValueError(
+        "source type %s not supported. Chose among %s for extended sources and %s for point sources."
+        % (source_type, _SUPPORTED_EXTENDED_SOURCES, _SUPPORTED_POINT_SOURCES)
+    )
 
 
 class Source(object):
@@ -47,50 +96,50 @@ class Source(object):
                 "either extended_source_type or point_source_type needs to be set."
             )
 
-        # point sources
-        if source_type in ["supernova"]:
-            from slsim.Sources.SourceTypes.supernova_event import SupernovaEvent
-
-            self._source = SupernovaEvent(**source_dict)
-        elif source_type in ["quasar"]:
-            from slsim.Sources.SourceTypes.quasar import Quasar
-
-            self._source = Quasar(**source_dict)
-        elif source_type in ["general_lightcurve"]:
-            from slsim.Sources.SourceTypes.general_lightcurve import GeneralLightCurve
-
-            self._source = GeneralLightCurve(**source_dict)
-
-        # extended sources
-        elif source_type in ["single_sersic"]:
-            from slsim.Sources.SourceTypes.single_sersic import SingleSersic
-
-            self._source = SingleSersic(**source_dict)
-        elif source_type in ["double_sersic"]:
-            from slsim.Sources.SourceTypes.double_sersic import DoubleSersic
-
-            self._source = DoubleSersic(**source_dict)
-        elif source_type in ["catalog_source"]:
-            from slsim.Sources.SourceTypes.catalog_source import CatalogSource
-
-            self._source = CatalogSource(**source_dict)
-        elif source_type in ["interpolated"]:
-            from slsim.Sources.SourceTypes.interpolated_image import Interpolated
-
-            self._source = Interpolated(**source_dict)
-
-        # point source plus extended source
-        elif source_type in ["point_plus_extended"]:
+        if source_type == "point_plus_extended":
             self._source = PointPlusExtendedSource(
                 extended_source_type=extended_source_type,
                 point_source_type=point_source_type,
                 **source_dict,
             )
         else:
+            self._source = _source_class(source_type)(**source_dict)
+
+    @classmethod
+    def from_arrays(cls, columns, indices=None, extended_source_type=None, **kwargs):
+        """Extended sources of rows of shared column arrays, e.g. of a source
+        population. The source dictionary of each source is a `ColumnView` of
+        its row, so that no source dictionary is copied and no table row is
+        materialized. The source type is resolved once for all sources.
+
+        :param columns: arrays by parameter name
+        :type columns: dict
+        :param indices: row indices of the sources, by default all rows
+        :type indices: iterable of int or None
+        :param extended_source_type: type of the extended sources, i.e.
+            "single_sersic" or "double_sersic"
+        :type extended_source_type: str
+        :param kwargs: additional source properties shared by all
+            sources, e.g. the cosmology
+        :return: list of Source instances
+        """
+        if extended_source_type not in _COLUMN_SOURCES:
             raise ValueError(
-                "source type %s not supported. Chose among %s for extended sources and %s for point sources."
-                % (source_type, _SUPPORTED_EXTENDED_SOURCES, _SUPPORTED_POINT_SOURCES)
+                "Extended source type %s not supported from arrays. Chose among %s."
+                % (extended_source_type, _COLUMN_SOURCES)
             )
+        source_class = _source_class(extended_source_type)
+        names = source_class.dictionary_names(columns)
+        if indices is None:
+            indices = range(len(next(iter(columns.values()))))
+        sources = []
+        for index in indices:
+            source = cls.__new__(cls)
+            source.extended_source_type = extended_source_type
+            source.source_type = "extended"
+            source._source = source_class.from_columns(columns, index, names, **kwargs)
+            sources.append(source)
+        return sources
 
     @property
     def name(self):
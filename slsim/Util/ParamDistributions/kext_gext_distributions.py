@@ -1,9 +1,141 @@
+from collections.abc import Mapping
+import functools
+import json
 import h5py
 import numpy as np
 import os
 import warnings
 
 
+class LazyDatasets(Mapping):
+    """Read-only mapping from dataset names to the (n, 2) kappa and gamma
+    arrays of an H5 file or of a contiguous `.npy` table written by
+    `convert_to_npy`, which loads a dataset on its first access.
+
+    Contiguous, uncompressed H5 datasets and the `.npy` tables are
+    memory-mapped, so that processes forked after loading share the pages of
+    the file. Other datasets are read with h5py. The accessed datasets are
+    kept in an LRU cache.
+    """
+
+    def __init__(self, file_path, cache_size=128):
+        """
+        :param file_path: Path to the H5 file or to the `.npy` table.
+        :param cache_size: Maximum number of datasets in the cache.
+        """
+        self.file_path = file_path
+        # values of all datasets of a .npy table, None for H5 files
+        self.values = None
+        # name -> (start, count) rows of a .npy table, or (offset, shape,
+        # dtype) of memory-mappable H5 datasets, None otherwise
+        self._layout = {}
+        # name -> number of rows, read from the metadata of the file
+        self._lengths = {}
+        if file_path.endswith(".npy"):
+            self.values = np.load(file_path, mmap_mode="r")
+            with open(npy_index_path(file_path)) as index_file:
+                index = json.load(index_file)
+            for name, start, count in zip(
+                index["names"], index["offsets"], index["counts"]
+            ):
+                self._layout[name] = (start, count)
+                self._lengths[name] = count
+        else:
+            with h5py.File(file_path, "r") as h5_file:
+                for name in h5_file:
+                    dataset = h5_file[name]
+                    self._lengths[name] = dataset.shape[0]
+                    offset = dataset.id.get_offset()
+                    if dataset.chunks is None and offset is not None:
+                        self._layout[name] = (offset, dataset.shape, dataset.dtype)
+                    else:
+                        self._layout[name] = None
+        self._read = functools.lru_cache(maxsize=cache_size)(self._read_dataset)
+
+    def _read_dataset(self, name):
+        """Loads one dataset, see the class description."""
+        layout = self._layout[name]
+        if self.values is not None:
+            start, count = layout
+            return self.values[start : start + count]
+        if layout is not None:
+            offset, shape, dtype = layout
+            return np.memmap(
+                self.file_path, dtype=dtype, mode="r", offset=offset, shape=shape
+            )
+        with h5py.File(self.file_path, "r") as h5_file:
+            return h5_file[name][()]
+
+    def __getitem__(self, name):
+        if name not in self._layout:
+            raise KeyError(name)
+        return self._read(name)
+
+    def __iter__(self):
+        return iter(self._layout)
+
+    def __len__(self):
+        return len(self._layout)
+
+    def lengths(self):
+        """Number of rows of the datasets, without loading them.
+
+        :return: number of rows by dataset name
+        :rtype: dict
+        """
+        return dict(self._lengths)
+
+    def offsets(self):
+        """Start rows of the datasets in `values`, for `.npy` tables.
+
+        :return: start row by dataset name, or None for H5 files
+        :rtype: dict or None
+        """
+        if self.values is None:
+            return None
+        return {name: start for name, (start, _) in self._layout.items()}
+
+
+def npy_index_path(npy_path):
+    """Path of the JSON offset index of a `.npy` table.
+
+    :param npy_path: Path to the `.npy` table.
+    :return: Path of the index next to the table.
+    """
+    return os.path.splitext(npy_path)[0] + "_index.json"
+
+
+def convert_to_npy(file_path, npy_path=None):
+    """Converts the kappa and gamma datasets of an H5 file, e.g.
+    `data/glass/joint_distributions.h5`, into a single contiguous `.npy` array
+    with a JSON offset index, which `LineOfSightDistribution` maps into memory
+    without copies.
+
+    :param file_path: Path to the H5 file.
+    :param npy_path: Path of the `.npy` table, by default that of the H5
+        file with the extension `.npy`.
+    :return: Path of the `.npy` table.
+    :rtype: str
+    """
+    if npy_path is None:
+        npy_path = os.path.splitext(file_path)[0] + ".npy"
+    names, offsets, counts, values = [], [], [], []
+    start = 0
+    with h5py.File(file_path, "r") as h5_file:
+        for name in h5_file:
+            data = np.asarray(h5_file[name][()], dtype=float)[:, :2]
+            names.append(name)
+            offsets.append(start)
+            counts.append(len(data))
+            values.append(data)
+            start += len(data)
+    values = np.concatenate(values) if values else np.empty((0, 2))
+    np.save(npy_path, np.ascontiguousarray(values))
+    with open(npy_index_path(npy_path), "w") as index_file:
+        json.dump({"names": names, "offsets": offsets, "counts": counts}, index_file)
+    return npy_path
+
+
 class LineOfSightDistribution:
     """Class to read the joint and no nonlinear distributions from the H5
     files.
@@ -15,15 +147,34 @@ class LineOfSightDistribution:
 
     correction_data = None
     no_nonlinear_correction_data = None
+    # files of the loaded data, so that tables of other files replace them
+    correction_path = None
+    no_nonlinear_correction_path = None
+    # dense (zs, zd) indices of the loaded data, built on first use
+    correction_index = None
+    no_nonlinear_correction_index = None
 
-    def __init__(self, nonlinear_correction_path=None, no_correction_path=None):
+    def __init__(
+        self,
+        nonlinear_correction_path=None,
+        no_correction_path=None,
+        lazy=False,
+        cache_size=128,
+    ):
         """Initialize the Data Reader. Load data into class variables if not
         already loaded.
 
         :param nonlinear_correction_path: Path to the
-            'joint_distributions.h5' file.
+            'joint_distributions.h5' file, or to a table built with
+            `slsim.Halos.kext_gext_tables.build_kext_gext_table`.
         :param no_correction_path: Path to the
-            'kg_distributions_nolos.h5' file.
+            'kg_distributions_nolos.h5' file, or to a table built with
+            `slsim.Halos.kext_gext_tables.build_kext_gext_table`.
+        :param lazy: If True, the datasets are loaded on first access
+            through a `LazyDatasets` mapping instead of all at once. Tables
+            converted with `convert_to_npy` are always loaded lazily.
+        :param cache_size: Maximum number of cached datasets of the lazy
+            mode.
         """
         current_script_path = os.path.abspath(__file__)
         current_directory = os.path.dirname(current_script_path)
@@ -48,39 +199,117 @@ class LineOfSightDistribution:
             else:
                 no_correction_path = None
 
-        if (
+        if nonlinear_correction_path is not None and (
             LineOfSightDistribution.correction_data is None
-            and nonlinear_correction_path is not None
+            or LineOfSightDistribution.correction_path != nonlinear_correction_path
+            or isinstance(LineOfSightDistribution.correction_data, LazyDatasets)
+            != (lazy or nonlinear_correction_path.endswith(".npy"))
         ):
             LineOfSightDistribution.correction_data = self._load_data(
-                nonlinear_correction_path
+                nonlinear_correction_path, lazy=lazy, cache_size=cache_size
             )
+            LineOfSightDistribution.correction_path = nonlinear_correction_path
+            LineOfSightDistribution.correction_index = None
         elif nonlinear_correction_path is None:
             LineOfSightDistribution.correction_data = None
+            LineOfSightDistribution.correction_index = None
 
-        if (
+        if no_correction_path is not None and (
             LineOfSightDistribution.no_nonlinear_correction_data is None
-            and no_correction_path is not None
+            or LineOfSightDistribution.no_nonlinear_correction_path
+            != no_correction_path
+            or isinstance(
+                LineOfSightDistribution.no_nonlinear_correction_data, LazyDatasets
+            )
+            != (lazy or no_correction_path.endswith(".npy"))
         ):
             LineOfSightDistribution.no_nonlinear_correction_data = self._load_data(
-                no_correction_path
+                no_correction_path, lazy=lazy, cache_size=cache_size
             )
+            LineOfSightDistribution.no_nonlinear_correction_path = no_correction_path
+            LineOfSightDistribution.no_nonlinear_correction_index = None
         elif no_correction_path is None:
             LineOfSightDistribution.no_nonlinear_correction_data = None
+            LineOfSightDistribution.no_nonlinear_correction_index = None
 
     @staticmethod
-    def _load_data(file_path):
-        """Load data from an H5 file into memory.
+    def _load_data(file_path, lazy=False, cache_size=128):
+        """Load data from an H5 file into memory, or lazily from an H5 file or
+        a `.npy` table.
 
-        :param file_path: Path to the H5 file.
+        :param file_path: Path to the H5 file or `.npy` table.
+        :param lazy: If True, returns a `LazyDatasets` mapping.
+        :param cache_size: Maximum number of cached datasets of the lazy
+            mode.
         :return: Dictionary of datasets.
         """
+        if lazy or file_path.endswith(".npy"):
+            return LazyDatasets(file_path, cache_size=cache_size)
         data = {}
         with h5py.File(file_path, "r") as h5_file:
             for dataset_name in h5_file:
                 data[dataset_name] = h5_file[dataset_name][()]
         return data
 
+    @staticmethod
+    def _build_index(data):
+        """Concatenates the datasets into one array with a dense index by the
+        redshifts of their names, in units of 0.1.
+
+        The datasets of a lazy H5 file are not concatenated, which would
+        read all of them. Their values are None, the offsets are the
+        positions of the datasets in the returned names, and the lengths
+        are read from the metadata of the file.
+
+        :param data: Dictionary of datasets of shape (n, 2) with kappa
+            and gamma, named `zs_{zs}` or `zs_{zs}_zd_{zd}`.
+        :return: values of shape (n_total, 2), the offsets (-1 if
+            missing) and lengths of the datasets, each of shape (n_zs,
+            n_zd) indexed by (round(10 zs), round(10 zd)); zd index 0
+            without deflector redshift, and the dataset names.
+        """
+        names = list(data)
+        offsets_npy = data.offsets() if isinstance(data, LazyDatasets) else None
+        redshifts = []
+        for name in names:
+            parts = name.split("_")
+            zd = float(parts[3]) if len(parts) > 3 else 0.0
+            redshifts.append((round(float(parts[1]) * 10), round(zd * 10)))
+        redshifts = np.array(redshifts, dtype=int).reshape(-1, 2)
+        shape = tuple(np.max(redshifts, axis=0) + 1) if len(names) else (1, 1)
+        offsets = np.full(shape, -1, dtype=np.int64)
+        counts = np.zeros(shape, dtype=np.int64)
+        if isinstance(data, LazyDatasets):
+            lengths = data.lengths()
+            for number, (name, (i, j)) in enumerate(zip(names, redshifts)):
+                # the values of a .npy table are used in place
+                offsets[i, j] = number if offsets_npy is None else offsets_npy[name]
+                counts[i, j] = lengths[name]
+            return data.values, offsets, counts, names
+        start = 0
+        for name, (i, j) in zip(names, redshifts):
+            offsets[i, j] = start
+            counts[i, j] = len(data[name])
+            start += len(data[name])
+        values = np.empty((start, 2))
+        for name, (i, j) in zip(names, redshifts):
+            values[offsets[i, j] : offsets[i, j] + counts[i, j]] = data[name][:, :2]
+        return values, offsets, counts, names
+
+    @classmethod
+    def _index(cls, use_nonlinear_correction):
+        """Dense index of the loaded correction or no correction data, see
+        `_build_index`."""
+        if use_nonlinear_correction:
+            if cls.correction_index is None:
+                cls.correction_index = cls._build_index(cls.correction_data)
+            return cls.correction_index
+        if cls.no_nonlinear_correction_index is None:
+            cls.no_nonlinear_correction_index = cls._build_index(
+                cls.no_nonlinear_correction_data
+            )
+        return cls.no_nonlinear_correction_index
+
     @staticmethod
     def _round_to_nearest_0_1(value):
         """Round the value to the nearest 0.1.
@@ -133,3 +362,71 @@ class LineOfSightDistribution:
             raise ValueError(
                 f"No data found for zs={z_source_rounded} and zd={z_lens_rounded}."
             )
+
+    def draw_kappa_gamma(
+        self, z_source, z_lens, use_nonlinear_correction=False, random_seed=None
+    ):
+        """Draws kappa and gamma for arrays of source and lens redshifts at
+        once. The redshifts are rounded as in `get_kappa_gamma`, and kappa and
+        gamma are drawn jointly from the same row of the dataset of each
+        redshift pair, with one `Generator.integers` call for all pairs. With
+        lazy H5 data, only the datasets of the requested redshift pairs are
+        read, through the cache of `LazyDatasets`.
+
+        :param z_source: Source redshifts (zs).
+        :type z_source: float or numpy.ndarray
+        :param z_lens: Lens redshifts (zd), broadcastable with z_source.
+        :type z_lens: float or numpy.ndarray
+        :param use_nonlinear_correction: Boolean to use the nonlinear
+            correction data.
+        :param random_seed: seed or numpy Generator.
+        :return: kappa and gamma arrays, 0 where z_source <= z_lens.
+        :rtype: (numpy.ndarray, numpy.ndarray)
+        """
+        z_source, z_lens = np.broadcast_arrays(
+            np.atleast_1d(np.asarray(z_source, dtype=float)),
+            np.atleast_1d(np.asarray(z_lens, dtype=float)),
+        )
+        kappa = np.zeros(z_source.shape)
+        gamma = np.zeros(z_source.shape)
+        data = (
+            LineOfSightDistribution.correction_data
+            if use_nonlinear_correction
+            else LineOfSightDistribution.no_nonlinear_correction_data
+        )
+        if data is None:
+            warnings.warn("No file found, provide 0 instead.")
+            return kappa, gamma
+        behind = z_source > z_lens
+        i = np.rint(np.clip(z_source[behind], 0.1, 4.9) * 10).astype(int)
+        if use_nonlinear_correction:
+            j = np.rint(np.clip(z_lens[behind], 0.1, 4.9) * 10).astype(int)
+            j = np.where(j == i, j - 1, j)
+        else:
+            j = np.zeros_like(i)
+        values, offsets, counts, names = self._index(use_nonlinear_correction)
+        known = (i < offsets.shape[0]) & (j < offsets.shape[1])
+        start = np.full(i.shape, -1, dtype=np.int64)
+        start[known] = offsets[i[known], j[known]]
+        if np.any(start < 0):
+            first = np.argmax(start < 0)
+            raise ValueError(
+                f"No data found for zs={i[first] / 10} and zd={j[first] / 10}."
+            )
+        rng = np.random.default_rng(random_seed)
+        rows = rng.integers(0, counts[i, j])
+        if values is None:
+            # lazy H5 data, start holds the positions of the dataset names
+            kappa_behind = np.empty(rows.shape)
+            gamma_behind = np.empty(rows.shape)
+            for number in np.unique(start):
+                selected = start == number
+                dataset = data[names[number]]
+                kappa_behind[selected] = dataset[rows[selected], 0]
+                gamma_behind[selected] = dataset[rows[selected], 1]
+            kappa[behind] = kappa_behind
+            gamma[behind] = gamma_behind
+            return kappa, gamma
+        kappa[behind] = values[start + rows, 0]
+        gamma[behind] = values[start + rows, 1]
+        return kappa, gamma
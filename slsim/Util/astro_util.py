@@ -1,18 +1,20 @@
 import numpy as np
-from scipy.fftpack import ifft
 from astropy import constants as const
 from astropy import units as u
 from astropy.cosmology import Cosmology
-from slsim.Util.param_util import (
-    amplitude_to_magnitude,
-    magnitude_to_amplitude,
-)
 from astropy.units.quantity import Quantity
+from scipy.fftpack import ifft
+from scipy.interpolate import RegularGridInterpolator
+from scipy.ndimage import map_coordinates
 from speclite.filters import (
-    load_filter,
     FilterResponse,
+    load_filter,
+)
+
+from slsim.Util.param_util import (
+    amplitude_to_magnitude,
+    magnitude_to_amplitude,
 )
-from scipy.interpolate import RegularGridInterpolator
 
 
 def spin_to_isco(spin):
@@ -1310,6 +1312,205 @@ def extract_light_curve(
     return np.asarray(light_curve)
 
 
+def extract_light_curve_batch(
+    convolution_array,
+    pixel_size,
+    effective_transverse_velocity,
+    light_curve_time_in_years,
+    num_light_curves=1,
+    pixel_shift=0,
+    x_start_positions=None,
+    y_start_positions=None,
+    phi_travel_directions=None,
+    return_track_coords=False,
+    random_seed=None,
+):
+    """Extracts many light curves from the convolution between two arrays in a
+    single vectorized call. This follows the same conventions as
+    extract_light_curve, but all tracks are sampled at once with
+    scipy.ndimage.map_coordinates (bilinear, 'nearest' edge behavior), so the
+    convolution array is neither padded nor copied and no interpolator is
+    rebuilt per track. Tracks which would leave the convolution array are
+    replaced by a constant light curve at the average flux.
+
+    :param convolution_array: The convolution between a flux distribution
+        and the magnification array due to microlensing. Note
+        coordinates on arrays have (y, x) signature.
+    :param pixel_size: Physical size of a pixel in the source plane, in
+        meters
+    :param effective_transverse_velocity: effective transverse velocity
+        in the source plane, in km / s. Can be an array with one velocity
+        per light curve, in which case each track covers its own length
+        with the same number of samples.
+    :param light_curve_time_in_years: duration of the light curves to
+        generate, in years
+    :param num_light_curves: number of light curves to extract. Ignored
+        if any of the velocities, start positions or travel directions is
+        provided as an array, in which case its length is used.
+    :param pixel_shift: offset of the SMBH with respect to the convolved
+        map, in pixels
+    :param x_start_positions: None, a scalar or an array of x
+        coordinates to start pulling the light curves from, in pixels.
+        None means random start positions.
+    :param y_start_positions: None, a scalar or an array of y
+        coordinates to start pulling the light curves from, in pixels.
+        None means random start positions.
+    :param phi_travel_directions: None, a scalar or an array of angular
+        directions of travel along the convolution, in degrees. None
+        means random directions.
+    :param return_track_coords: boolean toggle to return the x and y
+        coordinates of the tracks in pixels
+    :param random_seed: seed for the random start positions and
+        directions.
+    :return: array of shape (num_light_curves, num_samples) representing
+        the microlensing light curves. If return_track_coords is True,
+        the x and y coordinates of the tracks (same shape) are returned
+        as well. Coordinates of rejected tracks are set to NaN.
+    """
+    rng = np.random.default_rng(seed=random_seed)
+    convolution_array = np.asarray(convolution_array)
+
+    for positions in (
+        effective_transverse_velocity,
+        x_start_positions,
+        y_start_positions,
+        phi_travel_directions,
+    ):
+        if positions is not None and np.ndim(positions) > 0:
+            num_light_curves = len(positions)
+
+    if isinstance(effective_transverse_velocity, Quantity):
+        effective_transverse_velocity = effective_transverse_velocity.to(
+            u.m / u.s
+        ).value
+    else:
+        effective_transverse_velocity = np.asarray(
+            effective_transverse_velocity, dtype=float
+        ) * u.km.to(u.m)
+    if isinstance(light_curve_time_in_years, Quantity):
+        light_curve_time_in_years = light_curve_time_in_years.to(u.s).value
+    else:
+        light_curve_time_in_years = light_curve_time_in_years * u.yr.to(u.s)
+
+    pixels_traversed = (
+        effective_transverse_velocity * light_curve_time_in_years / pixel_size
+    )
+    num_samples = 5 * int(np.max(pixels_traversed) + 2)
+    # track length of each light curve in pixels
+    lengths = np.broadcast_to(pixels_traversed, (num_light_curves,))
+    average_flux = np.sum(convolution_array) / np.size(convolution_array)
+
+    light_curves = np.full((num_light_curves, num_samples), average_flux)
+    x_positions = np.full((num_light_curves, num_samples), np.nan)
+    y_positions = np.full((num_light_curves, num_samples), np.nan)
+
+    def _output():
+        if return_track_coords:
+            return light_curves, x_positions, y_positions
+        return light_curves
+
+    if pixel_shift >= np.size(convolution_array, 0) / 2:
+        print(
+            "warning, flux projection too large for this magnification map. Returning average flux."
+        )
+        return _output()
+
+    if pixel_shift > 0:
+        safe_convolution_array = convolution_array[
+            pixel_shift : -pixel_shift - 1, pixel_shift : -pixel_shift - 1
+        ]
+    else:
+        safe_convolution_array = convolution_array
+
+    N_safe_dim_x = safe_convolution_array.shape[0]
+    N_safe_dim_y = safe_convolution_array.shape[1]
+
+    if np.all(lengths >= max(N_safe_dim_x, N_safe_dim_y)):
+        print(
+            "Warning: light curve traversal length is too long for the safe region dimensions. Returning average flux."
+        )
+        return _output()
+    if N_safe_dim_x < 1 or N_safe_dim_y < 1:
+        print("Error: safe convolution array is empty. Returning average flux.")
+        return _output()
+
+    def _start_positions(start_positions, N_safe_dim):
+        if start_positions is not None:
+            return np.broadcast_to(
+                np.asarray(start_positions, dtype=float), (num_light_curves,)
+            )
+        # choose non-border pixels if possible
+        if N_safe_dim >= 3:
+            return rng.integers(1, N_safe_dim - 1, size=num_light_curves).astype(float)
+        return rng.integers(0, N_safe_dim, size=num_light_curves).astype(float)
+
+    x_start = _start_positions(x_start_positions, N_safe_dim_x)
+    y_start = _start_positions(y_start_positions, N_safe_dim_y)
+    valid = (
+        (x_start >= 0)
+        & (x_start <= N_safe_dim_x - 1)
+        & (y_start >= 0)
+        & (y_start <= N_safe_dim_y - 1)
+        & (lengths < max(N_safe_dim_x, N_safe_dim_y))
+    )
+
+    def _inside(angles):
+        x_end = x_start[:, np.newaxis] + lengths[:, np.newaxis] * np.cos(angles)
+        y_end = y_start[:, np.newaxis] + lengths[:, np.newaxis] * np.sin(angles)
+        return (
+            (x_end >= 0)
+            & (x_end < N_safe_dim_x)
+            & (y_end >= 0)
+            & (y_end < N_safe_dim_y)
+        )
+
+    if phi_travel_directions is not None:
+        angles = np.broadcast_to(
+            np.asarray(phi_travel_directions, dtype=float) * np.pi / 180,
+            (num_light_curves,),
+        )
+        valid &= _inside(angles[:, np.newaxis])[:, 0]
+    else:
+        # rotate a random direction by multiples of 90 degrees until the
+        # track fits within the safe region
+        candidates = (
+            rng.random(num_light_curves)[:, np.newaxis] * 2 * np.pi
+            + np.arange(1, 5) * np.pi / 2
+        )
+        inside = _inside(candidates)
+        choice = np.where(np.any(inside, axis=1), np.argmax(inside, axis=1), 3)
+        angles = candidates[np.arange(num_light_curves), choice]
+        valid &= inside[np.arange(num_light_curves), choice]
+
+    if not np.all(valid):
+        print(
+            f"Warning: {np.sum(~valid)} of {num_light_curves} chosen tracks start or end "
+            "outside the convolution array. Returning average flux for those."
+        )
+
+    steps = np.linspace(0, 1, num_samples)
+    x_track = (
+        x_start[valid, np.newaxis]
+        + (lengths[valid] * np.cos(angles[valid]))[:, np.newaxis] * steps
+    )
+    y_track = (
+        y_start[valid, np.newaxis]
+        + (lengths[valid] * np.sin(angles[valid]))[:, np.newaxis] * steps
+    )
+
+    light_curves[valid] = map_coordinates(
+        safe_convolution_array,
+        [x_track.ravel(), y_track.ravel()],
+        order=1,
+        mode="nearest",
+        prefilter=False,
+    ).reshape(x_track.shape)
+    x_positions[valid] = x_track + pixel_shift
+    y_positions[valid] = y_track + pixel_shift
+
+    return _output()
+
+
 # Credits: Luke Weisenbach (https://github.com/weisluke/microlensing/blob/main/microlensing/Util/length_scales.py)
 def theta_star_physical(
     z_lens: float,
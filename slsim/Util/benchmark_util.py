@@ -0,0 +1,121 @@
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import scipy
+
+import slsim
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    # not available on Windows
+    resource = None
+
+
+def process_peak_rss_mb():
+    """Peak resident set size of the current process in MB.
+
+    The peak is taken over the lifetime of the process, not of a single
+    benchmark, so it only grows between benchmarks run in the same
+    process.
+
+    :return: peak RSS in MB, or None if it cannot be determined on this
+        platform.
+    """
+    if resource is None:  # pragma: no cover
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":  # pragma: no cover
+        # bytes on macOS, kilobytes on Linux
+        return max_rss / 1024**2
+    return max_rss / 1024
+
+
+def measure(function, *args, repeat=1, trace_memory=True, **kwargs):
+    """Calls a function `repeat` times and measures its wall time, then calls
+    it once more with tracemalloc to measure its memory. The timed calls are
+    not traced, since tracing slows down allocations by a large factor.
+
+    :param function: function to benchmark
+    :param args: positional arguments of the function
+    :param repeat: number of timed calls
+    :param trace_memory: If True, the function is called once more to
+        trace its peak memory.
+    :param kwargs: keyword arguments of the function
+    :return: dictionary with the best and mean wall time in seconds, the
+        peak memory traced during the extra call in MB (python and numpy
+        allocations, None if not traced), the peak RSS of the process so
+        far in MB (see `process_peak_rss_mb`, it includes everything run
+        earlier in the process) and the return value of the last timed
+        call (key "result").
+    :rtype: dict
+    """
+    wall_times = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = function(*args, **kwargs)
+        wall_times.append(time.perf_counter() - start_time)
+
+    peak_traced_mb = None
+    if trace_memory:
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        function(*args, **kwargs)
+        _, peak_traced = tracemalloc.get_traced_memory()
+        if not tracing:
+            tracemalloc.stop()
+        peak_traced_mb = peak_traced / 1024**2
+    return {
+        "wall_time": float(np.min(wall_times)),
+        "wall_time_mean": float(np.mean(wall_times)),
+        "repeat": repeat,
+        "peak_traced_memory_mb": peak_traced_mb,
+        "process_peak_rss_mb": process_peak_rss_mb(),
+        "result": result,
+    }
+
+
+def benchmark_metadata():
+    """Versions and machine information stored with benchmark results, so that
+    results can be compared between releases.
+
+    :return: dictionary of metadata
+    """
+    return {
+        "slsim_version": slsim.__version__,
+        "python_version": platform.python_version(),
+        "numpy_version": np.__version__,
+        "scipy_version": scipy.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def write_benchmark_json(results, filename=None):
+    """Writes benchmark results together with the metadata as JSON.
+
+    :param results: list of dictionaries, one per benchmark. Entries
+        with the key "result" are dropped.
+    :param filename: path of the JSON file. If None, nothing is written.
+    :return: the JSON serializable report
+    :rtype: dict
+    """
+    report = {
+        "metadata": benchmark_metadata(),
+        "benchmarks": [
+            {key: value for key, value in result.items() if key != "result"}
+            for result in results
+        ],
+    }
+    if filename is not None:
+        with open(filename, "w") as f:
+            json.dump(report, f, indent=2, default=lambda value: value.item())
+    return report
@@ -0,0 +1,74 @@
+from collections.abc import Mapping
+
+
+class ColumnView(Mapping):
+    """Read-only view of one row of shared column arrays, used as the parameter
+    dictionary of deflectors and sources drawn from a population.
+
+    A view holds only a reference to the columns and the row index, so
+    that creating one does not copy the parameters of the row or
+    materialize an astropy table row. Values which are set on a view
+    (e.g. cached velocity dispersions) are kept in a dictionary of the
+    view and do not change the shared columns.
+    """
+
+    __slots__ = ("_columns", "_index", "_names", "_overrides")
+
+    def __init__(self, columns, index, names=None):
+        """
+
+        :param columns: arrays by parameter name, e.g. the columns of an
+            astropy table
+        :type columns: dict
+        :param index: row index
+        :type index: int
+        :param names: names of the columns visible in the view, by default
+            all columns. Pass a shared tuple for many views of the same
+            columns.
+        :type names: tuple or None
+        """
+        self._columns = columns
+        self._index = index
+        self._names = names
+        self._overrides = None
+
+    @property
+    def index(self):
+        """Row index of the view.
+
+        :return: index
+        """
+        return self._index
+
+    def __getitem__(self, name):
+        if self._overrides is not None and name in self._overrides:
+            return self._overrides[name]
+        if self._names is not None and name not in self._names:
+            raise KeyError(name)
+        return self._columns[name][self._index]
+
+    def __setitem__(self, name, value):
+        if self._overrides is None:
+            self._overrides = {}
+        self._overrides[name] = value
+
+    def __contains__(self, name):
+        if self._overrides is not None and name in self._overrides:
+            return True
+        if self._names is not None:
+            return name in self._names
+        return name in self._columns
+
+    def __iter__(self):
+        names = self._columns if self._names is None else self._names
+        yield from names
+        if self._overrides is not None:
+            for name in self._overrides:
+                if name not in names:
+                    yield name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return "%s(%s)" % (self.__class__.__name__, dict(self))
@@ -42,9 +42,18 @@ def epsilon2e(epsilon):
     .. math::
         e = \\equic \\frac{1 - q}{1 + q}
 
-    :param epsilon: ellipticity
+    :param epsilon: ellipticity, a float or an array
     :return: eccentricity
     """
+    if np.ndim(epsilon) > 0:
+        epsilon = np.asarray(epsilon, dtype=float)
+        if np.any((epsilon < 0) | (epsilon > 1)):
+            raise ValueError(
+                'Values of "epsilon" are %s and need to be in [0, 1]'
+                % epsilon[(epsilon < 0) | (epsilon > 1)]
+            )
+        nonzero = np.where(epsilon == 0, 1, epsilon)
+        return np.where(epsilon == 0, 0.0, (1 - np.sqrt(1 - epsilon**2)) / nonzero)
     if epsilon == 0:
         return 0
     elif 0 < epsilon <= 1:
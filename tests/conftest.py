@@ -0,0 +1,14 @@
+import pytest
+
+from slsim.Halos.halos import HaloMassFunctionTable
+
+
+@pytest.fixture(autouse=True)
+def halo_mass_function_cache(tmp_path_factory, monkeypatch):
+    """Writes the on-disk cache of the halo mass function tables to a temporary
+    directory instead of SLSIM_CACHE_DIR."""
+    monkeypatch.setattr(
+        HaloMassFunctionTable,
+        "default_cache_dir",
+        str(tmp_path_factory.mktemp("slsim_cache")),
+    )
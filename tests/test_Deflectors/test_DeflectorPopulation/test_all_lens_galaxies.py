@@ -50,6 +50,15 @@ def test_deflector_number_draw_deflector(all_lens_galaxies):
     assert num_deflectors >= 0
 
 
+def test_draw_deflectors(all_lens_galaxies):
+    galaxy_pop = all_lens_galaxies
+    deflectors = galaxy_pop.draw_deflectors(3)
+    assert len(deflectors) == 3
+    assert deflectors[0].redshift > 0
+    for name in ["e1_light", "e2_light", "e1_mass", "e2_mass", "n_sersic"]:
+        assert np.all(galaxy_pop._columns[name] != -1)
+
+
 def test_fill_table():
     mock_galaxy_list = copy.copy(galaxies)[0]
     filled_table = fill_table(mock_galaxy_list)
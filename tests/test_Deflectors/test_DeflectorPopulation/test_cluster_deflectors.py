@@ -4,6 +4,8 @@ from slsim.Deflectors.DeflectorPopulation.cluster_deflectors import ClusterDefle
 from slsim.Pipelines.skypy_pipeline import SkyPyPipeline
 from astropy.units import Quantity
 from astropy.table import Table, vstack
+import numpy as np
+import numpy.testing as npt
 import pytest
 import os
 
@@ -68,6 +70,57 @@ def test_draw_deflector(cluster_deflectors_instance):
     )
     assert (deflector.halo_properties[1] > 1) and (deflector.halo_properties[1] < 15)
     assert (len(members) >= 1) and (len(members) < 100)
+    assert np.all(members["cluster_id"] == cluster["cluster_id"])
+    assert np.all(members["z"] == cluster["z"])
+    assert np.all(members["e1_light"] != -1)
+    assert np.all(members["n_sersic"] != -1)
+    # members are grouped by cluster
+    assert np.all(np.diff(cluster_pop._members_select["cluster_id"]) >= 0)
+    # missing ellipticities are drawn anew for each draw
+    assert np.all(cluster_pop._members_select["e1_light"] == -1)
+    members1 = cluster_pop.draw_members(cluster["cluster_id"], max_dist=np.inf)
+    members2 = cluster_pop.draw_members(cluster["cluster_id"], max_dist=np.inf)
+    assert np.all(members1["e1_light"] != members2["e1_light"])
+
+
+def test_assign_similar_galaxy():
+    rng = np.random.default_rng(42)
+    cosmo = FlatLambdaCDM(H0=70, Om0=0.3)
+    members = Table(
+        {
+            "cluster_id": np.arange(50),
+            "mag_g": rng.uniform(18, 24, 50),
+            "mag_r": rng.uniform(18, 24, 50),
+            "z": rng.uniform(0.2, 0.8, 50),
+        }
+    )
+    galaxies = Table(
+        {
+            "mag_g": rng.uniform(18, 24, 500),
+            "mag_r": rng.uniform(18, 24, 500),
+            "z": rng.uniform(0.1, 1.0, 500),
+            "stellar_mass": 10 ** rng.uniform(10, 12, 500),
+        }
+    )
+    matched = ClusterDeflectors.assign_similar_galaxy(
+        members, galaxies, cosmo=cosmo, max_gals=None
+    )
+    assert len(matched) == 50
+
+    def _dist_mod(z):
+        return 5 * np.log10(cosmo.luminosity_distance(z).to_value("pc") / 10)
+
+    points_members = np.stack(
+        [members["mag_g"], members["mag_r"], _dist_mod(members["z"])], axis=1
+    )
+    points_galaxies = np.stack(
+        [galaxies["mag_g"], galaxies["mag_r"], _dist_mod(galaxies["z"])], axis=1
+    )
+    distance = np.linalg.norm(
+        points_members[:, None, :] - points_galaxies[None, :, :], axis=-1
+    )
+    nearest = np.argmin(distance, axis=1)
+    npt.assert_array_equal(matched["stellar_mass"], galaxies["stellar_mass"][nearest])
 
 
 def test_missing_id(cluster_deflectors_input):
@@ -57,6 +57,13 @@ def test_deflector_number_draw_deflector(compound_lens_halos_galaxies):
     assert light_lenstronomy[0][0] in expected_light_model
 
 
+def test_draw_deflectors(compound_lens_halos_galaxies):
+    deflectors = compound_lens_halos_galaxies.draw_deflectors(5)
+    assert len(deflectors) == 5
+    for deflector in deflectors:
+        assert deflector._theta_e_infinity >= 0
+
+
 # The following decorator and function are needed to run the tests with pytest
 if __name__ == "__main__":
     pytest.main()
@@ -1,11 +1,13 @@
 from astropy.cosmology import FlatLambdaCDM
 from slsim.Deflectors.DeflectorPopulation.elliptical_lens_galaxies import (
     EllipticalLensGalaxies,
+    elliptical_projected_eccentricity,
 )
 from slsim.Util.param_util import vel_disp_from_m_star
 from slsim.Pipelines.skypy_pipeline import SkyPyPipeline
 from astropy.units import Quantity
 import copy
+import numpy as np
 import pytest
 
 
@@ -43,6 +45,36 @@ def test_deflector_number_draw_deflector(elliptical_lens_galaxies):
     assert num_deflectors >= 0
 
 
+def test_draw_deflectors(elliptical_lens_galaxies):
+    galaxy_pop = elliptical_lens_galaxies
+    deflectors = galaxy_pop.draw_deflectors(5)
+    assert len(deflectors) == 5
+    for deflector in deflectors:
+        assert deflector.redshift > 0
+    # ellipticities and Sersic indices are filled for all deflectors at once
+    for name in ["e1_light", "e2_light", "e1_mass", "e2_mass", "n_sersic"]:
+        assert np.all(galaxy_pop._columns[name] != -1)
+        assert galaxy_pop._columns[name].flags["C_CONTIGUOUS"]
+    np.testing.assert_array_equal(
+        galaxy_pop._columns["e1_mass"], galaxy_pop._galaxy_select["e1_mass"]
+    )
+
+
+def test_elliptical_projected_eccentricity():
+    np.random.seed(1)
+    ellipticity = np.array([0.0, 0.2, 0.5])
+    e1_light, e2_light, e1_mass, e2_mass = elliptical_projected_eccentricity(
+        ellipticity, light2mass_e_scatter=0
+    )
+    assert e1_light.shape == (3,)
+    np.testing.assert_almost_equal(np.hypot(e1_light, e2_light)[0], 0)
+    np.testing.assert_almost_equal(
+        np.hypot(e1_light, e2_light), np.abs(np.hypot(e1_mass, e2_mass))
+    )
+    e1_light, _, _, _ = elliptical_projected_eccentricity(0.2)
+    assert isinstance(e1_light, float)
+
+
 def test_vel_disp_from_m_star():
     assert vel_disp_from_m_star(0) == 0
 
@@ -106,3 +138,54 @@ def test_elliptical_lens_galaxies_2():
 
 if __name__ == "__main__":
     pytest.main()
+
+
+def test_einstein_radius_table():
+    from lenstronomy.Cosmo.lens_cosmo import LensCosmo
+    from slsim.Deflectors.DeflectorTypes.epl import EPL
+    from slsim.Deflectors.MassLightConnection.velocity_dispersion import (
+        theta_E_from_vel_disp_epl,
+    )
+
+    cosmo = FlatLambdaCDM(H0=70, Om0=0.3)
+    galaxy_pop = EllipticalLensGalaxies(
+        copy.copy(galaxies),
+        kwargs_cut={},
+        kwargs_mass2light={},
+        cosmo=cosmo,
+        sky_area=Quantity(value=0.001, unit="deg2"),
+        gamma_pl=2.15,
+        einstein_radius_table=True,
+    )
+    columns = galaxy_pop._columns
+    assert np.all(columns["vel_disp_ratio"] > 0)
+    assert not np.any(columns["sis_convention"])
+    index = int(np.argmax(np.where(columns["z"] < 1, columns["vel_disp"], 0)))
+    deflector = EPL.from_columns(columns, index)
+    lens_cosmo = LensCosmo(z_lens=float(columns["z"][index]), z_source=3.0, cosmo=cosmo)
+    theta_E = deflector._einstein_radius(lens_cosmo=lens_cosmo)
+    # exact solution with the kinematics of the spherical light profile
+    kwargs_light = [
+        {
+            "magnitude": 20,
+            "R_sersic": columns["angular_size"][index],
+            "n_sersic": columns["n_sersic"][index],
+            "e1": 0,
+            "e2": 0,
+            "center_x": 0,
+            "center_y": 0,
+        }
+    ]
+    exact = theta_E_from_vel_disp_epl(
+        vel_disp=columns["vel_disp"][index],
+        gamma=2.15,
+        r_half=columns["angular_size"][index],
+        kwargs_light=kwargs_light,
+        light_model_list=["SERSIC_ELLIPSE"],
+        lens_cosmo=lens_cosmo,
+        sis_convention=False,
+    )
+    assert theta_E == pytest.approx(exact, rel=0.01)
+    assert theta_E != pytest.approx(
+        lens_cosmo.sis_sigma_v2theta_E(columns["vel_disp"][index]), rel=0.01
+    )
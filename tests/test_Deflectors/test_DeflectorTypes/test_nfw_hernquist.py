@@ -1,7 +1,13 @@
-from slsim.Deflectors.DeflectorTypes.nfw_hernquist import NFWHernquist
+from slsim.Deflectors.DeflectorTypes.nfw_hernquist import (
+    NFWHernquist,
+    einstein_radius_nfw_hernquist,
+)
 from astropy.cosmology import FlatLambdaCDM
+import numpy as np
 import numpy.testing as npt
+from lenstronomy.Analysis.lens_profile import LensProfileAnalysis
 from lenstronomy.Cosmo.lens_cosmo import LensCosmo
+from lenstronomy.LensModel.lens_model import LensModel
 
 
 class TestNFWHernquist(object):
@@ -75,3 +81,45 @@ class TestNFWHernquist(object):
         )
         assert lens_mass_model_list[0] == "NFW"
         assert len(lens_mass_model_list) == 2
+
+
+def test_einstein_radius_nfw_hernquist():
+    cosmo = FlatLambdaCDM(H0=70, Om0=0.3)
+    halo_mass = np.array([1e12, 1e13, 5e13, 1e9])
+    concentration = np.array([8, 6, 5, 8])
+    stellar_mass = np.array([1e11, 3e11, 5e11, 1e7])
+    angular_size = np.array([0.5, 1.0, 1.2, 0.5])
+    z_lens = np.array([0.3, 0.5, 0.8, 0.3])
+    theta_E = einstein_radius_nfw_hernquist(
+        halo_mass, concentration, stellar_mass, angular_size, z_lens, cosmo
+    )
+    assert theta_E.shape == (4,)
+    # too little mass for a mean convergence of 1 within r_min
+    assert theta_E[3] == 0
+
+    for i in range(3):
+        deflector = NFWHernquist(
+            halo_mass=halo_mass[i],
+            concentration=concentration[i],
+            stellar_mass=stellar_mass[i],
+            angular_size=angular_size[i],
+            z=z_lens[i],
+            e1_light=0,
+            e2_light=0,
+            e1_mass=0,
+            e2_mass=0,
+        )
+        lens_cosmo = LensCosmo(z_lens=z_lens[i], z_source=100, cosmo=cosmo)
+        model_list, kwargs_lens = deflector.mass_model_lenstronomy(
+            lens_cosmo=lens_cosmo, spherical=True
+        )
+        lens_analysis = LensProfileAnalysis(LensModel(lens_model_list=model_list))
+        theta_E_numerical = lens_analysis.effective_einstein_radius(
+            kwargs_lens, r_min=1e-3, r_max=5e1, num_points=200, spherical_model=True
+        )
+        npt.assert_allclose(theta_E[i], theta_E_numerical, rtol=2e-3)
+
+    theta_E_single = einstein_radius_nfw_hernquist(
+        halo_mass[1], concentration[1], stellar_mass[1], angular_size[1], 0.5, cosmo
+    )
+    npt.assert_almost_equal(theta_E_single[0], theta_E[1], decimal=8)
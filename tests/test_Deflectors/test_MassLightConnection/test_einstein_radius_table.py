@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+import numpy.testing as npt
+from astropy.cosmology import FlatLambdaCDM
+from lenstronomy.Cosmo.lens_cosmo import LensCosmo
+
+from slsim.Deflectors.MassLightConnection.einstein_radius_table import (
+    EPLEinsteinRadiusTable,
+    vel_disp_ratio_power_law,
+)
+from slsim.Deflectors.MassLightConnection.velocity_dispersion import (
+    theta_E_from_vel_disp_epl,
+)
+
+cosmo = FlatLambdaCDM(H0=70, Om0=0.3)
+lens_cosmo = LensCosmo(z_lens=0.4, z_source=1.5, cosmo=cosmo)
+
+
+def test_theta_E():
+    table = EPLEinsteinRadiusTable.cached()
+    assert EPLEinsteinRadiusTable.cached() is table
+
+    gamma, r_half, n_sersic, vel_disp = 1.83, 0.7, 3.3, 230
+    kwargs_light = [
+        {
+            "magnitude": 20,
+            "R_sersic": r_half,
+            "n_sersic": n_sersic,
+            "e1": 0,
+            "e2": 0,
+            "center_x": 0,
+            "center_y": 0,
+        }
+    ]
+    theta_E = theta_E_from_vel_disp_epl(
+        vel_disp,
+        gamma,
+        r_half,
+        kwargs_light,
+        ["SERSIC_ELLIPSE"],
+        lens_cosmo,
+        sis_convention=False,
+    )
+    theta_E_table = table.theta_E(
+        vel_disp, gamma, r_half, n_sersic, lens_cosmo=lens_cosmo
+    )
+    npt.assert_allclose(theta_E_table, theta_E, rtol=5e-3)
+
+    # vectorized over deflectors, SIS Einstein radii for gamma = 2
+    vel_disp = np.array([150, 200, 250])
+    gamma = np.array([2.0, 1.9, 2.2])
+    theta_E_sis = lens_cosmo.sis_sigma_v2theta_E(vel_disp)
+    theta_E = table.theta_E(vel_disp, gamma, 1.0, 4, theta_E_sis=theta_E_sis)
+    assert theta_E.shape == (3,)
+    npt.assert_almost_equal(theta_E[0], theta_E_sis[0])
+    theta_E_kappa = table.theta_E(
+        vel_disp, gamma, 1.0, 4, lens_cosmo=lens_cosmo, kappa_ext=0.1
+    )
+    npt.assert_allclose(theta_E_kappa, theta_E / 0.9 ** (1 / (gamma - 1)))
+
+
+def test_custom_grid(tmp_path):
+    table = EPLEinsteinRadiusTable(
+        gamma_grid=[1.9, 2.1], n_sersic_grid=[2, 4], cache_dir=str(tmp_path)
+    )
+    assert len(os.listdir(tmp_path)) == 1
+    npt.assert_allclose(
+        table.vel_disp_ratio(2.1, 4, r_half=1.0), vel_disp_ratio_power_law(2.1, 4)
+    )
+    table_cached = EPLEinsteinRadiusTable(
+        gamma_grid=[1.9, 2.1], n_sersic_grid=[2, 4], cache_dir=str(tmp_path)
+    )
+    npt.assert_array_equal(table_cached._ratio, table._ratio)
+    # clipped to the grid
+    npt.assert_allclose(
+        table.vel_disp_ratio(2.5, 8, r_half=2.0),
+        table.vel_disp_ratio(2.1, 4, r_half=2.0) * 2 ** (2.1 - 2.5),
+    )
@@ -6,9 +6,13 @@ from slsim.Deflectors.MassLightConnection.velocity_dispersion import (
     redshifts_from_comoving_density,
     vel_disp_power_law,
     theta_E_from_vel_disp_epl,
+    vel_disp_abundance_matching,
+    vel_disp_sdss_cumulative_density,
 )
+from astropy.table import Table
 from lenstronomy.Cosmo.lens_cosmo import LensCosmo
 import numpy as np
+import scipy
 import numpy.testing as npt
 from astropy.cosmology import FlatLambdaCDM
 from astropy.units import Quantity
@@ -212,3 +216,57 @@ def test_redshifts_from_comoving_density():
 
 if __name__ == "__main__":
     pytest.main()
+
+
+def test_vel_disp_sdss_cumulative_density():
+    cosmo = FlatLambdaCDM(H0=70, Om0=0.3)
+    vel_disp, density = vel_disp_sdss_cumulative_density(cosmo)
+    assert np.all(np.diff(vel_disp) > 0)
+    assert np.all(np.diff(density) <= 0)
+    assert density[-1] == 0
+    npt.assert_almost_equal(vel_disp[0], 50 * 8 ** (-0.066))
+    # all galaxies between 50 and 500 km/s of the Bernardi et al. 2010 VDF
+    alpha, beta, vd_star = 0.94, 1.85, 113.78
+    total = 2.099e-2 * (
+        scipy.special.gammaincc(alpha / beta, (50 / vd_star) ** beta)
+        - scipy.special.gammaincc(alpha / beta, (500 / vd_star) ** beta)
+    )
+    npt.assert_allclose(density[0], total, rtol=1e-4)
+
+
+def test_vel_disp_abundance_matching_analytic():
+    np.random.seed(42)
+    cosmo = FlatLambdaCDM(H0=70, Om0=0.3)
+    sky_area = Quantity(value=0.1, unit="deg2")
+    n = 8000
+    galaxy_list = Table(
+        {
+            "z": np.random.uniform(0, 1, n),
+            "stellar_mass": 10 ** np.random.normal(10.3, 0.6, n),
+        }
+    )
+    f_analytic = vel_disp_abundance_matching(
+        galaxy_list, z_max=0.5, sky_area=sky_area, cosmo=cosmo, analytic=True
+    )
+    f_monte_carlo = vel_disp_abundance_matching(
+        galaxy_list, z_max=0.5, sky_area=sky_area, cosmo=cosmo
+    )
+    log_stellar_mass = np.linspace(10, 11, 5)
+    npt.assert_allclose(
+        f_analytic(log_stellar_mass), f_monte_carlo(log_stellar_mass), rtol=0.1
+    )
+    assert np.all(np.diff(f_analytic(log_stellar_mass)) > 0)
+
+    # cached per cosmology and catalog
+    f_cached = vel_disp_abundance_matching(
+        galaxy_list, z_max=0.5, sky_area=sky_area, cosmo=cosmo, analytic=True
+    )
+    assert f_cached is f_analytic
+    f_other = vel_disp_abundance_matching(
+        galaxy_list,
+        z_max=0.5,
+        sky_area=sky_area,
+        cosmo=FlatLambdaCDM(H0=60, Om0=0.3),
+        analytic=True,
+    )
+    assert f_other is not f_analytic
@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 import numpy.testing as npt
 import os
@@ -131,3 +132,72 @@ class TestDeflector(object):
 
         theta_E_infinity = self.deflector_nfw.theta_e_infinity(cosmo=None)
         npt.assert_almost_equal(theta_E_infinity, 1, decimal=2)
+
+    def test_theta_e_infinity_batch(self):
+        deflector_nfw_dict = {
+            "halo_mass": 10**13,
+            "halo_mass_acc": 0.0,
+            "concentration": 10,
+            "e1_mass": 0.1,
+            "e2_mass": -0.1,
+            "stellar_mass": 10e11,
+            "angular_size": 1.0,
+            "e1_light": -0.1,
+            "e2_light": 0.1,
+            "z": 0.5,
+            "mag_g": -20,
+        }
+        deflectors = [
+            Deflector(deflector_type="NFW_HERNQUIST", **deflector_nfw_dict),
+            self.deflector,
+            Deflector(
+                deflector_type="NFW_HERNQUIST", **{**deflector_nfw_dict, "z": 0.8}
+            ),
+        ]
+        theta_E = Deflector.theta_e_infinity_batch(deflectors, cosmo=None)
+        assert len(theta_E) == 3
+        for deflector, theta_E_infinity in zip(deflectors, theta_E):
+            assert deflector._theta_e_infinity == theta_E_infinity
+        npt.assert_almost_equal(
+            theta_E[1], self.deflector.theta_e_infinity(cosmo=None), decimal=8
+        )
+        single = Deflector(deflector_type="NFW_HERNQUIST", **deflector_nfw_dict)
+        npt.assert_almost_equal(
+            theta_E[0], single.theta_e_infinity(cosmo=None), decimal=8
+        )
+
+    def test_from_arrays(self):
+        red_one = self.deflector._deflector._deflector_dict
+        columns = {
+            name: np.array([value, value])
+            for name, value in dict(red_one).items()
+            if np.ndim(value) <= 1 and np.size(value) == 1
+        }
+        columns["z"] = np.array([0.3, 0.5])
+        columns["vel_disp"] = np.array([200.0, 250.0])
+        columns["theta_E"] = np.array([0.8, 1.2])
+        columns["center_x"] = np.array([0.01, -0.02])
+        columns["center_y"] = np.array([0.03, 0.0])
+        deflectors = Deflector.from_arrays("EPL_SERSIC", columns)
+        assert len(deflectors) == 2
+        for index, deflector in enumerate(deflectors):
+            kwargs = {name: column[index] for name, column in columns.items()}
+            reference = Deflector(deflector_type="EPL_SERSIC", **kwargs)
+            assert deflector.redshift == reference.redshift
+            assert deflector.velocity_dispersion() == 200.0 + 50 * index
+            npt.assert_almost_equal(
+                deflector.mass_model_lenstronomy(self.lens_cosmo)[1][0]["theta_E"],
+                0.8 + 0.4 * index,
+            )
+            assert deflector.magnitude("g") == reference.magnitude("g")
+            assert (
+                deflector.light_model_lenstronomy(band="g")[1]
+                == reference.light_model_lenstronomy(band="g")[1]
+            )
+        # the deflectors share the columns
+        deflectors = Deflector.from_arrays("EPL_SERSIC", columns, indices=[1, 1])
+        assert deflectors[0]._deflector._deflector_dict._columns is columns
+        assert "z" not in deflectors[0]._deflector._deflector_dict
+
+        with npt.assert_raises(ValueError):
+            Deflector.from_arrays("NFW_CLUSTER", columns)
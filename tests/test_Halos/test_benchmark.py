@@ -0,0 +1,66 @@
+import json
+import logging
+
+from slsim.Halos.benchmark import main, run_halos_benchmarks
+from slsim.Halos.halos import HaloMassFunctionTable
+from slsim.Halos.halos_util import log_timing
+
+
+def test_run_halos_benchmarks(tmp_path):
+    output_file = str(tmp_path / "benchmark.json")
+    default_cache_dir = HaloMassFunctionTable.default_cache_dir
+    report = run_halos_benchmarks(
+        sky_areas=[0.00005],
+        samples_number=3,
+        processes=2,
+        use_skypy=False,
+        output_file=output_file,
+    )
+    with open(output_file) as f:
+        assert json.load(f) == report
+    assert "slsim_version" in report["metadata"]
+    names = [benchmark["name"] for benchmark in report["benchmarks"]]
+    assert names == [
+        "halos_pipeline",
+        "get_convergence_shear",
+        "get_kappa_gamma_distib_single_process",
+        "get_kappa_gamma_distib_multi_process",
+        "get_kappa_gamma_distib_vectorized",
+        "number_density_at_redshift",
+        "number_density_at_redshift",
+        "colossus_halo_mass_sampler",
+    ]
+    caches = [benchmark.get("cache") for benchmark in report["benchmarks"]]
+    assert caches[5:7] == ["cold", "warm"]
+    assert report["benchmarks"][5]["peak_traced_memory_mb"] is None
+    assert HaloMassFunctionTable.default_cache_dir == default_cache_dir
+    for benchmark in report["benchmarks"]:
+        assert benchmark["wall_time"] > 0
+        assert benchmark["sky_area"] == 0.00005
+        assert benchmark["n_halos"] >= 0
+        assert "result" not in benchmark
+
+    main(
+        [
+            "--sky-areas",
+            "0.00005",
+            "--samples-number",
+            "2",
+            "--processes",
+            "1",
+            "--no-skypy",
+            "--output",
+            output_file,
+        ]
+    )
+    with open(output_file) as f:
+        assert len(json.load(f)["benchmarks"]) == 8
+
+
+def test_log_timing(caplog):
+    with caplog.at_level(logging.INFO, logger="slsim.Halos.timing"):
+        timing = log_timing("test", 0.0, n_iterations=2)
+    assert timing["name"] == "test"
+    assert timing["n_iterations"] == 2
+    assert caplog.records[0].timing == timing
+    assert "test took" in caplog.text
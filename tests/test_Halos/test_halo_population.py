@@ -1,10 +1,14 @@
 import numpy as np
+import numpy.testing as npt
 from colossus.cosmology import cosmology
+from colossus.halo import concentration
 from slsim.Halos.halo_population import (
     gene_e_ang_halo,
     calc_vol,
     dNhalodzdlnM_lens,
+    dNhalodzdlnM_lens_grid,
     concent_m_w_scatter,
+    concent_m_w_scatter_vectorized,
 )
 
 # Assuming other imports are already defined, we continue from here.
@@ -41,3 +45,29 @@ def test_concent_m_w_scatter():
     for z in z_ar:
         con_ar = concent_m_w_scatter(Mh_ar, z, lnsigma)
         assert all(con >= 1 for con in con_ar)
+
+
+def test_dNhalodzdlnM_lens_grid():
+    Mh_ar = np.logspace(11, 16, 20)  # in units of M_sol/h
+    z_ar = np.linspace(0.01, 5, 7)
+    cosmo = cosmology.setCosmology("planck18")
+    dN_grid = dNhalodzdlnM_lens_grid(Mh_ar, z_ar, cosmo)
+    assert dN_grid.shape == (7, 20)
+    for i, z in enumerate(z_ar):
+        npt.assert_allclose(
+            dN_grid[i], dNhalodzdlnM_lens(Mh_ar, np.full(20, z), cosmo), rtol=1e-10
+        )
+
+
+def test_concent_m_w_scatter_vectorized():
+    cosmology.setCosmology("planck18")
+    Mh_ar = np.logspace(11.5, 15, 8)  # in units of M_sol/h
+    z_ar = np.linspace(0.01, 3, 8)
+    con_ar = concent_m_w_scatter_vectorized(Mh_ar, z_ar, 0.0)
+    for m, z, con in zip(Mh_ar, z_ar, con_ar):
+        con_exact = concentration.concentration(m, "vir", z, model="diemer19")
+        npt.assert_allclose(con, max(con_exact, 1.0), rtol=3e-3)
+
+    con_ar = concent_m_w_scatter_vectorized(Mh_ar, 0.5, 0.3)
+    assert len(con_ar) == 8
+    assert all(con >= 1 for con in con_ar)
@@ -19,6 +19,8 @@ from slsim.Halos.halos import (
     colossus_halo_expected_number_certain_bin,
     colossus_halo_expected_number,
     optimize_min_mass_based_on_number,
+    HaloMassFunctionTable,
+    halos_from_mass_function_table,
 )
 
 from astropy.cosmology import default_cosmology
@@ -92,6 +94,16 @@ def test_halo_mass_at_z():
     assert len(mass_list3) == 2
     assert mass_list3 == [0, 0]
 
+    # the global random state controls the masses unless a seed is given
+    np.random.seed(4)
+    mass_list4 = halo_mass_at_z(z=z_list, resolution=100)
+    np.random.seed(4)
+    np.testing.assert_array_equal(halo_mass_at_z(z=z_list, resolution=100), mass_list4)
+    np.testing.assert_array_equal(
+        halo_mass_at_z(z=z_list, resolution=100, random_seed=2),
+        halo_mass_at_z(z=z_list, resolution=100, random_seed=2),
+    )
+
 
 def test_number_density_at_redshift():
     z = 0.5
@@ -411,3 +423,100 @@ def test_optimize_min_mass_based_on_number():
         ns=0.96,
     )
     assert result2 == 1e9
+
+
+def test_halo_mass_function_table(tmp_path):
+    table = HaloMassFunctionTable(
+        cosmo, m_min=1e12, m_max=1e15, resolution=100, z_max=2, z_resolution=41
+    )
+    assert table.redshifts.shape == (41,)
+    assert table.masses[0] == pytest.approx(1e12)
+    assert table.masses[-1] == pytest.approx(1e15)
+
+    z = np.array([0.5, 0.77, 1.5])
+    dndlnm = table.dndlnm(z)
+    assert dndlnm.shape == (3, 100)
+    m_200 = table.masses * cosmo.h
+    np.testing.assert_allclose(
+        dndlnm[0], colossus_halo_mass_function(m_200, cosmo, 0.5), rtol=1e-10
+    )
+    np.testing.assert_allclose(
+        dndlnm[1], colossus_halo_mass_function(m_200, cosmo, 0.77), rtol=1e-2
+    )
+    density = [
+        number_density_for_massf(
+            colossus_halo_mass_function(m_200, cosmo, zi), m_200, dndlnM=True
+        )
+        for zi in z
+    ]
+    np.testing.assert_allclose(table.number_density(z), density, rtol=1e-3)
+    expected_mass = [
+        colossus_halo_expected_mass_sampler(1e12, 1e15, 100, zi, cosmo) for zi in z
+    ]
+    np.testing.assert_allclose(table.expected_mass(z), expected_mass, rtol=1e-3)
+
+    cdf = table.cdf(z)
+    assert cdf.shape == (3, 100)
+    np.testing.assert_allclose(cdf[:, 0], 0)
+    np.testing.assert_allclose(cdf[:, -1], 1)
+    assert np.all(np.diff(cdf, axis=-1) >= 0)
+
+    masses = table.sample_masses(np.full(20000, 0.77), random_seed=1)
+    assert np.all((masses >= 1e12) & (masses <= 1e15))
+    # the empirical CDF follows the tabulated one
+    empirical = np.searchsorted(np.sort(masses), table.masses) / len(masses)
+    np.testing.assert_allclose(empirical, cdf[1], atol=0.02)
+    np.testing.assert_array_equal(
+        masses, table.sample_masses(np.full(20000, 0.77), random_seed=1)
+    )
+
+    kwargs = dict(m_min=1e12, m_max=1e15, resolution=50, z_max=1, z_resolution=11)
+    assert HaloMassFunctionTable.cached(cosmo, **kwargs) is (
+        HaloMassFunctionTable.cached(cosmo, **kwargs)
+    )
+    table1 = HaloMassFunctionTable(cosmo, cache_dir=str(tmp_path), **kwargs)
+    assert len(list(tmp_path.iterdir())) == 1
+    table2 = HaloMassFunctionTable(cosmo, cache_dir=str(tmp_path), **kwargs)
+    np.testing.assert_array_equal(table1.dndlnm(0.3), table2.dndlnm(0.3))
+
+    # cached tables are stored in the default cache directory
+    default_cache_dir = HaloMassFunctionTable.default_cache_dir
+    HaloMassFunctionTable.default_cache_dir = str(tmp_path / "default")
+    try:
+        kwargs["z_resolution"] = 12
+        HaloMassFunctionTable.cached(cosmo, **kwargs)
+        assert len(list((tmp_path / "default").iterdir())) == 1
+    finally:
+        HaloMassFunctionTable.default_cache_dir = default_cache_dir
+
+
+def test_halos_from_mass_function_table():
+    sky_area = 0.01 * units.deg**2
+    halos = halos_from_mass_function_table(
+        sky_area, cosmo, m_min=1e12, m_max=1e15, z_max=3, random_seed=3
+    )
+    assert halos.colnames == ["z", "mass"]
+    assert np.all((halos["z"] >= 0) & (halos["z"] <= 3))
+    assert np.all((halos["mass"] >= 1e12) & (halos["mass"] <= 1e15))
+    halos2 = halos_from_mass_function_table(
+        sky_area, cosmo, m_min=1e12, m_max=1e15, z_max=3, random_seed=3
+    )
+    np.testing.assert_array_equal(halos["mass"], halos2["mass"])
+
+    # expected number of halos as in the SkyPy redshift sampling
+    redshift_list = np.linspace(0, 3, 301)
+    dN_dz = dv_dz_to_dn_dz(
+        v_per_redshift(redshift_list, cosmo, sky_area),
+        redshift_list,
+        m_min=1e12,
+        m_max=1e15,
+        cosmology=cosmo,
+    )
+    expected = np.trapz(dN_dz, redshift_list)
+    assert abs(len(halos) - expected) < 5 * np.sqrt(expected)
+
+    with pytest.warns(Warning, match=r".*No Halos*"):
+        halos = halos_from_mass_function_table(
+            1e-7 * units.deg**2, cosmo, m_min=1e15, m_max=1e16, z_max=0.3
+        )
+    assert len(halos) == 1 and np.isnan(halos["z"][0]) and halos["mass"][0] == 0
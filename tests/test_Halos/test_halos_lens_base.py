@@ -2,6 +2,7 @@ from slsim.Halos.halos_lens_base import (
     concentration_from_mass,
     HalosLensBase,
 )
+from slsim.Halos.halos_ray_tracing import HalosRayTracing
 from slsim.Util.param_util import deg2_to_cone_angle
 from slsim.Util.astro_util import cone_radius_angle_to_physical_area
 import pytest
@@ -64,6 +65,7 @@ def setup_halos_lens():
         sky_area=0.0001,
         cosmo=cosmo,
         mass_sheet=True,
+        random_seed=1,
     )
 
 
@@ -184,6 +186,37 @@ def test_random_position(setup_halos_lens):
     assert isinstance(px, float)
     assert isinstance(py, float)
 
+    px, py = hl.random_position(size=10000)
+    assert px.shape == py.shape == (10000,)
+    radius_max = 3600 * np.sqrt(hl.sky_area / np.pi)
+    assert np.all(np.hypot(px, py) <= radius_max)
+    # uniform on the disk: half of the positions inside radius_max / sqrt(2)
+    assert np.mean(np.hypot(px, py) < radius_max / np.sqrt(2)) == pytest.approx(
+        0.5, abs=0.03
+    )
+
+
+def test_random_positions_block(setup_halos_lens):
+    hl = setup_halos_lens
+    positions = hl.random_positions_block(5)
+    assert positions.shape == (5, hl.n_halos, 2)
+    assert hl.random_positions_block(5, n_halos=7).shape == (5, 7, 2)
+
+    halos = hl.halos_list[["z", "mass"]]
+    hl1 = HalosLensBase(halos_list=halos.copy(), cosmo=hl.cosmo, random_seed=3)
+    hl2 = HalosLensBase(halos_list=halos.copy(), cosmo=hl.cosmo, random_seed=3)
+    np.testing.assert_array_equal(hl1.halos_list["px"], hl2.halos_list["px"])
+    np.testing.assert_array_equal(
+        hl1.random_positions_block(4), hl2.random_positions_block(4)
+    )
+
+    # without a seed, the global random state controls the positions
+    np.random.seed(5)
+    hl3 = HalosLensBase(halos_list=halos.copy(), cosmo=hl.cosmo)
+    np.random.seed(5)
+    hl4 = HalosLensBase(halos_list=halos.copy(), cosmo=hl.cosmo)
+    np.testing.assert_array_equal(hl3.halos_list["px"], hl4.halos_list["px"])
+
 
 def test_get_lens_model(
     setup_halos_lens, setup_no_halos, setup_no_halos_mass_sheet_false
@@ -567,3 +600,95 @@ def test_setting():
             sky_area=0.0001,
             mass_sheet=False,
         )
+
+
+def test_halos_get_convergence_shear_vectorized(setup_halos_lens, setup_no_halos):
+    hl = setup_halos_lens
+    kappa, gamma1, gamma2 = hl.halos_get_convergence_shear(gamma12=True, diff=1e-7)
+    kappa_v, gamma1_v, gamma2_v = hl.halos_get_convergence_shear_vectorized(
+        gamma12=True
+    )
+    np.testing.assert_allclose(
+        [kappa_v, gamma1_v, gamma2_v], [kappa, gamma1, gamma2], atol=1e-5
+    )
+    assert hl.param_halos_multi_plane is hl.param_halos_multi_plane
+
+    px = np.array([hl.halos_list["px"], hl.halos_list["py"]])
+    py = np.array([hl.halos_list["py"], hl.halos_list["px"]])
+    kappa_v, gamma_v = hl.halos_get_convergence_shear_vectorized(px, py)
+    assert kappa_v.shape == gamma_v.shape == (2,)
+    kappa, gamma = hl.halos_get_convergence_shear(diff=1e-7)
+    assert kappa_v[0] == pytest.approx(kappa, abs=1e-5)
+    assert gamma_v[0] == pytest.approx(gamma, abs=1e-5)
+
+    assert setup_no_halos.halos_get_convergence_shear_vectorized() == (0.0, 0.0)
+
+
+def test_halos_get_kext_gext_values_vectorized(setup_halos_lens, setup_no_halos):
+    hl = setup_halos_lens
+    zd, zs = 0.55, 1.0
+    # reference of the point Hessian, with a small finite difference instead
+    # of the 1 arcsec of halos_get_kext_gext_values
+    lens_data = hl.get_lens_data_by_redshift(zd, zs)
+    ray_tracing = HalosRayTracing(lens_kwargs=None, lens_model=None)
+    kappa, gamma1, gamma2 = {}, {}, {}
+    for name, zdzs in [("od", None), ("os", None), ("ds", (zd, zs))]:
+        kappa[name], gamma1[name], gamma2[name] = ray_tracing.get_convergence_shear(
+            gamma12=True,
+            kwargs=lens_data[name]["kwargs_lens"],
+            lens_model=lens_data[name]["param_lens_model"],
+            same_from_class=False,
+            diff=1e-7,
+            zdzs=zdzs,
+        )
+    kext = 1 - (1 - kappa["od"]) * (1 - kappa["os"]) / (1 - kappa["ds"])
+    gext = np.hypot(
+        gamma1["od"] + gamma1["os"] - gamma1["ds"],
+        gamma2["od"] + gamma2["os"] - gamma2["ds"],
+    )
+    kext_v, gext_v = hl.halos_get_kext_gext_values_vectorized(zd=zd, zs=zs)
+    assert kext_v == pytest.approx(kext, rel=1e-4)
+    assert gext_v == pytest.approx(gext, rel=1e-4)
+    assert hl.get_halos_multi_plane_by_redshift(
+        zd, zs
+    ) is hl.get_halos_multi_plane_by_redshift(zd, zs)
+
+    px = np.array([hl.halos_list["px"], hl.halos_list["py"]])
+    py = np.array([hl.halos_list["py"], hl.halos_list["px"]])
+    kext_v, gext_v = hl.halos_get_kext_gext_values_vectorized(zd, zs, px, py)
+    assert kext_v.shape == gext_v.shape == (2,)
+    assert kext_v[0] == pytest.approx(kext, rel=1e-4)
+    kext_b, gext_b = hl.halos_get_kext_gext_values_vectorized(zd, zs, px, py, born=True)
+    np.testing.assert_allclose(kext_b, kext_v, rtol=0.1)
+
+    with pytest.raises(ValueError):
+        hl.get_halos_multi_plane_by_redshift(1.0, 0.5)
+
+    kext, gext = setup_no_halos.halos_get_kext_gext_values_vectorized(zd, zs)
+    assert np.isfinite(kext) and gext == 0
+
+
+def test_halos_born_maps(setup_halos_lens, setup_no_halos):
+    hl = setup_halos_lens
+    px, py = np.array([5.0, -8.0, 10.0]), np.array([3.0, 9.0, -6.0])
+    kappa, gamma1, gamma2 = hl.halos_born_maps(
+        num_points=60, px=px, py=py, truncate=False
+    )
+    assert kappa.shape == gamma1.shape == gamma2.shape == (60, 60)
+    # the lightcone axis is a pixel corner, compare with the mean of the
+    # four central pixels
+    kappa_0, gamma1_0, gamma2_0 = hl.halos_get_convergence_shear_vectorized(
+        px, py, gamma12=True, born=True
+    )
+    assert np.mean(kappa[29:31, 29:31]) == pytest.approx(kappa_0, abs=2e-3)
+    assert np.mean(gamma1[29:31, 29:31]) == pytest.approx(gamma1_0, abs=2e-3)
+    assert np.mean(gamma2[29:31, 29:31]) == pytest.approx(gamma2_0, abs=2e-3)
+
+    kappa_image, kappa_values = hl.halos_compute_kappa(num_points=60, fft=True)
+    assert kappa_image.shape == (60, 60)
+    assert np.isnan(kappa_image[0, 0])
+    assert len(kappa_values) == np.sum(np.isfinite(kappa_image))
+
+    kappa, gamma1, _ = setup_no_halos.halos_born_maps(num_points=10)
+    np.testing.assert_allclose(gamma1, 0)
+    assert np.all(kappa == kappa[0, 0])
@@ -0,0 +1,161 @@
+import numpy as np
+import pytest
+from astropy.cosmology import FlatLambdaCDM
+
+from slsim.Halos.halos_maps import (
+    _truncated_nfw_lensing,
+    cloud_in_cell,
+    nfw_born_maps,
+    truncated_nfw_kernels,
+)
+from slsim.Halos.halos_multi_plane import HalosMultiPlane, nfw_hessian
+
+
+def test_truncated_nfw_kernels():
+    pixel_scale = 0.5
+    kappa, gamma1, gamma2 = truncated_nfw_kernels(
+        Rs=2.0, truncation=5.0, pixel_scale=pixel_scale, shape=(128, 128)
+    )
+    # mass of the truncated profile, 4 pi kappa_s Rs^2 g(c)
+    mass = 4 * np.pi * (np.log(5.0 / 2) + np.arccos(1 / 5.0) / np.sqrt(24))
+    assert np.sum(kappa) * pixel_scale**2 == pytest.approx(mass, rel=0.01)
+    # point mass shear outside the truncation radius, on the x-axis
+    x = 20 * pixel_scale
+    assert gamma1[0, 20] == pytest.approx(-mass / (np.pi * x**2), rel=1e-6)
+    assert gamma2[0, 20] == pytest.approx(0, abs=1e-12)
+
+    # profiles much smaller than a pixel keep their mass
+    kappa, _, _ = truncated_nfw_kernels(
+        Rs=0.01, truncation=5.0, pixel_scale=pixel_scale, shape=(16, 16)
+    )
+    assert np.sum(kappa) * pixel_scale**2 == pytest.approx(mass, rel=1e-6)
+
+    # without truncation the NFW profile is recovered
+    _, gamma1, gamma2 = truncated_nfw_kernels(
+        Rs=2.0, truncation=np.inf, pixel_scale=pixel_scale, shape=(64, 64)
+    )
+    alpha_Rs = 4 * 2.0 * (1 + np.log(0.5))
+    f_xx, f_xy, f_yy = nfw_hessian(3.0, 4.0, 2.0, alpha_Rs)
+    assert gamma1[8, 6] * 4 == pytest.approx((f_xx - f_yy) / 2, rel=1e-6)
+    assert gamma2[8, 6] * 4 == pytest.approx(f_xy, rel=1e-6)
+
+
+def test_cloud_in_cell():
+    grid = cloud_in_cell(
+        x=[0.0, 0.25, 100.0],
+        y=[0.0, 0.0, 0.0],
+        amplitudes=np.array([1.0, 2.0, 5.0]),
+        pixel_scale=0.5,
+        shape=(4, 4),
+        origin=(1, 1),
+    )
+    assert np.sum(grid) == pytest.approx(3)
+    assert grid[1, 1] == pytest.approx(2)
+    assert grid[1, 2] == pytest.approx(1)
+
+
+def test_born_maps():
+    rng = np.random.default_rng(3)
+    n_halos = 30
+    cosmo = FlatLambdaCDM(H0=70, Om0=0.3)
+    multi_plane = HalosMultiPlane(
+        halo_redshifts=rng.uniform(0.1, 2.5, n_halos),
+        Rs=rng.uniform(1, 10, n_halos),
+        alpha_Rs=rng.uniform(0.05, 0.5, n_halos),
+        cosmo=cosmo,
+        z_source=3.0,
+        sheet_redshifts=[1.0],
+        sheet_kappa=[-0.01],
+    )
+    center_x = rng.uniform(-60, 60, n_halos)
+    center_y = rng.uniform(-60, 60, n_halos)
+    num_pixels, pixel_scale = 120, 1.0
+    kappa, gamma1, gamma2 = multi_plane.born_maps(
+        center_x,
+        center_y,
+        num_pixels=num_pixels,
+        pixel_scale=pixel_scale,
+        n_kernels=100,
+    )
+    assert kappa.shape == gamma1.shape == gamma2.shape == (num_pixels, num_pixels)
+    x = (np.arange(num_pixels) - (num_pixels - 1) / 2) * pixel_scale
+    for i, j in rng.integers(10, num_pixels - 10, size=(10, 2)):
+        if np.min(np.hypot(center_x - x[j], center_y - x[i])) < 3 * pixel_scale:
+            # the cloud-in-cell deposit smooths the halo centers
+            continue
+        f_xx, f_xy, _, f_yy = multi_plane.hessian(
+            center_x, center_y, theta_x=x[j], theta_y=x[i], born=True
+        )
+        assert kappa[i, j] == pytest.approx((f_xx + f_yy) / 2, abs=5e-4)
+        assert gamma1[i, j] == pytest.approx((f_xx - f_yy) / 2, abs=5e-4)
+        assert gamma2[i, j] == pytest.approx(f_xy, abs=5e-4)
+
+    # truncated profiles have less mass, only mass sheets without halos
+    kappa_truncated, _, _ = multi_plane.born_maps(
+        center_x,
+        center_y,
+        num_pixels=num_pixels,
+        pixel_scale=pixel_scale,
+        truncation=np.full(n_halos, 3.0),
+    )
+    assert np.mean(kappa_truncated) < np.mean(kappa)
+    kappa, gamma1, gamma2 = nfw_born_maps(
+        [], [], [], [], [], num_pixels=8, pixel_scale=1.0, sheet_kappa=-0.01
+    )
+    np.testing.assert_allclose(kappa, -0.01)
+    np.testing.assert_allclose(gamma1, 0)
+
+
+def test_born_maps_truncation_bins():
+    rng = np.random.default_rng(3)
+    n_halos = 300
+    center_x, center_y = rng.uniform(-70, 70, (2, n_halos))
+    Rs = np.exp(rng.uniform(0, np.log(10), n_halos))
+    kappa_s = rng.uniform(0.005, 0.05, n_halos)
+    weights = rng.uniform(0.2, 1, n_halos)
+    truncation = np.exp(rng.uniform(np.log(3), np.log(12), n_halos))
+    num_pixels, pixel_scale = 120, 1.0
+    x = (np.arange(num_pixels) - (num_pixels - 1) / 2) * pixel_scale
+    x, y = np.meshgrid(x, x)
+    exact = np.zeros((3, num_pixels, num_pixels))
+    for i in range(n_halos):
+        exact += (
+            weights[i]
+            * kappa_s[i]
+            * Rs[i] ** 2
+            * np.array(
+                _truncated_nfw_lensing(
+                    x - center_x[i], y - center_y[i], Rs[i], truncation[i]
+                )
+            )
+        )
+    # the cloud-in-cell deposit smooths the halo centers
+    distance = np.min(
+        np.hypot(center_x[:, None, None] - x, center_y[:, None, None] - y), axis=0
+    )
+    mask = distance > 3 * pixel_scale
+
+    def relative_errors(**kwargs):
+        maps = nfw_born_maps(
+            center_x,
+            center_y,
+            Rs,
+            kappa_s,
+            weights,
+            num_pixels,
+            pixel_scale,
+            truncation=truncation,
+            **kwargs,
+        )
+        return np.array(
+            [
+                np.sqrt(np.mean((maps[i] - exact[i])[mask] ** 2))
+                / np.sqrt(np.mean(exact[i][mask] ** 2))
+                for i in range(3)
+            ]
+        )
+
+    errors = relative_errors()
+    np.testing.assert_array_less(errors, [0.04, 0.12, 0.08])
+    # a single kernel per scale radius bin ignores the spread of truncations
+    np.testing.assert_array_less(errors, relative_errors(n_truncation_kernels=1))
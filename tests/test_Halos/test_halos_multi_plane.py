@@ -0,0 +1,135 @@
+import numpy as np
+import pytest
+from astropy.cosmology import FlatLambdaCDM
+from lenstronomy.LensModel.lens_model import LensModel
+from lenstronomy.LensModel.Profiles.nfw import NFW
+
+from slsim.Halos.halos_multi_plane import (
+    HalosMultiPlane,
+    nfw_derivatives,
+    nfw_hessian,
+)
+
+
+@pytest.fixture
+def setup_halos():
+    rng = np.random.default_rng(42)
+    n_halos = 20
+    return {
+        "z": rng.uniform(0.1, 2.5, n_halos),
+        "Rs": rng.uniform(1, 20, n_halos),
+        "alpha_Rs": rng.uniform(0.05, 2, n_halos),
+        "center_x": rng.uniform(-20, 20, n_halos),
+        "center_y": rng.uniform(-20, 20, n_halos),
+        "sheet_z": np.array([0.5, 1.5]),
+        "sheet_kappa": np.array([-0.01, -0.02]),
+        "cosmo": FlatLambdaCDM(H0=70, Om0=0.3),
+    }
+
+
+def _lenstronomy_model(halos, z_source):
+    n_halos = len(halos["z"])
+    lens_model = LensModel(
+        lens_model_list=["NFW"] * n_halos + ["CONVERGENCE"] * 2,
+        lens_redshift_list=np.concatenate((halos["z"], halos["sheet_z"])),
+        cosmo=halos["cosmo"],
+        observed_convention_index=[],
+        multi_plane=True,
+        z_source=z_source,
+        z_source_convention=5,
+    )
+    kwargs = [
+        {
+            "Rs": halos["Rs"][i],
+            "alpha_Rs": halos["alpha_Rs"][i],
+            "center_x": halos["center_x"][i],
+            "center_y": halos["center_y"][i],
+        }
+        for i in range(n_halos)
+    ] + [{"kappa": kappa, "ra_0": 0, "dec_0": 0} for kappa in halos["sheet_kappa"]]
+    return lens_model, kwargs
+
+
+def _engine(halos, z_source):
+    return HalosMultiPlane(
+        halos["z"],
+        halos["Rs"],
+        halos["alpha_Rs"],
+        halos["cosmo"],
+        z_source,
+        sheet_redshifts=halos["sheet_z"],
+        sheet_kappa=halos["sheet_kappa"],
+    )
+
+
+def test_nfw_profile():
+    x = np.array([0.1, 0.5, 0.99, 1.5, 3.0, 40.0])
+    y = np.array([0.0, -0.3, 0.2, 1.0, -2.0, 5.0])
+    nfw = NFW()
+    for Rs, alpha_Rs in [(1.0, 0.5), (0.3, 2.0), (5.0, 0.01)]:
+        f_xx, f_xy, _, f_yy = nfw.hessian(x, y, Rs, alpha_Rs)
+        npt_hessian = nfw_hessian(x, y, Rs, alpha_Rs)
+        np.testing.assert_allclose(npt_hessian, [f_xx, f_xy, f_yy], atol=1e-10)
+        np.testing.assert_allclose(
+            nfw_derivatives(x, y, Rs, alpha_Rs),
+            nfw.derivatives(x, y, Rs, alpha_Rs),
+            atol=1e-10,
+        )
+    # continuous across R = Rs
+    f_xx, _, _ = nfw_hessian(np.array([0.99999, 1.0, 1.00001]), np.zeros(3), 1, 1)
+    np.testing.assert_allclose(f_xx, f_xx[1], rtol=1e-4)
+
+
+def test_hessian_multi_plane(setup_halos):
+    z_source = 4
+    lens_model, kwargs = _lenstronomy_model(setup_halos, z_source)
+    engine = _engine(setup_halos, z_source)
+    center_x, center_y = setup_halos["center_x"], setup_halos["center_y"]
+
+    expected = lens_model.hessian(0.0, 0.0, kwargs, diff=1e-6)
+    np.testing.assert_allclose(engine.hessian(center_x, center_y), expected, atol=1e-6)
+    expected = lens_model.hessian(2.0, -3.0, kwargs, diff=1e-6)
+    np.testing.assert_allclose(
+        engine.hessian(center_x, center_y, theta_x=2.0, theta_y=-3.0),
+        expected,
+        atol=1e-6,
+    )
+    expected = lens_model.hessian_z1z2(1.0, z_source, 0, 0, kwargs, diff=1e-6)
+    np.testing.assert_allclose(
+        engine.hessian(center_x, center_y, z_start=1.0), expected, atol=1e-6
+    )
+
+
+def test_many_samples(setup_halos):
+    engine = _engine(setup_halos, 4)
+    center_x = np.array([setup_halos["center_x"], setup_halos["center_x"] + 5])
+    center_y = np.array([setup_halos["center_y"], setup_halos["center_y"]])
+    kappa, gamma1, gamma2 = engine.convergence_shear(center_x, center_y, gamma12=True)
+    assert kappa.shape == (2,)
+    kappa_1, gamma_1 = engine.convergence_shear(center_x[1], center_y[1])
+    assert kappa[1] == pytest.approx(kappa_1)
+    assert np.hypot(gamma1[1], gamma2[1]) == pytest.approx(gamma_1)
+
+
+def test_born_approximation(setup_halos):
+    # weak halos far from the line of sight, the plane coupling is second order
+    setup_halos["alpha_Rs"] = setup_halos["alpha_Rs"] * 0.01
+    setup_halos["sheet_kappa"] = np.zeros(2)
+    engine = _engine(setup_halos, 4)
+    rng = np.random.default_rng(1)
+    center_x = rng.uniform(-100, 100, (50, 20))
+    center_y = rng.uniform(-100, 100, (50, 20))
+    kappa, gamma = engine.convergence_shear(center_x, center_y)
+    kappa_born, gamma_born = engine.convergence_shear(center_x, center_y, born=True)
+    np.testing.assert_allclose(kappa_born, kappa, rtol=1e-2)
+    np.testing.assert_allclose(gamma_born, gamma, rtol=1e-2)
+    f_born = engine.hessian(center_x, center_y, z_start=1.0, born=True, chunk_size=7)
+    f = engine.hessian(center_x, center_y, z_start=1.0)
+    np.testing.assert_allclose(f_born, f, rtol=1e-2, atol=1e-5)
+
+
+def test_empty_and_errors(setup_halos):
+    engine = HalosMultiPlane([], [], [], setup_halos["cosmo"], z_source=2)
+    assert engine.hessian(np.array([]), np.array([])) == (0.0, 0.0, 0.0, 0.0)
+    with pytest.raises(ValueError):
+        HalosMultiPlane([5.5], [1], [1], setup_halos["cosmo"], z_source=6)
@@ -1,6 +1,7 @@
 from slsim.Halos.halos_plus_glass import (
     read_glass_data,
     generate_samples_from_glass,
+    resample_kappa_gamma,
     skyarea_form_n,
     generate_maps_kmean_zero_using_halos,
     halos_plus_glass,
@@ -56,6 +57,20 @@ class Testhalosplusglass(object):
         assert isinstance(kappa_random_glass, np.ndarray)
         assert isinstance(gamma_random_glass, np.ndarray)
 
+    def test_resample_kappa_gamma(self):
+        for sampler in ["quantile", "kde"]:
+            kappa_1, gamma_1 = resample_kappa_gamma(
+                self.kappa, self.gamma, 100, sampler=sampler, random_seed=1
+            )
+            kappa_2, gamma_2 = resample_kappa_gamma(
+                self.kappa, self.gamma, 100, sampler=sampler, random_seed=1
+            )
+            assert len(kappa_1) == len(gamma_1) == 100
+            np.testing.assert_array_equal(kappa_1, kappa_2)
+            np.testing.assert_array_equal(gamma_1, gamma_2)
+        with pytest.raises(ValueError):
+            resample_kappa_gamma(self.kappa, self.gamma, 100, sampler="histogram")
+
     def test_skyarea_form_n(self):
         skyarea = skyarea_form_n(self.nside)
         assert skyarea == pytest.approx(0.20982341130279172, rel=1e-4)
@@ -71,6 +86,13 @@ class Testhalosplusglass(object):
         assert isinstance(kappa_random_glass, np.ndarray)
         assert isinstance(gamma_random_glass, np.ndarray)
 
+        kappa_random_glass, gamma_random_glass = generate_maps_kmean_zero_using_halos(
+            samples_number_for_one_halos=50, renders_numbers=50, sampler="quantile"
+        )
+        assert len(kappa_random_glass) == len(gamma_random_glass) == 50
+        assert isinstance(kappa_random_glass, np.ndarray)
+        assert isinstance(gamma_random_glass, np.ndarray)
+
     def test_generate_m_h_m_t_and_halos_plus_glass(self):
         kappa_random_glass, gamma_random_glass = generate_meanzero_halos_multiple_times(
             samples_number_for_one_halos=50,
@@ -338,3 +338,57 @@ def test_get_kappa_gamma_distib(setup_halos_hs):
     results = hl.get_kappa_gamma_distib(gamma_tot=False, listmean=True)
     assert results.shape[0] == hl.samples_number
     assert results.shape[1] == 3  # kappa, gamma1, gamma2
+
+    # same positions, and hence results, for any number of workers and chunks
+    halos = hl.halos_list[["z", "mass"]]
+    kwargs = {
+        "mass_correction_list": hl.mass_correction_list,
+        "cosmo": hl.cosmo,
+        "sky_area": hl.sky_area,
+        "samples_number": 20,
+    }
+    hs1 = HalosStatistics(halos_list=halos.copy(), random_seed=2, **kwargs)
+    hs2 = HalosStatistics(halos_list=halos.copy(), random_seed=2, **kwargs)
+    results1 = hs1.get_kappa_gamma_distib(processes=1)
+    results2 = hs2.get_kappa_gamma_distib(processes=3, chunk_size=4)
+    np.testing.assert_allclose(results1, results2)
+
+
+def test_get_kappa_gamma_distib_vectorized(setup_halos_hs, setup_no_halos):
+    hs = setup_halos_hs
+    results = hs.get_kappa_gamma_distib_vectorized()
+    assert results.shape == (hs.samples_number, 3)
+    results = hs.get_kappa_gamma_distib_vectorized(gamma_tot=True, listmean=True)
+    assert results.shape == (hs.samples_number, 2)
+    assert np.mean(results[:, 0]) == pytest.approx(0, abs=1e-6)
+    assert np.all(results[:, 1] >= 0)
+    results = hs.get_kappa_gamma_distib_vectorized(born=True)
+    assert results.shape == (hs.samples_number, 3)
+
+    hs2 = setup_no_halos
+    results2 = hs2.get_kappa_gamma_distib_vectorized(gamma_tot=True)
+    assert results2.shape == (hs2.samples_number, 2)
+
+
+def test_get_kappaext_gammaext_distib_zdzs_vectorized(setup_halos_hs):
+    hs = setup_halos_hs
+    distribution = hs.get_kappaext_gammaext_distib_zdzs(0.5, 1.0, vectorized=True)
+    assert distribution.shape == (hs.samples_number, 2)
+    assert np.all(np.isfinite(distribution))
+    distribution = hs.get_kappaext_gammaext_distib_zdzs(
+        0.5, 1.0, listmean=True, vectorized=True, born=True
+    )
+    assert np.mean(distribution[:, 0]) == pytest.approx(0, abs=1e-6)
+
+
+def test_sample_halos_positions(setup_halos_hs, setup_no_halos):
+    hs = setup_halos_hs
+    px, py = hs.sample_halos_positions()
+    assert px.shape == py.shape == (hs.samples_number, hs.n_halos)
+    np.testing.assert_array_equal(hs.halos_list["px"], px[-1])
+    np.testing.assert_array_equal(hs.halos_list["py"], py[-1])
+
+    hs2 = setup_no_halos
+    px, py = hs2.sample_halos_positions()
+    assert px.shape == (hs2.samples_number, 1)
+    assert np.all(px == 0) and np.all(py == 0)
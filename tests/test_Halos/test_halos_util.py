@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from slsim.Halos.halos_util import (
+    ConditionalQuantileSampler,
+    load_arrays_for_workers,
+    save_arrays_for_workers,
+    starmap_in_chunks,
+)
+
+
+def _add(a, b):
+    return a + b
+
+
+def test_save_load_arrays_for_workers(tmp_path):
+    z = np.linspace(0, 1, 5)
+    positions = np.arange(12.0).reshape(2, 3, 2)
+    paths = save_arrays_for_workers(str(tmp_path), z=z, positions=positions)
+    arrays = load_arrays_for_workers(paths)
+    assert isinstance(arrays["z"], np.memmap)
+    np.testing.assert_array_equal(arrays["z"], z)
+    np.testing.assert_array_equal(arrays["positions"], positions)
+    assert not arrays["positions"].flags.writeable
+
+
+def test_starmap_in_chunks():
+    args = [(i, 2 * i) for i in range(10)]
+    results = starmap_in_chunks(_add, args, processes=2)
+    assert results == [3 * i for i in range(10)]
+    results = starmap_in_chunks(_add, args, processes=64, chunk_size=3)
+    assert results == [3 * i for i in range(10)]
+    assert starmap_in_chunks(_add, [(1, 1)]) == [2]
+
+
+def test_conditional_quantile_sampler():
+    rng = np.random.default_rng(1)
+    kappa = rng.normal(0, 0.02, size=8000)
+    gamma = np.abs(kappa) + rng.exponential(0.01, size=8000)
+    sampler = ConditionalQuantileSampler(kappa, gamma)
+    assert sampler.resolution == (20, 400)
+
+    kappa_random, gamma_random = sampler.sample(200000, random_seed=2)
+    assert kappa_random.shape == gamma_random.shape == (200000,)
+    assert kappa_random.min() >= kappa.min()
+    assert gamma_random.max() <= gamma.max()
+    np.testing.assert_allclose(np.mean(kappa_random), np.mean(kappa), atol=1e-3)
+    np.testing.assert_allclose(np.std(kappa_random), np.std(kappa), atol=1e-3)
+    np.testing.assert_allclose(np.mean(gamma_random), np.mean(gamma), atol=1e-3)
+    # the dependence of gamma on kappa is kept
+    np.testing.assert_allclose(
+        np.corrcoef(np.abs(kappa_random), gamma_random)[0, 1],
+        np.corrcoef(np.abs(kappa), gamma)[0, 1],
+        atol=0.05,
+    )
+
+    x1, y1 = sampler.sample(10, random_seed=3)
+    x2, y2 = sampler.sample(10, random_seed=3)
+    np.testing.assert_array_equal(x1, x2)
+    np.testing.assert_array_equal(y1, y2)
+
+    sampler = ConditionalQuantileSampler([0.0], [0.0])
+    assert sampler.resolution == (1, 2)
+    x, y = sampler.sample(3)
+    np.testing.assert_array_equal(x, 0)
+    np.testing.assert_array_equal(y, 0)
+    with pytest.raises(ValueError):
+        ConditionalQuantileSampler([0.0, 1.0], [0.0])
@@ -0,0 +1,106 @@
+import h5py
+import numpy as np
+import pytest
+from astropy.cosmology import FlatLambdaCDM
+from astropy.table import Table
+
+from slsim.Halos.halos_statistics import HalosStatistics
+from slsim.Halos.kext_gext_tables import (
+    build_kext_gext_table,
+    default_redshift_pairs,
+    kext_gext_dataset_name,
+    kext_gext_samples_from_halos,
+    write_kext_gext_table,
+)
+from slsim.Util.ParamDistributions.kext_gext_distributions import (
+    LineOfSightDistribution,
+)
+
+
+@pytest.fixture
+def halos_lens():
+    halos = Table(
+        [[0.3, 0.6, 1.2], [2e12, 1e13, 5e12]],
+        names=("z", "mass"),
+    )
+    mass_sheet_correction = Table([[0.5], [-0.01]], names=("z", "kappa"))
+    return HalosStatistics(
+        halos_list=halos,
+        mass_correction_list=mass_sheet_correction,
+        sky_area=0.0001,
+        cosmo=FlatLambdaCDM(H0=70, Om0=0.3),
+        samples_number=20,
+        random_seed=1,
+    )
+
+
+def test_kext_gext_dataset_name():
+    assert kext_gext_dataset_name(1.0) == "zs_1.0"
+    assert kext_gext_dataset_name(0.30000000000000004, 0.1) == "zs_0.3_zd_0.1"
+
+
+def test_default_redshift_pairs():
+    pairs = default_redshift_pairs(nonlinear=False)
+    assert len(pairs) == 49
+    assert pairs[0] == (0.1, None) and pairs[-1] == (4.9, None)
+    pairs = default_redshift_pairs()
+    assert (0.1, 0.0) in pairs and (4.9, 4.8) in pairs
+    assert all(zd < zs for zs, zd in pairs)
+    assert default_redshift_pairs(zs_list=[0.5], zd_list=[0.2, 0.5, 0.7]) == [
+        (0.5, 0.2)
+    ]
+
+
+def test_kext_gext_samples_from_halos(halos_lens):
+    samples = kext_gext_samples_from_halos(halos_lens, [(1.5, 0.5), (1.5, None)])
+    assert set(samples) == {"zs_1.5_zd_0.5", "zs_1.5"}
+    assert samples["zs_1.5"].shape == (20, 2)
+    assert np.all(samples["zs_1.5_zd_0.5"][:, 1] >= 0)
+
+    # the same as the sampling of HalosStatistics for the last positions
+    kext, gext = halos_lens.halos_get_kext_gext_values_vectorized(zd=0.5, zs=1.5)
+    np.testing.assert_allclose(samples["zs_1.5_zd_0.5"][-1], [kext, gext])
+
+
+def test_write_kext_gext_table(tmp_path):
+    file_name = str(tmp_path / "table.h5")
+    samples = {"zs_1.0": np.ones((3, 2))}
+    write_kext_gext_table(file_name, samples, {"sky_area": 0.0001})
+    write_kext_gext_table(file_name, {"zs_1.0": np.zeros((2, 2))})
+    with h5py.File(file_name, "r") as f:
+        assert f["zs_1.0"].shape == (5, 2)
+        assert f.attrs["sky_area"] == 0.0001
+    with pytest.raises(ValueError):
+        write_kext_gext_table(file_name, samples, {"sky_area": 0.001})
+
+    # datasets of fixed size are extended as well
+    with h5py.File(file_name, "a") as f:
+        f.create_dataset("zs_2.0", data=np.ones((2, 2)))
+    write_kext_gext_table(file_name, {"zs_2.0": np.zeros((2, 2))})
+    with h5py.File(file_name, "r") as f:
+        assert f["zs_2.0"].shape == (4, 2)
+
+
+def test_build_kext_gext_table(tmp_path):
+    file_name = str(tmp_path / "joint.h5")
+    kwargs = dict(
+        zs_list=[0.5, 1.0],
+        sky_area=0.00005,
+        samples_number=4,
+        processes=2,
+    )
+    n = build_kext_gext_table(file_name, n_iterations=2, random_seed=3, **kwargs)
+    assert n == 8
+    build_kext_gext_table(file_name, n_iterations=1, random_seed=4, **kwargs)
+    with h5py.File(file_name, "r") as f:
+        assert len(f) == 5 + 10
+        assert f["zs_1.0_zd_0.5"].shape == (12, 2)
+        assert bool(f.attrs["nonlinear"])
+
+    los = LineOfSightDistribution(
+        nonlinear_correction_path=file_name, no_correction_path=file_name
+    )
+    gamma, kappa = los.get_kappa_gamma(1.0, 0.5, use_nonlinear_correction=True)
+    assert np.isfinite(gamma) and np.isfinite(kappa)
+    LineOfSightDistribution.correction_data = None
+    LineOfSightDistribution.no_nonlinear_correction_data = None
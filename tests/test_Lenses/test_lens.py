@@ -1394,7 +1394,7 @@ class TestSlhammock(object):
 
     def test_theta_e_infinity(self):
         npt.assert_almost_equal(
-            self.lens_class.einstein_radius_infinity, 3.76881, decimal=5
+            self.lens_class.einstein_radius_infinity, 3.77349, decimal=5
         )
 
     def test_image_position(self):
@@ -1,7 +1,10 @@
 from slsim.LOS.los_pop import LOSPop
 import os
 from astropy.cosmology import FlatLambdaCDM
+import numpy as np
+import numpy.testing as npt
 import pytest
+import h5py
 
 
 path = os.path.dirname(__file__)
@@ -84,3 +87,52 @@ def test_nonlinear_los_corrections(los_pop):
     assert isinstance(gamma1, float)
     assert isinstance(gamma2, float)
     assert isinstance(kappa, float)
+
+
+def test_draw_los_batch(los_pop):
+    source = np.array([0.5, 1.0, 0.3])
+    deflector = np.array([0.2, 0.4, 0.1])
+
+    los_pop.los_bool = False
+    kappa, gamma1, gamma2 = los_pop.draw_los_batch(source, deflector)
+    npt.assert_array_equal(kappa, 0)
+    npt.assert_array_equal(gamma1, 0)
+    npt.assert_array_equal(gamma2, 0)
+
+    los_pop.los_bool = True
+    los_pop.mixgauss_gamma = True
+    kappa, gamma1, gamma2 = los_pop.draw_los_batch(source, deflector, random_seed=1)
+    assert kappa.shape == gamma1.shape == gamma2.shape == (3,)
+    npt.assert_allclose(np.hypot(gamma1, gamma2), 0.1, atol=0.05)
+
+    los_pop.nonlinear_los_bool = True
+    with pytest.raises(ValueError):
+        los_pop.draw_los_batch(source, deflector)
+
+    los_pop.mixgauss_gamma = False
+    los_pop.nonlinear_los_bool = False
+    los_pop.no_correction_path = path_to_h5
+    kappa, gamma1, gamma2 = los_pop.draw_los_batch(source, deflector, random_seed=2)
+    kappa2, _, _ = los_pop.draw_los_batch(source, deflector, random_seed=2)
+    npt.assert_array_equal(kappa, kappa2)
+    los_list = los_pop.draw_los_batch(source, deflector, random_seed=2, as_list=True)
+    assert len(los_list) == 3
+    assert los_list[0].convergence == kappa[0]
+    npt.assert_almost_equal(los_list[1].shear, [gamma1[1], gamma2[1]])
+
+
+def test_draw_los_batch_other_tables(los_pop, tmp_path):
+    # tables of constant kappa and gamma, loaded by a second LOSPop
+    other_path = str(tmp_path / "constant.h5")
+    with h5py.File(other_path, "w") as h5_file:
+        for i in range(1, 50):
+            h5_file[f"zs_{i / 10}"] = np.tile([0.3, 0.2], (10, 1))
+    los_pop.no_correction_path = path_to_h5
+    other_los_pop = LOSPop(no_correction_path=other_path)
+    source, deflector = np.array([0.5, 1.0]), np.array([0.2, 0.4])
+    los_pop.draw_los_batch(source, deflector, random_seed=1)
+    kappa, _, _ = other_los_pop.draw_los_batch(source, deflector, random_seed=1)
+    npt.assert_array_equal(kappa, 0.3)
+    kappa, _, _ = los_pop.draw_los_batch(source, deflector, random_seed=1)
+    assert np.all(kappa != 0.3)
+    assert other_los_pop.draw_los(1.0, 0.4).convergence == 0.3
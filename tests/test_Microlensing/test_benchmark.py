@@ -0,0 +1,66 @@
+import json
+
+import numpy as np
+import pytest
+
+from slsim.Microlensing.benchmark import (
+    kwargs_source_morphology,
+    main,
+    run_microlensing_benchmarks,
+    synthetic_magnification_map,
+)
+
+
+def test_synthetic_magnification_map():
+    magmap = synthetic_magnification_map(
+        64, kappa_tot=0.47, shear=0.42, kappa_star=0.12, theta_star=1e-6, random_seed=1
+    )
+    assert magmap.magnifications.shape == (64, 64)
+    assert np.all(magmap.magnifications > 0)
+    np.testing.assert_allclose(np.mean(magmap.magnifications), np.abs(magmap.mu_ave))
+    assert magmap.half_length_x == 10 * 1e-6
+
+
+def test_kwargs_source_morphology():
+    assert "source_size" in kwargs_source_morphology("gaussian", None, 1e-6)
+    assert "r_out" in kwargs_source_morphology("agn", None, 1e-6)
+    with pytest.raises(ValueError):
+        kwargs_source_morphology("supernovae", None, 1e-6)
+
+
+@pytest.mark.filterwarnings("ignore:divide by zero encountered in divide")
+def test_run_microlensing_benchmarks(tmp_path):
+    output_file = str(tmp_path / "benchmark.json")
+    report = run_microlensing_benchmarks(
+        resolutions=[50],
+        point_source_morphologies=["gaussian", "agn"],
+        num_lightcurves=3,
+        output_file=output_file,
+    )
+    with open(output_file) as f:
+        assert json.load(f) == report
+    assert "slsim_version" in report["metadata"]
+    names = [benchmark["name"] for benchmark in report["benchmarks"]]
+    assert names.count("convolution") == 2
+    assert names.count("track_extraction_batch") == 2
+    for benchmark in report["benchmarks"]:
+        assert benchmark["wall_time"] > 0
+        assert "result" not in benchmark
+        if benchmark["name"] == "lens_end_to_end":
+            assert benchmark["num_lightcurves"] == 12
+            assert benchmark["lightcurves_per_second"] > 0
+
+    main(
+        [
+            "--resolutions",
+            "50",
+            "--morphologies",
+            "gaussian",
+            "--num-lightcurves",
+            "2",
+            "--output",
+            output_file,
+        ]
+    )
+    with open(output_file) as f:
+        assert len(json.load(f)["benchmarks"]) == 4
@@ -0,0 +1,155 @@
+import os
+
+import numpy as np
+import pytest
+from astropy.cosmology import FlatLambdaCDM
+from astropy.table import Table
+
+from slsim.Microlensing.lightcurve_population import (
+    MicrolensingLightCurvePopulation,
+    default_magnification_map,
+)
+from slsim.Microlensing.magmap import MagnificationMap
+
+# ---- Test Fixtures ----
+
+
+@pytest.fixture(scope="module")
+def cosmology():
+    return FlatLambdaCDM(H0=70, Om0=0.3)
+
+
+@pytest.fixture(scope="module")
+def kwargs_magnification_map():
+    """Settings of the precomputed map in the TestData folder."""
+    theta_star = 1.4533388875267387e-06
+    magmap2D = np.load(
+        os.path.join(
+            os.path.dirname(os.path.abspath(__file__)),
+            "..",
+            "TestData",
+            "test_magmaps_microlensing",
+            "magmap_0.npy",
+        )
+    )
+    return {
+        "magnifications_array": magmap2D,
+        "theta_star": theta_star,
+        "center_x": 0,
+        "center_y": 0,
+        "half_length_x": 2.5 * theta_star,
+        "half_length_y": 2.5 * theta_star,
+        "num_pixels_x": 50,
+        "num_pixels_y": 50,
+    }
+
+
+@pytest.fixture(scope="module")
+def microlensing_params():
+    """Two quads where some images have almost identical parameters."""
+    return Table(
+        {
+            "lens_id": np.array([0, 0, 0, 0, 1, 1, 1, 1]),
+            "kappa_star": np.array(
+                [0.120, 0.132, 0.159, 0.219, 0.1201, 0.1322, 0.30, 0.31]
+            ),
+            "kappa_tot": np.array(
+                [0.471, 0.493, 0.531, 0.610, 0.4712, 0.4932, 0.70, 0.72]
+            ),
+            "shear": np.array([0.423, 0.460, 0.510, 0.588, 0.4231, 0.4601, 0.60, 0.64]),
+            "shear_phi": np.array([2.0, -1.8, -0.7, 0.04, 10.0, 20.0, 30.0, 40.0]),
+            "source_redshift": np.array([2.0] * 4 + [1.5] * 4),
+            "effective_velocity": np.array([500.0] * 4 + [800.0] * 4),
+            "effective_velocity_angle": np.array([10.0] * 4 + [100.0] * 4),
+        }
+    )
+
+
+@pytest.fixture
+def population(microlensing_params, cosmology, kwargs_magnification_map):
+    return MicrolensingLightCurvePopulation(
+        microlensing_params=microlensing_params,
+        cosmology=cosmology,
+        kwargs_MagnificationMap=kwargs_magnification_map,
+        point_source_morphology="gaussian",
+        kwargs_source_morphology={"source_size": 8e-8},
+        map_tolerance=0.01,
+    )
+
+
+class TestMicrolensingLightCurvePopulation:
+
+    def test_grouping(self, population, microlensing_params, cosmology):
+        group_ids = population.group_ids
+        assert len(group_ids) == 8
+        # images 0 and 4, 1 and 5 share a map
+        assert group_ids[0] == group_ids[4]
+        assert group_ids[1] == group_ids[5]
+        assert population.num_groups == 6
+
+        exact = MicrolensingLightCurvePopulation(
+            microlensing_params,
+            cosmology,
+            kwargs_MagnificationMap={},
+            point_source_morphology="gaussian",
+            kwargs_source_morphology={},
+            map_tolerance=0,
+        )
+        assert exact.num_groups == 8
+
+    def test_default_magnification_map(self, kwargs_magnification_map):
+        magmap = default_magnification_map(0.47, 0.42, 0.12, **kwargs_magnification_map)
+        assert isinstance(magmap, MagnificationMap)
+        expected_mu_ave = 1 / ((1 - 0.47) ** 2 - 0.42**2)
+        np.testing.assert_allclose(magmap.mu_ave, expected_mu_ave)
+
+    def test_generate_lightcurves(self, population, tmp_path):
+        time = np.linspace(0, 2000, 30)
+        filename = population.generate_lightcurves(
+            time,
+            str(tmp_path / "lightcurves.h5"),
+            chunk_size=3,
+            processes=1,
+            random_seed=42,
+        )
+        image_index, lens_id, lightcurves, time_read = (
+            MicrolensingLightCurvePopulation.read_lightcurves(filename)
+        )
+        np.testing.assert_array_equal(image_index, np.arange(8))
+        np.testing.assert_array_equal(lens_id, [0, 0, 0, 0, 1, 1, 1, 1])
+        np.testing.assert_array_equal(time_read, time)
+        assert lightcurves.shape == (8, 30)
+        assert np.all(np.isfinite(lightcurves))
+
+        # reproducible with the same seed
+        filename = population.generate_lightcurves(
+            time,
+            str(tmp_path / "lightcurves_2.h5"),
+            processes=1,
+            random_seed=42,
+        )
+        _, _, lightcurves_2, _ = MicrolensingLightCurvePopulation.read_lightcurves(
+            filename
+        )
+        np.testing.assert_allclose(lightcurves, lightcurves_2)
+
+    def test_generate_lightcurves_multiprocessing(self, population, tmp_path):
+        time = np.linspace(0, 1000, 10)
+        filename = population.generate_lightcurves(
+            time,
+            str(tmp_path / "lightcurves.h5"),
+            lightcurve_type="magnification",
+            processes=2,
+            random_seed=1,
+        )
+        _, _, lightcurves, _ = MicrolensingLightCurvePopulation.read_lightcurves(
+            filename
+        )
+        assert lightcurves.shape == (8, 10)
+        assert np.all(lightcurves > 0)
+
+    def test_invalid_lightcurve_type(self, population, tmp_path):
+        with pytest.raises(ValueError, match="Lightcurve type not recognized"):
+            population.generate_lightcurves(
+                [0, 1], str(tmp_path / "lc.h5"), lightcurve_type="flux"
+            )
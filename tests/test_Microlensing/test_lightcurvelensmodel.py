@@ -752,3 +752,97 @@ class TestMicrolensingLightCurveFromLensModel:
         magmaps = ml_lens_model.magmaps_images
         assert isinstance(magmaps, list)
         assert len(magmaps) == len(microlensing_params["kappa_star"])
+
+
+def test_cosmology_interpolation_grid():
+    from astropy.cosmology import LambdaCDM
+    from slsim.Microlensing.lightcurvelensmodel import (
+        cosmology_interpolation_grid,
+        _transverse_comoving_distance,
+    )
+
+    for cosmo in [
+        FlatLambdaCDM(H0=70, Om0=0.3),
+        LambdaCDM(H0=70, Om0=0.3, Ode0=0.6),
+        LambdaCDM(H0=70, Om0=0.3, Ode0=0.8),
+    ]:
+        z_grid, comoving_distance, growth = cosmology_interpolation_grid(cosmo)
+        # cached per cosmology
+        assert cosmology_interpolation_grid(cosmo)[0] is z_grid
+        np.testing.assert_allclose(growth[0], 1)
+        z_l, z_s = np.array([0.5, 1.2]), np.array([2.0, 3.1])
+        D_C_l = np.interp(z_l, z_grid, comoving_distance)
+        D_C_s = np.interp(z_s, z_grid, comoving_distance)
+        np.testing.assert_allclose(
+            _transverse_comoving_distance(D_C_l, cosmo) / (1 + z_l),
+            cosmo.angular_diameter_distance(z_l).value,
+            rtol=1e-4,
+        )
+        np.testing.assert_allclose(
+            _transverse_comoving_distance(D_C_s - D_C_l, cosmo) / (1 + z_s),
+            cosmo.angular_diameter_distance_z1z2(z_l, z_s).value,
+            rtol=1e-4,
+        )
+
+
+def test_effective_transverse_velocities(
+    lens_source_info, microlensing_params, cosmology
+):
+    from astropy import units as u
+    from astropy.coordinates import SkyCoord
+    from slsim.Microlensing.lightcurvelensmodel import (
+        effective_transverse_velocities,
+        growth_rate,
+    )
+
+    num_lenses = 5000
+    z_s = np.full(num_lenses, lens_source_info["source_redshift"])
+    z_l = np.full(num_lenses, lens_source_info["deflector_redshift"])
+    ra = np.full(num_lenses, lens_source_info["ra_lens"])
+    dec = np.full(num_lenses, lens_source_info["dec_lens"])
+    sigma = np.full(num_lenses, lens_source_info["deflector_velocity_dispersion"])
+    shear_phi = np.tile(microlensing_params["shear_phi"], num_lenses)
+    lens_indices = np.repeat(np.arange(num_lenses), 4)
+
+    velocities, angles = effective_transverse_velocities(
+        z_s, z_l, ra, dec, sigma, shear_phi, lens_indices, cosmology, random_seed=42
+    )
+    assert velocities.shape == angles.shape == (4 * num_lenses,)
+    assert np.all(velocities >= 0)
+    velocities_2, angles_sky = effective_transverse_velocities(
+        z_s,
+        z_l,
+        ra,
+        dec,
+        sigma,
+        shear_phi,
+        lens_indices,
+        cosmology,
+        random_seed=42,
+        magmap_reference_frame=False,
+    )
+    np.testing.assert_allclose(velocities, velocities_2)
+    np.testing.assert_allclose(angles, angles_sky - shear_phi)
+
+    # the mean squared velocity matches the sum of the variances of eq. 7
+    z_l0, z_s0 = z_l[0], z_s[0]
+    D_l = cosmology.angular_diameter_distance(z_l0)
+    D_s = cosmology.angular_diameter_distance(z_s0)
+    D_ls = cosmology.angular_diameter_distance_z1z2(z_l0, z_s0)
+    f0 = growth_rate(0, cosmology)
+    sig_l = 235 / (1 + z_l0) ** 0.5 * growth_rate(z_l0, cosmology) / f0
+    sig_s = 235 / (1 + z_s0) ** 0.5 * growth_rate(z_s0, cosmology) / f0
+    sigma_g2 = (sig_l / (1 + z_l0) * D_s / D_l) ** 2 + (sig_s / (1 + z_s0)) ** 2
+    u_dipole = SkyCoord(ra=167.942 * u.deg, dec=-6.944 * u.deg).cartesian.xyz.value
+    u_los = SkyCoord(ra=ra[0] * u.deg, dec=dec[0] * u.deg).cartesian.xyz.value
+    v_cmb = 369.8 * u_dipole
+    v_o = (v_cmb - np.dot(u_los, v_cmb) * u_los) * (D_ls / D_l) / (1 + z_l0)
+    v_star2 = (np.sqrt(2) * sigma[0] * (D_s / D_l) / (1 + z_l0)) ** 2
+    expected = np.sum(v_o.value**2) + sigma_g2.value + v_star2.value
+    np.testing.assert_allclose(np.mean(velocities**2), expected, rtol=0.05)
+
+    # a lens at the celestial pole
+    velocities_pole, _ = effective_transverse_velocities(
+        2.0, 0.5, 0.0, 90.0, 200.0, [0.0, 10.0], [0, 0], cosmology
+    )
+    assert velocities_pole.shape == (2,)
@@ -194,3 +194,51 @@ class TestMagnificationMap:
         ang_diam_dist_m = cosmology.angular_diameter_distance(source_z).to(u.m).value
         expected_meters = ang_diam_dist_m * pixel_size_arcsec * u.arcsec.to(u.rad)
         np.testing.assert_allclose(pix_size_meters, expected_meters)
+
+    def test_float32_storage_and_cached_magnitudes(
+        self, loaded_mag_array, magmap_params
+    ):
+        magmap = MagnificationMap(
+            magnifications_array=loaded_mag_array, dtype=np.float32, **magmap_params
+        )
+        assert magmap.magnifications.dtype == np.float32
+        magnitudes = magmap.magnitudes
+        assert magnitudes.dtype == np.float32
+        # cached on first access
+        assert magmap.magnitudes is magnitudes
+        # reset when the magnifications change
+        magmap.magnifications = loaded_mag_array * 2
+        assert magmap.magnifications.dtype == np.float32
+        assert magmap.magnitudes is not magnitudes
+
+    def test_to_file_from_file(self, magmap_instance, magmap_params, tmp_path):
+        filename = magmap_instance.to_file(tmp_path / "magmap", dtype=np.float32)
+        assert filename.endswith(".npy")
+        assert os.path.exists(str(tmp_path / "magmap.json"))
+
+        magmap = MagnificationMap.from_file(filename)
+        assert isinstance(magmap.magnifications, np.memmap)
+        assert not magmap.magnifications.flags.writeable
+        assert magmap.magnifications.dtype == np.float32
+        np.testing.assert_allclose(
+            magmap.magnifications, magmap_instance.magnifications, rtol=1e-6
+        )
+        assert magmap.mu_ave == magmap_instance.mu_ave
+        assert magmap.num_pixels_x == magmap_params["num_pixels_x"]
+        assert magmap.half_length_x == magmap_params["half_length_x"]
+        assert magmap._m_lower == magmap_params["m_lower"]
+
+        # stored parameters can be overridden and the map read into memory
+        magmap = MagnificationMap.from_file(
+            filename, mmap_mode=None, dtype=np.float64, theta_star=1.0
+        )
+        assert not isinstance(magmap.magnifications, np.memmap)
+        assert magmap.magnifications.dtype == np.float64
+        assert magmap.theta_star == 1.0
+
+        # without a parameter file only the magnifications are restored
+        np.save(tmp_path / "bare.npy", magmap_instance.magnifications)
+        magmap = MagnificationMap.from_file(
+            tmp_path / "bare.npy", kappa_tot=0.5, shear=0.1, kappa_star=0.1
+        )
+        assert magmap.num_pixels == magmap_instance.num_pixels
@@ -1,5 +1,7 @@
 from slsim.Pipelines.halos_pipeline import HalosSkyPyPipeline
 from astropy.cosmology import FlatLambdaCDM, default_cosmology
+import numpy as np
+import pytest
 
 
 class TestHalosSkyPyPipeline(object):
@@ -35,3 +37,32 @@ def test_default_pipeline():
     pipeline0 = HalosSkyPyPipeline()
     halos0 = pipeline0.halos
     assert halos0[0]["z"] > 0
+
+
+def test_pipeline_without_skypy():
+    pipeline = HalosSkyPyPipeline(
+        sky_area=0.001, m_min=1.0e11, z_max=4.0, use_skypy=False, random_seed=1
+    )
+    halos = pipeline.halos
+    assert len(halos) > 1
+    assert np.all(halos["z"] <= 4.0)
+    assert np.all(halos["mass"] >= 1.0e11)
+    sheets = pipeline.mass_sheet_correction
+    reference = HalosSkyPyPipeline(sky_area=0.001, m_min=1.0e11, z_max=4.0)
+    np.testing.assert_allclose(
+        sheets["z"], reference.mass_sheet_correction["z"], rtol=1e-10
+    )
+    np.testing.assert_allclose(
+        sheets["kappa"], reference.mass_sheet_correction["kappa"], rtol=1e-3
+    )
+    with pytest.raises(ValueError):
+        HalosSkyPyPipeline(skypy_config="halo.yml", use_skypy=False)
+
+
+def test_pipeline_random_seed():
+    pipeline1 = HalosSkyPyPipeline(sky_area=0.0001, random_seed=7)
+    pipeline2 = HalosSkyPyPipeline(sky_area=0.0001, random_seed=7)
+    np.testing.assert_array_equal(pipeline1.halos["z"], pipeline2.halos["z"])
+    np.testing.assert_array_equal(pipeline1.halos["mass"], pipeline2.halos["mass"])
+    with pytest.raises(ValueError):
+        HalosSkyPyPipeline(random_seed=np.random.default_rng(1))
@@ -1,4 +1,7 @@
-﻿from slsim.Pipelines.skypy_pipeline import SkyPyPipeline
+﻿from slsim.Pipelines.skypy_pipeline import (
+    SkyPyPipeline,
+    skypy_galaxy_tables_in_tiles,
+)
 from astropy.cosmology import (
     LambdaCDM,
     FlatLambdaCDM,
@@ -7,6 +10,9 @@ from astropy.cosmology import (
     default_cosmology,
 )
 import os
+import numpy as np
+import numpy.testing as npt
+import pytest
 
 
 class TestSkyPyPipeline(object):
@@ -111,3 +117,34 @@ class TestSkyPyPipeline(object):
         assert "mag_z" in red_galaxies.colnames
         assert "mag_y" in red_galaxies.colnames
         assert "mag_u" in red_galaxies.colnames
+
+    def test_tiles_and_cache(self, tmp_path):
+        from astropy.units import Quantity
+
+        kwargs = {
+            "sky_area": self.sky_area,
+            "tile_area": Quantity(value=0.0005, unit="deg2"),
+            "processes": 1,
+            "random_seed": 42,
+        }
+        pipeline = SkyPyPipeline(cache_dir=str(tmp_path), **kwargs)
+        assert len(list(tmp_path.iterdir())) == 2
+        blue_galaxies = pipeline.blue_galaxies
+        red_galaxies = pipeline.red_galaxies
+        assert len(blue_galaxies) > 0
+        assert len(red_galaxies) > 0
+        assert "mag_i" in blue_galaxies.colnames
+
+        # the catalog is read from the cache
+        cached = SkyPyPipeline(cache_dir=str(tmp_path), **kwargs)
+        npt.assert_array_equal(cached.blue_galaxies["z"], blue_galaxies["z"])
+        npt.assert_array_equal(cached.red_galaxies["mag_i"], red_galaxies["mag_i"])
+        assert np.all(cached.blue_galaxies["angular_size"] > 0)
+
+        # a catalog without a seed is not cached
+        kwargs["random_seed"] = None
+        with pytest.raises(ValueError):
+            SkyPyPipeline(cache_dir=str(tmp_path), **kwargs)
+
+        with pytest.raises(ValueError):
+            skypy_galaxy_tables_in_tiles("", sky_area=self.sky_area, num_tiles=2)
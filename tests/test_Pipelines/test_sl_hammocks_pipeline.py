@@ -2,7 +2,10 @@
 from astropy.cosmology import LambdaCDM
 from astropy.cosmology import w0waCDM
 
-from slsim.Pipelines.sl_hammocks_pipeline import SLHammocksPipeline
+from slsim.Pipelines.sl_hammocks_pipeline import (
+    SLHammocksPipeline,
+    halo_galaxy_population,
+)
 
 
 class TestSkyPyPipeline(object):
@@ -95,3 +98,37 @@ class TestSkyPyPipeline(object):
         assert "Now sky_area should be lower than" in str(
             excinfo.value
         ), "An exception with sky_area' message should be raised for too large sky_area"
+
+
+def test_halo_galaxy_population():
+    import numpy as np
+    from astropy.units import Quantity
+
+    cosmo = LambdaCDM(H0=70, Om0=0.3, Ob0=0.05, Ode0=0.7, Tcmb0=2.725)
+    kwargs_population = {
+        "z_min": 0.1,
+        "z_max": 1.5,
+        "log10host_halo_mass_min": 12.0,
+        "log10host_halo_mass_max": 15.0,
+        "sigma_host_halo_concentration": 0.33,
+        "sigma_central_galaxy_mass": 0.2,
+        "TYPE_GAL_SIZE": "vdW23",
+        "sig_tb": 0.46,
+        "frac_SM_IMF": 1.715,
+        "TYPE_SMHM": "true",
+        "sigma8": 0.8102,
+        "ns": 0.9660499,
+    }
+    table = halo_galaxy_population(
+        Quantity(value=0.05, unit="deg2"), cosmo, **kwargs_population
+    )
+    assert len(table) > 0
+    assert np.all((table["z"] >= 0.1) & (table["z"] <= 1.501))
+    assert np.all((table["halo_mass"] >= 1e12) & (table["halo_mass"] < 1e15))
+    assert np.all(table["concentration"] >= 1)
+    assert np.all(table["halo_mass_acc"] == 0)
+
+    table = halo_galaxy_population(
+        Quantity(value=1e-8, unit="deg2"), cosmo, **kwargs_population
+    )
+    assert len(table) == 0
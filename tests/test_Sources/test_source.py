@@ -1,4 +1,5 @@
 from slsim.Sources.source import Source
+from slsim.Util.column_view import ColumnView
 import numpy as np
 import pytest
 from numpy import testing as npt
@@ -173,6 +174,39 @@ class TestSource:
         assert x_pos_1 == x_pos_2
         assert y_pos_1 == y_pos_2
 
+    def test_from_arrays(self):
+        cosmo = cosmology.FlatLambdaCDM(H0=70, Om0=0.3)
+        columns = {
+            name: np.array([value, value])
+            for name, value in self.source_dict_extended.items()
+        }
+        columns["z"] = np.array([1.0, 2.0])
+        sources = Source.from_arrays(
+            columns, extended_source_type="single_sersic", cosmo=cosmo
+        )
+        assert len(sources) == 2
+        npt.assert_almost_equal(sources[0].redshift, 1.0)
+        npt.assert_almost_equal(sources[1].redshift, 2.0)
+        assert isinstance(sources[0]._source.source_dict, ColumnView)
+        assert "z" not in sources[0]._source.source_dict
+        npt.assert_almost_equal(
+            sources[0].extended_source_magnitude("i"),
+            self.source.extended_source_magnitude("i"),
+        )
+        npt.assert_almost_equal(
+            sources[0].extended_source_position, self.source.extended_source_position
+        )
+        assert sources[0].kwargs_extended_light(
+            band="i"
+        ) == self.source.kwargs_extended_light(band="i")
+        sources = Source.from_arrays(
+            columns, indices=[1], extended_source_type="single_sersic", cosmo=cosmo
+        )
+        assert len(sources) == 1
+        npt.assert_almost_equal(sources[0].redshift, 2.0)
+        with pytest.raises(ValueError):
+            Source.from_arrays(columns, extended_source_type="other", cosmo=cosmo)
+
     def test_error(self):
         cosmo = cosmology.FlatLambdaCDM(H0=70, Om0=0.3)
         self.source_dict_extended = {
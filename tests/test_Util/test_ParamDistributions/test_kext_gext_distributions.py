@@ -1,6 +1,10 @@
 from slsim.Util.ParamDistributions.kext_gext_distributions import (
     LineOfSightDistribution,
+    LazyDatasets,
+    convert_to_npy,
 )
+import numpy as np
+import numpy.testing as npt
 import pytest
 import os
 
@@ -88,8 +92,104 @@ def test_invalid():
 def reset_line_of_sight():
     LineOfSightDistribution.correction_data = None
     LineOfSightDistribution.no_nonlinear_correction_data = None
+    LineOfSightDistribution.correction_index = None
+    LineOfSightDistribution.no_nonlinear_correction_index = None
 
     yield
 
     LineOfSightDistribution.correction_data = None
     LineOfSightDistribution.no_nonlinear_correction_data = None
+
+
+def test_draw_kappa_gamma():
+    current_directory = os.path.dirname(os.path.abspath(__file__))
+    mother_path = os.path.dirname(os.path.dirname(os.path.dirname(current_directory)))
+    path_to_h5 = os.path.join(mother_path, "data/glass/no_nonlinear_distributions.h5")
+    line_of_sight = LineOfSightDistribution(no_correction_path=path_to_h5)
+    z_source = np.array([0.5, 1.04, 0.3, 2.0])
+    z_lens = np.array([0.3, 0.5, 0.4, 0.2])
+    kappa, gamma = line_of_sight.draw_kappa_gamma(z_source, z_lens, random_seed=1)
+    assert kappa.shape == gamma.shape == (4,)
+    assert kappa[2] == 0 and gamma[2] == 0
+
+    # kappa and gamma are drawn from the same row of the table
+    data = line_of_sight.no_nonlinear_correction_data
+    for k, g, zs in zip(kappa[[0, 1, 3]], gamma[[0, 1, 3]], [0.5, 1.0, 2.0]):
+        table = data[f"zs_{zs}"]
+        assert np.any((table[:, 0] == k) & (table[:, 1] == g))
+
+    kappa2, gamma2 = line_of_sight.draw_kappa_gamma(z_source, z_lens, random_seed=1)
+    npt.assert_array_equal(kappa, kappa2)
+    npt.assert_array_equal(gamma, gamma2)
+
+    kappa, gamma = line_of_sight.draw_kappa_gamma(0.5, 0.3, random_seed=1)
+    assert kappa.shape == (1,)
+
+    with pytest.warns(UserWarning):
+        kappa, gamma = line_of_sight.draw_kappa_gamma(
+            0.5, 0.3, use_nonlinear_correction=True
+        )
+    assert kappa[0] == 0 and gamma[0] == 0
+
+    file_path = os.path.join(mother_path, "tests/TestData/empty_file.h5")
+    line_of_sight = LineOfSightDistribution(no_correction_path=file_path)
+    with pytest.raises(ValueError):
+        line_of_sight.draw_kappa_gamma(0.5, 0.3)
+
+
+def test_lazy_datasets(tmp_path):
+    current_directory = os.path.dirname(os.path.abspath(__file__))
+    mother_path = os.path.dirname(os.path.dirname(os.path.dirname(current_directory)))
+    path_to_h5 = os.path.join(mother_path, "data/glass/no_nonlinear_distributions.h5")
+    data = LineOfSightDistribution._load_data(path_to_h5)
+
+    lazy = LazyDatasets(path_to_h5, cache_size=2)
+    assert len(lazy) == len(data)
+    assert set(lazy) == set(data)
+    npt.assert_array_equal(lazy["zs_0.5"], data["zs_0.5"])
+    assert lazy["zs_0.5"] is lazy["zs_0.5"]
+    assert lazy.offsets() is None
+    with pytest.raises(KeyError):
+        lazy["zs_9.9"]
+
+    npy_path = convert_to_npy(path_to_h5, str(tmp_path / "no_nonlinear.npy"))
+    lazy_npy = LazyDatasets(npy_path)
+    assert set(lazy_npy) == set(data)
+    npt.assert_array_equal(lazy_npy["zs_1.2"], data["zs_1.2"])
+    assert np.shares_memory(lazy_npy["zs_1.2"], lazy_npy.values)
+
+    line_of_sight = LineOfSightDistribution(no_correction_path=path_to_h5, lazy=True)
+    assert isinstance(line_of_sight.no_nonlinear_correction_data, LazyDatasets)
+    gamma, kappa = line_of_sight.get_kappa_gamma(0.5, 0.3)
+    assert gamma in data["zs_0.5"][:, 1]
+    assert kappa in data["zs_0.5"][:, 0]
+
+    line_of_sight = LineOfSightDistribution(no_correction_path=npy_path)
+    kappa, gamma = line_of_sight.draw_kappa_gamma(
+        np.array([0.5, 2.0]), 0.2, random_seed=1
+    )
+    assert np.any(
+        (data["zs_2.0"][:, 0] == kappa[1]) & (data["zs_2.0"][:, 1] == gamma[1])
+    )
+    values, _, _, _ = line_of_sight._index(False)
+    assert values is line_of_sight.no_nonlinear_correction_data.values
+
+    # lazy H5 data are drawn per dataset instead of being concatenated
+    z_source = np.array([0.5, 2.0, 1.2, 0.5])
+    kappa, gamma = line_of_sight.draw_kappa_gamma(z_source, 0.2, random_seed=2)
+    LineOfSightDistribution.no_nonlinear_correction_data = None
+    line_of_sight = LineOfSightDistribution(no_correction_path=path_to_h5, lazy=True)
+    lazy = line_of_sight.no_nonlinear_correction_data
+    lazy._read.cache_clear()
+    kappa_lazy, gamma_lazy = line_of_sight.draw_kappa_gamma(
+        z_source, 0.2, random_seed=2
+    )
+    npt.assert_array_equal(kappa_lazy, kappa)
+    npt.assert_array_equal(gamma_lazy, gamma)
+    values, _, counts, _ = line_of_sight._index(False)
+    assert values is None
+    assert counts[5, 0] == len(data["zs_0.5"])
+    assert lazy._read.cache_info().currsize == 3
+
+    line_of_sight = LineOfSightDistribution(no_correction_path=path_to_h5)
+    assert isinstance(line_of_sight.no_nonlinear_correction_data, dict)
@@ -31,6 +31,7 @@ from slsim.Util.astro_util import (
     convert_passband_to_nm,
     pull_value_from_grid,
     extract_light_curve,
+    extract_light_curve_batch,
     theta_star_physical,
 )
 from astropy.cosmology import Planck18
@@ -1284,6 +1285,129 @@ def test_extract_light_curve_all_cases():
     print("extract_light_curve tests PASSED")
 
 
+def test_extract_light_curve_batch():
+    conv_array = np.random.default_rng(1).random((40, 30))
+    pixel_size = 1.0
+    eff_vel_km_s = 1.0
+    time_yr_for_1px = 0.001 / u.yr.to(u.s)
+    x_starts = np.array([3.0, 10.5, 20.0])
+    y_starts = np.array([4.0, 12.0, 5.0])
+    phis = np.array([0.0, 45.0, 90.0])
+
+    lcs, x_tracks, y_tracks = extract_light_curve_batch(
+        conv_array,
+        pixel_size,
+        eff_vel_km_s,
+        time_yr_for_1px * 10,
+        x_start_positions=x_starts,
+        y_start_positions=y_starts,
+        phi_travel_directions=phis,
+        return_track_coords=True,
+    )
+    assert lcs.shape[0] == 3
+    assert x_tracks.shape == lcs.shape
+    for i in range(3):
+        lc, x_track, y_track = extract_light_curve(
+            conv_array,
+            pixel_size,
+            eff_vel_km_s,
+            time_yr_for_1px * 10,
+            x_start_position=x_starts[i],
+            y_start_position=y_starts[i],
+            phi_travel_direction=phis[i],
+            return_track_coords=True,
+        )
+        npt.assert_array_almost_equal(lcs[i], lc, decimal=NPT_DECIMAL_PLACES)
+        npt.assert_array_almost_equal(x_tracks[i], x_track)
+        npt.assert_array_almost_equal(y_tracks[i], y_track)
+        npt.assert_array_almost_equal(
+            lcs[i], pull_value_from_grid(conv_array, x_tracks[i], y_tracks[i])
+        )
+
+    # random start positions and directions stay within the array
+    lcs, x_tracks, y_tracks = extract_light_curve_batch(
+        conv_array,
+        pixel_size,
+        eff_vel_km_s,
+        time_yr_for_1px * 10,
+        num_light_curves=50,
+        pixel_shift=2,
+        return_track_coords=True,
+        random_seed=42,
+    )
+    assert lcs.shape[0] == 50
+    assert np.all(np.isfinite(x_tracks)) and np.all(np.isfinite(y_tracks))
+    assert np.all(x_tracks >= 2) and np.all(x_tracks < 40 - 3 + 2)
+    assert np.all(y_tracks >= 2) and np.all(y_tracks < 30 - 3 + 2)
+    lcs_seeded = extract_light_curve_batch(
+        conv_array,
+        pixel_size,
+        eff_vel_km_s,
+        time_yr_for_1px * 10,
+        num_light_curves=50,
+        pixel_shift=2,
+        random_seed=42,
+    )
+    npt.assert_array_equal(lcs, lcs_seeded)
+
+    # tracks leaving the array fall back to the average flux
+    lcs, x_tracks, _ = extract_light_curve_batch(
+        conv_array,
+        pixel_size,
+        eff_vel_km_s,
+        time_yr_for_1px * 10,
+        x_start_positions=[35.0, 5.0],
+        y_start_positions=5.0,
+        phi_travel_directions=0.0,
+        return_track_coords=True,
+    )
+    npt.assert_almost_equal(lcs[0], np.mean(conv_array))
+    assert np.all(np.isnan(x_tracks[0]))
+    assert np.all(np.isfinite(x_tracks[1]))
+
+    # one velocity per light curve, each track covers its own length
+    lcs, x_tracks, y_tracks = extract_light_curve_batch(
+        conv_array,
+        pixel_size,
+        np.array([1.0, 0.5, 3.0]),
+        time_yr_for_1px * 10,
+        x_start_positions=x_starts,
+        y_start_positions=y_starts,
+        phi_travel_directions=phis,
+        return_track_coords=True,
+    )
+    assert lcs.shape[0] == 3
+    npt.assert_almost_equal(x_tracks[:2, -1] - x_starts[:2], [10, 5 / np.sqrt(2)])
+    npt.assert_almost_equal(y_tracks[:2, -1] - y_starts[:2], [0, 5 / np.sqrt(2)])
+    lc = extract_light_curve_batch(
+        conv_array,
+        pixel_size,
+        0.5,
+        time_yr_for_1px * 10,
+        x_start_positions=x_starts[1],
+        y_start_positions=y_starts[1],
+        phi_travel_directions=phis[1],
+    )[0]
+    npt.assert_almost_equal(
+        np.interp(np.linspace(0, 1, 50), np.linspace(0, 1, len(lc)), lc),
+        np.interp(np.linspace(0, 1, 50), np.linspace(0, 1, lcs.shape[1]), lcs[1]),
+        decimal=2,
+    )
+    # the fast track leaves the array and falls back to the average flux
+    npt.assert_almost_equal(lcs[2], np.mean(conv_array))
+    assert np.all(np.isnan(x_tracks[2]))
+
+    # traversal and pixel shift too large
+    lcs = extract_light_curve_batch(
+        conv_array, pixel_size, eff_vel_km_s * u.km / u.s, 50 * time_yr_for_1px * u.yr
+    )
+    npt.assert_almost_equal(lcs, np.mean(conv_array))
+    lcs = extract_light_curve_batch(
+        conv_array, pixel_size, eff_vel_km_s, time_yr_for_1px, pixel_shift=20
+    )
+    npt.assert_almost_equal(lcs, np.mean(conv_array))
+
+
 def test_theta_star_physical_realistic_scenario():
     print("Running simple realistic test for theta_star_physical...")
 
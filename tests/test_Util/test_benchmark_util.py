@@ -0,0 +1,60 @@
+import json
+import tracemalloc
+
+import numpy as np
+
+from slsim.Util.benchmark_util import (
+    benchmark_metadata,
+    measure,
+    process_peak_rss_mb,
+    write_benchmark_json,
+)
+
+
+def test_process_peak_rss_mb():
+    assert process_peak_rss_mb() > 0
+
+
+def test_measure():
+    result = measure(np.ones, 10**6, repeat=2)
+    assert result["repeat"] == 2
+    assert result["wall_time"] <= result["wall_time_mean"]
+    assert result["peak_traced_memory_mb"] > 7
+    assert result["process_peak_rss_mb"] >= result["peak_traced_memory_mb"]
+    assert result["result"].shape == (10**6,)
+    assert not tracemalloc.is_tracing()
+
+    # an already running trace is left running
+    tracemalloc.start()
+    measure(np.ones, 10)
+    assert tracemalloc.is_tracing()
+    tracemalloc.stop()
+
+
+def test_measure_untraced_timing():
+    traced = []
+
+    def function():
+        traced.append(tracemalloc.is_tracing())
+        return len(traced)
+
+    result = measure(function, repeat=2)
+    # two untraced timed calls and one traced call for the memory
+    assert traced == [False, False, True]
+    assert result["result"] == 2
+
+    traced.clear()
+    result = measure(function, repeat=2, trace_memory=False)
+    assert traced == [False, False]
+    assert result["peak_traced_memory_mb"] is None
+
+
+def test_write_benchmark_json(tmp_path):
+    assert "numpy_version" in benchmark_metadata()
+    results = [{"name": "test", "wall_time": np.float64(1.0), "result": [1, 2]}]
+    filename = str(tmp_path / "benchmark.json")
+    report = write_benchmark_json(results, filename)
+    assert report["benchmarks"] == [{"name": "test", "wall_time": 1.0}]
+    with open(filename) as f:
+        assert json.load(f)["benchmarks"][0]["wall_time"] == 1.0
+    assert write_benchmark_json(results)["benchmarks"][0]["name"] == "test"
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from slsim.Util.column_view import ColumnView
+
+
+class TestColumnView(object):
+    def setup_method(self):
+        self.columns = {
+            "z": np.array([0.5, 1.0]),
+            "mag_g": np.array([20.0, 21.0]),
+            "vel_disp": np.array([200.0, 250.0]),
+        }
+
+    def test_getitem(self):
+        view = ColumnView(self.columns, 1)
+        assert view.index == 1
+        assert view["z"] == 1.0
+        assert view["mag_g"] == 21.0
+        assert len(view) == 3
+        assert dict(view) == {"z": 1.0, "mag_g": 21.0, "vel_disp": 250.0}
+        assert dict(**view) == dict(view)
+
+    def test_names(self):
+        view = ColumnView(self.columns, 0, names=("mag_g",))
+        assert "mag_g" in view
+        assert "z" not in view
+        assert list(view) == ["mag_g"]
+        with pytest.raises(KeyError):
+            view["z"]
+        assert view.get("z") is None
+
+    def test_setitem(self):
+        view = ColumnView(self.columns, 0, names=("mag_g",))
+        view["vel_disp"] = 100.0
+        view["mag_g"] = 19.0
+        assert view["vel_disp"] == 100.0
+        assert view["mag_g"] == 19.0
+        assert list(view) == ["mag_g", "vel_disp"]
+        # the shared columns are unchanged
+        assert self.columns["vel_disp"][0] == 200.0
+        assert self.columns["mag_g"][0] == 20.0
+        assert ColumnView(self.columns, 0)["mag_g"] == 20.0
+        assert "ColumnView" in repr(view)
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -55,6 +55,10 @@ def test_epsilon2e():
     assert e == 0
     with pytest.raises(ValueError):
         epsilon2e(17)
+    epsilon = np.array([0, 0.3, 0.8])
+    npt.assert_almost_equal(epsilon2e(epsilon), [epsilon2e(x) for x in epsilon])
+    with pytest.raises(ValueError):
+        epsilon2e(np.array([0.5, 1.2]))
 
 
 def test_e2epsilon():